@@ -4,49 +4,88 @@ from __future__ import (
     print_function,
 )
 
+import atexit
 import getopt
+import importlib
 import os
 import sys
 import logging
 
 from pcs import (
-    acl,
-    booth,
-    cluster,
-    config,
-    constraint,
-    node,
-    pcsd,
-    prop,
-    qdevice,
-    quorum,
-    resource,
     settings,
-    status,
-    stonith,
     usage,
-    utils,
-    alert,
 )
-
 from pcs.cli.common import (
-    capabilities,
     completion,
     parse_args,
 )
+from pcs.common import trace
 
 
 logging.basicConfig()
 usefile = False
 filename = ""
+
+def _load_command(module_name, function_name):
+    # Command modules are imported only when their command is run, importing
+    # all of them considerably slows down pcs start.
+    def run(argv):
+        module = importlib.import_module("pcs." + module_name)
+        getattr(module, function_name)(argv)
+    return run
+
+def _load_library_command(module_name, function_name):
+    def run(argv):
+        from pcs import utils
+        module = importlib.import_module("pcs." + module_name)
+        getattr(module, function_name)(
+            utils.get_library_wrapper(),
+            argv,
+            utils.get_modifiers()
+        )
+    return run
+
+def _get_completion_tree():
+    tree = completion.load_suggestion_tree(
+        settings.completion_tree_file, usage.__file__
+    )
+    if tree is None:
+        tree = usage.generate_completion_tree_from_usage()
+    return tree
+
+def _report_trace(print_summary, trace_file):
+    if trace_file:
+        try:
+            trace.write_chrome_trace(trace_file)
+        except EnvironmentError as e:
+            sys.stderr.write(
+                "Warning: Unable to save trace to '{0}': {1}\n".format(
+                    trace_file, e.strerror
+                )
+            )
+    if print_summary:
+        sys.stderr.write(trace.get_summary() + "\n")
+
 def main(argv=None):
     if completion.has_applicable_environment(os.environ):
         print(completion.make_suggestions(
             os.environ,
-            usage.generate_completion_tree_from_usage()
+            _get_completion_tree(),
+            completion.CibIdCache(
+                settings.completion_id_cache_file,
+                settings.completion_id_cache_ttl,
+                lambda: completion.load_cib_configuration(
+                    os.path.join(settings.pacemaker_binaries, "cibadmin")
+                )
+            ).get
         ))
         sys.exit()
 
+    # imported after the completion has been handled as it is slow to import
+    from pcs import utils
+    from pcs.cli.common import capabilities
+    from pcs.lib import resource_agent
+
     argv = argv if argv else sys.argv[1:]
     utils.subprocess_setup()
     global filename, usefile
@@ -58,6 +97,8 @@ def main(argv=None):
     # we want to support optional arguments for --wait, so if an argument
     # is specified with --wait (ie. --wait=30) then we use them
     waitsecs = None
+    # the same applies to --watch
+    watchsecs = None
     new_argv = []
     for arg in argv:
         if arg.startswith("--wait="):
@@ -65,6 +106,11 @@ def main(argv=None):
             if len(tempsecs) > 0:
                 waitsecs = tempsecs
                 arg = "--wait"
+        elif arg.startswith("--watch="):
+            tempsecs = arg.replace("--watch=","")
+            if len(tempsecs) > 0:
+                watchsecs = tempsecs
+                arg = "--watch"
         new_argv.append(arg)
     argv = new_argv
 
@@ -128,6 +174,8 @@ def main(argv=None):
             sys.exit()
         elif o == "--wait":
             utils.pcs_options[o] = waitsecs
+        elif o == "--watch":
+            utils.pcs_options[o] = watchsecs
         elif o == "--request-timeout":
             request_timeout_valid = False
             try:
@@ -155,53 +203,36 @@ def main(argv=None):
     logger.propagate = 0
     logger.handlers = []
 
+    trace_file = os.environ.get("PCS_TRACE")
+    if "--profile" in utils.pcs_options or trace_file:
+        trace.enable()
+        atexit.register(
+            _report_trace, "--profile" in utils.pcs_options, trace_file
+        )
+
+    # share agents' metadata with other pcs processes
+    resource_agent.enable_metadata_cache(settings.agent_metadata_cache_dir)
+
     command = argv.pop(0)
     if (command == "-h" or command == "help"):
         usage.main()
         return
     cmd_map = {
-        "resource": resource.resource_cmd,
-        "cluster": cluster.cluster_cmd,
-        "stonith": stonith.stonith_cmd,
-        "property": prop.property_cmd,
-        "constraint": constraint.constraint_cmd,
-        "acl": lambda argv: acl.acl_cmd(
-            utils.get_library_wrapper(),
-            argv,
-            utils.get_modifiers()
-        ),
-        "status": lambda argv: status.status_cmd(
-            utils.get_library_wrapper(),
-            argv,
-            utils.get_modifiers()
-        ),
-        "config": config.config_cmd,
-        "pcsd": pcsd.pcsd_cmd,
-        "node": lambda argv: node.node_cmd(
-            utils.get_library_wrapper(),
-            argv,
-            utils.get_modifiers()
-        ),
-        "quorum": lambda argv: quorum.quorum_cmd(
-            utils.get_library_wrapper(),
-            argv,
-            utils.get_modifiers()
-        ),
-        "qdevice": lambda argv: qdevice.qdevice_cmd(
-            utils.get_library_wrapper(),
-            argv,
-            utils.get_modifiers()
-        ),
-        "alert": lambda args: alert.alert_cmd(
-            utils.get_library_wrapper(),
-            args,
-            utils.get_modifiers()
-        ),
-        "booth": lambda argv: booth.booth_cmd(
-            utils.get_library_wrapper(),
-            argv,
-            utils.get_modifiers()
-        ),
+        "resource": _load_command("resource", "resource_cmd"),
+        "cluster": _load_command("cluster", "cluster_cmd"),
+        "stonith": _load_command("stonith", "stonith_cmd"),
+        "property": _load_command("prop", "property_cmd"),
+        "constraint": _load_command("constraint", "constraint_cmd"),
+        "acl": _load_library_command("acl", "acl_cmd"),
+        "status": _load_library_command("status", "status_cmd"),
+        "config": _load_command("config", "config_cmd"),
+        "pcsd": _load_command("pcsd", "pcsd_cmd"),
+        "node": _load_library_command("node", "node_cmd"),
+        "quorum": _load_library_command("quorum", "quorum_cmd"),
+        "qdevice": _load_library_command("qdevice", "qdevice_cmd"),
+        "alert": _load_library_command("alert", "alert_cmd"),
+        "booth": _load_library_command("booth", "booth_cmd"),
+        "batch": _load_library_command("batch", "batch_cmd"),
     }
     if command not in cmd_map:
         usage.main()
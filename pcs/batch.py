@@ -0,0 +1,178 @@
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+)
+
+import getopt
+import shlex
+import sys
+from functools import partial
+
+from pcs import (
+    acl,
+    alert,
+    constraint,
+    resource,
+    usage,
+    utils,
+)
+from pcs.cli.common import (
+    middleware,
+    parse_args,
+)
+from pcs.cli.common.errors import CmdLineInputError
+from pcs.cli.common.lib_wrapper import (
+    cli_env_to_lib_env,
+    lib_env_to_cli_env,
+)
+from pcs.lib.errors import LibraryError
+
+
+# Only commands implemented purely in pcs.lib can be run in a batch. Other
+# commands load and push the CIB on their own, so they would not see changes
+# made by preceding commands of the batch.
+BATCH_COMMAND_LIST = [
+    ["resource", "create"],
+    ["constraint", "colocation", "set"],
+    ["constraint", "order", "set"],
+    ["constraint", "ticket", "add"],
+    ["constraint", "ticket", "set"],
+    ["constraint", "ticket", "remove"],
+    ["acl", "role"],
+    ["acl", "user"],
+    ["acl", "target"],
+    ["acl", "group"],
+    ["acl", "permission"],
+    ["alert", "create"],
+    ["alert", "update"],
+    ["alert", "remove"],
+    ["alert", "recipient"],
+]
+
+# options which affect the whole environment of the batch
+BATCH_ONLY_OPTION_LIST = [
+    "-f", "--wait", "--debug", "--request-timeout", "--corosync_conf",
+    "--cluster_conf",
+]
+
+def batch_cmd(dummy_lib, argv, modifiers):
+    if argv and argv[0] == "help":
+        usage.batch(argv[1:])
+        return
+    if argv:
+        usage.batch()
+        sys.exit(1)
+    try:
+        command_list = parse_batch(sys.stdin.read().splitlines())
+    except CmdLineInputError as e:
+        utils.exit_on_cmdline_input_errror(e, "batch", "")
+    run_with_middleware = middleware.build(
+        utils.get_middleware_factory().cib
+    )
+    run_with_middleware(
+        partial(_run_batch, command_list, modifiers["wait"]),
+        utils.get_cli_env()
+    )
+
+def parse_batch(line_list):
+    """
+    Return a list of (line number, argv, options) of commands to run
+
+    list line_list -- lines of a batch, each contains one pcs command
+    """
+    command_list = []
+    for line_number, line in enumerate(line_list, 1):
+        try:
+            argv = shlex.split(line, comments=True)
+        except ValueError as e:
+            raise CmdLineInputError(
+                "line {0}: {1}".format(line_number, str(e))
+            )
+        if argv and argv[0] == "pcs":
+            argv = argv[1:]
+        if not argv:
+            continue
+        options, argv = _parse_line_options(line_number, argv)
+        if not any(
+            argv[:len(command)] == command for command in BATCH_COMMAND_LIST
+        ):
+            raise CmdLineInputError(
+                "line {0}: command '{1}' cannot be used in a batch".format(
+                    line_number, " ".join(argv[:3])
+                )
+            )
+        command_list.append((line_number, argv, options))
+    return command_list
+
+def _parse_line_options(line_number, argv):
+    argv = parse_args.upgrade_args(argv)
+    for arg in argv:
+        if arg.startswith("--wait="):
+            raise CmdLineInputError(
+                "line {0}: option '--wait' can be specified only for the "
+                "whole batch".format(line_number)
+            )
+    try:
+        option_list, dummy_argv = getopt.gnu_getopt(
+            parse_args.filter_out_non_option_negative_numbers(argv),
+            parse_args.PCS_SHORT_OPTIONS,
+            parse_args.PCS_LONG_OPTIONS,
+        )
+    except getopt.GetoptError as e:
+        raise CmdLineInputError("line {0}: {1}".format(line_number, str(e)))
+    options = {}
+    for option, value in option_list:
+        if option in BATCH_ONLY_OPTION_LIST:
+            raise CmdLineInputError(
+                "line {0}: option '{1}' can be specified only for the whole "
+                "batch".format(line_number, option)
+            )
+        if option in options:
+            raise CmdLineInputError(
+                "line {0}: {1} can only be used once".format(
+                    line_number, option
+                )
+            )
+        options[option] = value
+    return options, parse_args.filter_out_options(argv)
+
+def _run_command(argv):
+    command, argv_next = argv[0], argv[1:]
+    if command == "resource":
+        resource.resource_cmd(argv_next)
+    elif command == "constraint":
+        constraint.constraint_cmd(argv_next)
+    elif command == "acl":
+        acl.acl_cmd(
+            utils.get_library_wrapper(), argv_next, utils.get_modifiers()
+        )
+    elif command == "alert":
+        alert.alert_cmd(
+            utils.get_library_wrapper(), argv_next, utils.get_modifiers()
+        )
+
+def _run_batch(command_list, wait, cli_env):
+    lib_env = cli_env_to_lib_env(cli_env)
+    batch_options = dict(utils.pcs_options)
+    batch_options.pop("--wait", None)
+    utils.shared_lib_env = lib_env
+    try:
+        with lib_env.cib_transaction(wait):
+            for line_number, argv, options in command_list:
+                utils.pcs_options = dict(batch_options, **options)
+                try:
+                    _run_command(argv)
+                except SystemExit as e:
+                    if e.code:
+                        utils.err(
+                            "line {0} failed, no changes have been made"
+                            .format(line_number)
+                        )
+                    raise
+    except LibraryError as e:
+        utils.process_library_reports(e.args)
+    finally:
+        utils.shared_lib_env = None
+        utils.pcs_options = dict(batch_options)
+    lib_env_to_cli_env(lib_env, cli_env)
@@ -4,6 +4,69 @@ from __future__ import (
     print_function,
 )
 
+import hashlib
+import json
+import os
+import os.path
+import subprocess
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+
+# Commands whose first argument is an id of an existing object in the CIB. The
+# ids are suggested in addition to subcommands.
+ID_ARGUMENT_MAP = {
+    ("constraint", "colocation", "add"): "resource",
+    ("constraint", "location"): "resource",
+    ("constraint", "ref"): "resource",
+    ("constraint", "remove"): "constraint",
+    ("constraint", "rule", "add"): "constraint",
+    ("node", "attribute"): "node",
+    ("node", "maintenance"): "node",
+    ("node", "standby"): "node",
+    ("node", "unmaintenance"): "node",
+    ("node", "unstandby"): "node",
+    ("node", "utilization"): "node",
+    ("resource", "ban"): "resource",
+    ("resource", "cleanup"): "resource",
+    ("resource", "clear"): "resource",
+    ("resource", "clone"): "resource",
+    ("resource", "debug-demote"): "resource",
+    ("resource", "debug-monitor"): "resource",
+    ("resource", "debug-promote"): "resource",
+    ("resource", "debug-start"): "resource",
+    ("resource", "debug-stop"): "resource",
+    ("resource", "delete"): "resource",
+    ("resource", "disable"): "resource",
+    ("resource", "enable"): "resource",
+    ("resource", "failcount", "reset"): "resource",
+    ("resource", "failcount", "show"): "resource",
+    ("resource", "manage"): "resource",
+    ("resource", "master"): "resource",
+    ("resource", "meta"): "resource",
+    ("resource", "move"): "resource",
+    ("resource", "op", "add"): "resource",
+    ("resource", "refresh"): "resource",
+    ("resource", "restart"): "resource",
+    ("resource", "show"): "resource",
+    ("resource", "unclone"): "resource",
+    ("resource", "ungroup"): "resource",
+    ("resource", "unmanage"): "resource",
+    ("resource", "update"): "resource",
+    ("resource", "utilization"): "resource",
+    ("stonith", "cleanup"): "stonith",
+    ("stonith", "delete"): "stonith",
+    ("stonith", "disable"): "stonith",
+    ("stonith", "enable"): "stonith",
+    ("stonith", "fence"): "node",
+    ("stonith", "refresh"): "stonith",
+    ("stonith", "show"): "stonith",
+    ("stonith", "update"): "stonith",
+}
+
+_RESOURCE_TAGS = frozenset(["primitive", "group", "clone", "master", "bundle"])
+
 def has_applicable_environment(environment):
     """
     dict environment - very likely os.environ
@@ -20,10 +83,12 @@ def has_applicable_environment(environment):
         environment['COMP_CWORD'].isdigit()
     )
 
-def make_suggestions(environment, suggestion_tree):
+def make_suggestions(environment, suggestion_tree, get_id_list=None):
     """
     dict environment - very likely os.environ
     dict suggestion_tree - {'acl': {'role': {'create': ...}}}...
+    callable get_id_list - takes a kind of ids (see ID_ARGUMENT_MAP) and
+        returns a list of ids to suggest
     """
     if not has_applicable_environment(environment):
         raise EnvironmentError("Environment is not completion read")
@@ -39,7 +104,8 @@ def make_suggestions(environment, suggestion_tree):
     return "\n".join(_find_suggestions(
         suggestion_tree,
         typed_word_list,
-        int(environment['COMP_CWORD'])
+        int(environment['COMP_CWORD']),
+        get_id_list
     ))
 
 def _split_words(joined_words, word_lengths):
@@ -71,7 +137,9 @@ def _split_words(joined_words, word_lengths):
 
     return word_list
 
-def _find_suggestions(suggestion_tree, typed_word_list, word_under_cursor_idx):
+def _find_suggestions(
+    suggestion_tree, typed_word_list, word_under_cursor_idx, get_id_list=None
+):
     if not  1 <= word_under_cursor_idx <= len(typed_word_list):
         return []
 
@@ -85,6 +153,11 @@ def _find_suggestions(suggestion_tree, typed_word_list, word_under_cursor_idx):
         suggestion_tree,
         typed_word_list[1:word_under_cursor_idx]
     )
+    id_kind = ID_ARGUMENT_MAP.get(
+        tuple(typed_word_list[1:word_under_cursor_idx])
+    )
+    if id_kind is not None and get_id_list is not None:
+        words_for_current_cursor_position += sorted(get_id_list(id_kind))
 
     return [
         word for word in words_for_current_cursor_position
@@ -98,3 +171,162 @@ def _get_subcommands(suggestion_tree, previous_subcommand_list):
             return []
         subcommand_tree = subcommand_tree[subcommand]
     return sorted(list(subcommand_tree.keys()))
+
+def load_suggestion_tree(tree_file, source_file):
+    """
+    Return a suggestion tree stored by save_suggestion_tree or None if the tree
+    is missing or it has been generated from another version of the source
+
+    string tree_file -- path to the stored suggestion tree
+    string source_file -- path to the file the tree is generated from
+    """
+    try:
+        with open(tree_file) as tree_data:
+            stored = json.load(tree_data)
+        if stored["source_digest"] != _get_file_digest(source_file):
+            return None
+        return stored["tree"]
+    except (EnvironmentError, ValueError, KeyError, TypeError):
+        return None
+
+def save_suggestion_tree(tree_file, source_file, suggestion_tree):
+    """
+    Store a suggestion tree so it does not need to be generated on each
+    completion
+
+    string tree_file -- path to store the suggestion tree to
+    string source_file -- path to the file the tree is generated from
+    dict suggestion_tree -- {'acl': {'role': {'create': ...}}}...
+    """
+    with open(tree_file, "w") as tree_data:
+        json.dump(
+            {
+                "source_digest": _get_file_digest(source_file),
+                "tree": suggestion_tree,
+            },
+            tree_data,
+            separators=(",", ":"),
+            sort_keys=True,
+        )
+
+def _get_file_digest(path):
+    # python2 may have imported the module from its compiled version
+    if path.endswith(".pyc"):
+        path = path[:-1]
+    with open(path, "rb") as source:
+        return hashlib.sha1(source.read()).hexdigest()
+
+
+class CibIdCache(object):
+    """
+    Ids of objects in the CIB stored in a file for a short time, so the CIB is
+    not loaded and parsed on each completion
+    """
+    def __init__(self, cache_file, ttl, load_cib):
+        """
+        string cache_file -- path to the file storing the ids
+        int ttl -- number of seconds the stored ids are valid for
+        callable load_cib -- returns the CIB xml or None if it is not available
+        """
+        self._cache_file = cache_file
+        self._ttl = ttl
+        self._load_cib = load_cib
+        self._id_dict = None
+
+    def get(self, kind):
+        """
+        Return ids of the specified kind
+
+        string kind -- resource, stonith, node or constraint
+        """
+        if self._id_dict is None:
+            self._id_dict = self._read()
+            if self._id_dict is None:
+                self._id_dict = get_cib_id_dict(self._load_cib())
+                self._write(self._id_dict)
+        return self._id_dict.get(kind, [])
+
+    def _read(self):
+        try:
+            if time.time() - os.path.getmtime(self._cache_file) > self._ttl:
+                return None
+            with open(self._cache_file) as cache_data:
+                id_dict = json.load(cache_data)
+            return id_dict if isinstance(id_dict, dict) else None
+        except (EnvironmentError, ValueError):
+            return None
+
+    def _write(self, id_dict):
+        # The cache is only an optimization, the ids are loaded from the CIB
+        # again if they cannot be stored.
+        cache_dir = os.path.dirname(self._cache_file)
+        try:
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir, 0o700)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir)
+            with os.fdopen(fd, "w") as cache_data:
+                json.dump(id_dict, cache_data)
+            os.rename(tmp_path, self._cache_file)
+        except EnvironmentError:
+            pass
+
+def load_cib_configuration(cibadmin):
+    """
+    Return the configuration section of the live CIB or None if it cannot be
+    loaded
+
+    string cibadmin -- path to the cibadmin binary
+    """
+    try:
+        with open(os.devnull, "w") as devnull:
+            process = subprocess.Popen(
+                [cibadmin, "--query", "--local", "--scope", "configuration"],
+                stdout=subprocess.PIPE,
+                stderr=devnull,
+                close_fds=True,
+            )
+            stdout, dummy_stderr = process.communicate()
+    except OSError:
+        return None
+    return stdout if process.returncode == 0 else None
+
+def get_cib_id_dict(cib_xml):
+    """
+    Return a dict of lists of ids of resources, stonith devices, nodes and
+    constraints in the CIB
+
+    string cib_xml -- the CIB or its configuration section
+    """
+    id_dict = {
+        "resource": [],
+        "stonith": [],
+        "node": [],
+        "constraint": [],
+    }
+    if not cib_xml:
+        return id_dict
+    try:
+        root = ET.fromstring(cib_xml)
+    except ET.ParseError:
+        return id_dict
+    for resources in root.iter("resources"):
+        for element in resources.iter():
+            if element.tag not in _RESOURCE_TAGS or not element.get("id"):
+                continue
+            if (
+                element.tag == "primitive"
+                and
+                element.get("class") == "stonith"
+            ):
+                id_dict["stonith"].append(element.get("id"))
+            else:
+                id_dict["resource"].append(element.get("id"))
+    for nodes in root.iter("nodes"):
+        for node in nodes.iter("node"):
+            if node.get("uname"):
+                id_dict["node"].append(node.get("uname"))
+    for constraints in root.iter("constraints"):
+        for constraint in constraints:
+            if constraint.get("id"):
+                id_dict["constraint"].append(constraint.get("id"))
+    return id_dict
@@ -424,6 +424,13 @@ CODE_TO_MESSAGE_BUILDER_MAP = {
         ).format(**info)
     ,
 
+    codes.NODE_COMMUNICATION_CONNECTION_POOL_STATS: lambda info:
+        (
+            "Connection pool: {hits} reused, {misses} new, {evictions} "
+            "evicted, {idle} idle"
+        ).format(**info)
+    ,
+
     codes.NODE_COMMUNICATION_NOT_CONNECTED: lambda info:
         "Unable to connect to {node} ({reason})"
         .format(**info)
@@ -1259,6 +1266,16 @@ CODE_TO_MESSAGE_BUILDER_MAP = {
         .format(**info)
     ,
 
+    codes.CIB_UPGRADE_WITH_PENDING_CHANGES: lambda info:
+        (
+            "Unable to upgrade CIB to required schema version"
+            " {required_version} or higher while it contains changes which"
+            " have not been pushed yet. Current version is {current_version}."
+            " Upgrade the CIB first by running 'pcs cluster cib-upgrade'."
+        )
+        .format(**info)
+    ,
+
     codes.FILE_ALREADY_EXISTS: lambda info:
         "{node_prefix}{role_prefix}file {file_path} already exists"
         .format(
@@ -17,3 +17,6 @@ class Env(object):
         self.debug = False
         self.cluster_conf_data = None
         self.request_timeout = None
+        self.connection_pool = None
+        self.lib_env = None
+        self.cib_cache = None
@@ -13,29 +13,8 @@ from pcs.cli.common.reports import (
     LibraryReportProcessorToConsole,
     process_library_reports
 )
-from pcs.lib.commands import (
-    acl,
-    alert,
-    booth,
-    cluster,
-    fencing_topology,
-    node,
-    qdevice,
-    quorum,
-    remote_node,
-    resource_agent,
-    resource,
-    cib_options,
-    stonith,
-    sbd,
-    stonith_agent,
-)
-from pcs.lib.commands.constraint import (
-    colocation as constraint_colocation,
-    order as constraint_order,
-    ticket as constraint_ticket
-)
-from pcs.lib.env import LibraryEnvironment
+from pcs.common import trace
+from pcs.common.node_communicator import DEBUG_ALWAYS
 from pcs.lib.errors import LibraryEnvError
 
 
@@ -45,6 +24,7 @@ def wrapper(dictionary):
     return namedtuple('wrapper', dictionary.keys())(**dictionary)
 
 def cli_env_to_lib_env(cli_env):
+    from pcs.lib.env import LibraryEnvironment
     return LibraryEnvironment(
         logging.getLogger("pcs"),
         LibraryReportProcessorToConsole(cli_env.debug),
@@ -56,6 +36,10 @@ def cli_env_to_lib_env(cli_env):
         token_file_data_getter=cli_env.token_file_data_getter,
         cluster_conf_data=cli_env.cluster_conf_data,
         request_timeout=cli_env.request_timeout,
+        connection_pool=cli_env.connection_pool,
+        # debug output of communication is only displayed with --debug
+        communication_debug_policy=(DEBUG_ALWAYS if cli_env.debug else None),
+        cib_cache=cli_env.cib_cache,
     )
 
 def lib_env_to_cli_env(lib_env, cli_env):
@@ -92,9 +76,22 @@ def bind(cli_env, run_with_middleware, run_library_command):
 
         return lib_call_result
 
+    # e.g. resource.create, used to identify the command in traces
+    command_name = "{0}.{1}".format(
+        getattr(run_library_command, "__module__", "").split(".")[-1],
+        getattr(run_library_command, "__name__", "")
+    )
+
     def decorated_run(*args, **kwargs):
         try:
-            return run_with_middleware(run, cli_env, *args, **kwargs)
+            with trace.span(command_name, trace.CATEGORY_COMMAND):
+                if cli_env.lib_env is not None:
+                    #the environment is shared by several commands (e.g. in
+                    #a batch), middlewares are run around all of them at once
+                    return run_library_command(
+                        cli_env.lib_env, *args, **kwargs
+                    )
+                return run_with_middleware(run, cli_env, *args, **kwargs)
         except LibraryEnvError as e:
             process_library_reports(e.unprocessed)
             #TODO we use explicit exit here - process_library_reports stil has
@@ -116,7 +113,10 @@ def get_module(env, middleware_factory, name):
 
 
 def load_module(env, middleware_factory, name):
+    # Library command modules are imported only when they are used, so pcs
+    # does not pay for importing all of them on each run.
     if name == "acl":
+        from pcs.lib.commands import acl
         return bind_all(
             env,
             middleware.build(middleware_factory.cib),
@@ -140,6 +140,7 @@ def load_module(env, middleware_factory, name):
         )
 
     if name == "alert":
+        from pcs.lib.commands import alert
         return bind_all(
             env,
             middleware.build(middleware_factory.cib),
@@ -155,6 +156,7 @@ def load_module(env, middleware_factory, name):
         )
 
     if name == "booth":
+        from pcs.lib.commands import booth
         return bind_all(
             env,
             middleware.build(
@@ -183,6 +185,7 @@ def load_module(env, middleware_factory, name):
         )
 
     if name == "cluster":
+        from pcs.lib.commands import cluster
         return bind_all(
             env,
             middleware.build(
@@ -190,12 +193,14 @@ def load_module(env, middleware_factory, name):
                 middleware_factory.corosync_conf_existing,
             ),
             {
+                "get_cib_from_node": cluster.get_cib_from_node,
                 "node_clear": cluster.node_clear,
                 "verify": cluster.verify,
             }
         )
 
     if name == "remote_node":
+        from pcs.lib.commands import remote_node
         return bind_all(
             env,
             middleware.build(
@@ -211,6 +216,9 @@ def load_module(env, middleware_factory, name):
         )
 
     if name == 'constraint_colocation':
+        from pcs.lib.commands.constraint import (
+            colocation as constraint_colocation,
+        )
         return bind_all(
             env,
             middleware.build(middleware_factory.cib),
@@ -221,6 +229,9 @@ def load_module(env, middleware_factory, name):
         )
 
     if name == 'constraint_order':
+        from pcs.lib.commands.constraint import (
+            order as constraint_order,
+        )
         return bind_all(
             env,
             middleware.build(middleware_factory.cib),
@@ -231,6 +242,9 @@ def load_module(env, middleware_factory, name):
         )
 
     if name == 'constraint_ticket':
+        from pcs.lib.commands.constraint import (
+            ticket as constraint_ticket,
+        )
         return bind_all(
             env,
             middleware.build(middleware_factory.cib),
@@ -243,6 +257,7 @@ def load_module(env, middleware_factory, name):
         )
 
     if name == "fencing_topology":
+        from pcs.lib.commands import fencing_topology
         return bind_all(
             env,
             middleware.build(middleware_factory.cib),
@@ -257,6 +272,7 @@ def load_module(env, middleware_factory, name):
         )
 
     if name == "node":
+        from pcs.lib.commands import node
         return bind_all(
             env,
             middleware.build(middleware_factory.cib),
@@ -274,6 +290,7 @@ def load_module(env, middleware_factory, name):
         )
 
     if name == "qdevice":
+        from pcs.lib.commands import qdevice
         return bind_all(
             env,
             middleware.build(),
@@ -297,6 +314,7 @@ def load_module(env, middleware_factory, name):
         )
 
     if name == "quorum":
+        from pcs.lib.commands import quorum
         return bind_all(
             env,
             middleware.build(middleware_factory.corosync_conf_existing),
@@ -314,10 +332,12 @@ def load_module(env, middleware_factory, name):
         )
 
     if name == "resource_agent":
+        from pcs.lib.commands import resource_agent
         return bind_all(
             env,
             middleware.build(),
             {
+                "clear_metadata_cache": resource_agent.clear_metadata_cache,
                 "describe_agent": resource_agent.describe_agent,
                 "list_agents": resource_agent.list_agents,
                 "list_agents_for_standard_and_provider":
@@ -328,6 +348,7 @@ def load_module(env, middleware_factory, name):
         )
 
     if name == "resource":
+        from pcs.lib.commands import resource
         return bind_all(
             env,
             middleware.build(
@@ -350,6 +371,7 @@ def load_module(env, middleware_factory, name):
         )
 
     if name == "cib_options":
+        from pcs.lib.commands import cib_options
         return bind_all(
             env,
             middleware.build(
@@ -362,6 +384,7 @@ def load_module(env, middleware_factory, name):
         )
 
     if name == "stonith":
+        from pcs.lib.commands import stonith
         return bind_all(
             env,
             middleware.build(
@@ -376,6 +399,7 @@ def load_module(env, middleware_factory, name):
 
 
     if name == "sbd":
+        from pcs.lib.commands import sbd
         return bind_all(
             env,
             middleware.build(),
@@ -392,6 +416,7 @@ def load_module(env, middleware_factory, name):
         )
 
     if name == "stonith_agent":
+        from pcs.lib.commands import stonith_agent
         return bind_all(
             env,
             middleware.build(),
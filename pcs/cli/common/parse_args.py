@@ -36,6 +36,14 @@ PCS_LONG_OPTIONS = [
     "hide-inactive",
     # pcs resource (un)manage - enable or disable monitor operations
     "monitor",
+    # pcs resource agents - drop cached metadata of agents
+    "refresh-cache",
+    # print time spent in external processes, requests and CIB processing
+    "profile",
+    # pcs status - print the status as text or json
+    "output-format=",
+    # pcs status - keep printing the status when the cluster changes
+    "watch",
 ]
 
 def split_list(arg_list, separator):
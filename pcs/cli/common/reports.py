@@ -6,6 +6,7 @@ from __future__ import (
 
 import sys
 import inspect
+import threading
 from functools import partial
 
 from pcs.cli.booth.console_report import (
@@ -70,6 +71,8 @@ class LibraryReportProcessorToConsole(object):
     def __init__(self, debug=False):
         self.debug = debug
         self.items = []
+        # reports may come from threads, e.g. runners of external processes
+        self._lock = threading.RLock()
 
     def append(self, report_item):
         self.items.append(report_item)
@@ -93,12 +96,14 @@ class LibraryReportProcessorToConsole(object):
         return self._send(report_item_list)
 
     def process(self, report_item):
-        self.append(report_item)
-        self.send()
+        with self._lock:
+            self.append(report_item)
+            self.send()
 
     def process_list(self, report_item_list):
-        self.extend(report_item_list)
-        self.send()
+        with self._lock:
+            self.extend(report_item_list)
+            self.send()
 
     def _send(self, report_item_list, print_errors=True):
         errors = []
@@ -4,12 +4,22 @@ from __future__ import (
     print_function,
 )
 
-from pcs.test.tools.pcs_unittest import TestCase
+import os
+import os.path
+import shutil
+import tempfile
+import time
+
+from pcs.test.tools.pcs_unittest import TestCase, mock
 
 from pcs.cli.common.completion import (
+    CibIdCache,
     _find_suggestions,
+    get_cib_id_dict,
     has_applicable_environment,
+    load_suggestion_tree,
     make_suggestions,
+    save_suggestion_tree,
     _split_words,
 )
 
@@ -60,6 +70,183 @@ class SuggestionTest(TestCase):
             _find_suggestions(tree, ['pcs', 'invalid', 'c'], 2)
         )
 
+class IdSuggestionTest(TestCase):
+    def setUp(self):
+        self.get_id_list = mock.Mock(return_value=["R2", "R1", "S1"])
+
+    def test_suggest_ids(self):
+        self.assertEqual(
+            ["R1", "R2", "S1"],
+            _find_suggestions(
+                tree, ["pcs", "resource", "clone"], 3, self.get_id_list
+            )
+        )
+        self.get_id_list.assert_called_once_with("resource")
+
+    def test_suggest_ids_and_subcommands(self):
+        self.assertEqual(
+            ["add", "R1", "R2", "S1"],
+            _find_suggestions(
+                {"resource": {"clone": {"add": {}}}},
+                ["pcs", "resource", "clone", ""],
+                3,
+                self.get_id_list
+            )
+        )
+
+    def test_suggest_ids_started(self):
+        self.assertEqual(
+            ["R1", "R2"],
+            _find_suggestions(
+                tree, ["pcs", "resource", "clone", "R"], 3, self.get_id_list
+            )
+        )
+
+    def test_no_ids_for_other_commands(self):
+        self.assertEqual(
+            [],
+            _find_suggestions(
+                tree, ["pcs", "cluster", "auth"], 3, self.get_id_list
+            )
+        )
+        self.get_id_list.assert_not_called()
+
+    def test_no_ids_for_other_arguments(self):
+        self.assertEqual(
+            [],
+            _find_suggestions(
+                tree, ["pcs", "resource", "clone", "R1"], 4, self.get_id_list
+            )
+        )
+        self.get_id_list.assert_not_called()
+
+
+class SuggestionTreeFileTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.tree_file = os.path.join(self.tmp_dir, "tree.json")
+        self.source_file = os.path.join(self.tmp_dir, "usage.py")
+        with open(self.source_file, "w") as source:
+            source.write("usage")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_save_and_load(self):
+        save_suggestion_tree(self.tree_file, self.source_file, tree)
+        self.assertEqual(
+            tree, load_suggestion_tree(self.tree_file, self.source_file)
+        )
+
+    def test_missing(self):
+        self.assertIsNone(
+            load_suggestion_tree(self.tree_file, self.source_file)
+        )
+
+    def test_source_changed(self):
+        save_suggestion_tree(self.tree_file, self.source_file, tree)
+        with open(self.source_file, "w") as source:
+            source.write("new usage")
+        self.assertIsNone(
+            load_suggestion_tree(self.tree_file, self.source_file)
+        )
+
+    def test_corrupted(self):
+        with open(self.tree_file, "w") as tree_data:
+            tree_data.write("{ garbage")
+        self.assertIsNone(
+            load_suggestion_tree(self.tree_file, self.source_file)
+        )
+
+
+class CibIdCacheTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.tmp_dir, "cache", "ids.json")
+        self.load_cib = mock.Mock(return_value="""
+            <configuration>
+                <nodes><node id="1" uname="node1"/></nodes>
+                <resources><primitive id="R1" class="ocf"/></resources>
+                <constraints/>
+            </configuration>
+        """)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_load_and_store(self):
+        cache = CibIdCache(self.cache_file, 10, self.load_cib)
+        self.assertEqual(["R1"], cache.get("resource"))
+        self.assertEqual(["node1"], cache.get("node"))
+        self.assertEqual(1, self.load_cib.call_count)
+        self.assertTrue(os.path.exists(self.cache_file))
+
+    def test_use_stored(self):
+        CibIdCache(self.cache_file, 10, self.load_cib).get("resource")
+        self.assertEqual(
+            ["R1"],
+            CibIdCache(self.cache_file, 10, self.load_cib).get("resource")
+        )
+        self.assertEqual(1, self.load_cib.call_count)
+
+    def test_expired(self):
+        CibIdCache(self.cache_file, 10, self.load_cib).get("resource")
+        old_time = time.time() - 60
+        os.utime(self.cache_file, (old_time, old_time))
+        CibIdCache(self.cache_file, 10, self.load_cib).get("resource")
+        self.assertEqual(2, self.load_cib.call_count)
+
+    def test_cib_not_available(self):
+        self.load_cib.return_value = None
+        self.assertEqual(
+            [], CibIdCache(self.cache_file, 10, self.load_cib).get("resource")
+        )
+
+    def test_cannot_store(self):
+        os.mkdir(os.path.dirname(self.cache_file))
+        os.mkdir(self.cache_file)
+        self.assertEqual(
+            ["R1"],
+            CibIdCache(self.cache_file, 10, self.load_cib).get("resource")
+        )
+
+
+class GetCibIdDictTest(TestCase):
+    def test_success(self):
+        self.assertEqual(
+            {
+                "resource": ["G", "R1", "C", "R2", "B"],
+                "stonith": ["S1"],
+                "node": ["node1", "node2"],
+                "constraint": ["location-R1", "order-R1-R2"],
+            },
+            get_cib_id_dict("""
+                <cib><configuration>
+                    <nodes>
+                        <node id="1" uname="node1"/>
+                        <node id="2" uname="node2"/>
+                    </nodes>
+                    <resources>
+                        <group id="G"><primitive id="R1" class="ocf"/></group>
+                        <clone id="C"><primitive id="R2" class="ocf"/></clone>
+                        <bundle id="B"/>
+                        <primitive id="S1" class="stonith"/>
+                    </resources>
+                    <constraints>
+                        <rsc_location id="location-R1" rsc="R1"/>
+                        <rsc_order id="order-R1-R2" first="R1" then="R2"/>
+                    </constraints>
+                </configuration></cib>
+            """)
+        )
+
+    def test_invalid_xml(self):
+        self.assertEqual(
+            {"resource": [], "stonith": [], "node": [], "constraint": []},
+            get_cib_id_dict("<cib")
+        )
+
+
 class HasCompletionEnvironmentTest(TestCase):
     def test_returns_false_if_environment_inapplicable(self):
         inapplicable_environments = [
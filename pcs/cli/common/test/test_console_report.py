@@ -2081,3 +2081,20 @@ class CibPushForcedFullDueToCrmFeatureSet(NameBuildTest):
                 "current_set": "3.0.6",
             }
         )
+
+
+class CibUpgradeWithPendingChanges(NameBuildTest):
+    code = codes.CIB_UPGRADE_WITH_PENDING_CHANGES
+    def test_success(self):
+        self.assert_message_from_info(
+            (
+                "Unable to upgrade CIB to required schema version 2.8 or "
+                "higher while it contains changes which have not been pushed "
+                "yet. Current version is 2.5. Upgrade the CIB first by running "
+                "'pcs cluster cib-upgrade'."
+            ),
+            {
+                "required_version": "2.8",
+                "current_version": "2.5",
+            }
+        )
@@ -5,10 +5,12 @@ from __future__ import (
 )
 from pcs.test.tools.pcs_unittest import TestCase
 
-from pcs.cli.common.lib_wrapper import Library, bind
+from pcs.cli.common.env_cli import Env
+from pcs.cli.common.lib_wrapper import Library, bind, cli_env_to_lib_env
 from pcs.test.tools.pcs_unittest import mock
 from pcs.lib.errors import ReportItem
 from pcs.lib.errors import LibraryEnvError
+from pcs.lib.pacemaker.cib_cache import CibCache
 
 class LibraryWrapperTest(TestCase):
     def test_raises_for_bad_path(self):
@@ -16,7 +18,7 @@ class LibraryWrapperTest(TestCase):
         lib = Library('env', mock_middleware_factory)
         self.assertRaises(Exception, lambda:lib.no_valid_library_part)
 
-    @mock.patch('pcs.cli.common.lib_wrapper.constraint_order.create_with_set')
+    @mock.patch('pcs.lib.commands.constraint.order.create_with_set')
     @mock.patch('pcs.cli.common.lib_wrapper.cli_env_to_lib_env')
     def test_bind_to_library(self, mock_cli_env_to_lib_env, mock_order_set):
         lib_env = mock.MagicMock()
@@ -32,6 +34,7 @@ class LibraryWrapperTest(TestCase):
         mock_middleware_factory.cib = dummy_middleware
         mock_middleware_factory.corosync_conf_existing = dummy_middleware
         mock_env = mock.MagicMock()
+        mock_env.lib_env = None
         Library(mock_env, mock_middleware_factory).constraint_order.set(
             'first', second="third"
         )
@@ -49,10 +52,34 @@ class BindTest(TestCase):
         mock_middleware = mock.Mock(side_effect=e)
 
         binded = bind(
-            cli_env=None,
+            cli_env=mock.Mock(lib_env=None),
             run_with_middleware=mock_middleware,
             run_library_command=None
         )
 
         self.assertRaises(SystemExit, lambda: binded(cli_env=None))
         mock_process_report.assert_called_once_with([report1, report3])
+
+    def test_shared_lib_env_bypasses_middleware(self):
+        lib_env = mock.Mock()
+        mock_middleware = mock.Mock()
+        mock_command = mock.Mock(return_value="result")
+
+        binded = bind(
+            cli_env=mock.Mock(lib_env=lib_env),
+            run_with_middleware=mock_middleware,
+            run_library_command=mock_command
+        )
+
+        self.assertEqual("result", binded("first", second="third"))
+        mock_command.assert_called_once_with(lib_env, "first", second="third")
+        mock_middleware.assert_not_called()
+
+class CliEnvToLibEnvTest(TestCase):
+    def test_cib_cache_shared(self):
+        cli_env = Env()
+        cli_env.cib_cache = CibCache()
+        first_env = cli_env_to_lib_env(cli_env)
+        second_env = cli_env_to_lib_env(cli_env)
+        self.assertIs(cli_env.cib_cache, first_env._cib_cache)
+        self.assertIs(cli_env.cib_cache, second_env._cib_cache)
@@ -1571,12 +1571,25 @@ def get_cib(argv):
     if "--config" in utils.pcs_options:
         scope = "configuration"
 
+    if "--node" in utils.pcs_options:
+        if utils.usefile:
+            utils.err("Cannot specify both --node and -f")
+        try:
+            output = utils.get_library_wrapper().cluster.get_cib_from_node(
+                utils.pcs_options["--node"], scope
+            ) + "\n"
+        except LibraryError as e:
+            utils.process_library_reports(e.args)
+    else:
+        output = None
+
     if not filename:
-        print(utils.get_cib(scope), end="")
+        print(output if output is not None else utils.get_cib(scope), end="")
     else:
         try:
             f = open(filename, 'w')
-            output = utils.get_cib(scope)
+            if output is None:
+                output = utils.get_cib(scope)
             if output != "":
                 f.write(output)
             else:
@@ -7,7 +7,8 @@ from __future__ import (
 import base64
 import io
 import re
-from collections import namedtuple
+import time
+from collections import deque, namedtuple, OrderedDict
 
 try:
     # python2
@@ -16,6 +17,12 @@ except ImportError:
     # python3
     from urllib.parse import urlencode as urllib_urlencode
 
+try:
+    # python3 only, the socket event engine is not available without it
+    import selectors
+except ImportError:
+    selectors = None
+
 # We should ignore SIGPIPE when using pycurl.NOSIGNAL - see the libcurl tutorial
 # for more info.
 try:
@@ -25,7 +32,7 @@ except ImportError:
     pass
 
 from pcs import settings
-from pcs.common import pcs_pycurl as pycurl
+from pcs.common import pcs_pycurl as pycurl, trace
 
 
 def _find_value_for_possible_keys(value_dict, possible_key_list):
@@ -133,15 +140,17 @@ class Request(object):
     interface for getting next available host to make request on.
     """
 
-    def __init__(self, request_target, request_data):
+    def __init__(self, request_target, request_data, response_consumer=None):
         """
         RequestTarget request_target
         RequestData request_data
+        ResponseConsumer response_consumer -- receives the response body
+            while it is being transferred instead of buffering it
         """
         self._target = request_target
         self._data = request_data
-        self._current_host_iterator = iter(request_target.address_list)
-        self._current_host = None
+        self._response_consumer = response_consumer
+        self._current_host_index = -1
         self.next_host()
 
     def next_host(self):
@@ -149,7 +158,30 @@ class Request(object):
         Move to the next available host. Raises StopIteration when there is no
         host to use.
         """
-        self._current_host = next(self._current_host_iterator)
+        if self._current_host_index + 1 >= len(self._target.address_list):
+            raise StopIteration()
+        self._current_host_index += 1
+
+    def get_host_request(self):
+        """
+        Returns a new Request with the same target and data which uses the
+        current host of this request. The response consumer is not passed to
+        the new request.
+        """
+        request = Request(self._target, self._data)
+        for dummy_index in range(self._current_host_index):
+            request.next_host()
+        return request
+
+    def get_next_host_request(self):
+        """
+        Returns a new Request with the same target and data which uses the host
+        following the current host of this request. Raises StopIteration when
+        there is no host left.
+        """
+        request = self.get_host_request()
+        request.next_host()
+        return request
 
     @property
     def url(self):
@@ -158,17 +190,25 @@ class Request(object):
         """
         return "https://{host}:{port}/{request}".format(
             host="[{0}]".format(self.host) if ":" in self.host else self.host,
-            port=(
-                self._target.port
-                if self._target.port
-                else settings.pcsd_default_port
-            ),
+            port=self.port,
             request=self._data.action
         )
 
+    @property
+    def port(self):
+        return (
+            self._target.port
+            if self._target.port
+            else settings.pcsd_default_port
+        )
+
     @property
     def host(self):
-        return self._current_host
+        return self._target.address_list[self._current_host_index]
+
+    @property
+    def has_next_host(self):
+        return self._current_host_index + 1 < len(self._target.address_list)
 
     @property
     def host_label(self):
@@ -182,10 +222,18 @@ class Request(object):
     def data(self):
         return self._data.data
 
+    @property
+    def request_data(self):
+        return self._data
+
     @property
     def action(self):
         return self._data.action
 
+    @property
+    def response_consumer(self):
+        return self._response_consumer
+
     @property
     def cookies(self):
         cookies = {}
@@ -197,6 +245,98 @@ class Request(object):
         return str("Request({0}, {1})").format(self._target, self._data)
 
 
+class ResponseConsumer(object):
+    """
+    Base class for consumers of response bodies. A consumer gets the body in
+    chunks right from curl, so the whole body is never held in memory. Only
+    the beginning of the body is kept to be available as Response.data, e.g.
+    for error messages.
+    """
+    head_size = 4096
+
+    def __init__(self):
+        self._head = b""
+
+    def reset(self):
+        """
+        Prepare the consumer for receiving a body. Called each time the request
+        is sent, i.e. again when it is retried via another host.
+        """
+        self._head = b""
+        self._reset()
+
+    def write(self, chunk):
+        """
+        Receive a chunk of the body, to be set as curl WRITEFUNCTION
+
+        bytes chunk -- part of the response body
+        """
+        if len(self._head) < self.head_size:
+            self._head += chunk[:self.head_size - len(self._head)]
+        self._consume(chunk)
+
+    @property
+    def head(self):
+        """
+        Beginning of the received body (at most head_size bytes)
+        """
+        return self._head
+
+    def _reset(self):
+        raise NotImplementedError()
+
+    def _consume(self, chunk):
+        raise NotImplementedError()
+
+
+DEBUG_OFF = "off"
+DEBUG_ON_FAILURE = "on_failure"
+DEBUG_ALWAYS = "always"
+
+
+class CurlDebugCollector(object):
+    """
+    Collects curl debug output, to be set as curl DEBUGFUNCTION. The output can
+    be limited to its last max_size bytes, older data are dropped.
+    """
+    _prefixes = {
+        pycurl.DEBUG_TEXT: b"* ",
+        pycurl.DEBUG_HEADER_IN: b"< ",
+        pycurl.DEBUG_HEADER_OUT: b"> ",
+        pycurl.DEBUG_DATA_IN: b"<< ",
+        pycurl.DEBUG_DATA_OUT: b">> ",
+    }
+
+    def __init__(self, max_size=None, failure_only=False):
+        """
+        int max_size -- keep at most this number of the latest bytes, None
+            means no limit
+        bool failure_only -- the output is only provided for failed requests
+        """
+        self._max_size = max_size
+        self._chunks = deque()
+        self._size = 0
+        self.failure_only = failure_only
+
+    def __call__(self, data_type, debug_data):
+        if data_type not in self._prefixes:
+            return
+        entry = self._prefixes[data_type] + debug_data
+        if not debug_data.endswith(b"\n"):
+            entry += b"\n"
+        self._chunks.append(entry)
+        self._size += len(entry)
+        if self._max_size is not None:
+            while self._size > self._max_size and len(self._chunks) > 1:
+                self._size -= len(self._chunks.popleft())
+            if self._size > self._max_size:
+                self._chunks[0] = self._chunks[0][-self._max_size:]
+                self._size = len(self._chunks[0])
+
+    def getvalue(self):
+        return b"".join(self._chunks)
+
+
 class Response(object):
     """
     This class represents response for request which is available as instance
@@ -210,6 +350,9 @@ class Response(object):
         self._error_msg = error_msg
         self._data = None
         self._debug = None
+        # When the handle is going to be reused for another request (see
+        # ConnectionPool), everything we need from it is copied here.
+        self._detached = None
 
     @classmethod
     def connection_successful(cls, handle):
@@ -231,9 +374,32 @@ class Response(object):
         """
         return cls(handle, False, errno, error_msg)
 
+    def detach_handle(self):
+        """
+        Copy all data the response needs from its curl handle, so the handle
+        can be reset and reused for another request.
+        """
+        if self._detached is None:
+            self._detached = {
+                "request_obj": self._handle.request_obj,
+                "output_buffer": self._handle.output_buffer,
+                "debug_buffer": self._handle.debug_buffer,
+                "response_code": self._get_handle_response_code(),
+            }
+
+    def _get_handle_attr(self, name):
+        if self._detached is not None:
+            return self._detached[name]
+        return getattr(self._handle, name)
+
+    def _get_handle_response_code(self):
+        if not self.was_connected:
+            return None
+        return self._handle.getinfo(pycurl.RESPONSE_CODE)
+
     @property
     def request(self):
-        return self._handle.request_obj
+        return self._get_handle_attr("request_obj")
 
     @property
     def handle(self):
@@ -253,21 +419,47 @@ class Response(object):
 
     @property
     def data(self):
+        """
+        Response body. If the request has a response consumer, only
+        the beginning of the body is available.
+        """
         if self._data is None:
-            self._data = self._handle.output_buffer.getvalue().decode("utf-8")
+            output_buffer = self._get_handle_attr("output_buffer")
+            if output_buffer is None:
+                self._data = self.request.response_consumer.head.decode(
+                    "utf-8", "replace"
+                )
+            else:
+                self._data = output_buffer.getvalue().decode("utf-8")
         return self._data
 
     @property
     def debug(self):
+        """
+        Curl debug output of the request, empty if it has not been collected
+        according to the debug policy of the communicator
+        """
         if self._debug is None:
-            self._debug = self._handle.debug_buffer.getvalue().decode("utf-8")
+            debug_buffer = self._get_handle_attr("debug_buffer")
+            if debug_buffer is None or (
+                getattr(debug_buffer, "failure_only", False)
+                and
+                not self.is_failure
+            ):
+                self._debug = ""
+            else:
+                self._debug = debug_buffer.getvalue().decode("utf-8", "replace")
         return self._debug
 
+    @property
+    def is_failure(self):
+        return not self.was_connected or self.response_code >= 400
+
     @property
     def response_code(self):
-        if not self.was_connected:
-            return None
-        return self._handle.getinfo(pycurl.RESPONSE_CODE)
+        if self._detached is not None:
+            return self._detached["response_code"]
+        return self._get_handle_response_code()
 
     def __repr__(self):
         return str(
@@ -282,27 +474,436 @@ class Response(object):
             self.response_code,
         )
 
+ConnectionPoolStats = namedtuple(
+    "ConnectionPoolStats", ["hits", "misses", "evictions", "idle"]
+)
+
+
+class ConnectionPool(object):
+    """
+    Keeps curl easy handles (and a curl multi handle) alive between requests,
+    so libcurl is able to reuse already established connections to nodes
+    instead of doing a TCP and TLS handshake for each request.
+    The instances of this class are not thread-safe!
+    """
+    max_size_default = 32
+    max_idle_time_default = 60 # in seconds
+
+    def __init__(
+        self, max_size=None, max_idle_time=None, share_tls_sessions=False
+    ):
+        """
+        int max_size -- maximal number of idle handles kept in the pool, it
+            also limits the number of connections cached by libcurl
+        int max_idle_time -- idle handles older than this (in seconds) are
+            closed
+        bool share_tls_sessions -- share TLS session ids between all handles
+            of the pool so even a new connection can do a short handshake
+        """
+        self._max_size = (
+            max_size if max_size is not None else self.max_size_default
+        )
+        self._max_idle_time = (
+            max_idle_time if max_idle_time is not None
+            else self.max_idle_time_default
+        )
+        self._share = None
+        if share_tls_sessions:
+            self._share = pycurl.CurlShare()
+            self._share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_SSL_SESSION)
+            self._share.setopt(pycurl.SH_SHARE, pycurl.LOCK_DATA_DNS)
+        # (host, port) -> list of (handle, time the handle was put back)
+        # the dict is ordered from the least recently used key
+        self._idle_handles = OrderedDict()
+        self._idle_count = 0
+        self._idle_multi_handle = None
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def stats(self):
+        return ConnectionPoolStats(
+            self._hits, self._misses, self._evictions, self._idle_count
+        )
+
+    def get_handle(self, host, port):
+        """
+        Return a curl easy handle for the specified node, reuse an idle one if
+        possible.
+
+        string host -- node address
+        int port -- node port
+        """
+        self._evict_expired()
+        handle_list = self._idle_handles.get((host, port))
+        if handle_list:
+            handle, dummy_put_time = handle_list.pop()
+            if not handle_list:
+                del self._idle_handles[(host, port)]
+            self._idle_count -= 1
+            self._hits += 1
+            handle.reset()
+        else:
+            self._misses += 1
+            handle = pycurl.Curl()
+        if self._share is not None:
+            handle.setopt(pycurl.SHARE, self._share)
+        return handle
+
+    def has_idle_handle(self, host, port):
+        """
+        Return True if there is an idle handle for the specified node, i.e. the
+        node has been reached recently and its connection may be reused.
+
+        string host -- node address
+        int port -- node port
+        """
+        self._evict_expired()
+        return bool(self._idle_handles.get((host, port)))
+
+    def put_handle(self, host, port, handle):
+        """
+        Give the handle back to the pool. The handle must not be used by
+        the caller anymore.
+
+        string host -- node address the handle was used for
+        int port -- node port the handle was used for
+        pycurl.Curl handle -- handle to be reused
+        """
+        key = (host, port)
+        self._idle_handles.setdefault(key, []).append((handle, time.time()))
+        # mark the key as the most recently used one
+        self._idle_handles[key] = self._idle_handles.pop(key)
+        self._idle_count += 1
+        while self._idle_count > self._max_size:
+            self._evict(next(iter(self._idle_handles)), 1)
+
+    def acquire_multi_handle(self):
+        """
+        Return a curl multi handle. Connections are cached by libcurl in the
+        multi handle, so it is kept in the pool between communicators.
+        """
+        if self._idle_multi_handle is not None:
+            multi_handle = self._idle_multi_handle
+            self._idle_multi_handle = None
+            return multi_handle
+        multi_handle = pycurl.CurlMulti()
+        multi_handle.setopt(pycurl.M_MAXCONNECTS, self._max_size)
+        return multi_handle
+
+    def release_multi_handle(self, multi_handle):
+        """
+        Give the multi handle back to the pool, it must not contain any easy
+        handles.
+
+        pycurl.CurlMulti multi_handle -- handle obtained by
+            acquire_multi_handle
+        """
+        if self._idle_multi_handle is None:
+            self._idle_multi_handle = multi_handle
+        else:
+            multi_handle.close()
+
+    def clear(self):
+        """
+        Close all idle handles
+        """
+        for key in list(self._idle_handles.keys()):
+            self._evict(key, len(self._idle_handles[key]))
+        if self._idle_multi_handle is not None:
+            self._idle_multi_handle.close()
+            self._idle_multi_handle = None
+
+    def _evict_expired(self):
+        expire_before = time.time() - self._max_idle_time
+        for key in list(self._idle_handles.keys()):
+            expired_count = len([
+                put_time for dummy_handle, put_time in self._idle_handles[key]
+                if put_time < expire_before
+            ])
+            if expired_count:
+                self._evict(key, expired_count)
+
+    def _evict(self, key, count):
+        # handles are appended, so the oldest ones are at the beginning
+        handle_list = self._idle_handles[key]
+        for handle, dummy_put_time in handle_list[:count]:
+            handle.close()
+        del handle_list[:count]
+        if not handle_list:
+            del self._idle_handles[key]
+        self._idle_count -= count
+        self._evictions += count
+
+
 class NodeCommunicatorFactory(object):
-    def __init__(self, communicator_logger, user, groups, request_timeout):
+    def __init__(
+        self, communicator_logger, user, groups, request_timeout,
+        connection_pool=None, max_in_flight=None, max_per_host=None,
+        per_host_fair=None, race_stagger=None, engine=None, debug_policy=None
+    ):
         self._logger = communicator_logger
         self._user = user
         self._groups = groups
         self._request_timeout = request_timeout
+        self._connection_pool = connection_pool
+        self._race_stagger = (
+            race_stagger if race_stagger is not None
+            else settings.node_communication_race_stagger
+        )
+        self._scheduling = dict(
+            max_in_flight=(
+                max_in_flight if max_in_flight is not None
+                else settings.node_communication_max_in_flight
+            ),
+            max_per_host=(
+                max_per_host if max_per_host is not None
+                else settings.node_communication_max_per_host
+            ),
+            per_host_fair=(
+                per_host_fair if per_host_fair is not None
+                else settings.node_communication_per_host_fair
+            ),
+            engine=(
+                engine if engine is not None
+                else settings.node_communication_engine
+            ),
+            debug_policy=(
+                debug_policy if debug_policy is not None
+                else settings.node_communication_debug_policy
+            ),
+        )
 
     def get_communicator(self):
+        if self._race_stagger is not None:
+            # racing makes sense only if all addresses of nodes are used
+            return self.get_multiaddress_communicator()
         return self.get_simple_communicator()
 
     def get_simple_communicator(self):
         return Communicator(
-            self._logger, self._user, self._groups, self._request_timeout
+            self._logger, self._user, self._groups, self._request_timeout,
+            connection_pool=self._connection_pool,
+            **self._scheduling
         )
 
     def get_multiaddress_communicator(self):
         return MultiaddressCommunicator(
-            self._logger, self._user, self._groups, self._request_timeout
+            self._logger, self._user, self._groups, self._request_timeout,
+            connection_pool=self._connection_pool,
+            race_stagger=self._race_stagger,
+            **self._scheduling
+        )
+
+
+class _RequestQueue(object):
+    """
+    Queue of requests waiting to be sent. Requests are either taken in the
+    order they were added (FIFO) or in a round-robin manner over hosts, so
+    a host with many requests does not delay requests to other hosts.
+    """
+    def __init__(self, per_host_fair=False):
+        self._per_host_fair = per_host_fair
+        # host label -> deque of requests, ordered from the host to be served
+        # first
+        self._host_queues = OrderedDict()
+        self._fifo = deque()
+
+    def __len__(self):
+        if self._per_host_fair:
+            return sum(len(queue) for queue in self._host_queues.values())
+        return len(self._fifo)
+
+    def append(self, request):
+        if self._per_host_fair:
+            self._host_queues.setdefault(
+                request.host_label, deque()
+            ).append(request)
+        else:
+            self._fifo.append(request)
+
+    def pop(self, is_host_available):
+        """
+        Return next request which may be sent or None if there is no such
+        request
+
+        callable is_host_available -- takes a host label, returns True if
+            a request to the host may be sent
+        """
+        if self._per_host_fair:
+            for host_label in list(self._host_queues.keys()):
+                if not is_host_available(host_label):
+                    continue
+                # move the host to the end of the round
+                queue = self._host_queues.pop(host_label)
+                request = queue.popleft()
+                if queue:
+                    self._host_queues[host_label] = queue
+                return request
+            return None
+        for index, request in enumerate(self._fifo):
+            if is_host_available(request.host_label):
+                del self._fifo[index]
+                return request
+        return None
+
+
+ENGINE_SELECT = "select"
+ENGINE_SOCKET_EVENTS = "socket_events"
+
+
+class SelectEngine(object):
+    """
+    Drives a curl multi handle by calling perform and waiting using
+    CurlMulti.select
+    """
+    def __init__(self, multi_handle, select_timeout_default):
+        """
+        pycurl.CurlMulti multi_handle -- handle to drive
+        float select_timeout_default -- how long to wait (in seconds) when curl
+            does not provide its timeout
+        """
+        self._multi_handle = multi_handle
+        self._select_timeout_default = select_timeout_default
+
+    def perform(self):
+        # run all internal operation required by libcurl
+        status, num_to_process = self._multi_handle.perform()
+        # if perform returns E_CALL_MULTI_PERFORM it requires to call perform
+        # once again right away
+        while status == pycurl.E_CALL_MULTI_PERFORM:
+            status, num_to_process = self._multi_handle.perform()
+        return num_to_process
+
+    def wait(self, max_timeout=None):
+        """
+        Wait until there is something to do for curl
 
+        float max_timeout -- wait at most this number of seconds
+        """
+        need_to_wait = True
+        while need_to_wait:
+            timeout = self._multi_handle.timeout()
+            if timeout == 0:
+                # if timeout == 0 then there is something to precess already
+                return
+            timeout = (
+                timeout / 1000.0
+                if timeout > 0
+                # curl don't have timeout set, so we can use our default
+                else self._select_timeout_default
+            )
+            if max_timeout is not None and max_timeout < timeout:
+                # wake up in time for the caller
+                self._multi_handle.select(max(max_timeout, 0))
+                self.perform()
+                return
+            # when value returned from select is -1, it timed out, so we can
+            # wait
+            need_to_wait = (self._multi_handle.select(timeout) == -1)
+        self.perform()
+
+    def close(self):
+        pass
+
+
+class SocketEventEngine(object):
+    """
+    Drives a curl multi handle using curl's socket interface: curl tells which
+    sockets and timeouts it is interested in, we wait for events on exactly
+    these sockets and let curl process only the sockets with an event.
+    """
+    def __init__(self, multi_handle):
+        """
+        pycurl.CurlMulti multi_handle -- handle to drive
+        """
+        self._multi_handle = multi_handle
+        self._selector = selectors.DefaultSelector()
+        self._timer_deadline = None
+        multi_handle.setopt(pycurl.M_SOCKETFUNCTION, self._socket_callback)
+        multi_handle.setopt(pycurl.M_TIMERFUNCTION, self._timer_callback)
+
+    def _socket_callback(self, event, fd, dummy_multi, dummy_data):
+        if event == pycurl.POLL_REMOVE:
+            if fd in self._selector.get_map():
+                self._selector.unregister(fd)
+            return
+        mask = 0
+        if event & pycurl.POLL_IN:
+            mask |= selectors.EVENT_READ
+        if event & pycurl.POLL_OUT:
+            mask |= selectors.EVENT_WRITE
+        if fd in self._selector.get_map():
+            self._selector.modify(fd, mask)
+        else:
+            self._selector.register(fd, mask)
+
+    def _timer_callback(self, timeout_ms):
+        self._timer_deadline = (
+            None if timeout_ms < 0 else time.time() + timeout_ms / 1000.0
         )
 
+    def _socket_action(self, fd, event_mask):
+        status = pycurl.E_CALL_MULTI_PERFORM
+        while status == pycurl.E_CALL_MULTI_PERFORM:
+            status, dummy_running = self._multi_handle.socket_action(
+                fd, event_mask
+            )
+
+    def perform(self):
+        # Run curl timers which expired. Adding a handle sets a zero timeout,
+        # so this also starts newly added transfers.
+        if (
+            self._timer_deadline is not None
+            and
+            self._timer_deadline <= time.time()
+        ):
+            self._timer_deadline = None
+            self._socket_action(pycurl.SOCKET_TIMEOUT, 0)
+
+    def wait(self, max_timeout=None):
+        """
+        Wait for an event on curl sockets or for a curl timeout and let curl
+        process it
+
+        float max_timeout -- wait at most this number of seconds
+        """
+        timeout = None
+        if self._timer_deadline is not None:
+            timeout = max(self._timer_deadline - time.time(), 0)
+        if max_timeout is not None:
+            timeout = (
+                max(max_timeout, 0) if timeout is None
+                else min(timeout, max(max_timeout, 0))
+            )
+        if not self._selector.get_map():
+            if timeout is None:
+                # nothing to wait for
+                return
+            time.sleep(timeout)
+            event_list = []
+        else:
+            event_list = self._selector.select(timeout)
+        for key, mask in event_list:
+            event_mask = 0
+            if mask & selectors.EVENT_READ:
+                event_mask |= pycurl.CSELECT_IN
+            if mask & selectors.EVENT_WRITE:
+                event_mask |= pycurl.CSELECT_OUT
+            self._socket_action(key.fd, event_mask)
+        self.perform()
+
+    def close(self):
+        # callbacks cannot be unset, make them not to hold this object
+        self._multi_handle.setopt(pycurl.M_SOCKETFUNCTION, _ignore_callback)
+        self._multi_handle.setopt(pycurl.M_TIMERFUNCTION, _ignore_callback)
+        self._selector.close()
+
+
+def _ignore_callback(*dummy_args):
+    pass
+
 
 class Communicator(object):
     """
@@ -312,7 +913,45 @@ class Communicator(object):
     """
     curl_multi_select_timeout_default = 0.8 # in seconds
 
-    def __init__(self, communicator_logger, user, groups, request_timeout=None):
+    def __init__(
+        self, communicator_logger, user, groups, request_timeout=None,
+        connection_pool=None, max_in_flight=None, max_per_host=None,
+        per_host_fair=False, engine=ENGINE_SELECT, debug_policy=DEBUG_ALWAYS
+    ):
+        """
+        CommunicatorLoggerInterface communicator_logger
+        string user -- CIB user
+        list groups -- CIB user groups
+        int request_timeout -- request timeout in seconds
+        ConnectionPool connection_pool -- if set, curl handles are taken from
+            the pool and returned to it, so connections to nodes are reused
+        int max_in_flight -- maximal number of requests processed at the same
+            time, other requests wait in a queue, None means no limit
+        int max_per_host -- maximal number of requests processed at the same
+            time for one host, None means no limit
+        bool per_host_fair -- take queued requests round-robin over hosts
+            instead of in the order they were added
+        string engine -- how to wait for network events: ENGINE_SELECT polls
+            curl multi handle, ENGINE_SOCKET_EVENTS waits for events on
+            sockets reported by curl (requires the selectors module)
+        string debug_policy -- when to collect curl debug output of requests:
+            DEBUG_OFF, DEBUG_ON_FAILURE (only the latest part of the output is
+            kept and it is provided for failed requests only) or DEBUG_ALWAYS;
+            collecting costs a python callback for each chunk of transferred
+            data
+        """
+        if engine not in (ENGINE_SELECT, ENGINE_SOCKET_EVENTS):
+            raise AssertionError("Unknown engine '{0}'".format(engine))
+        if debug_policy not in (DEBUG_OFF, DEBUG_ON_FAILURE, DEBUG_ALWAYS):
+            raise AssertionError(
+                "Unknown debug policy '{0}'".format(debug_policy)
+            )
+        if engine == ENGINE_SOCKET_EVENTS and selectors is None:
+            engine = ENGINE_SELECT
+        if max_in_flight is not None and max_in_flight < 1:
+            raise AssertionError("max_in_flight must be at least 1")
+        if max_per_host is not None and max_per_host < 1:
+            raise AssertionError("max_per_host must be at least 1")
         self._logger = communicator_logger
         self._auth_cookies = _get_auth_cookies(user, groups)
         self._request_timeout = (
@@ -320,8 +959,21 @@ class Communicator(object):
             if request_timeout is not None
             else settings.default_request_timeout
         )
-        self._multi_handle = pycurl.CurlMulti()
+        self._connection_pool = connection_pool
+        self._debug_policy = debug_policy
+        self._engine_name = engine
+        self._multi_handle = None
+        self._engine = None
         self._is_running = False
+        self._max_in_flight = max_in_flight
+        self._max_per_host = max_per_host
+        self._request_queue = _RequestQueue(per_host_fair)
+        self._in_flight_count = 0
+        self._in_flight_per_host = {}
+        # handles removed from the multi handle before they finished
+        self._cancelled_handle_set = set()
+        # handles of connect-only requests, they are never reused
+        self._connect_only_handle_set = set()
         # This is used just for storing references of curl easy handles.
         # We need to have references for all the handles, so they don't be
         # cleaned up by the garbage collector.
@@ -339,13 +991,9 @@ class Communicator(object):
         list request_list -- Request objects to add to the queue
         """
         for request in request_list:
-            handle = _create_request_handle(
-                request, self._auth_cookies, self._request_timeout,
-            )
-            self._easy_handle_list.append(handle)
-            self._multi_handle.add_handle(handle)
-            if self._is_running:
-                self._logger.log_request_start(request)
+            self._request_queue.append(request)
+        if self._is_running:
+            self.__dispatch_requests()
 
     def start_loop(self):
         """
@@ -373,27 +1021,190 @@ class Communicator(object):
         if self._is_running:
             raise AssertionError("Method start_loop already running")
         self._is_running = True
-        for handle in self._easy_handle_list:
-            self._logger.log_request_start(handle.request_obj)
+        self.__dispatch_requests()
 
-        finished_count = 0
-        while finished_count < len(self._easy_handle_list):
-            self.__multi_perform()
-            self.__wait_for_multi_handle()
+        while self._in_flight_count > 0:
+            self._engine.perform()
+            self._engine.wait(self._get_timer_timeout())
             response_list = self.__get_all_ready_responses()
+            self._run_timers()
             for response in response_list:
+                if response.handle in self._cancelled_handle_set:
+                    # cancelled while processing previous responses
+                    self._cancelled_handle_set.remove(response.handle)
+                    self._connect_only_handle_set.discard(response.handle)
+                    response.handle.close()
+                    continue
                 # free up memory for next usage of this Communicator instance
                 self._multi_handle.remove_handle(response.handle)
+                if trace.is_enabled():
+                    _trace_response(response)
+                self.__release_handle(
+                    response,
+                    reuse_handle=(
+                        response.handle not in self._connect_only_handle_set
+                    )
+                )
+                if self._consume_internal_response(response):
+                    self.__dispatch_requests()
+                    continue
                 self._logger.log_response(response)
                 yield response
-                # if something was added to the queue in the meantime, run it
+                # if something was added to the queue in the meantime or
+                # a slot for a waiting request has been freed, run it
                 # immediately, so we don't need to wait until all responses will
                 # be processed
-                self.__multi_perform()
-            finished_count += len(response_list)
+                self.__dispatch_requests()
+                self._engine.perform()
         self._easy_handle_list = []
+        for handle in self._cancelled_handle_set | self._connect_only_handle_set:
+            handle.close()
+        self._cancelled_handle_set = set()
+        self._connect_only_handle_set = set()
+        # nothing has been acquired from the pool if there were no requests
+        if self._connection_pool is not None and self._multi_handle is not None:
+            self._engine.close()
+            self._engine = None
+            self._connection_pool.release_multi_handle(self._multi_handle)
+            self._multi_handle = None
+            self._logger.log_connection_pool_stats(self._connection_pool.stats)
         self._is_running = False
 
+    def __is_host_available(self, host_label):
+        return (
+            self._max_per_host is None
+            or
+            self._in_flight_per_host.get(host_label, 0) < self._max_per_host
+        )
+
+    def __dispatch_requests(self):
+        # move requests from the queue to the multi handle as long as the
+        # limits allow it
+        while (
+            self._max_in_flight is None
+            or
+            self._in_flight_count < self._max_in_flight
+        ):
+            request = self._request_queue.pop(self.__is_host_available)
+            if request is None:
+                return
+            self._dispatch_request(request)
+
+    def _dispatch_request(self, request):
+        """
+        Hook called when a request has been taken from the queue, it is
+        supposed to start it
+
+        Request request -- request allowed to run by the limits
+        """
+        self._start_request(request)
+
+    def _start_request(self, request, connect_only=False):
+        """
+        Send the request right away regardless of the limits. Returns curl
+        handle of the request.
+
+        Request request -- request to be sent
+        bool connect_only -- only connect to the host, do not send anything,
+            the response is not logged and it is up to a descendant to consume
+            it in _consume_internal_response; a new connection is always
+            opened and it is not kept for other requests
+        """
+        if self._multi_handle is None:
+            self._multi_handle = (
+                pycurl.CurlMulti() if self._connection_pool is None
+                else self._connection_pool.acquire_multi_handle()
+            )
+            self._engine = (
+                SocketEventEngine(self._multi_handle)
+                if self._engine_name == ENGINE_SOCKET_EVENTS
+                else SelectEngine(
+                    self._multi_handle, self.curl_multi_select_timeout_default
+                )
+            )
+        if connect_only:
+            handle = _create_request_handle(
+                request, self._auth_cookies, self._request_timeout,
+                debug_policy=self._debug_policy,
+            )
+            handle.setopt(pycurl.CONNECT_ONLY, 1)
+            handle.setopt(pycurl.FRESH_CONNECT, 1)
+            handle.setopt(pycurl.FORBID_REUSE, 1)
+            self._connect_only_handle_set.add(handle)
+        else:
+            handle = self.__create_handle(request)
+        self._easy_handle_list.append(handle)
+        self._multi_handle.add_handle(handle)
+        self._in_flight_count += 1
+        self._in_flight_per_host[request.host_label] = (
+            self._in_flight_per_host.get(request.host_label, 0) + 1
+        )
+        if not connect_only:
+            self._logger.log_request_start(request)
+        return handle
+
+    def _cancel_request(self, handle):
+        """
+        Stop processing of a running request, no response is returned for it
+
+        pycurl.Curl handle -- handle returned by _start_request
+        """
+        self._multi_handle.remove_handle(handle)
+        # The handle may have been reported as finished already. It is not
+        # given back to the pool, otherwise a response of another request using
+        # it would be taken for the cancelled one. It is closed once it cannot
+        # be reported anymore.
+        self._cancelled_handle_set.add(handle)
+        self.__release_handle(Response(handle, False), reuse_handle=False)
+
+    def __release_handle(self, response, reuse_handle=True):
+        request = response.request
+        self._in_flight_count -= 1
+        self._in_flight_per_host[request.host_label] -= 1
+        if not self._in_flight_per_host[request.host_label]:
+            del self._in_flight_per_host[request.host_label]
+        if self._connection_pool is not None and reuse_handle:
+            response.detach_handle()
+            self._connection_pool.put_handle(
+                request.host, request.port, response.handle
+            )
+
+    def _consume_internal_response(self, response):
+        """
+        Hook for processing responses which should not be passed to the
+        caller. Returns True if the response has been consumed.
+
+        Response response -- finished response
+        """
+        # pylint: disable=unused-argument, no-self-use
+        return False
+
+    def _get_timer_timeout(self):
+        """
+        Hook returning number of seconds until _run_timers should be called or
+        None if there is no need to call it
+        """
+        # pylint: disable=no-self-use
+        return None
+
+    def _run_timers(self):
+        """
+        Hook called in each iteration of the loop
+        """
+        pass
+
+    def __create_handle(self, request):
+        if self._connection_pool is None:
+            return _create_request_handle(
+                request, self._auth_cookies, self._request_timeout,
+                debug_policy=self._debug_policy,
+            )
+        return _create_request_handle(
+            request, self._auth_cookies, self._request_timeout,
+            handle=self._connection_pool.get_handle(request.host, request.port),
+            debug_policy=self._debug_policy,
+        )
+
     def __get_all_ready_responses(self):
         response_list = []
         repeat = True
@@ -409,32 +1220,17 @@ class Communicator(object):
             repeat = num_queued > 0
         return response_list
 
-    def __multi_perform(self):
-        # run all internal operation required by libcurl
-        status, num_to_process = self._multi_handle.perform()
-        # if perform returns E_CALL_MULTI_PERFORM it requires to call perform
-        # once again right away
-        while status == pycurl.E_CALL_MULTI_PERFORM:
-            status, num_to_process = self._multi_handle.perform()
-        return num_to_process
 
-    def __wait_for_multi_handle(self):
-        # try to wait until there is something to do for us
-        need_to_wait = True
-        while need_to_wait:
-            timeout = self._multi_handle.timeout()
-            if timeout == 0:
-                # if timeout == 0 then there is something to precess already
-                return
-            timeout = (
-                timeout / 1000.0
-                if timeout > 0
-                # curl don't have timeout set, so we can use our default
-                else self.curl_multi_select_timeout_default
-            )
-            # when value returned from select is -1, it timed out, so we can
-            # wait
-            need_to_wait = (self._multi_handle.select(timeout) == -1)
+class _AddressRace(object):
+    # pylint: disable=too-few-public-methods
+    def __init__(self, request):
+        self.request = request
+        # handle of a running connect-only request -> (request of the handle,
+        # number of hosts it is ahead of the raced request)
+        self.probe_dict = {}
+        self.last_probe_request = None
+        self.last_probe_offset = -1
+        self.last_probe_time = None
 
 
 class MultiaddressCommunicator(Communicator):
@@ -443,7 +1239,130 @@ class MultiaddressCommunicator(Communicator):
     it takes advantage of multiple hosts in RequestTarget. So if it is not
     possible to connect to target using first hostname, it will use next one
     until connection will be successful or there is no host left.
+
+    In racing mode (race_stagger is set), a request which has more hosts is
+    not sent right away. Connect-only requests on new connections are made to
+    its hosts instead, the next host is tried when the previous one has not
+    connected within race_stagger seconds or it has failed. The first host
+    which connects wins, the other connection attempts are cancelled and
+    the request is queued to be sent via the winner. So the request is sent
+    exactly once. The race is skipped if the connection pool keeps an idle
+    connection to the first host of the request.
     """
+    def __init__(self, *args, **kwargs):
+        """
+        float race_stagger -- number of seconds to wait for a connection before
+            racing the next host, None disables racing
+        other arguments are the same as in Communicator
+        """
+        self._race_stagger = kwargs.pop("race_stagger", None)
+        super(MultiaddressCommunicator, self).__init__(*args, **kwargs)
+        # id(request) -> _AddressRace
+        self._race_dict = {}
+        # connect-only handle -> _AddressRace
+        self._probe_dict = {}
+        # ids of requests whose race has been finished, they are to be sent
+        self._race_winner_set = set()
+
+    def _dispatch_request(self, request):
+        if id(request) in self._race_winner_set:
+            self._race_winner_set.remove(id(request))
+            self._start_request(request)
+            return
+        if (
+            self._race_stagger is None
+            or
+            not request.has_next_host
+            or
+            (
+                self._connection_pool is not None
+                and
+                self._connection_pool.has_idle_handle(
+                    request.host, request.port
+                )
+            )
+        ):
+            self._start_request(request)
+            return
+        race = _AddressRace(request)
+        self._race_dict[id(request)] = race
+        self.__start_probe(race, request.get_host_request(), 0)
+
+    def __start_probe(self, race, probe_request, offset):
+        handle = self._start_request(probe_request, connect_only=True)
+        race.probe_dict[handle] = (probe_request, offset)
+        race.last_probe_request = probe_request
+        race.last_probe_offset = offset
+        race.last_probe_time = time.time()
+        self._probe_dict[handle] = race
+
+    def __start_next_probe(self, race):
+        self.__start_probe(
+            race,
+            race.last_probe_request.get_next_host_request(),
+            race.last_probe_offset + 1
+        )
+
+    def _get_timer_timeout(self):
+        start_list = [
+            race.last_probe_time for race in self._race_dict.values()
+            if race.last_probe_request.has_next_host
+        ]
+        if not start_list:
+            return None
+        return min(start_list) + self._race_stagger - time.time()
+
+    def _run_timers(self):
+        now = time.time()
+        for race in list(self._race_dict.values()):
+            if (
+                race.last_probe_request.has_next_host
+                and
+                now - race.last_probe_time >= self._race_stagger
+            ):
+                self.__start_next_probe(race)
+
+    def _consume_internal_response(self, response):
+        race = self._probe_dict.pop(response.handle, None)
+        if race is None:
+            return False
+        dummy_probe_request, offset = race.probe_dict.pop(response.handle)
+        if not response.was_connected:
+            if race.probe_dict:
+                # other hosts are still being connected
+                return True
+            if race.last_probe_request.has_next_host:
+                self.__start_next_probe(race)
+                return True
+            # no host is available, report the failure of the last one
+            del self._race_dict[id(race.request)]
+            for dummy_index in range(race.last_probe_offset):
+                race.request.next_host()
+            response.handle.request_obj = race.request
+            return False
+
+        del self._race_dict[id(race.request)]
+        for handle in race.probe_dict:
+            del self._probe_dict[handle]
+            self._cancel_request(handle)
+        previous_host = race.request.host
+        for dummy_index in range(offset):
+            race.request.next_host()
+        if offset:
+            response.handle.request_obj = race.request
+            self._logger.log_retry(
+                Response.connection_failure(
+                    response.handle,
+                    pycurl.E_OPERATION_TIMEDOUT,
+                    "Connection to '{0}' was not established before '{1}' "
+                    "connected".format(previous_host, race.request.host)
+                ),
+                previous_host
+            )
+        self._race_winner_set.add(id(race.request))
+        self.add_requests([race.request])
+        return True
+
     def start_loop(self):
         for response in super(MultiaddressCommunicator, self).start_loop():
             if response.was_connected:
@@ -459,6 +1378,29 @@ class MultiaddressCommunicator(Communicator):
                 yield response
 
 
+def _trace_response(response):
+    handle = response.handle
+    end = time.time()
+    size = (
+        (handle.getinfo(pycurl.SIZE_UPLOAD) or 0)
+        +
+        (handle.getinfo(pycurl.SIZE_DOWNLOAD) or 0)
+    )
+    trace.record_span(
+        response.request.action,
+        trace.CATEGORY_HTTP,
+        end - (handle.getinfo(pycurl.TOTAL_TIME) or 0),
+        end,
+        {
+            "host": response.request.host_label,
+            "was_connected": response.was_connected,
+            "bytes": int(size),
+        }
+    )
+    trace.add_count(trace.COUNTER_HTTP_REQUESTS)
+    trace.add_count(trace.COUNTER_HTTP_BYTES, int(size))
+
+
 class CommunicatorLoggerInterface(object):
     def log_request_start(self, request):
         raise NotImplementedError()
@@ -472,6 +1414,9 @@ class CommunicatorLoggerInterface(object):
     def log_no_more_addresses(self, response):
         raise NotImplementedError()
 
+    def log_connection_pool_stats(self, pool_stats):
+        raise NotImplementedError()
+
 
 def _get_auth_cookies(user, group_list):
     """
@@ -495,40 +1440,46 @@ def _get_auth_cookies(user, group_list):
     return cookies
 
 
-def _create_request_handle(request, cookies, timeout):
+def _create_request_handle(
+    request, cookies, timeout, handle=None, debug_policy=DEBUG_ALWAYS
+):
     """
     Returns Curl object (easy handle) which is set up witc specified parameters.
 
     Request request -- request specification
     dict cookies -- cookies to add to request
     int timeot -- request timeout
+    pycurl.Curl handle -- set up this (reused) handle instead of a new one
+    string debug_policy -- when to collect curl debug output of the request
     """
-    # it is not possible to take this callback out of this function, because of
-    # curl API
-    def __debug_callback(data_type, debug_data):
-        prefixes = {
-            pycurl.DEBUG_TEXT: b"* ",
-            pycurl.DEBUG_HEADER_IN: b"< ",
-            pycurl.DEBUG_HEADER_OUT: b"> ",
-            pycurl.DEBUG_DATA_IN: b"<< ",
-            pycurl.DEBUG_DATA_OUT: b">> ",
-        }
-        if data_type in prefixes:
-            debug_output.write(prefixes[data_type])
-            debug_output.write(debug_data)
-            if not debug_data.endswith(b"\n"):
-                debug_output.write(b"\n")
-
-    output = io.BytesIO()
-    debug_output = io.BytesIO()
+    consumer = request.response_consumer
+    if consumer is None:
+        output = io.BytesIO()
+        write_function = output.write
+    else:
+        # the body goes straight to the consumer, nothing is buffered here
+        consumer.reset()
+        output = None
+        write_function = consumer.write
+    if debug_policy == DEBUG_ALWAYS:
+        debug_output = CurlDebugCollector()
+    elif debug_policy == DEBUG_ON_FAILURE:
+        debug_output = CurlDebugCollector(
+            max_size=settings.node_communication_debug_max_size,
+            failure_only=True,
+        )
+    else:
+        debug_output = None
     cookies.update(request.cookies)
-    handle = pycurl.Curl()
+    if handle is None:
+        handle = pycurl.Curl()
     handle.setopt(pycurl.PROTOCOLS, pycurl.PROTO_HTTPS)
     handle.setopt(pycurl.TIMEOUT, timeout)
     handle.setopt(pycurl.URL, request.url.encode("utf-8"))
-    handle.setopt(pycurl.WRITEFUNCTION, output.write)
-    handle.setopt(pycurl.VERBOSE, 1)
-    handle.setopt(pycurl.DEBUGFUNCTION, __debug_callback)
+    handle.setopt(pycurl.WRITEFUNCTION, write_function)
+    if debug_output is not None:
+        handle.setopt(pycurl.VERBOSE, 1)
+        handle.setopt(pycurl.DEBUGFUNCTION, debug_output)
     handle.setopt(pycurl.SSL_VERIFYHOST, 0)
     handle.setopt(pycurl.SSL_VERIFYPEER, 0)
     handle.setopt(pycurl.NOSIGNAL, 1) # required for multi-threading
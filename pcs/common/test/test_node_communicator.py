@@ -5,8 +5,9 @@ from __future__ import (
 )
 
 import io
+import socket
 
-from pcs.test.tools.pcs_unittest import mock, TestCase
+from pcs.test.tools.pcs_unittest import mock, skipIf, TestCase
 from pcs.test.tools.custom_mock import (
     MockCurl,
     MockCurlMulti,
@@ -144,6 +145,20 @@ class RequestUrlTest(TestCase):
         self.assert_url(request.url, hosts[1], action)
 
 
+class RequestPortTest(TestCase):
+    def test_default_port(self):
+        request = lib.Request(
+            lib.RequestTarget("host"), lib.RequestData("action")
+        )
+        self.assertEqual(settings.pcsd_default_port, request.port)
+
+    def test_port(self):
+        request = lib.Request(
+            lib.RequestTarget("host", port=1234), lib.RequestData("action")
+        )
+        self.assertEqual(1234, request.port)
+
+
 class RequestHostTest(TestCase):
     action = "action"
 
@@ -228,6 +243,64 @@ class ResponseTest(TestCase):
         self.assertEqual(debug, response.debug)
         self.assertIsNone(response.response_code)
 
+    def test_detach_handle(self):
+        request = lib.Request(
+            lib.RequestTarget("host"), lib.RequestData("request")
+        )
+        handle = self.fixture_handle(
+            {pycurl.RESPONSE_CODE: 200}, request, "output", "debug"
+        )
+        response = lib.Response.connection_successful(handle)
+        response.detach_handle()
+        # simulate reuse of the handle for another request
+        handle.request_obj = lib.Request(
+            lib.RequestTarget("another"), lib.RequestData("request")
+        )
+        handle.output_buffer = io.BytesIO()
+        handle.debug_buffer = io.BytesIO()
+        handle.getinfo = mock.Mock(side_effect=AssertionError("handle used"))
+        self.assertIs(request, response.request)
+        self.assertEqual("output", response.data)
+        self.assertEqual("debug", response.debug)
+        self.assertEqual(200, response.response_code)
+
+
+class ChunkListConsumer(lib.ResponseConsumer):
+    head_size = 8
+
+    def __init__(self):
+        super(ChunkListConsumer, self).__init__()
+        self.chunk_list = None
+        self.reset_count = 0
+
+    def _reset(self):
+        self.chunk_list = []
+        self.reset_count += 1
+
+    def _consume(self, chunk):
+        self.chunk_list.append(chunk)
+
+
+class ResponseConsumerTest(TestCase):
+    def test_head_is_limited(self):
+        consumer = ChunkListConsumer()
+        consumer.reset()
+        consumer.write(b"01234")
+        consumer.write(b"56789")
+        consumer.write(b"abcde")
+        self.assertEqual(b"01234567", consumer.head)
+        self.assertEqual([b"01234", b"56789", b"abcde"], consumer.chunk_list)
+
+    def test_reset(self):
+        consumer = ChunkListConsumer()
+        consumer.reset()
+        consumer.write(b"first")
+        consumer.reset()
+        consumer.write(b"second")
+        self.assertEqual(b"second", consumer.head)
+        self.assertEqual([b"second"], consumer.chunk_list)
+        self.assertEqual(2, consumer.reset_count)
+
 
 @mock.patch("pcs.common.node_communicator.pycurl.Curl")
 class CreateRequestHandleTest(TestCase):
@@ -303,6 +376,115 @@ class CreateRequestHandleTest(TestCase):
         self.assertEqual("", handle.output_buffer.getvalue().decode("utf-8"))
         self.assertEqual("", handle.debug_buffer.getvalue().decode("utf-8"))
 
+    def test_no_debug_capture(self, mock_curl):
+        mock_curl.return_value = MockCurl(
+            None, b"output", [(pycurl.DEBUG_TEXT, b"debug")]
+        )
+        request = lib.Request(
+            lib.RequestTarget("label"), lib.RequestData("action")
+        )
+        handle = lib._create_request_handle(
+            request, {}, 10, debug_policy=lib.DEBUG_OFF
+        )
+        self.assertFalse(pycurl.VERBOSE in handle.opts)
+        self.assertFalse(pycurl.DEBUGFUNCTION in handle.opts)
+        handle.perform()
+        self.assertEqual(
+            "output", handle.output_buffer.getvalue().decode("utf-8")
+        )
+        self.assertIsNone(handle.debug_buffer)
+        self.assertEqual(
+            "", lib.Response.connection_successful(handle).debug
+        )
+
+    def test_debug_on_failure(self, mock_curl):
+        mock_curl.return_value = MockCurl(
+            {pycurl.RESPONSE_CODE: 200}, b"", [(pycurl.DEBUG_TEXT, b"debug")]
+        )
+        request = lib.Request(
+            lib.RequestTarget("label"), lib.RequestData("action")
+        )
+        handle = lib._create_request_handle(
+            request, {}, 10, debug_policy=lib.DEBUG_ON_FAILURE
+        )
+        handle.perform()
+        self.assertEqual(b"* debug\n", handle.debug_buffer.getvalue())
+        self.assertEqual(
+            "", lib.Response.connection_successful(handle).debug
+        )
+        self.assertEqual(
+            "* debug\n",
+            lib.Response.connection_failure(handle, 7, "reason").debug
+        )
+
+
+    def test_response_consumer(self, mock_curl):
+        mock_curl.return_value = MockCurl({pycurl.RESPONSE_CODE: 200})
+        consumer = ChunkListConsumer()
+        request = lib.Request(
+            lib.RequestTarget("label"),
+            lib.RequestData("action"),
+            response_consumer=consumer
+        )
+        handle = lib._create_request_handle(request, {}, 10)
+        self.assertEqual(1, consumer.reset_count)
+        self.assertIsNone(handle.output_buffer)
+        write = handle.opts[pycurl.WRITEFUNCTION]
+        for chunk in [b"chunk1", b"chunk2", b"chunk3"]:
+            write(chunk)
+        self.assertIsNone(handle.output_buffer)
+        self.assertEqual(
+            [b"chunk1", b"chunk2", b"chunk3"], consumer.chunk_list
+        )
+        response = lib.Response.connection_successful(handle)
+        self.assertEqual("chunk1ch", response.data)
+        response.detach_handle()
+        self.assertEqual("chunk1ch", response.data)
+
+    def test_response_consumer_reset_on_resend(self, mock_curl):
+        mock_curl.return_value = MockCurl(None, b"output")
+        consumer = ChunkListConsumer()
+        request = lib.Request(
+            lib.RequestTarget("label", ["host1", "host2"]),
+            lib.RequestData("action"),
+            response_consumer=consumer
+        )
+        lib._create_request_handle(request, {}, 10).perform()
+        request.next_host()
+        lib._create_request_handle(request, {}, 10).perform()
+        self.assertEqual(2, consumer.reset_count)
+        self.assertEqual([b"output"], consumer.chunk_list)
+
+    def test_probe_has_no_consumer(self, mock_curl):
+        consumer = ChunkListConsumer()
+        request = lib.Request(
+            lib.RequestTarget("label", ["host1", "host2"]),
+            lib.RequestData("action"),
+            response_consumer=consumer
+        )
+        self.assertIsNone(request.get_host_request().response_consumer)
+        self.assertIsNone(request.get_next_host_request().response_consumer)
+
+
+class CurlDebugCollectorTest(TestCase):
+    def test_format(self):
+        collector = lib.CurlDebugCollector()
+        collector(pycurl.DEBUG_TEXT, b"text")
+        collector(pycurl.DEBUG_HEADER_OUT, b"header\n")
+        collector(pycurl.DEBUG_DATA_IN, b"data")
+        collector(pycurl.DEBUG_SSL_DATA_IN, b"ssl")
+        self.assertEqual(
+            b"* text\n> header\n<< data\n", collector.getvalue()
+        )
+
+    def test_keep_latest_data(self):
+        collector = lib.CurlDebugCollector(max_size=10)
+        collector(pycurl.DEBUG_TEXT, b"first")
+        collector(pycurl.DEBUG_TEXT, b"second")
+        self.assertEqual(b"* second\n", collector.getvalue())
+        collector(pycurl.DEBUG_TEXT, b"too long line")
+        self.assertEqual(b"long line\n", collector.getvalue())
+
 
 def fixture_request(host_id=1, action="action"):
     return lib.Request(
@@ -341,7 +523,8 @@ class CommunicatorSimpleTest(CommunicatorBaseTest):
         self.assertIs(handle, response.handle)
         self.assertIs(request, response.request)
         mock_create_handle.assert_called_once_with(
-            request, {}, settings.default_request_timeout
+            request, {}, settings.default_request_timeout,
+            debug_policy=lib.DEBUG_ALWAYS
         )
         return response
 
@@ -378,7 +561,7 @@ class CommunicatorMultiTest(CommunicatorBaseTest):
     )
     def test_call_start_loop_multiple_times(self, _,  mock_create_handle):
         com = self.get_communicator()
-        mock_create_handle.side_effect = lambda request, _, __: MockCurl(
+        mock_create_handle.side_effect = lambda request, _, __, **kwargs: MockCurl(
             request=request
         )
         com.add_requests([fixture_request(i) for i in range(2)])
@@ -472,7 +655,7 @@ class MultiaddressCommunicatorTest(CommunicatorBaseTest):
             expected_response_list.append(response)
             return response
 
-        def _mock_create_request_handle(request, _, __):
+        def _mock_create_request_handle(request, _, __, **kwargs):
             counter["counter"] += 1
             return(
                 MockCurl(request=request)
@@ -500,7 +683,10 @@ class MultiaddressCommunicatorTest(CommunicatorBaseTest):
         self.assertEqual(3, mock_create_handle.call_count)
         self.assertEqual(3, len(expected_response_list))
         mock_create_handle.assert_has_calls([
-            mock.call(request, {}, settings.default_request_timeout)
+            mock.call(
+                request, {}, settings.default_request_timeout,
+                debug_policy=lib.DEBUG_ALWAYS
+            )
             for _ in range(3)
         ])
         logger_calls = (
@@ -531,7 +717,7 @@ class MultiaddressCommunicatorTest(CommunicatorBaseTest):
 
         mock_con_failure.side_effect = _con_failure
         com = self.get_multiaddress_communicator()
-        mock_create_handle.side_effect = lambda request, _, __: MockCurl(
+        mock_create_handle.side_effect = lambda request, _, __, **kwargs: MockCurl(
             error=(pycurl.E_SEND_ERROR, "reason"), request=request,
         )
         request = lib.Request(
@@ -549,7 +735,10 @@ class MultiaddressCommunicatorTest(CommunicatorBaseTest):
         mock_con_successful.assert_not_called()
         self.assertEqual(4, len(expected_response_list))
         mock_create_handle.assert_has_calls([
-            mock.call(request, {}, settings.default_request_timeout)
+            mock.call(
+                request, {}, settings.default_request_timeout,
+                debug_policy=lib.DEBUG_ALWAYS
+            )
             for _ in range(3)
         ])
         logger_calls = (
@@ -574,3 +763,752 @@ class MultiaddressCommunicatorTest(CommunicatorBaseTest):
         self.assertEqual(logger_calls, self.mock_com_log.mock_calls)
         com._multi_handle.assert_no_handle_left()
 
+
+
+def fixture_pool_handle():
+    handle = mock.Mock(spec_set=["reset", "close", "setopt"])
+    return handle
+
+
+@mock.patch("pcs.common.node_communicator.time.time", lambda: 100)
+@mock.patch("pcs.common.node_communicator.pycurl.Curl")
+class ConnectionPoolTest(TestCase):
+    def test_miss_then_hit(self, mock_curl):
+        handle = fixture_pool_handle()
+        mock_curl.return_value = handle
+        pool = lib.ConnectionPool()
+        self.assertIs(handle, pool.get_handle("host", 2224))
+        pool.put_handle("host", 2224, handle)
+        self.assertEqual(lib.ConnectionPoolStats(0, 1, 0, 1), pool.stats)
+        self.assertIs(handle, pool.get_handle("host", 2224))
+        self.assertEqual(lib.ConnectionPoolStats(1, 1, 0, 0), pool.stats)
+        self.assertEqual(1, mock_curl.call_count)
+        handle.reset.assert_called_once_with()
+        handle.close.assert_not_called()
+
+    def test_handles_are_per_host_and_port(self, mock_curl):
+        mock_curl.side_effect = fixture_pool_handle
+        pool = lib.ConnectionPool()
+        handle = pool.get_handle("host", 2224)
+        pool.put_handle("host", 2224, handle)
+        self.assertIsNot(handle, pool.get_handle("host", 2225))
+        self.assertIsNot(handle, pool.get_handle("other", 2224))
+        self.assertEqual(lib.ConnectionPoolStats(0, 3, 0, 1), pool.stats)
+
+    def test_max_size_evicts_least_recently_used(self, mock_curl):
+        mock_curl.side_effect = fixture_pool_handle
+        pool = lib.ConnectionPool(max_size=2)
+        handles = [
+            pool.get_handle("host{0}".format(i), 2224) for i in range(3)
+        ]
+        for i, handle in enumerate(handles):
+            pool.put_handle("host{0}".format(i), 2224, handle)
+        handles[0].close.assert_called_once_with()
+        handles[1].close.assert_not_called()
+        handles[2].close.assert_not_called()
+        self.assertEqual(lib.ConnectionPoolStats(0, 3, 1, 2), pool.stats)
+        self.assertIsNot(handles[0], pool.get_handle("host0", 2224))
+
+    def test_idle_eviction(self, mock_curl):
+        mock_curl.side_effect = fixture_pool_handle
+        pool = lib.ConnectionPool(max_idle_time=10)
+        handle = pool.get_handle("host", 2224)
+        pool.put_handle("host", 2224, handle)
+        with mock.patch(
+            "pcs.common.node_communicator.time.time", lambda: 111
+        ):
+            self.assertIsNot(handle, pool.get_handle("host", 2224))
+        handle.close.assert_called_once_with()
+        self.assertEqual(lib.ConnectionPoolStats(0, 2, 1, 0), pool.stats)
+
+    @mock.patch("pcs.common.node_communicator.pycurl.CurlShare")
+    def test_share_tls_sessions(self, mock_share, mock_curl):
+        handle = fixture_pool_handle()
+        mock_curl.return_value = handle
+        pool = lib.ConnectionPool(share_tls_sessions=True)
+        pool.get_handle("host", 2224)
+        mock_share.return_value.setopt.assert_any_call(
+            pycurl.SH_SHARE, pycurl.LOCK_DATA_SSL_SESSION
+        )
+        handle.setopt.assert_called_once_with(
+            pycurl.SHARE, mock_share.return_value
+        )
+
+    def test_clear(self, mock_curl):
+        handle = fixture_pool_handle()
+        mock_curl.return_value = handle
+        pool = lib.ConnectionPool()
+        pool.put_handle("host", 2224, pool.get_handle("host", 2224))
+        pool.clear()
+        handle.close.assert_called_once_with()
+        self.assertEqual(0, pool.stats.idle)
+
+    @mock.patch("pcs.common.node_communicator.pycurl.CurlMulti")
+    def test_multi_handle_is_reused(self, mock_multi, mock_curl):
+        pool = lib.ConnectionPool(max_size=5)
+        multi_handle = pool.acquire_multi_handle()
+        multi_handle.setopt.assert_called_once_with(pycurl.M_MAXCONNECTS, 5)
+        pool.release_multi_handle(multi_handle)
+        self.assertIs(multi_handle, pool.acquire_multi_handle())
+        self.assertEqual(1, mock_multi.call_count)
+
+
+@mock.patch(
+    "pcs.common.node_communicator.pycurl.CurlMulti",
+    side_effect=lambda: MockCurlMulti([1, 1])
+)
+@mock.patch(
+    "pcs.common.node_communicator.pycurl.Curl", side_effect=MockCurl
+)
+class CommunicatorConnectionPoolTest(CommunicatorBaseTest):
+    def test_handle_reused_between_communicators(self, mock_curl, _):
+        pool = lib.ConnectionPool()
+        response_list = []
+        for action in ("action1", "action2"):
+            com = lib.Communicator(
+                self.mock_com_log, None, None, connection_pool=pool
+            )
+            com.add_requests([fixture_request(1, action)])
+            response_list.extend(com.start_loop())
+        self.assertEqual(1, mock_curl.call_count)
+        self.assertIs(response_list[0].handle, response_list[1].handle)
+        self.assertEqual(
+            ["action1", "action2"],
+            [response.request.action for response in response_list]
+        )
+        self.assertEqual(lib.ConnectionPoolStats(1, 1, 0, 1), pool.stats)
+        self.mock_com_log.log_connection_pool_stats.assert_has_calls([
+            mock.call(lib.ConnectionPoolStats(0, 1, 0, 1)),
+            mock.call(lib.ConnectionPoolStats(1, 1, 0, 1)),
+        ])
+        pool.acquire_multi_handle().assert_no_handle_left()
+
+    def test_no_requests(self, mock_curl, mock_multi):
+        pool = lib.ConnectionPool()
+        com = lib.Communicator(
+            self.mock_com_log, None, None, connection_pool=pool
+        )
+        self.assertEqual([], list(com.start_loop()))
+        mock_curl.assert_not_called()
+        mock_multi.assert_not_called()
+        self.mock_com_log.log_connection_pool_stats.assert_not_called()
+        # the communicator can be used again
+        com.add_requests([fixture_request(1, "action")])
+        self.assertEqual(1, len(list(com.start_loop())))
+
+
+def fixture_labeled_request(label, action="action"):
+    return lib.Request(lib.RequestTarget(label), lib.RequestData(action))
+
+
+class RequestQueueTest(TestCase):
+    def setUp(self):
+        self.request_list = [
+            fixture_labeled_request("host1", "a1"),
+            fixture_labeled_request("host1", "a2"),
+            fixture_labeled_request("host1", "a3"),
+            fixture_labeled_request("host2", "a4"),
+            fixture_labeled_request("host3", "a5"),
+        ]
+
+    def pop_all(self, queue, is_host_available=lambda host: True):
+        result = []
+        request = queue.pop(is_host_available)
+        while request is not None:
+            result.append(request)
+            request = queue.pop(is_host_available)
+        return result
+
+    def fixture_queue(self, per_host_fair):
+        queue = lib._RequestQueue(per_host_fair)
+        for request in self.request_list:
+            queue.append(request)
+        return queue
+
+    def test_fifo(self):
+        queue = self.fixture_queue(False)
+        self.assertEqual(5, len(queue))
+        self.assertEqual(self.request_list, self.pop_all(queue))
+        self.assertEqual(0, len(queue))
+
+    def test_fifo_skips_unavailable_host(self):
+        queue = self.fixture_queue(False)
+        self.assertEqual(
+            [self.request_list[3], self.request_list[4]],
+            self.pop_all(queue, lambda host: host != "host1")
+        )
+        self.assertEqual(3, len(queue))
+
+    def test_fair(self):
+        queue = self.fixture_queue(True)
+        self.assertEqual(5, len(queue))
+        self.assertEqual(
+            [
+                self.request_list[0],
+                self.request_list[3],
+                self.request_list[4],
+                self.request_list[1],
+                self.request_list[2],
+            ],
+            self.pop_all(queue)
+        )
+        self.assertEqual(0, len(queue))
+
+    def test_fair_skips_unavailable_host(self):
+        queue = self.fixture_queue(True)
+        self.assertEqual(
+            [
+                self.request_list[0],
+                self.request_list[4],
+                self.request_list[1],
+                self.request_list[2],
+            ],
+            self.pop_all(queue, lambda host: host != "host2")
+        )
+        self.assertEqual(1, len(queue))
+
+
+@mock.patch("pcs.common.node_communicator._create_request_handle")
+class CommunicatorSchedulingTest(CommunicatorBaseTest):
+    def run_requests(self, com, request_list):
+        com.add_requests(request_list)
+        return list(com.start_loop())
+
+    def assert_sequential(self, request_list, response_list):
+        self.assertEqual(request_list, [r.request for r in response_list])
+        logger_calls = []
+        for response in response_list:
+            logger_calls.extend([
+                mock.call.log_request_start(response.request),
+                mock.call.log_response(response),
+            ])
+        self.assertEqual(logger_calls, self.mock_com_log.mock_calls)
+
+    @mock.patch(
+        "pcs.common.node_communicator.pycurl.CurlMulti",
+        side_effect=lambda: MockCurlMulti([1, 1, 1])
+    )
+    def test_max_in_flight(self, _, mock_create_handle):
+        mock_create_handle.side_effect = lambda request, _, __, **kwargs: MockCurl(
+            request=request
+        )
+        com = lib.Communicator(self.mock_com_log, None, None, max_in_flight=1)
+        request_list = [fixture_request(i) for i in range(3)]
+        response_list = self.run_requests(com, request_list)
+        self.assert_sequential(request_list, response_list)
+        com._multi_handle.assert_no_handle_left()
+
+    @mock.patch(
+        "pcs.common.node_communicator.pycurl.CurlMulti",
+        side_effect=lambda: MockCurlMulti([2, 1])
+    )
+    def test_max_per_host(self, _, mock_create_handle):
+        mock_create_handle.side_effect = lambda request, _, __, **kwargs: MockCurl(
+            request=request
+        )
+        com = lib.Communicator(self.mock_com_log, None, None, max_per_host=1)
+        request_list = [
+            fixture_labeled_request("host1", "a1"),
+            fixture_labeled_request("host1", "a2"),
+            fixture_labeled_request("host2", "a3"),
+        ]
+        response_list = self.run_requests(com, request_list)
+        self.assertEqual(
+            [request_list[0], request_list[2], request_list[1]],
+            [r.request for r in response_list]
+        )
+        self.assertEqual(
+            [
+                mock.call.log_request_start(request_list[0]),
+                mock.call.log_request_start(request_list[2]),
+                mock.call.log_response(response_list[0]),
+                mock.call.log_request_start(request_list[1]),
+                mock.call.log_response(response_list[1]),
+                mock.call.log_response(response_list[2]),
+            ],
+            self.mock_com_log.mock_calls
+        )
+        com._multi_handle.assert_no_handle_left()
+
+    def test_invalid_limits(self, _):
+        with self.assertRaises(AssertionError):
+            lib.Communicator(self.mock_com_log, None, None, max_in_flight=0)
+        with self.assertRaises(AssertionError):
+            lib.Communicator(self.mock_com_log, None, None, max_per_host=0)
+
+
+class RequestNextHostRequestTest(TestCase):
+    def test_next_host_request(self):
+        request = lib.Request(
+            lib.RequestTarget("label", ["h0", "h1", "h2"]),
+            lib.RequestData("action", [("a", "b")])
+        )
+        self.assertTrue(request.has_next_host)
+        next_request = request.get_next_host_request()
+        self.assertEqual("h0", request.host)
+        self.assertEqual("h1", next_request.host)
+        self.assertIs(request.target, next_request.target)
+        self.assertIs(request.request_data, next_request.request_data)
+        request.next_host()
+        request.next_host()
+        self.assertFalse(request.has_next_host)
+        self.assertRaises(StopIteration, request.get_next_host_request)
+        self.assertRaises(StopIteration, request.next_host)
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class RaceCurlMulti(MockCurlMulti):
+    """
+    Curl multi handle where each info_read call finishes handles selected by
+    a step function and moves the clock forward
+    """
+    def __init__(self, clock, step_list, clock_step=2):
+        super(RaceCurlMulti, self).__init__([])
+        self._clock = clock
+        self._step_list = step_list
+        self._clock_step = clock_step
+
+    @property
+    def handle_list(self):
+        return self._handle_list
+
+    def info_read(self):
+        if not self._step_list:
+            raise AssertionError("unexpected info_read call")
+        finished_list = self._step_list.pop(0)(self._handle_list)
+        self._clock.now += self._clock_step
+        ok_list = []
+        err_list = []
+        for handle in finished_list:
+            if handle.error:
+                err_list.append((handle, handle.error[0], handle.error[1]))
+            else:
+                ok_list.append(handle)
+        return 0, ok_list, err_list
+
+
+def fixture_race_handle(request, dummy_cookies, dummy_timeout, **kwargs):
+    handle = kwargs.get("handle")
+    if handle is None:
+        return MockCurl({pycurl.CONNECT_TIME: 0}, request=request)
+    # a handle from a connection pool
+    handle.request_obj = request
+    handle.output_buffer = io.BytesIO()
+    handle.debug_buffer = None
+    return handle
+
+
+def is_probe(handle):
+    return handle.opts.get(pycurl.CONNECT_ONLY) == 1
+
+
+def fail(handle):
+    # pylint: disable=protected-access
+    handle._error = (pycurl.E_COULDNT_CONNECT, "refused")
+    return handle
+
+
+@mock.patch(
+    "pcs.common.node_communicator._create_request_handle",
+    side_effect=fixture_race_handle
+)
+class MultiaddressCommunicatorRaceTest(CommunicatorBaseTest):
+    def setUp(self):
+        super(MultiaddressCommunicatorRaceTest, self).setUp()
+        self.clock = FakeClock()
+        self.request = lib.Request(
+            lib.RequestTarget("label", ["host0", "host1"]),
+            lib.RequestData("action")
+        )
+        self.handle_list = []
+
+    def run_race(
+        self, step_list, clock_step=2, request_list=None, on_response=None,
+        **kwargs
+    ):
+        multi = RaceCurlMulti(self.clock, step_list, clock_step)
+        original_add_handle = multi.add_handle
+        def add_handle(handle):
+            self.handle_list.append(handle)
+            original_add_handle(handle)
+        multi.add_handle = add_handle
+        with mock.patch(
+            "pcs.common.node_communicator.pycurl.CurlMulti",
+            return_value=multi
+        ), mock.patch(
+            "pcs.common.node_communicator.time.time", self.clock
+        ):
+            com = lib.MultiaddressCommunicator(
+                self.mock_com_log, None, None, race_stagger=1, **kwargs
+            )
+            com.add_requests(request_list or [self.request])
+            response_list = []
+            for response in com.start_loop():
+                response_list.append(response)
+                if on_response:
+                    on_response(com, response)
+        multi.assert_no_handle_left()
+        self.assertEqual([], step_list)
+        return response_list
+
+    def assert_request_sent_once(self, request):
+        sent_list = [
+            handle for handle in self.handle_list
+            if handle.request_obj is request and not is_probe(handle)
+        ]
+        self.assertEqual(1, len(sent_list))
+        return sent_list[0]
+
+    def assert_probes_closed(self):
+        for handle in self.handle_list:
+            if is_probe(handle):
+                self.assertTrue(handle.closed)
+                self.assertEqual(1, handle.opts[pycurl.FRESH_CONNECT])
+                self.assertEqual(1, handle.opts[pycurl.FORBID_REUSE])
+
+    def test_first_host_connects(self, mock_create_handle):
+        def probe_connects(handle_list):
+            self.assertEqual(1, len(handle_list))
+            self.assertTrue(is_probe(handle_list[0]))
+            self.assertEqual("host0", handle_list[0].request_obj.host)
+            self.assertIsNot(self.request, handle_list[0].request_obj)
+            return handle_list
+        def request_finishes(handle_list):
+            self.assertEqual(1, len(handle_list))
+            self.assertFalse(is_probe(handle_list[0]))
+            return handle_list
+
+        response_list = self.run_race(
+            [probe_connects, request_finishes], clock_step=0.4
+        )
+        self.assertEqual(1, len(response_list))
+        self.assertIs(self.request, response_list[0].request)
+        self.assertEqual("host0", self.request.host)
+        self.assertEqual(2, mock_create_handle.call_count)
+        self.assert_request_sent_once(self.request)
+        self.assert_probes_closed()
+        self.assertEqual(
+            [
+                mock.call.log_request_start(self.request),
+                mock.call.log_response(response_list[0]),
+            ],
+            self.mock_com_log.mock_calls
+        )
+
+    def test_next_host_wins(self, mock_create_handle):
+        def probe_connects(handle_list):
+            self.assertEqual(2, len(handle_list))
+            self.assertTrue(all([is_probe(handle) for handle in handle_list]))
+            self.assertEqual("host1", handle_list[1].request_obj.host)
+            return [handle_list[1]]
+
+        response_list = self.run_race([
+            lambda handle_list: [],
+            probe_connects,
+            lambda handle_list: handle_list,
+        ])
+        self.assertEqual(1, len(response_list))
+        response = response_list[0]
+        self.assertTrue(response.was_connected)
+        self.assertIs(self.request, response.request)
+        self.assertEqual("host1", self.request.host)
+        self.assertEqual(3, mock_create_handle.call_count)
+        self.assert_request_sent_once(self.request)
+        self.assert_probes_closed()
+        retry_call = self.mock_com_log.log_retry.call_args
+        self.assertIs(self.request, retry_call[0][0].request)
+        self.assertEqual("host0", retry_call[0][1])
+        self.assertEqual(
+            [
+                mock.call.log_retry(retry_call[0][0], "host0"),
+                mock.call.log_request_start(self.request),
+                mock.call.log_response(response),
+            ],
+            self.mock_com_log.mock_calls
+        )
+
+    def test_first_host_fails_before_stagger(self, mock_create_handle):
+        def probe_fails(handle_list):
+            self.assertEqual(1, len(handle_list))
+            return [fail(handle_list[0])]
+        def next_probe_connects(handle_list):
+            # the next host is tried right away
+            self.assertEqual(1, len(handle_list))
+            self.assertTrue(is_probe(handle_list[0]))
+            self.assertEqual("host1", handle_list[0].request_obj.host)
+            return handle_list
+
+        response_list = self.run_race(
+            [
+                probe_fails,
+                next_probe_connects,
+                lambda handle_list: handle_list,
+            ],
+            clock_step=0.4
+        )
+        self.assertEqual(1, len(response_list))
+        self.assertEqual("host1", self.request.host)
+        self.assert_request_sent_once(self.request)
+        self.assert_probes_closed()
+        self.assertEqual(1, self.mock_com_log.log_retry.call_count)
+
+    def test_all_hosts_fail(self, mock_create_handle):
+        response_list = self.run_race([
+            lambda handle_list: [],
+            lambda handle_list: [fail(handle) for handle in handle_list],
+        ])
+        self.assertEqual(1, len(response_list))
+        response = response_list[0]
+        self.assertFalse(response.was_connected)
+        self.assertIs(self.request, response.request)
+        self.assertEqual("host1", self.request.host)
+        self.assertEqual(2, mock_create_handle.call_count)
+        self.assert_probes_closed()
+        self.assertEqual(
+            [
+                mock.call.log_response(response),
+                mock.call.log_no_more_addresses(response),
+            ],
+            self.mock_com_log.mock_calls
+        )
+
+    def test_no_race_before_stagger(self, mock_create_handle):
+        response_list = self.run_race(
+            [
+                lambda handle_list: [],
+                lambda handle_list: handle_list,
+                lambda handle_list: handle_list,
+            ],
+            clock_step=0.4
+        )
+        self.assertEqual(1, len(response_list))
+        self.assertEqual("host0", self.request.host)
+        self.assertEqual(2, mock_create_handle.call_count)
+
+    def test_both_connect_at_once(self, mock_create_handle):
+        response_list = self.run_race([
+            lambda handle_list: [],
+            lambda handle_list: list(handle_list),
+            lambda handle_list: handle_list,
+        ])
+        self.assertEqual(1, len(response_list))
+        self.assertEqual("host0", self.request.host)
+        self.assert_request_sent_once(self.request)
+        self.assert_probes_closed()
+
+    def test_winner_waits_in_queue(self, mock_create_handle):
+        other_request = lib.Request(
+            lib.RequestTarget("other", ["host2"]), lib.RequestData("action")
+        )
+        def probe_connects(handle_list):
+            self.assertEqual(1, len(handle_list))
+            self.assertTrue(is_probe(handle_list[0]))
+            return handle_list
+        def other_request_finishes(handle_list):
+            # the winner is queued after the other request
+            self.assertEqual(1, len(handle_list))
+            self.assertIs(other_request, handle_list[0].request_obj)
+            return handle_list
+        def request_finishes(handle_list):
+            self.assertEqual(1, len(handle_list))
+            self.assertIs(self.request, handle_list[0].request_obj)
+            return handle_list
+
+        response_list = self.run_race(
+            [probe_connects, other_request_finishes, request_finishes],
+            request_list=[self.request, other_request],
+            max_in_flight=1,
+        )
+        self.assertEqual(
+            [other_request, self.request],
+            [response.request for response in response_list]
+        )
+
+    @mock.patch(
+        "pcs.common.node_communicator.pycurl.Curl",
+        side_effect=lambda: MockCurl({pycurl.CONNECT_TIME: 0})
+    )
+    def test_pooled_connection_not_raced(
+        self, mock_curl, mock_create_handle
+    ):
+        pool = lib.ConnectionPool()
+        pool.put_handle(
+            self.request.host, self.request.port,
+            MockCurl({pycurl.CONNECT_TIME: 0})
+        )
+        def request_sends_body(handle_list):
+            # a reused connection does not report a connect time
+            self.assertEqual(1, len(handle_list))
+            return []
+        def request_finishes(handle_list):
+            self.assertEqual(1, len(handle_list))
+            self.assertFalse(is_probe(handle_list[0]))
+            return handle_list
+
+        response_list = self.run_race(
+            [request_sends_body, request_finishes], connection_pool=pool
+        )
+        self.assertEqual(1, len(response_list))
+        self.assertEqual("host0", self.request.host)
+        self.assertEqual(1, mock_create_handle.call_count)
+        self.assert_request_sent_once(self.request)
+        self.assertEqual(
+            [
+                mock.call.log_request_start(self.request),
+                mock.call.log_response(response_list[0]),
+                mock.call.log_connection_pool_stats(pool.stats),
+            ],
+            self.mock_com_log.mock_calls
+        )
+
+    @mock.patch(
+        "pcs.common.node_communicator.pycurl.Curl",
+        side_effect=lambda: MockCurl({pycurl.CONNECT_TIME: 0})
+    )
+    def test_probes_not_pooled(self, mock_curl, mock_create_handle):
+        pool = lib.ConnectionPool()
+        other_request = lib.Request(
+            lib.RequestTarget("other", ["host0"]), lib.RequestData("action")
+        )
+        def add_other_request(com, response):
+            if response.request is self.request:
+                com.add_requests([other_request])
+        def other_request_finishes(handle_list):
+            self.assertEqual(1, len(handle_list))
+            self.assertIs(other_request, handle_list[0].request_obj)
+            self.assertFalse(is_probe(handle_list[0]))
+            return handle_list
+
+        response_list = self.run_race(
+            [
+                lambda handle_list: [],
+                lambda handle_list: [handle_list[1]],
+                lambda handle_list: handle_list,
+                other_request_finishes,
+            ],
+            on_response=add_other_request,
+            connection_pool=pool,
+        )
+        self.assertEqual(
+            [self.request, other_request],
+            [response.request for response in response_list]
+        )
+        self.assert_probes_closed()
+        self.assertEqual(2, pool.stats.idle)
+        self.assertEqual(2, pool.stats.misses)
+
+
+class SelectEngineTest(TestCase):
+    def test_perform_repeats_call_multi_perform(self):
+        multi = mock.Mock(spec_set=["perform"])
+        multi.perform.side_effect = [
+            (pycurl.E_CALL_MULTI_PERFORM, 2), (0, 1)
+        ]
+        self.assertEqual(1, lib.SelectEngine(multi, 0.8).perform())
+
+    def test_wait_respects_max_timeout(self):
+        multi = mock.Mock(spec_set=["perform", "select", "timeout"])
+        multi.timeout.return_value = -1
+        multi.perform.return_value = (0, 1)
+        multi.select.return_value = -1
+        lib.SelectEngine(multi, 0.8).wait(0.2)
+        multi.select.assert_called_once_with(0.2)
+
+    def test_wait_until_activity(self):
+        multi = mock.Mock(spec_set=["perform", "select", "timeout"])
+        multi.timeout.return_value = 500
+        multi.perform.return_value = (0, 1)
+        multi.select.side_effect = [-1, 1]
+        lib.SelectEngine(multi, 0.8).wait()
+        self.assertEqual(
+            [mock.call(0.5), mock.call(0.5)], multi.select.call_args_list
+        )
+
+
+@skipIf(lib.selectors is None, "selectors module is not available")
+class SocketEventEngineTest(TestCase):
+    def setUp(self):
+        self.multi = mock.Mock(spec_set=["setopt", "socket_action"])
+        self.multi.socket_action.return_value = (0, 1)
+        self.engine = lib.SocketEventEngine(self.multi)
+        self.callbacks = dict(
+            call[0] for call in self.multi.setopt.call_args_list
+        )
+        self.sock_curl, self.sock_peer = socket.socketpair()
+
+    def tearDown(self):
+        self.engine.close()
+        self.sock_curl.close()
+        self.sock_peer.close()
+
+    def test_socket_event(self):
+        fd = self.sock_curl.fileno()
+        self.callbacks[pycurl.M_SOCKETFUNCTION](
+            pycurl.POLL_IN, fd, self.multi, None
+        )
+        self.sock_peer.send(b"data")
+        self.engine.wait(1)
+        self.multi.socket_action.assert_called_once_with(
+            fd, pycurl.CSELECT_IN
+        )
+
+    def test_socket_modify_and_remove(self):
+        fd = self.sock_curl.fileno()
+        socket_callback = self.callbacks[pycurl.M_SOCKETFUNCTION]
+        socket_callback(pycurl.POLL_IN, fd, self.multi, None)
+        socket_callback(pycurl.POLL_OUT, fd, self.multi, None)
+        # the socket is writable right away
+        self.engine.wait(1)
+        self.multi.socket_action.assert_called_once_with(
+            fd, pycurl.CSELECT_OUT
+        )
+        socket_callback(pycurl.POLL_REMOVE, fd, self.multi, None)
+        self.multi.socket_action.reset_mock()
+        self.engine.wait(0)
+        self.multi.socket_action.assert_not_called()
+
+    def test_timer(self):
+        self.callbacks[pycurl.M_TIMERFUNCTION](0)
+        self.engine.perform()
+        self.multi.socket_action.assert_called_once_with(
+            pycurl.SOCKET_TIMEOUT, 0
+        )
+        # the timer is not repeated
+        self.engine.perform()
+        self.assertEqual(1, self.multi.socket_action.call_count)
+
+    def test_timer_removed(self):
+        self.callbacks[pycurl.M_TIMERFUNCTION](0)
+        self.callbacks[pycurl.M_TIMERFUNCTION](-1)
+        self.engine.wait(0)
+        self.multi.socket_action.assert_not_called()
+
+    def test_close_releases_callbacks(self):
+        self.engine.close()
+        self.multi.setopt.assert_any_call(
+            pycurl.M_SOCKETFUNCTION, lib._ignore_callback
+        )
+        self.multi.setopt.assert_any_call(
+            pycurl.M_TIMERFUNCTION, lib._ignore_callback
+        )
+        self.engine = mock.Mock()
+
+
+class CommunicatorEngineTest(TestCase):
+    def test_unknown_engine(self):
+        with self.assertRaises(AssertionError):
+            lib.Communicator(None, None, None, engine="unknown")
+
+    @mock.patch("pcs.common.node_communicator.selectors", None)
+    def test_fallback_without_selectors(self):
+        com = lib.Communicator(
+            None, None, None, engine=lib.ENGINE_SOCKET_EVENTS
+        )
+        self.assertEqual(lib.ENGINE_SELECT, com._engine_name)
@@ -0,0 +1,138 @@
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+)
+
+import json
+import os
+import shutil
+import tempfile
+
+from pcs.common import trace
+from pcs.test.tools.pcs_unittest import TestCase
+
+
+class TraceTest(TestCase):
+    def setUp(self):
+        trace.enable()
+
+    def tearDown(self):
+        trace.disable()
+
+    def get_events(self, category=None):
+        return [
+            event for event in trace.get_chrome_trace()["traceEvents"]
+            if category is None or event["cat"] == category
+        ]
+
+    def test_disabled(self):
+        trace.disable()
+        with trace.span("cibadmin", trace.CATEGORY_PROCESS) as args:
+            args["retval"] = 0
+        trace.add_process("stdin", "stdout")
+        self.assertFalse(trace.is_enabled())
+        self.assertEqual({"traceEvents": []}, trace.get_chrome_trace())
+        self.assertEqual("", trace.get_summary())
+
+    def test_span(self):
+        with trace.span(
+            "cibadmin", trace.CATEGORY_PROCESS, command="cibadmin -Q"
+        ) as args:
+            args["retval"] = 0
+        event_list = self.get_events(trace.CATEGORY_PROCESS)
+        self.assertEqual(1, len(event_list))
+        event = event_list[0]
+        self.assertEqual("cibadmin", event["name"])
+        self.assertEqual("X", event["ph"])
+        self.assertEqual(os.getpid(), event["pid"])
+        self.assertTrue(event["dur"] >= 0)
+        self.assertEqual(
+            {"command": "cibadmin -Q", "retval": 0}, event["args"]
+        )
+
+    def test_span_recorded_on_exception(self):
+        def fail():
+            with trace.span("push cib", trace.CATEGORY_CIB):
+                raise ValueError()
+        self.assertRaises(ValueError, fail)
+        self.assertEqual(
+            ["push cib"],
+            [event["name"] for event in self.get_events(trace.CATEGORY_CIB)]
+        )
+
+    def test_record_span(self):
+        trace.record_span(
+            "status", trace.CATEGORY_HTTP, 10.0, 10.5, {"host": "node1"}
+        )
+        self.assertEqual(
+            [{
+                "name": "status",
+                "cat": trace.CATEGORY_HTTP,
+                "ph": "X",
+                "ts": 10000000,
+                "dur": 500000,
+                "pid": os.getpid(),
+                "tid": self.get_events(trace.CATEGORY_HTTP)[0]["tid"],
+                "args": {"host": "node1"},
+            }],
+            self.get_events(trace.CATEGORY_HTTP)
+        )
+
+    def test_counters(self):
+        trace.add_process("stdin", "stdout", None)
+        trace.add_process(None, b"out", "")
+        trace.add_count(trace.COUNTER_HTTP_REQUESTS)
+        trace.add_count(trace.COUNTER_HTTP_BYTES, 100)
+        self.assertEqual(
+            {
+                trace.COUNTER_PROCESSES: 2,
+                trace.COUNTER_PIPE_BYTES: 14,
+                trace.COUNTER_HTTP_REQUESTS: 1,
+                trace.COUNTER_HTTP_BYTES: 100,
+            },
+            trace.get_chrome_trace()["otherData"]
+        )
+
+    def test_enable_resets(self):
+        trace.record_span("status", trace.CATEGORY_HTTP, 10.0, 10.5)
+        trace.add_count(trace.COUNTER_HTTP_REQUESTS)
+        trace.enable()
+        self.assertEqual([], self.get_events(trace.CATEGORY_HTTP))
+        self.assertEqual(
+            0, trace.get_chrome_trace()["otherData"][trace.COUNTER_HTTP_REQUESTS]
+        )
+
+    def test_summary(self):
+        trace.record_span("cibadmin", trace.CATEGORY_PROCESS, 10.0, 10.25)
+        trace.record_span("cibadmin", trace.CATEGORY_PROCESS, 11.0, 11.5)
+        trace.record_span("crm_mon", trace.CATEGORY_PROCESS, 12.0, 12.125)
+        trace.add_process("stdin", "stdout")
+        line_list = trace.get_summary().splitlines()
+        self.assertEqual(
+            ["category", "name", "count", "total", "[ms]", "max", "[ms]"],
+            line_list[0].split()
+        )
+        self.assertIn(
+            ["process", "cibadmin", "2", "750.0", "500.0"],
+            [line.split() for line in line_list]
+        )
+        self.assertIn(
+            ["process", "crm_mon", "1", "125.0", "125.0"],
+            [line.split() for line in line_list]
+        )
+        self.assertIn("external processes: 1", line_list)
+        self.assertIn("bytes over pipes: 11", line_list)
+
+    def test_write_chrome_trace(self):
+        trace.record_span("cibadmin", trace.CATEGORY_PROCESS, 10.0, 10.25)
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            trace_path = os.path.join(tmp_dir, "trace.json")
+            trace.write_chrome_trace(trace_path)
+            with open(trace_path) as trace_file:
+                self.assertEqual(
+                    trace.get_chrome_trace(), json.load(trace_file)
+                )
+        finally:
+            shutil.rmtree(tmp_dir)
@@ -37,6 +37,46 @@ def run_parallel(worker, data_list):
     for thread in thread_list:
         thread.join()
 
+def map_parallel(worker, item_list, max_workers):
+    """
+    Return a list of results of the worker run for each item in the order of
+    the items. If the worker raises an exception for any item, the first one is
+    raised once all items have been processed.
+
+    callable worker -- function taking an item
+    iterable item_list -- items to process
+    int max_workers -- maximal number of threads running the worker at a time
+    """
+    item_list = list(item_list)
+    result_list = [None] * len(item_list)
+    error_list = []
+    index_iterator = iter(range(len(item_list)))
+    lock = threading.Lock()
+
+    def run_worker():
+        while True:
+            with lock:
+                index = next(index_iterator, None)
+            if index is None:
+                return
+            try:
+                result_list[index] = worker(item_list[index])
+            except Exception as e:
+                error_list.append((index, e))
+
+    thread_list = []
+    for dummy_i in range(min(max(max_workers, 1), len(item_list))):
+        thread = threading.Thread(target=run_worker)
+        thread.daemon = True
+        thread_list.append(thread)
+        thread.start()
+
+    for thread in thread_list:
+        thread.join()
+    if error_list:
+        raise min(error_list, key=lambda error: error[0])[1]
+    return result_list
+
 def format_environment_error(e):
     if e.filename:
         return "{0}: '{1}'".format(e.strerror, e.filename)
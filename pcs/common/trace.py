@@ -0,0 +1,228 @@
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+)
+
+from contextlib import contextmanager
+import json
+import os
+import threading
+import time
+
+
+# Tracing records spans of time spent in external processes, node
+# communication, CIB handling and library commands. It is disabled unless
+# enable is called, disabled tracing costs a function call per span.
+
+CATEGORY_COMMAND = "command"
+CATEGORY_PROCESS = "process"
+CATEGORY_HTTP = "http"
+CATEGORY_CIB = "cib"
+
+COUNTER_PROCESSES = "external processes"
+COUNTER_PIPE_BYTES = "bytes over pipes"
+COUNTER_HTTP_REQUESTS = "http requests"
+COUNTER_HTTP_BYTES = "bytes over http"
+
+_lock = threading.Lock()
+_tracer = None
+
+
+class _Tracer(object):
+    def __init__(self):
+        self.span_list = []
+        self.counters = dict(
+            (name, 0) for name in (
+                COUNTER_PROCESSES,
+                COUNTER_PIPE_BYTES,
+                COUNTER_HTTP_REQUESTS,
+                COUNTER_HTTP_BYTES,
+            )
+        )
+
+
+def enable():
+    """
+    Start recording spans and counters, drop everything recorded so far
+    """
+    global _tracer
+    _tracer = _Tracer()
+    startup_time = _get_process_start_time()
+    if startup_time is not None:
+        record_span("startup", "python", startup_time, time.time())
+
+
+def disable():
+    global _tracer
+    _tracer = None
+
+
+def is_enabled():
+    return _tracer is not None
+
+
+@contextmanager
+def span(name, category, **args):
+    """
+    Record time spent in the with block, yield a dict of span's arguments
+    which can be extended in the block
+
+    string name -- name of the span, e.g. a command
+    string category -- kind of the span, spans are summarized by categories
+    """
+    if _tracer is None:
+        yield args
+        return
+    start = time.time()
+    try:
+        yield args
+    finally:
+        record_span(name, category, start, time.time(), args)
+
+
+def record_span(name, category, start, end, args=None):
+    """
+    Record a span which has already finished
+
+    string name -- name of the span
+    string category -- kind of the span
+    float start -- start of the span in seconds since the epoch
+    float end -- end of the span in seconds since the epoch
+    dict args -- additional information about the span
+    """
+    tracer = _tracer
+    if tracer is None:
+        return
+    with _lock:
+        tracer.span_list.append((
+            name,
+            category,
+            start,
+            end,
+            threading.current_thread().ident,
+            dict(args) if args else {},
+        ))
+
+
+def add_count(counter, value=1):
+    """
+    Increase a counter
+
+    string counter -- name of the counter, e.g. COUNTER_PROCESSES
+    int value -- increment
+    """
+    tracer = _tracer
+    if tracer is None:
+        return
+    with _lock:
+        tracer.counters[counter] = tracer.counters.get(counter, 0) + value
+
+
+def add_process(*payload_list):
+    """
+    Count an external process and data exchanged with it
+
+    string payload_list -- stdin, stdout and stderr of the process
+    """
+    if _tracer is None:
+        return
+    add_count(COUNTER_PROCESSES)
+    add_count(
+        COUNTER_PIPE_BYTES,
+        sum([len(payload) for payload in payload_list if payload])
+    )
+
+
+def get_chrome_trace():
+    """
+    Return recorded spans in the Chrome trace event format
+    """
+    if _tracer is None:
+        return {"traceEvents": []}
+    pid = os.getpid()
+    with _lock:
+        span_list = list(_tracer.span_list)
+        counters = dict(_tracer.counters)
+    return {
+        "traceEvents": [
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": int(start * 1000000),
+                "dur": int((end - start) * 1000000),
+                "pid": pid,
+                "tid": tid,
+                "args": args,
+            }
+            for name, category, start, end, tid, args in span_list
+        ],
+        "otherData": counters,
+    }
+
+
+def get_summary():
+    """
+    Return a table of time spent in each category of spans and the counters
+    """
+    if _tracer is None:
+        return ""
+    with _lock:
+        span_list = list(_tracer.span_list)
+        counters = dict(_tracer.counters)
+    summary = {}
+    for name, category, start, end, dummy_tid, dummy_args in span_list:
+        key = (category, name)
+        count, total, maximum = summary.get(key, (0, 0.0, 0.0))
+        duration = end - start
+        summary[key] = (count + 1, total + duration, max(maximum, duration))
+    line_list = [
+        "{0:<12} {1:<40} {2:>6} {3:>11} {4:>11}".format(
+            "category", "name", "count", "total [ms]", "max [ms]"
+        )
+    ]
+    for (category, name), (count, total, maximum) in sorted(
+        summary.items(), key=lambda item: (-item[1][1], item[0])
+    ):
+        line_list.append(
+            "{0:<12} {1:<40} {2:>6} {3:>11.1f} {4:>11.1f}".format(
+                category, _shorten(name, 40), count, total * 1000,
+                maximum * 1000
+            )
+        )
+    line_list.append("")
+    for counter, value in sorted(counters.items()):
+        line_list.append("{0}: {1}".format(counter, value))
+    return "\n".join(line_list)
+
+
+def write_chrome_trace(path):
+    """
+    Store recorded spans to a file in the Chrome trace event format
+
+    string path -- path to the file
+    """
+    with open(path, "w") as trace_file:
+        json.dump(get_chrome_trace(), trace_file)
+
+
+def _shorten(text, length):
+    if len(text) <= length:
+        return text
+    return text[:length - 3] + "..."
+
+
+def _get_process_start_time():
+    # time spent before pcs started tracing, mostly importing python modules
+    try:
+        with open("/proc/self/stat") as stat_file:
+            # the process name may contain spaces, it is enclosed in ()
+            stat = stat_file.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as uptime_file:
+            uptime = float(uptime_file.read().split()[0])
+        # starttime is the 22nd field, stat starts with the 3rd one
+        started_after_boot = int(stat[19]) / os.sysconf("SC_CLK_TCK")
+    except (EnvironmentError, ValueError, IndexError):
+        return None
+    return time.time() - (uptime - started_after_boot)
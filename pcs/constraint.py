@@ -5,10 +5,13 @@ from __future__ import (
 )
 
 import sys
+import weakref
 import xml.dom.minidom
 from collections import defaultdict
 from xml.dom.minidom import parseString
 
+from lxml import etree
+
 from pcs import (
     rule as rule_utils,
     usage,
@@ -24,6 +27,7 @@ import pcs.cli.constraint_colocation.command as colocation_command
 import pcs.cli.constraint_order.command as order_command
 from pcs.cli.constraint_ticket import command as ticket_command
 from pcs.lib.cib.constraint import resource_set
+from pcs.lib.cib.constraint.constraint import RESOURCE_ATTRIBUTE_LIST
 from pcs.lib.cib.constraint.order import ATTRIB as order_attrib
 from pcs.lib.errors import LibraryError
 from pcs.lib.pacemaker.values import sanitize_id
@@ -40,6 +44,106 @@ OPTIONS_KIND = order_attrib["kind"]
 RESOURCE_TYPE_RESOURCE = "resource"
 RESOURCE_TYPE_REGEXP = "regexp"
 
+# constraints which reference resources
+CONSTRAINT_TAG_LIST = [
+    "rsc_colocation", "rsc_location", "rsc_order", "rsc_ticket"
+]
+
+_resource_reference_index_cache = weakref.WeakKeyDictionary()
+
+
+class ResourceReferenceIndex(object):
+    """
+    Reverse index from resource ids to constraints referencing them
+
+    The index is built once per loaded CIB, see get_resource_reference_index.
+    Elements removed from the CIB and references changed after the index has
+    been built are filtered out when reading the index. Constraints added to
+    the CIB later are not in the index unless added by add_constraint.
+    """
+    def __init__(self, document):
+        self._primitive_dict = {}
+        self._constraint_dict = defaultdict(list)
+        self._resource_ref_dict = defaultdict(list)
+        for primitive_el in document.getElementsByTagName("primitive"):
+            self._primitive_dict.setdefault(
+                primitive_el.getAttribute("id"), primitive_el
+            )
+        constraints_el_list = document.getElementsByTagName("constraints")
+        if not constraints_el_list:
+            return
+        for tag in CONSTRAINT_TAG_LIST:
+            for constraint_el in constraints_el_list[0].getElementsByTagName(
+                tag
+            ):
+                for resource_id in set([
+                    constraint_el.getAttribute(attr)
+                    for attr in RESOURCE_ATTRIBUTE_LIST
+                ]):
+                    if resource_id:
+                        self.add_constraint(resource_id, constraint_el)
+        for resource_ref in constraints_el_list[0].getElementsByTagName(
+            "resource_ref"
+        ):
+            self._resource_ref_dict[resource_ref.getAttribute("id")].append(
+                resource_ref
+            )
+
+    def add_constraint(self, resource_id, constraint_el):
+        self._constraint_dict[resource_id].append(constraint_el)
+
+    def get_primitive(self, resource_id):
+        primitive_el = self._primitive_dict.get(resource_id)
+        if primitive_el is None or not _is_in_document(primitive_el):
+            return None
+        return primitive_el
+
+    def get_constraints(self, resource_id):
+        return [
+            constraint_el
+            for constraint_el in self._constraint_dict.get(resource_id, [])
+            if (
+                _is_in_document(constraint_el)
+                and
+                resource_id in [
+                    constraint_el.getAttribute(attr)
+                    for attr in RESOURCE_ATTRIBUTE_LIST
+                ]
+            )
+        ]
+
+    def get_resource_refs(self, resource_id):
+        return [
+            resource_ref
+            for resource_ref in self._resource_ref_dict.get(resource_id, [])
+            if (
+                _is_in_document(resource_ref)
+                and
+                resource_ref.getAttribute("id") == resource_id
+            )
+        ]
+
+def get_resource_reference_index(dom):
+    """
+    Return an index of constraints referencing resources in the CIB
+
+    dom -- minidom document of the CIB or any element in it
+    """
+    document = (
+        dom if dom.nodeType == xml.dom.Node.DOCUMENT_NODE
+        else dom.ownerDocument
+    )
+    index = _resource_reference_index_cache.get(document)
+    if index is None:
+        index = ResourceReferenceIndex(document)
+        _resource_reference_index_cache[document] = index
+    return index
+
+def _is_in_document(element):
+    while element.parentNode is not None:
+        element = element.parentNode
+    return element.nodeType == xml.dom.Node.DOCUMENT_NODE
+
 def constraint_cmd(argv):
     lib = utils.get_library_wrapper()
     modifiers = utils.get_modifiers()
@@ -550,34 +654,34 @@ def location_show(argv):
     else:
         valid_noderes = []
 
-    (dummy_dom,constraintsElement) = getCurrentConstraints()
+    constraints_el = utils.get_cib_tree().find(".//constraints")
+    if constraints_el is None:
+        utils.err("unable to process cib")
     nodehashon = {}
     nodehashoff = {}
     rschashon = {}
     rschashoff = {}
     ruleshash = defaultdict(list)
-    all_loc_constraints = constraintsElement.getElementsByTagName('rsc_location')
 
     print("Location Constraints:")
-    for rsc_loc in all_loc_constraints:
-        if rsc_loc.hasAttribute("rsc-pattern"):
+    for rsc_loc in constraints_el.iter("rsc_location"):
+        if rsc_loc.get("rsc-pattern") is not None:
             lc_rsc_type = RESOURCE_TYPE_REGEXP
-            lc_rsc_value = rsc_loc.getAttribute("rsc-pattern")
+            lc_rsc_value = rsc_loc.get("rsc-pattern")
             lc_name = "Resource pattern: {0}".format(lc_rsc_value)
         else:
             lc_rsc_type = RESOURCE_TYPE_RESOURCE
-            lc_rsc_value = rsc_loc.getAttribute("rsc")
+            lc_rsc_value = rsc_loc.get("rsc", "")
             lc_name = "Resource: {0}".format(lc_rsc_value)
         lc_rsc = lc_rsc_type, lc_rsc_value, lc_name
-        lc_id = rsc_loc.getAttribute("id")
-        lc_node = rsc_loc.getAttribute("node")
-        lc_score = rsc_loc.getAttribute("score")
-        lc_role = rsc_loc.getAttribute("role")
-        lc_resource_discovery = rsc_loc.getAttribute("resource-discovery")
+        lc_id = rsc_loc.get("id", "")
+        lc_node = rsc_loc.get("node", "")
+        lc_score = rsc_loc.get("score", "")
+        lc_role = rsc_loc.get("role", "")
+        lc_resource_discovery = rsc_loc.get("resource-discovery", "")
 
-        for child in rsc_loc.childNodes:
-            if child.nodeType == child.ELEMENT_NODE and child.tagName == "rule":
-                ruleshash[lc_rsc].append(child)
+        for rule in rsc_loc.findall("rule"):
+            ruleshash[lc_rsc].append(rule)
 
 # NEED TO FIX FOR GROUP LOCATION CONSTRAINTS (where there are children of
 # rsc_location)
@@ -716,11 +820,14 @@ def show_location_rules(ruleshash, showDetail, noheader=False):
         if not noheader:
             print("  {0}".format(rsc[2]))
         for rule in ruleshash[rsc]:
-            constraint_id = rule.parentNode.getAttribute("id")
+            constraint_id = rule.getparent().get("id", "")
             constrainthash[constraint_id].append(rule)
             constraint_options[constraint_id] = []
-            if rule.parentNode.getAttribute("resource-discovery"):
-                constraint_options[constraint_id].append("resource-discovery=%s" % rule.parentNode.getAttribute("resource-discovery"))
+            resource_discovery = rule.getparent().get("resource-discovery")
+            if resource_discovery:
+                constraint_options[constraint_id].append(
+                    "resource-discovery=%s" % resource_discovery
+                )
 
         for constraint_id in sorted(constrainthash.keys()):
             if constraint_id in constraint_options and len(constraint_options[constraint_id]) > 0:
@@ -730,8 +837,13 @@ def show_location_rules(ruleshash, showDetail, noheader=False):
 
             print("    Constraint: " + constraint_id + constraint_option_info)
             for rule in constrainthash[constraint_id]:
+                # only the small rule subtree is converted for the exporter
                 print(rule_utils.ExportDetailed().get_string(
-                    rule, showDetail, "      "
+                    parseString(
+                        etree.tostring(rule, with_tail=False)
+                    ).documentElement,
+                    showDetail,
+                    "      "
                 ))
 
 def location_prefer(argv):
@@ -1110,9 +1222,10 @@ def constraint_ref(argv):
         usage.constraint()
         sys.exit(1)
 
+    dom = utils.get_cib_dom()
     for arg in argv:
         print("Resource: %s" % arg)
-        constraints,set_constraints = find_constraints_containing(arg)
+        constraints,set_constraints = find_constraints_containing(arg, dom)
         if len(constraints) == 0 and len(set_constraints) == 0:
             print("  No Matches.")
         else:
@@ -1121,83 +1234,72 @@ def constraint_ref(argv):
             for constraint in sorted(set_constraints):
                 print("  " + constraint)
 
-def remove_constraints_containing(resource_id,output=False,constraints_element = None, passed_dom=None):
-    constraints,set_constraints = find_constraints_containing(resource_id, passed_dom)
-    for c in constraints:
+def remove_constraints_containing(resource_id, output=False, passed_dom=None):
+    dom = utils.get_cib_dom() if passed_dom is None else passed_dom
+    constraint_list, resource_ref_list = _find_elements_referencing(
+        resource_id, dom
+    )
+    for constraint_el in constraint_list:
         if output == True:
-            print("Removing Constraint - " + c)
-        if constraints_element != None:
-            constraint_rm([c], True, constraints_element, passed_dom=passed_dom)
-        else:
-            constraint_rm([c], passed_dom=passed_dom)
-
-    if len(set_constraints) != 0:
-        (dom, constraintsElement) = getCurrentConstraints(passed_dom)
-        for c in constraintsElement.getElementsByTagName("resource_ref")[:]:
-            # If resource id is in a set, remove it from the set, if the set
-            # is empty, then we remove the set, if the parent of the set
-            # is empty then we remove it
-            if c.getAttribute("id") == resource_id:
-                pn = c.parentNode
-                pn.removeChild(c)
-                if output == True:
-                    print("Removing %s from set %s" % (resource_id,pn.getAttribute("id")))
-                if pn.getElementsByTagName("resource_ref").length == 0:
-                    print("Removing set %s" % pn.getAttribute("id"))
-                    pn2 = pn.parentNode
-                    pn2.removeChild(pn)
-                    if pn2.getElementsByTagName("resource_set").length == 0:
-                        pn2.parentNode.removeChild(pn2)
-                        print("Removing constraint %s" % pn2.getAttribute("id"))
-        if passed_dom:
-            return dom
-        utils.replace_cib_configuration(dom)
+            print("Removing Constraint - " + constraint_el.getAttribute("id"))
+        constraint_el.parentNode.removeChild(constraint_el)
+
+    for c in resource_ref_list:
+        # If resource id is in a set, remove it from the set, if the set
+        # is empty, then we remove the set, if the parent of the set
+        # is empty then we remove it
+        pn = c.parentNode
+        pn.removeChild(c)
+        if output == True:
+            print("Removing %s from set %s" % (resource_id,pn.getAttribute("id")))
+        if pn.getElementsByTagName("resource_ref").length == 0:
+            print("Removing set %s" % pn.getAttribute("id"))
+            pn2 = pn.parentNode
+            pn2.removeChild(pn)
+            if pn2.getElementsByTagName("resource_set").length == 0:
+                pn2.parentNode.removeChild(pn2)
+                print("Removing constraint %s" % pn2.getAttribute("id"))
 
-def find_constraints_containing(resource_id, passed_dom=None):
     if passed_dom:
-        dom = passed_dom
-    else:
-        dom = utils.get_cib_dom()
-    constraints_found = []
-    set_constraints = []
-
-    resources = dom.getElementsByTagName("primitive")
-    resource_match = None
-    for res in resources:
-        if res.getAttribute("id") == resource_id:
-            resource_match = res
-            break
-
-    if resource_match:
-        if resource_match.parentNode.tagName == "master" or resource_match.parentNode.tagName == "clone":
-            constraints_found,set_constraints = find_constraints_containing(resource_match.parentNode.getAttribute("id"), dom)
-
-    constraints = dom.getElementsByTagName("constraints")
-    if len(constraints) == 0:
-        return [],[]
-    else:
-        constraints = constraints[0]
-
-    myConstraints = constraints.getElementsByTagName("rsc_colocation")
-    myConstraints += constraints.getElementsByTagName("rsc_location")
-    myConstraints += constraints.getElementsByTagName("rsc_order")
-    myConstraints += constraints.getElementsByTagName("rsc_ticket")
-    attr_to_match = ["rsc", "first", "then", "with-rsc", "first", "then"]
-    for c in myConstraints:
-        for attr in attr_to_match:
-            if c.getAttribute(attr) == resource_id:
-                constraints_found.append(c.getAttribute("id"))
-                break
-
-    setConstraints = constraints.getElementsByTagName("resource_ref")
-    for c in setConstraints:
-        if c.getAttribute("id") == resource_id:
-            set_constraints.append(c.parentNode.parentNode.getAttribute("id"))
+        return dom
+    utils.replace_cib_configuration(dom)
 
-    # Remove duplicates
-    set_constraints = list(set(set_constraints))
+def find_constraints_containing(resource_id, passed_dom=None):
+    dom = utils.get_cib_dom() if passed_dom is None else passed_dom
+    constraint_list, resource_ref_list = _find_elements_referencing(
+        resource_id, dom
+    )
+    constraints_found = [
+        constraint_el.getAttribute("id") for constraint_el in constraint_list
+    ]
+    set_constraints = list(set([
+        resource_ref.parentNode.parentNode.getAttribute("id")
+        for resource_ref in resource_ref_list
+    ]))
     return constraints_found,set_constraints
 
+def _find_elements_referencing(resource_id, dom):
+    # Return constraints referencing the resource and resource_ref elements
+    # pointing to it. Constraints of a clone or master apply to its primitive
+    # as well.
+    index = get_resource_reference_index(dom)
+    constraint_list = []
+    resource_ref_list = []
+    resource_el = index.get_primitive(resource_id)
+    if (
+        resource_el is not None
+        and
+        resource_el.parentNode.tagName in ["clone", "master"]
+    ):
+        constraint_list, resource_ref_list = _find_elements_referencing(
+            resource_el.parentNode.getAttribute("id"), dom
+        )
+    for constraint_el in index.get_constraints(resource_id):
+        if constraint_el not in constraint_list:
+            constraint_list.append(constraint_el)
+    resource_ref_list.extend(index.get_resource_refs(resource_id))
+    return constraint_list, resource_ref_list
+
 def remove_constraints_containing_node(dom, node, output=False):
     for constraint in find_constraints_containing_node(dom, node):
         if output:
@@ -1223,14 +1325,14 @@ def constraint_resource_update(old_id, passed_dom=None):
         new_id = clone_ms_parent.getAttribute("id")
 
     if new_id:
-        constraints = dom.getElementsByTagName("rsc_location")
-        constraints += dom.getElementsByTagName("rsc_order")
-        constraints += dom.getElementsByTagName("rsc_colocation")
-        attrs_to_update=["rsc","first","then", "with-rsc"]
-        for constraint in constraints:
-            for attr in attrs_to_update:
+        index = get_resource_reference_index(dom)
+        for constraint in index.get_constraints(old_id):
+            if constraint.tagName == "rsc_ticket":
+                continue
+            for attr in RESOURCE_ATTRIBUTE_LIST:
                 if constraint.getAttribute(attr) == old_id:
                     constraint.setAttribute(attr, new_id)
+            index.add_constraint(new_id, constraint)
 
         if passed_dom is None:
             utils.replace_cib_configuration(dom)
@@ -1265,7 +1367,7 @@ def constraint_rule(argv):
         utils.replace_cib_configuration(cib)
 
     elif command in ["remove","delete"]:
-        cib = utils.get_cib_etree()
+        cib = utils.get_cib_tree()
         temp_id = argv.pop(0)
         constraints = cib.find('.//constraints')
         loc_cons = cib.findall(str('.//rsc_location'))
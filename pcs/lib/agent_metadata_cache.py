@@ -0,0 +1,133 @@
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+)
+
+import hashlib
+import json
+import os
+import os.path
+import tempfile
+
+
+_ENTRY_SUFFIX = ".json"
+
+
+def get_file_identity(path):
+    """
+    Return a list identifying the current content of a file or None if the file
+    cannot be accessed
+
+    string path -- path to the file
+    """
+    try:
+        stat = os.stat(path)
+    except EnvironmentError:
+        return None
+    return [path, stat.st_mtime, stat.st_size]
+
+
+class AgentMetadataCache(object):
+    """
+    Keeps metadata of agents in files so they can be shared by pcs processes
+
+    An entry is valid only while the agent's file and the pacemaker binary
+    which produced the metadata stay the same. Entries are written to temporary
+    files which are then renamed, so concurrent writers never produce
+    a corrupted entry and readers see either an old or a new entry. The cache
+    is an optimization only, any error accessing it is treated as a cache miss.
+    """
+    def __init__(self, cache_dir, pacemaker_binary):
+        """
+        string cache_dir -- directory holding the entries
+        string pacemaker_binary -- path to a pacemaker binary, its changes
+            invalidate all entries
+        """
+        self._cache_dir = cache_dir
+        self._pacemaker_binary = pacemaker_binary
+
+    def get(self, agent_name, agent_path):
+        """
+        Return cached metadata of an agent or None if they are not cached
+
+        string agent_name -- name of the agent
+        string agent_path -- path to the agent's file
+        """
+        key = self._get_key(agent_name, agent_path)
+        if key is None:
+            return None
+        try:
+            with open(self._get_entry_path(agent_name)) as entry_file:
+                entry = json.load(entry_file)
+        except (EnvironmentError, ValueError):
+            return None
+        if not isinstance(entry, dict) or entry.get("key") != key:
+            return None
+        return entry.get("metadata")
+
+    def put(self, agent_name, agent_path, metadata):
+        """
+        Store metadata of an agent
+
+        string agent_name -- name of the agent
+        string agent_path -- path to the agent's file
+        string metadata -- metadata of the agent
+        """
+        key = self._get_key(agent_name, agent_path)
+        if key is None:
+            return
+        temp_path = None
+        try:
+            if not os.path.isdir(self._cache_dir):
+                os.mkdir(self._cache_dir, 0o755)
+            temp_fd, temp_path = tempfile.mkstemp(
+                dir=self._cache_dir, suffix=".tmp"
+            )
+            with os.fdopen(temp_fd, "w") as temp_file:
+                json.dump({"key": key, "metadata": metadata}, temp_file)
+            os.chmod(temp_path, 0o644)
+            os.rename(temp_path, self._get_entry_path(agent_name))
+        except EnvironmentError:
+            if temp_path is not None:
+                self._remove(temp_path)
+
+    def invalidate(self, agent_name=None):
+        """
+        Remove cached metadata of the specified agent or of all agents
+
+        string agent_name -- name of the agent, None means all agents
+        """
+        if agent_name is not None:
+            self._remove(self._get_entry_path(agent_name))
+            return
+        try:
+            file_name_list = os.listdir(self._cache_dir)
+        except EnvironmentError:
+            return
+        for file_name in file_name_list:
+            if file_name.endswith(_ENTRY_SUFFIX):
+                self._remove(os.path.join(self._cache_dir, file_name))
+
+    def _get_key(self, agent_name, agent_path):
+        agent_identity = get_file_identity(agent_path)
+        pacemaker_identity = get_file_identity(self._pacemaker_binary)
+        if agent_identity is None or pacemaker_identity is None:
+            return None
+        return [agent_name, agent_identity, pacemaker_identity]
+
+    def _get_entry_path(self, agent_name):
+        # agent names may contain characters not allowed in file names
+        return os.path.join(
+            self._cache_dir,
+            hashlib.sha1(agent_name.encode("utf-8")).hexdigest()
+                +
+                _ENTRY_SUFFIX
+        )
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except EnvironmentError:
+            pass
@@ -14,6 +14,7 @@ from pcs.lib.cib.constraint import resource_set
 from pcs.lib.cib.tools import (
     find_unique_id,
     find_element_by_tag_and_id,
+    IdProvider,
 )
 from pcs.lib.errors import LibraryError, ReportItemSeverity
 from pcs.lib.xml_tools import (
@@ -22,6 +23,9 @@ from pcs.lib.xml_tools import (
 )
 
 
+# attributes of constraints holding ids of resources
+RESOURCE_ATTRIBUTE_LIST = ["rsc", "first", "then", "with-rsc"]
+
 def _validate_attrib_names(attrib_names, options):
     invalid_names = [
         name for name in options.keys()
@@ -111,14 +115,43 @@ def have_duplicate_resource_sets(element, other_element):
     ]
     return get_id_set_list(element) == get_id_set_list(other_element)
 
+def _find_duplicate_candidates(constraint_section, element):
+    # A duplicate references the same resources as the element. Only
+    # constraints referencing the first of them are compared, libxml2 finds
+    # them instead of comparing every constraint in python.
+    resource_id_list = [
+        element.get(attr) for attr in RESOURCE_ATTRIBUTE_LIST
+        if element.get(attr)
+    ]
+    resource_id_list.extend(element.xpath("./resource_set/resource_ref/@id"))
+    if not resource_id_list:
+        return constraint_section.findall(".//"+element.tag)
+    return constraint_section.xpath(
+        """.//{0}[
+            @rsc=$id or @first=$id or @then=$id or @with-rsc=$id
+            or
+            resource_set/resource_ref/@id=$id
+        ]""".format(element.tag),
+        id=resource_id_list[0]
+    )
+
 def check_is_without_duplication(
     report_processor,
     constraint_section, element, are_duplicate, export_element,
     duplication_alowed=False
 ):
+    """
+    Report constraints which are duplicates of the element
+
+    callable are_duplicate -- takes two elements and decides if they are
+        duplicates, only constraints referencing the same resource as
+        the element are passed to it
+    """
     duplicate_element_list = [
         duplicate_element
-        for duplicate_element in constraint_section.findall(".//"+element.tag)
+        for duplicate_element in _find_duplicate_candidates(
+            constraint_section, element
+        )
         if(
             element is not duplicate_element
             and
@@ -145,6 +178,7 @@ def create_with_set(constraint_section, tag_name, options, resource_set_list):
         raise LibraryError(reports.empty_resource_set_list())
     element = etree.SubElement(constraint_section, tag_name)
     element.attrib.update(options)
+    id_provider = IdProvider(element)
     for resource_set_item in resource_set_list:
-        resource_set.create(element, resource_set_item)
+        resource_set.create(element, resource_set_item, id_provider)
     return element
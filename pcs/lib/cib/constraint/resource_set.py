@@ -42,15 +42,17 @@ def validate_options(options):
 def extract_id_set_list(resource_set_list):
     return [resource_set["ids"] for resource_set in resource_set_list]
 
-def create(parent, resource_set):
+def create(parent, resource_set, id_provider=None):
     """
     parent - lxml element for append new resource_set
+    IdProvider id_provider -- elements' ids generator
     """
     element = etree.SubElement(parent, "resource_set")
     element.attrib.update(resource_set["options"])
-    element.attrib["id"] = find_unique_id(
-        parent.getroottree(),
-        "pcs_rsc_set_{0}".format("_".join(resource_set["ids"]))
+    proposed_id = "pcs_rsc_set_{0}".format("_".join(resource_set["ids"]))
+    element.attrib["id"] = (
+        id_provider.allocate_id(proposed_id) if id_provider
+        else find_unique_id(parent.getroottree(), proposed_id)
     )
 
     for id in resource_set["ids"]:
@@ -15,7 +15,7 @@ from pcs.lib.cib.resource.operations import(
     prepare as prepare_operations,
     create_operations,
 )
-from pcs.lib.cib.tools import does_id_exist
+from pcs.lib.cib.tools import does_id_exist, IdProvider
 from pcs.lib.errors import LibraryError
 from pcs.lib.pacemaker.values import validate_id
 
@@ -117,19 +117,27 @@ def append_new(
     if provider:
         attributes["provider"] = provider
     primitive_element = etree.SubElement(resources_section, TAG, attributes)
+    # ids of all the subelements are checked against one index of ids
+    id_provider = IdProvider(primitive_element)
 
     if instance_attributes:
         append_new_instance_attributes(
             primitive_element,
-            instance_attributes
+            instance_attributes,
+            id_provider
         )
 
     if meta_attributes:
-        append_new_meta_attributes(primitive_element, meta_attributes)
+        append_new_meta_attributes(
+            primitive_element,
+            meta_attributes,
+            id_provider
+        )
 
     create_operations(
         primitive_element,
-        operation_list if operation_list else []
+        operation_list if operation_list else [],
+        id_provider
     )
 
     return primitive_element
@@ -281,6 +281,8 @@ def fixture_constraint_section(return_value):
     constraint_section = mock.MagicMock()
     constraint_section.findall = mock.MagicMock()
     constraint_section.findall.return_value = return_value
+    constraint_section.xpath = mock.MagicMock()
+    constraint_section.xpath.return_value = return_value
     return constraint_section
 
 @mock.patch("pcs.lib.cib.constraint.constraint.export_with_set")
@@ -347,6 +349,60 @@ class CheckIsWithoutDuplicationTest(TestCase):
         )
 
 
+class CheckIsWithoutDuplicationCandidates(TestCase):
+    def setUp(self):
+        self.constraint_section = etree.fromstring("""
+            <constraints>
+                <rsc_ticket id="t1" rsc="A" ticket="T" />
+                <rsc_ticket id="t2" rsc="B" ticket="T" />
+                <rsc_ticket id="t3" ticket="T">
+                    <resource_set id="t3-set">
+                        <resource_ref id="A" />
+                    </resource_set>
+                </rsc_ticket>
+                <rsc_ticket id="t4" ticket="T">
+                    <resource_set id="t4-set">
+                        <resource_ref id="C" />
+                    </resource_set>
+                </rsc_ticket>
+                <rsc_order id="o1" first="A" then="B" />
+            </constraints>
+        """)
+        self.compared = []
+
+    def are_duplicate(self, element, other_element):
+        self.compared.append(other_element.get("id"))
+        return False
+
+    def check(self, element):
+        constraint.check_is_without_duplication(
+            MockLibraryReportProcessor(),
+            self.constraint_section,
+            element,
+            are_duplicate=self.are_duplicate,
+            export_element=constraint.export_with_set,
+        )
+
+    def test_plain(self):
+        self.check(self.constraint_section.find("rsc_ticket[@id='t1']"))
+        self.assertEqual(["t3"], self.compared)
+
+    def test_set(self):
+        etree.SubElement(
+            self.constraint_section.find("rsc_ticket[@id='t2']"),
+            "resource_set", id="t2-set"
+        ).append(etree.Element("resource_ref", id="C"))
+        self.check(self.constraint_section.find("rsc_ticket[@id='t4']"))
+        self.assertEqual(["t2"], self.compared)
+
+    def test_no_resource(self):
+        element = etree.SubElement(
+            self.constraint_section, "rsc_ticket", id="t5", ticket="T"
+        )
+        self.check(element)
+        self.assertEqual(["t1", "t2", "t3", "t4"], self.compared)
+
+
 class CreateWithSetTest(TestCase):
     def test_put_new_constraint_to_constraint_section(self):
         constraint_section = etree.Element("constraints")
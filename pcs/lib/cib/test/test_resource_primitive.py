@@ -9,6 +9,7 @@ from functools import partial
 from lxml import etree
 
 from pcs.lib.cib.resource import primitive
+from pcs.lib.cib.tools import IdProvider
 from pcs.test.tools.pcs_unittest import TestCase, mock
 
 @mock.patch("pcs.lib.cib.resource.primitive.append_new_instance_attributes")
@@ -37,17 +38,22 @@ class AppendNew(TestCase):
         append_new_meta_attributes,
         append_new_instance_attributes,
     ):
+        id_provider = create_operations.call_args[0][2]
+        self.assertIsInstance(id_provider, IdProvider)
         create_operations.assert_called_once_with(
             primitive_element,
-            self.operation_list
+            self.operation_list,
+            id_provider
         )
         append_new_meta_attributes.assert_called_once_with(
             primitive_element,
-            self.meta_attributes
+            self.meta_attributes,
+            id_provider
         )
         append_new_instance_attributes.assert_called_once_with(
             primitive_element,
-            self.instance_attributes
+            self.instance_attributes,
+            id_provider
         )
 
     def test_append_without_provider(
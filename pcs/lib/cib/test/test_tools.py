@@ -132,6 +132,41 @@ class IdProviderAllocate(IdProviderTest):
             []
         )
         self.assertEqual("myId-2",  self.provider.allocate_id("myId"))
+    def test_ids_removed_from_cib(self):
+        self.fixture_add_primitive_with_id("myId")
+        self.assertEqual("myId-1",  self.provider.allocate_id("myId"))
+        resources = self.cib.tree.find(".//resources")
+        resources.remove(resources.find("primitive[@id='myId']"))
+        self.assertEqual("myId",  self.provider.allocate_id("myId"))
+
+    def test_ids_moved_to_status(self):
+        self.fixture_add_primitive_with_id("myId")
+        self.assertEqual("myId-1",  self.provider.allocate_id("myId"))
+        self.cib.tree.find(".//status").append(
+            self.cib.tree.find(".//primitive[@id='myId']")
+        )
+        self.assertEqual("myId",  self.provider.allocate_id("myId"))
+
+    def test_ids_changed(self):
+        self.fixture_add_primitive_with_id("myId")
+        self.fixture_add_primitive_with_id("otherId")
+        self.assertEqual("myId-1",  self.provider.allocate_id("myId"))
+        self.cib.tree.find(".//primitive[@id='myId']").set("id", "newId")
+        self.cib.tree.find(".//primitive[@id='otherId']").set("id", "myId")
+        self.assertEqual("myId-2",  self.provider.allocate_id("myId"))
+        self.assertEqual("otherId",  self.provider.allocate_id("otherId"))
+
+    def test_remote_node_ids(self):
+        self.cib.append_to_first_tag_name("resources", """
+            <primitive id="R">
+                <meta_attributes id="R-meta">
+                    <nvpair id="R-meta-remote" name="remote-node" value="N"/>
+                </meta_attributes>
+            </primitive>
+        """)
+        self.assertEqual("N-1",  self.provider.allocate_id("N"))
+        self.cib.tree.find(".//nvpair").set("value", "M")
+        self.assertEqual("N",  self.provider.allocate_id("N"))
 
 
 class DoesIdExistTest(CibToolsTest):
@@ -508,6 +543,32 @@ class getCibCrmFeatureSet(TestCase):
         )
 
 
+class GetCibUpdateVersion(TestCase):
+    def test_success(self):
+        self.assertEqual(
+            (1, 2, 3),
+            lib.get_cib_update_version(etree.XML(
+                '<cib admin_epoch="1" epoch="2" num_updates="3" />'
+            ))
+        )
+
+    def test_missing_attribute(self):
+        self.assertEqual(
+            None,
+            lib.get_cib_update_version(
+                etree.XML('<cib admin_epoch="1" epoch="2" />')
+            )
+        )
+
+    def test_invalid_value(self):
+        self.assertEqual(
+            None,
+            lib.get_cib_update_version(etree.XML(
+                '<cib admin_epoch="1" epoch="two" num_updates="3" />'
+            ))
+        )
+
+
 find_group = partial(lib.find_element_by_tag_and_id, "group")
 class FindTagWithId(TestCase):
     def test_returns_element_when_exists(self):
@@ -28,13 +28,19 @@ class IdProvider(object):
         """
         self._cib = get_root(cib_element)
         self._booked_ids = set()
+        # built on the first use so elements created before are included
+        self._id_index = None
 
     def allocate_id(self, proposed_id):
         """
         Generate a new unique id based on the proposal and keep track of it
         string proposed_id -- requested id
         """
-        final_id = find_unique_id(self._cib, proposed_id, self._booked_ids)
+        counter = 1
+        final_id = proposed_id
+        while self._is_used(final_id):
+            final_id = "{0}-{1}".format(proposed_id, counter)
+            counter += 1
         self._booked_ids.add(final_id)
         return final_id
 
@@ -48,34 +54,108 @@ class IdProvider(object):
         for id in id_list:
             if id in reported_ids:
                 continue
-            if id in self._booked_ids or does_id_exist(self._cib, id):
+            if self._is_used(id):
                 report_list.append(reports.id_already_exists(id))
                 reported_ids.add(id)
                 continue
             self._booked_ids.add(id)
         return report_list
 
+    def _is_used(self, id):
+        if id in self._booked_ids:
+            return True
+        if self._id_index is None:
+            self._id_index = _IdIndex(self._cib)
+        return self._id_index.contains(id)
 
-def does_id_exist(tree, check_id):
+
+class _IdIndex(object):
     """
-    Checks to see if id exists in the xml dom passed
-    tree cib etree node
-    check_id id to check
+    Ids used in a CIB tree for fast repeated checks of id existence
+
+    The index is built by one pass through the tree. Ids created afterwards are
+    expected to be booked in an IdProvider owning the index. Elements removed
+    from the tree or moved to a place where their ids do not count are detected
+    when their ids are looked up.
     """
+    def __init__(self, cib):
+        self._cib = cib
+        self._elements = {}
+        for element in cib.xpath(_ID_ELEMENTS_XPATH):
+            self._elements.setdefault(element.get("id"), element)
+        for nvpair in cib.xpath(_REMOTE_NODE_NVPAIRS_XPATH):
+            self._elements.setdefault(nvpair.get("value"), nvpair)
+
+    def contains(self, id):
+        element = self._elements.get(id)
+        if element is None:
+            return False
+        if self._holds_id(element, id):
+            return True
+        # the element has been changed, look for another holder of the id
+        del self._elements[id]
+        holder_list = _find_id_holders(self._cib, id)
+        if not holder_list:
+            return False
+        self._elements[id] = holder_list[0]
+        return True
+
+    def _holds_id(self, element, id):
+        if element.get("id") == id and element.tag not in ("acl_target", "role"):
+            return self._is_in_searched_part(element)
+        if (
+            element.tag == "nvpair"
+            and
+            element.get("name") == "remote-node"
+            and
+            element.get("value") == id
+        ):
+            nvset = element.getparent()
+            primitive = nvset.getparent() if nvset is not None else None
+            return (
+                nvset.tag == "meta_attributes"
+                and
+                primitive is not None
+                and
+                primitive.tag == "primitive"
+                and
+                self._is_in_searched_part(primitive)
+            )
+        return False
+
+    def _is_in_searched_part(self, element):
+        ancestor_list = list(element.iterancestors())
+        if not ancestor_list or ancestor_list[-1] is not self._cib:
+            return False
+        if self._cib.tag != "cib":
+            return True
+        return len(ancestor_list) > 1 and ancestor_list[-2].tag != "status"
+
+
+# do not search in /cib/status, it may contain references to previously
+# existing and deleted resources and thus preventing creating them again
+_SEARCHED_PART_XPATH = """
+    (
+        /cib/*[name()!="status"]
+        |
+        /*[name()!="cib"]
+    )
+"""
+
+_ID_ELEMENTS_XPATH = _SEARCHED_PART_XPATH + """
+    //*[@id and name()!="acl_target" and name()!="role"]
+"""
 
-    # do not search in /cib/status, it may contain references to previously
-    # existing and deleted resources and thus preventing creating them again
+_REMOTE_NODE_NVPAIRS_XPATH = _SEARCHED_PART_XPATH + """
+    //primitive/meta_attributes/nvpair[@name="remote-node"]
+"""
 
+def _find_id_holders(tree, check_id):
     #pacemaker creates an implicit resource for the pacemaker_remote connection,
     #which will be named the same as the value of the remote-node attribute of
     #the explicit resource. So the value of nvpair named "remote-node" is
     #considered to be id
-    existing = get_root(tree).xpath("""
-        (
-            /cib/*[name()!="status"]
-            |
-            /*[name()!="cib"]
-        )
+    return get_root(tree).xpath(_SEARCHED_PART_XPATH + """
         //*[
             (
                 name()!="acl_target"
@@ -96,7 +176,14 @@ def does_id_exist(tree, check_id):
             )
         ]
     """.format(check_id))
-    return len(existing) > 0
+
+def does_id_exist(tree, check_id):
+    """
+    Checks to see if id exists in the xml dom passed
+    tree cib etree node
+    check_id id to check
+    """
+    return len(_find_id_holders(tree, check_id)) > 0
 
 def validate_id_does_not_exist(tree, id):
     """
@@ -299,3 +386,18 @@ def get_cib_crm_feature_set(cib, none_if_missing=False):
         re.compile(_VERSION_FORMAT),
         none_if_missing=none_if_missing
     )
+
+def get_cib_update_version(cib):
+    """
+    Return the version pacemaker changes on each CIB update as a tuple
+    (admin_epoch, epoch, num_updates) or None if it cannot be determined
+
+    etree cib -- cib etree, only attributes of its root element are used
+    """
+    try:
+        return tuple(
+            int(cib.get(attribute))
+            for attribute in ("admin_epoch", "epoch", "num_updates")
+        )
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,114 @@
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+)
+
+from pcs import settings
+from pcs.common.tools import map_parallel
+from pcs.lib import resource_agent
+from pcs.lib.errors import LibraryError
+
+
+# we don't want to change these properties
+_BANNED_PROPERTIES = frozenset(["dc-version", "cluster-infrastructure"])
+
+_BASIC_PROPERTIES = frozenset([
+    "batch-limit", "no-quorum-policy", "symmetric-cluster", "enable-acl",
+    "stonith-enabled", "stonith-action", "pe-input-series-max",
+    "stop-orphan-resources", "stop-orphan-actions", "cluster-delay",
+    "start-failure-is-fatal", "pe-error-series-max", "pe-warn-series-max"
+])
+
+_READABLE_NAMES = {
+    "batch-limit": "Batch Limit",
+    "no-quorum-policy": "No Quorum Policy",
+    "symmetric-cluster": "Symmetric",
+    "stonith-enabled": "Stonith Enabled",
+    "stonith-action": "Stonith Action",
+    "cluster-delay": "Cluster Delay",
+    "stop-orphan-resources": "Stop Orphan Resources",
+    "stop-orphan-actions": "Stop Orphan Actions",
+    "start-failure-is-fatal": "Start Failure is Fatal",
+    "pe-error-series-max": "PE Error Storage",
+    "pe-warn-series-max": "PE Warning Storage",
+    "pe-input-series-max": "PE Input Storage",
+    "enable-acl": "Enable ACLs"
+}
+
+
+def get_cluster_properties_definition(runner):
+    """
+    Return a dict of definitions of cluster properties keyed by their names
+
+    Cluster properties are defined by metadata of pacemaker daemons. They are
+    loaded in parallel and stored in the agents' metadata cache if enabled.
+
+    CommandRunner runner
+    """
+    daemon_list = [
+        resource_agent.PacemakerDaemonMetadata(runner, name, binary)
+        for name, binary in [
+            ("pengine", settings.pengine_binary),
+            ("crmd", settings.crmd_binary),
+            ("cib", settings.cib_binary),
+        ]
+    ]
+    try:
+        element_list_list = map_parallel(
+            lambda daemon: daemon.get_parameter_elements(),
+            daemon_list,
+            len(daemon_list)
+        )
+    except resource_agent.ResourceAgentError as e:
+        raise LibraryError(
+            resource_agent.resource_agent_error_to_report_item(e)
+        )
+
+    definition = {}
+    for daemon, element_list in zip(daemon_list, element_list_list):
+        for element in element_list:
+            prop = _get_property_from_element(element)
+            if prop["name"] in _BANNED_PROPERTIES:
+                continue
+            prop["source"] = daemon.get_name()
+            prop["advanced"] = prop["name"] not in _BASIC_PROPERTIES
+            prop["readable_name"] = _READABLE_NAMES.get(
+                prop["name"], prop["name"]
+            )
+            definition[prop["name"]] = prop
+    return definition
+
+
+def _get_property_from_element(element):
+    prop = {
+        "name": element.get("name", ""),
+        "shortdesc": "",
+        "longdesc": "",
+    }
+    for item in ["shortdesc", "longdesc"]:
+        item_el = element.find(item)
+        if item_el is not None and item_el.text is not None:
+            prop[item] = item_el.text
+
+    content = element.find("content")
+    if content is None:
+        prop["type"] = ""
+        prop["default"] = ""
+    else:
+        prop["type"] = content.get("type", "")
+        prop["default"] = content.get("default", "")
+
+    if prop["type"] == "enum":
+        prop["enum"] = []
+        if prop["longdesc"]:
+            values = prop["longdesc"].split("  Allowed values: ")
+            if len(values) == 2:
+                prop["enum"] = values[1].split(", ")
+                prop["longdesc"] = values[0]
+        if prop["default"] not in prop["enum"]:
+            prop["enum"].append(prop["default"])
+
+    if prop["longdesc"] == prop["shortdesc"]:
+        prop["longdesc"] = ""
+    return prop
@@ -4,6 +4,8 @@ from __future__ import (
     print_function,
 )
 
+from lxml import etree
+
 from pcs.common import report_codes
 from pcs.lib import reports
 from pcs.lib.cib import fencing_topology
@@ -11,6 +13,8 @@ from pcs.lib.cib.tools import (
     get_fencing_topology,
     get_resources,
 )
+from pcs.lib.communication.cib import GetCib
+from pcs.lib.communication.tools import run_and_raise
 from pcs.lib.env_tools import get_nodes
 from pcs.lib.errors import LibraryError
 from pcs.lib.node import (
@@ -98,3 +102,30 @@ def verify(env, verbose=False):
     )
     #can raise
     env.report_processor.send()
+
+
+def get_cib_from_node(env, node_name, scope=None):
+    """
+    Get the CIB of the specified node from its pcsd. The CIB is parsed while it
+    is being received, so a big CIB is not held in memory twice.
+
+    LibraryEnvironment env provides all for communication with externals
+    string node_name -- name of the node to get the CIB from
+    string scope -- return only the specified section of the CIB
+    """
+    com_cmd = GetCib(env.report_processor)
+    com_cmd.set_targets([
+        env.get_node_target_factory().get_target_from_hostname(node_name)
+    ])
+    cib = run_and_raise(env.get_node_communicator(), com_cmd)[node_name]
+    if scope:
+        section_list = cib.xpath(
+            "/cib/{0} | /cib/configuration/{0}".format(scope)
+        )
+        if not section_list:
+            raise LibraryError(reports.cib_load_error_scope_missing(
+                scope,
+                "Section '{0}' not found in the CIB".format(scope)
+            ))
+        cib = section_list[0]
+    return etree.tostring(cib, with_tail=False).decode("utf-8")
@@ -21,6 +21,7 @@ from pcs.lib.env_tools import get_nodes
 from pcs.lib.errors import LibraryError
 from pcs.lib.pacemaker.values import validate_id
 from pcs.lib.pacemaker.state import (
+    ClusterStateIndex,
     ensure_resource_state,
     info_resource_state,
     is_resource_managed,
@@ -42,7 +43,7 @@ def resource_environment(
     yield get_resources(env.get_cib(required_cib_version))
     env.push_cib(wait=wait)
     if wait is not False and wait_for_resource_ids:
-        state = env.get_cluster_state()
+        state = ClusterStateIndex(env.get_cluster_state())
         env.report_processor.process_list([
             resource_state_reporter(state, res_id)
             for res_id in wait_for_resource_ids
@@ -675,10 +676,11 @@ def enable(env, resource_ids, wait):
 
 def _resource_list_enable_disable(resource_el_list, func, cluster_state):
     report_list = []
+    cluster_state_index = ClusterStateIndex(cluster_state)
     for resource_el in resource_el_list:
         res_id = resource_el.attrib["id"]
         try:
-            if not is_resource_managed(cluster_state, res_id):
+            if not is_resource_managed(cluster_state_index, res_id):
                 report_list.append(reports.resource_is_unmanaged(res_id))
             func(resource_el)
         except ResourceNotFound:
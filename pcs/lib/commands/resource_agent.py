@@ -4,7 +4,10 @@ from __future__ import (
     print_function,
 )
 
+from pcs import settings
+from pcs.common.tools import map_parallel
 from pcs.lib import resource_agent
+from pcs.lib.errors import ReportItemSeverity
 
 
 def list_standards(lib_env):
@@ -23,6 +26,13 @@ def list_ocf_providers(lib_env):
     )
 
 
+def clear_metadata_cache(lib_env):
+    """
+    Remove agents' metadata stored in the persistent cache on the local host
+    """
+    resource_agent.clear_metadata_cache()
+
+
 def list_agents_for_standard_and_provider(lib_env, standard_provider=None):
     """
     List resource agents for specified standard on the local host
@@ -68,6 +78,7 @@ def list_agents(lib_env, describe=True, search=None):
     )
     return _complete_agent_list(
         runner,
+        lib_env.report_processor,
         agent_names,
         describe,
         search,
@@ -76,7 +87,7 @@ def list_agents(lib_env, describe=True, search=None):
 
 
 def _complete_agent_list(
-    runner, agent_names, describe, search, metadata_class
+    runner, report_processor, agent_names, describe, search, metadata_class
 ):
     # filter agents by name if requested
     if search:
@@ -86,14 +97,20 @@ def _complete_agent_list(
         ]
 
     # complete the output and load descriptions if requested
-    agent_list = []
-    for name in agent_names:
+    report_dict = {}
+    def get_agent_info(name):
         try:
             agent_metadata = metadata_class(runner, name)
             if describe:
-                agent_list.append(agent_metadata.get_description_info())
-            else:
-                agent_list.append(agent_metadata.get_name_info())
+                return agent_metadata.get_description_info()
+            return agent_metadata.get_name_info()
+        except resource_agent.AgentMetadataTimedOut as e:
+            # the agent may be valid, let the user know it is missing
+            report_dict[name] = (
+                resource_agent.resource_agent_error_to_report_item(
+                    e, ReportItemSeverity.WARNING
+                )
+            )
         except resource_agent.ResourceAgentError:
             #we don't return it in the list:
             #
@@ -109,7 +126,21 @@ def _complete_agent_list(
             #read this list and do not expect warnings there. Using the stderr
             #(to separate warnings) is currently difficult.
             pass
-    return agent_list
+        return None
+
+    if describe:
+        # loading metadata runs the agents, do not wait for them one by one
+        agent_list = map_parallel(
+            get_agent_info,
+            agent_names,
+            settings.agent_metadata_max_in_flight
+        )
+    else:
+        agent_list = [get_agent_info(name) for name in agent_names]
+    report_processor.process_list([
+        report_dict[name] for name in agent_names if name in report_dict
+    ])
+    return [agent_info for agent_info in agent_list if agent_info is not None]
 
 
 def describe_agent(lib_env, agent_name):
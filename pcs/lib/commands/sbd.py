@@ -268,15 +268,15 @@ def enable_sbd(
         )
     run_and_raise(lib_env.get_node_communicator(), com_cmd)
 
-    # remove cluster prop 'stonith_watchdog_timeout'
-    com_cmd = RemoveStonithWatchdogTimeout(lib_env.report_processor)
-    com_cmd.set_targets(online_targets)
-    run_and_raise(lib_env.get_node_communicator(), com_cmd)
-
-    # enable SBD service an all nodes
-    com_cmd = EnableSbdService(lib_env.report_processor)
-    com_cmd.set_targets(online_targets)
-    run_and_raise(lib_env.get_node_communicator(), com_cmd)
+    # remove cluster prop 'stonith_watchdog_timeout' and enable SBD service on
+    # all nodes, both depend only on the distributed SBD configuration
+    remove_timeout_cmd = RemoveStonithWatchdogTimeout(
+        lib_env.report_processor
+    )
+    remove_timeout_cmd.set_targets(online_targets)
+    enable_service_cmd = EnableSbdService(lib_env.report_processor)
+    enable_service_cmd.set_targets(online_targets)
+    lib_env.communicate_concurrently([remove_timeout_cmd, enable_service_cmd])
 
     lib_env.report_processor.process(
         reports.cluster_restart_required_to_apply_changes()
@@ -307,13 +307,11 @@ def disable_sbd(lib_env, ignore_offline_nodes=False):
         com_cmd.set_targets(online_nodes)
         run_and_raise(lib_env.get_node_communicator(), com_cmd)
 
-    com_cmd = SetStonithWatchdogTimeoutToZero(lib_env.report_processor)
-    com_cmd.set_targets(online_nodes)
-    run_and_raise(lib_env.get_node_communicator(), com_cmd)
-
-    com_cmd = DisableSbdService(lib_env.report_processor)
-    com_cmd.set_targets(online_nodes)
-    run_and_raise(lib_env.get_node_communicator(), com_cmd)
+    set_timeout_cmd = SetStonithWatchdogTimeoutToZero(lib_env.report_processor)
+    set_timeout_cmd.set_targets(online_nodes)
+    disable_service_cmd = DisableSbdService(lib_env.report_processor)
+    disable_service_cmd.set_targets(online_nodes)
+    lib_env.communicate_concurrently([set_timeout_cmd, disable_service_cmd])
 
     if not lib_env.is_cman_cluster:
         lib_env.report_processor.process(
@@ -18,6 +18,7 @@ def list_agents(lib_env, describe=True, search=None):
     agent_names = resource_agent.list_stonith_agents(runner)
     return _complete_agent_list(
         runner,
+        lib_env.report_processor,
         agent_names,
         describe,
         search,
@@ -0,0 +1,138 @@
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+)
+
+from lxml import etree
+
+from pcs.common import report_codes
+from pcs.lib.commands.cluster import get_cib_from_node
+from pcs.test.tools import fixture
+from pcs.test.tools.command_env import get_env_tools
+from pcs.test.tools.misc import get_test_resource as rc
+from pcs.test.tools.pcs_unittest import TestCase
+
+
+NODE = "node-1"
+
+
+class GetCibFromNode(TestCase):
+    def setUp(self):
+        self.env_assist, self.config = get_env_tools(self)
+        with open(rc("cib-empty.xml")) as cib_file:
+            self.cib = cib_file.read()
+
+    def fixture_communication(self, **kwargs):
+        self.config.http.add_communication(
+            "get_cib",
+            [dict(label=NODE, **kwargs)],
+            action="remote/get_cib",
+        )
+
+    def test_success(self):
+        self.fixture_communication(output=self.cib, response_code=200)
+        cib = get_cib_from_node(self.env_assist.get_env(), NODE)
+        self.assertEqual(
+            etree.tostring(etree.fromstring(self.cib)).decode("utf-8"),
+            cib
+        )
+
+    def test_big_cib(self):
+        # the body is longer than the head of the response kept in memory,
+        # the CIB is still complete as it is built by the parser
+        resources = "".join([
+            '<primitive id="R{0}" class="ocf" provider="heartbeat" '
+            'type="Dummy"/>'.format(i)
+            for i in range(500)
+        ])
+        big_cib = self.cib.replace("<resources/>", (
+            "<resources>{0}</resources>".format(resources)
+        ))
+        self.fixture_communication(output=big_cib, response_code=200)
+        cib = get_cib_from_node(self.env_assist.get_env(), NODE)
+        self.assertEqual(
+            500,
+            len(etree.fromstring(cib).findall(".//resources/primitive"))
+        )
+
+    def test_scope(self):
+        self.fixture_communication(output=self.cib, response_code=200)
+        self.assertEqual(
+            "<resources/>",
+            get_cib_from_node(self.env_assist.get_env(), NODE, "resources")
+        )
+
+    def test_scope_status(self):
+        self.fixture_communication(output=self.cib, response_code=200)
+        self.assertEqual(
+            "<status/>",
+            get_cib_from_node(self.env_assist.get_env(), NODE, "status")
+        )
+
+    def test_scope_missing(self):
+        self.fixture_communication(output=self.cib, response_code=200)
+        self.env_assist.assert_raise_library_error(
+            lambda: get_cib_from_node(
+                self.env_assist.get_env(), NODE, "rsc_defaults"
+            ),
+            [
+                fixture.error(
+                    report_codes.CIB_LOAD_ERROR_SCOPE_MISSING,
+                    scope="rsc_defaults",
+                    reason="Section 'rsc_defaults' not found in the CIB",
+                ),
+            ],
+            expected_in_processor=False
+        )
+
+    def test_invalid_xml(self):
+        self.fixture_communication(
+            output="<cib><configuration>", response_code=200
+        )
+        self.env_assist.assert_raise_library_error(
+            lambda: get_cib_from_node(self.env_assist.get_env(), NODE),
+            []
+        )
+        self.env_assist.assert_reports([
+            fixture.error(
+                report_codes.INVALID_RESPONSE_FORMAT,
+                node=NODE,
+            ),
+        ])
+
+    def test_pacemaker_not_running(self):
+        self.fixture_communication(
+            output='{"pacemaker_not_running":true}', response_code=400
+        )
+        self.env_assist.assert_raise_library_error(
+            lambda: get_cib_from_node(self.env_assist.get_env(), NODE),
+            []
+        )
+        self.env_assist.assert_reports([
+            fixture.error(
+                report_codes.NODE_COMMUNICATION_COMMAND_UNSUCCESSFUL,
+                node=NODE,
+                command="remote/get_cib",
+                reason='{"pacemaker_not_running":true}',
+            ),
+        ])
+
+    def test_node_offline(self):
+        self.fixture_communication(
+            was_connected=False,
+            errno=7,
+            error_msg="Failed connect to node-1:2224; No route to host",
+        )
+        self.env_assist.assert_raise_library_error(
+            lambda: get_cib_from_node(self.env_assist.get_env(), NODE),
+            []
+        )
+        self.env_assist.assert_reports([
+            fixture.error(
+                report_codes.NODE_COMMUNICATION_ERROR_UNABLE_TO_CONNECT,
+                node=NODE,
+                command="remote/get_cib",
+                reason="Failed connect to node-1:2224; No route to host",
+            ),
+        ])
@@ -11,6 +11,16 @@ from pcs.test.tools.command_env import get_env_tools
 from pcs.test.tools.pcs_unittest import TestCase
 
 
+def _config_disable_phases_concurrently(config):
+    config.http.run_concurrently(
+        [
+            "http.pcmk.set_stonith_watchdog_timeout_to_zero",
+            "http.sbd.disable_sbd",
+        ],
+        "http.set_timeout_and_disable_sbd"
+    )
+
+
 class DisableSbd(TestCase):
     def setUp(self):
         self.env_assist, self.config = get_env_tools(self)
@@ -25,6 +35,7 @@ class DisableSbd(TestCase):
             node_labels=self.node_list[:1]
         )
         self.config.http.sbd.disable_sbd(node_labels=self.node_list)
+        _config_disable_phases_concurrently(self.config)
         disable_sbd(self.env_assist.get_env())
         self.env_assist.assert_reports(
             [fixture.info(report_codes.SBD_DISABLING_STARTED)]
@@ -97,6 +108,7 @@ class DisableSbd(TestCase):
             node_labels=online_nodes_list[:1]
         )
         self.config.http.sbd.disable_sbd(node_labels=online_nodes_list)
+        _config_disable_phases_concurrently(self.config)
         disable_sbd(self.env_assist.get_env(), ignore_offline_nodes=True)
         self.env_assist.assert_reports(
             [fixture.warn(report_codes.OMITTING_NODE, node="rh7-1")]
@@ -141,6 +153,7 @@ class DisableSbd(TestCase):
             ]
         )
         self.config.http.sbd.disable_sbd(node_labels=self.node_list)
+        _config_disable_phases_concurrently(self.config)
         disable_sbd(self.env_assist.get_env())
         self.env_assist.assert_reports(
             [
@@ -187,11 +200,25 @@ class DisableSbd(TestCase):
                 for node in self.node_list
             ]
         )
+        # the service is disabled even if the property cannot be set
+        self.config.http.sbd.disable_sbd(node_labels=self.node_list)
+        _config_disable_phases_concurrently(self.config)
         self.env_assist.assert_raise_library_error(
             lambda: disable_sbd(self.env_assist.get_env()),
             [],
         )
         self.env_assist.assert_reports(
+            [fixture.info(report_codes.SBD_DISABLING_STARTED)]
+            +
+            [
+                fixture.info(
+                    report_codes.SERVICE_DISABLE_SUCCESS,
+                    service="sbd",
+                    node=node,
+                    instance=None
+                ) for node in self.node_list
+            ]
+            +
             [
                 fixture.warn(
                     report_codes.NODE_COMMUNICATION_COMMAND_UNSUCCESSFUL,
@@ -227,6 +254,7 @@ class DisableSbd(TestCase):
                 }
             ]
         )
+        _config_disable_phases_concurrently(self.config)
         self.env_assist.assert_raise_library_error(
             lambda: disable_sbd(self.env_assist.get_env()),
             [],
@@ -16,6 +16,16 @@ from pcs.test.tools.misc import get_test_resource, outdent
 from pcs.lib.corosync.config_parser import parse_string
 
 
+def _config_enable_phases_concurrently(config):
+    config.http.run_concurrently(
+        [
+            "http.pcmk.remove_stonith_watchdog_timeout",
+            "http.sbd.enable_sbd",
+        ],
+        "http.remove_timeout_and_enable_sbd"
+    )
+
+
 def _check_sbd_comm_success_fixture(node, watchdog, device_list):
     return dict(
         label=node,
@@ -190,6 +200,7 @@ class OddNumOfNodesSuccess(TestCase):
             node_labels=[self.node_list[0]]
         )
         self.config.http.sbd.enable_sbd(node_labels=self.node_list)
+        _config_enable_phases_concurrently(self.config)
         enable_sbd(
             self.env_assist.get_env(),
             default_watchdog=None,
@@ -225,6 +236,7 @@ class OddNumOfNodesSuccess(TestCase):
             node_labels=[self.node_list[0]]
         )
         self.config.http.sbd.enable_sbd(node_labels=self.node_list)
+        _config_enable_phases_concurrently(self.config)
         enable_sbd(
             self.env_assist.get_env(),
             default_watchdog=None,
@@ -275,6 +287,7 @@ class OddNumOfNodesDefaultsSuccess(TestCase):
             node_labels=[self.node_list[0]]
         )
         self.config.http.sbd.enable_sbd(node_labels=self.node_list)
+        _config_enable_phases_concurrently(self.config)
         enable_sbd(
             self.env_assist.get_env(),
             default_watchdog=self.watchdog,
@@ -306,6 +319,7 @@ class OddNumOfNodesDefaultsSuccess(TestCase):
             node_labels=[self.node_list[0]]
         )
         self.config.http.sbd.enable_sbd(node_labels=self.node_list)
+        _config_enable_phases_concurrently(self.config)
         enable_sbd(
             self.env_assist.get_env(),
             default_watchdog=self.watchdog,
@@ -356,6 +370,7 @@ class EvenNumOfNodes(TestCase):
             node_labels=[self.node_list[0]]
         )
         self.config.http.sbd.enable_sbd(node_labels=self.node_list)
+        _config_enable_phases_concurrently(self.config)
         enable_sbd(
             self.env_assist.get_env(),
             default_watchdog=self.watchdog,
@@ -395,6 +410,7 @@ class EvenNumOfNodes(TestCase):
             node_labels=[self.node_list[0]]
         )
         self.config.http.sbd.enable_sbd(node_labels=self.node_list)
+        _config_enable_phases_concurrently(self.config)
         enable_sbd(
             self.env_assist.get_env(),
             default_watchdog=self.watchdog,
@@ -428,6 +444,7 @@ class EvenNumOfNodes(TestCase):
             node_labels=[self.node_list[0]]
         )
         self.config.http.sbd.enable_sbd(node_labels=self.node_list)
+        _config_enable_phases_concurrently(self.config)
         enable_sbd(
             self.env_assist.get_env(),
             default_watchdog=self.watchdog,
@@ -458,6 +475,7 @@ class EvenNumOfNodes(TestCase):
             node_labels=[self.node_list[0]]
         )
         self.config.http.sbd.enable_sbd(node_labels=self.node_list)
+        _config_enable_phases_concurrently(self.config)
         enable_sbd(
             self.env_assist.get_env(),
             default_watchdog=self.watchdog,
@@ -545,6 +563,7 @@ class OfflineNodes(TestCase):
             node_labels=[self.online_node_list[0]]
         )
         self.config.http.sbd.enable_sbd(node_labels=self.online_node_list)
+        _config_enable_phases_concurrently(self.config)
         enable_sbd(
             self.env_assist.get_env(),
             default_watchdog=None,
@@ -589,6 +608,7 @@ class OfflineNodes(TestCase):
             node_labels=[self.online_node_list[0]]
         )
         self.config.http.sbd.enable_sbd(node_labels=self.online_node_list)
+        _config_enable_phases_concurrently(self.config)
         enable_sbd(
             self.env_assist.get_env(),
             default_watchdog=None,
@@ -1136,6 +1156,7 @@ class FailureHandling(TestCase):
         self.config.http.sbd.enable_sbd(
             communication_list=self.communication_list_failure
         )
+        _config_enable_phases_concurrently(self.config)
         self.env_assist.assert_raise_library_error(
             lambda: enable_sbd(
                 self.env_assist.get_env(),
@@ -1170,6 +1191,7 @@ class FailureHandling(TestCase):
         self.config.http.sbd.enable_sbd(
             communication_list=self.communication_list_not_connected
         )
+        _config_enable_phases_concurrently(self.config)
         self.env_assist.assert_raise_library_error(
             lambda: enable_sbd(
                 self.env_assist.get_env(),
@@ -1209,6 +1231,7 @@ class FailureHandling(TestCase):
             ]
         )
         self.config.http.sbd.enable_sbd(node_labels=self.node_list)
+        _config_enable_phases_concurrently(self.config)
         enable_sbd(
             self.env_assist.get_env(),
             default_watchdog=self.watchdog,
@@ -1239,6 +1262,7 @@ class FailureHandling(TestCase):
             ]
         )
         self.config.http.sbd.enable_sbd(node_labels=self.node_list)
+        _config_enable_phases_concurrently(self.config)
         enable_sbd(
             self.env_assist.get_env(),
             default_watchdog=self.watchdog,
@@ -1272,6 +1296,9 @@ class FailureHandling(TestCase):
                 )],
             ]
         )
+        # the service is enabled even if the property cannot be removed
+        self.config.http.sbd.enable_sbd(node_labels=self.node_list)
+        _config_enable_phases_concurrently(self.config)
         self.env_assist.assert_raise_library_error(
             lambda: enable_sbd(
                 self.env_assist.get_env(),
@@ -1284,7 +1311,7 @@ class FailureHandling(TestCase):
         self.env_assist.assert_reports(
             _sbd_enable_successful_report_list_fixture(
                 self.node_list, atb_set=True
-            )[:-4]
+            )[:-1]
             +
             [
                 fixture.warn(
@@ -6,6 +6,7 @@ from __future__ import (
 )
 
 import logging
+import time
 from lxml import etree
 
 from pcs.test.tools.assertions import assert_raise_library_error, start_tag_error_text
@@ -299,12 +300,66 @@ class CompleteAgentList(TestCase):
 
         self.assertEqual(["ocf:heartbeat:Dummy"], lib._complete_agent_list(
             mock.MagicMock(),
+            MockLibraryReportProcessor(),
             ["ocf:heartbeat:Dummy", invalid_agent_name],
             describe=False,
             search=False,
             metadata_class=Agent,
         ))
 
+    def test_describe_in_order_of_names(self):
+        class Agent(object):
+            def __init__(self, runner, name):
+                self.name = name
+
+            def get_description_info(self):
+                # later agents finish sooner
+                time.sleep(0.01 * (5 - int(self.name[-1])))
+                return self.name
+
+        agent_names = ["ocf:heartbeat:A{0}".format(i) for i in range(5)]
+        self.assertEqual(agent_names, lib._complete_agent_list(
+            mock.MagicMock(),
+            MockLibraryReportProcessor(),
+            agent_names,
+            describe=True,
+            search=False,
+            metadata_class=Agent,
+        ))
+
+    def test_report_timed_out_agents(self):
+        class Agent(object):
+            def __init__(self, runner, name):
+                self.name = name
+
+            def get_description_info(self):
+                if self.name != "ocf:heartbeat:Dummy":
+                    raise lib_ra.AgentMetadataTimedOut(
+                        self.name, "timed out after 30 seconds"
+                    )
+                return self.name
+
+        report_processor = MockLibraryReportProcessor()
+        self.assertEqual(["ocf:heartbeat:Dummy"], lib._complete_agent_list(
+            mock.MagicMock(),
+            report_processor,
+            ["ocf:heartbeat:Delay", "ocf:heartbeat:Dummy", "ocf:heartbeat:IP"],
+            describe=True,
+            search=False,
+            metadata_class=Agent,
+        ))
+        report_processor.assert_reports([
+            (
+                severity.WARNING,
+                report_codes.UNABLE_TO_GET_AGENT_METADATA,
+                {
+                    "agent": agent,
+                    "reason": "timed out after 30 seconds",
+                },
+            )
+            for agent in ["ocf:heartbeat:Delay", "ocf:heartbeat:IP"]
+        ])
+
 @mock.patch.object(lib_ra.ResourceAgent, "_load_metadata", autospec=True)
 @mock.patch("pcs.lib.resource_agent.guess_exactly_one_resource_agent_full_name")
 @mock.patch.object(
@@ -0,0 +1,58 @@
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+)
+
+from lxml import etree
+
+from pcs.common.node_communicator import Request, RequestData
+from pcs.lib import reports
+from pcs.lib.communication.tools import (
+    AllAtOnceStrategyMixin,
+    AllSameDataMixin,
+    RunRemotelyBase,
+)
+from pcs.lib.node_communication import XmlResponseConsumer
+
+
+class GetCib(AllSameDataMixin, AllAtOnceStrategyMixin, RunRemotelyBase):
+    """
+    Get the CIB from nodes. The CIB is parsed while it is being received, so
+    the raw response is never held in memory.
+    """
+    def __init__(self, report_processor):
+        super(GetCib, self).__init__(report_processor)
+        self._cib_dict = {}
+
+    def _get_request_data(self):
+        return RequestData("remote/get_cib")
+
+    def _prepare_initial_requests(self):
+        return [
+            Request(
+                target,
+                self._get_request_data(),
+                response_consumer=XmlResponseConsumer()
+            )
+            for target in self._target_list
+        ]
+
+    def _process_response(self, response):
+        report = self._get_response_report(response)
+        if report is not None:
+            self._report(report)
+            return
+        node_label = response.request.target.label
+        try:
+            self._cib_dict[node_label] = (
+                response.request.response_consumer.get_root()
+            )
+        except etree.XMLSyntaxError:
+            self._report(reports.invalid_response_format(node_label))
+
+    def on_complete(self):
+        """
+        Returns a dict: node label -> root element of the CIB of the node
+        """
+        return self._cib_dict
@@ -0,0 +1,130 @@
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+)
+
+from pcs.common.node_communicator import (
+    Request,
+    RequestData,
+    RequestTarget,
+)
+from pcs.lib.communication.tools import (
+    run_concurrently,
+    run_concurrently_and_raise,
+)
+from pcs.lib.errors import LibraryError
+from pcs.test.tools.pcs_unittest import TestCase, mock
+
+
+def _request(label, action):
+    return Request(RequestTarget(label), RequestData(action))
+
+
+class FakeCommunicator(object):
+    """
+    Communicator answering requests in the order they were added
+    """
+    def __init__(self):
+        self.add_requests_calls = []
+        self._queue = []
+
+    def add_requests(self, request_list):
+        self.add_requests_calls.append(list(request_list))
+        self._queue.extend(request_list)
+
+    def start_loop(self):
+        while self._queue:
+            request = self._queue.pop(0)
+            yield mock.Mock(request=request)
+
+
+class FakeCommand(object):
+    def __init__(self, name, initial_request_list, extra_request_dict=None):
+        self.name = name
+        self.calls = []
+        self.received = []
+        self.error_list = []
+        self._initial_request_list = initial_request_list
+        self._extra_request_dict = extra_request_dict or {}
+
+    def before(self):
+        self.calls.append("before")
+
+    def get_initial_request_list(self):
+        self.calls.append("get_initial_request_list")
+        return self._initial_request_list
+
+    def on_response(self, response):
+        self.received.append(response.request)
+        return self._extra_request_dict.get(response.request.host_label, [])
+
+    def on_complete(self):
+        self.calls.append("on_complete")
+        return self.name
+
+
+class RunConcurrently(TestCase):
+    def setUp(self):
+        self.communicator = FakeCommunicator()
+        self.req_a1 = _request("node1", "a")
+        self.req_a2 = _request("node2", "a")
+        self.req_a3 = _request("node3", "a")
+        self.req_b1 = _request("node1", "b")
+
+    def test_requests_of_all_commands_share_one_loop(self):
+        cmd_a = FakeCommand("a", [self.req_a1, self.req_a2])
+        cmd_b = FakeCommand("b", [self.req_b1])
+
+        self.assertEqual(
+            ["a", "b"],
+            run_concurrently(self.communicator, [cmd_a, cmd_b])
+        )
+        self.assertEqual(
+            [[self.req_a1, self.req_a2], [self.req_b1]],
+            self.communicator.add_requests_calls
+        )
+        self.assertEqual([self.req_a1, self.req_a2], cmd_a.received)
+        self.assertEqual([self.req_b1], cmd_b.received)
+        for cmd in (cmd_a, cmd_b):
+            self.assertEqual(
+                ["before", "get_initial_request_list", "on_complete"],
+                cmd.calls
+            )
+
+    def test_extra_requests_are_owned_by_their_command(self):
+        cmd_a = FakeCommand(
+            "a", [self.req_a1], extra_request_dict={"node1": [self.req_a3]}
+        )
+        cmd_b = FakeCommand("b", [self.req_b1])
+
+        run_concurrently(self.communicator, [cmd_a, cmd_b])
+
+        self.assertEqual(
+            [[self.req_a1], [self.req_b1], [self.req_a3]],
+            self.communicator.add_requests_calls
+        )
+        self.assertEqual([self.req_a1, self.req_a3], cmd_a.received)
+        self.assertEqual([self.req_b1], cmd_b.received)
+
+    def test_raise_when_any_command_failed(self):
+        cmd_a = FakeCommand("a", [self.req_a1])
+        cmd_b = FakeCommand("b", [self.req_b1])
+        cmd_a.error_list.append("error")
+
+        self.assertRaises(
+            LibraryError,
+            lambda: run_concurrently_and_raise(
+                self.communicator, [cmd_a, cmd_b]
+            )
+        )
+        self.assertEqual(["on_complete"], cmd_b.calls[-1:])
+
+    def test_no_raise_when_all_commands_succeeded(self):
+        cmd_a = FakeCommand("a", [self.req_a1])
+        cmd_b = FakeCommand("b", [])
+
+        self.assertEqual(
+            ["a", "b"],
+            run_concurrently_and_raise(self.communicator, [cmd_a, cmd_b])
+        )
@@ -47,6 +47,54 @@ def run_and_raise(communicator, cmd):
     return to_return
 
 
+def run_concurrently(communicator, cmd_list):
+    """
+    Run several independent communication commands at once using one
+    communicator. Requests of all commands share one event loop (and therefore
+    one connection pool and in-flight limit), each response is dispatched to
+    the command which created its request. Returns a list of return values of
+    method on_complete() of the commands in the order of cmd_list.
+
+    NodeCommunicator communicator -- object used for communication
+    list cmd_list -- CommunicationCommandInterface commands to run
+    """
+    owner_dict = {}
+
+    def add_requests(cmd, request_list):
+        for request in request_list:
+            owner_dict[id(request)] = (request, cmd)
+        communicator.add_requests(request_list)
+
+    for cmd in cmd_list:
+        cmd.before()
+    for cmd in cmd_list:
+        add_requests(cmd, cmd.get_initial_request_list())
+    for response in communicator.start_loop():
+        _, cmd = owner_dict.pop(id(response.request))
+        extra_requests = cmd.on_response(response)
+        if extra_requests:
+            add_requests(cmd, extra_requests)
+    return [cmd.on_complete() for cmd in cmd_list]
+
+
+def run_concurrently_and_raise(communicator, cmd_list):
+    """
+    Run several independent communication commands at once, see
+    run_concurrently. Returns a list of return values of method on_complete()
+    of the commands in the order of cmd_list.
+    Raises LibraryError (with no report item) when some errors occured while
+    running any of the communication commands. All commands are always run to
+    the end.
+
+    NodeCommunicator communicator -- object used for communication
+    list cmd_list -- CommunicationCommandInterface commands to run
+    """
+    to_return = run_concurrently(communicator, cmd_list)
+    if any(cmd.error_list for cmd in cmd_list):
+        raise LibraryError()
+    return to_return
+
+
 class CommunicationCommandInterface(object):
     """
     Interface for all communication commands.
@@ -4,9 +4,11 @@ from __future__ import (
     print_function,
 )
 
+from contextlib import contextmanager
 import os.path
 
 from pcs import settings
+from pcs.common import trace
 from pcs.common.node_communicator import (
     NodeCommunicatorFactory,
     NodeTargetFactory
@@ -14,7 +16,16 @@ from pcs.common.node_communicator import (
 from pcs.common.tools import Version
 from pcs.lib import reports
 from pcs.lib.booth.env import BoothEnv
-from pcs.lib.cib.tools import get_cib_crm_feature_set
+from pcs.lib.cib.tools import (
+    get_cib_crm_feature_set,
+    get_cib_update_version,
+    get_pacemaker_version_by_which_cib_was_validated,
+)
+from pcs.lib.pacemaker.cib_diff import (
+    CIB_DIFF_CRM_DIFF,
+    CIB_DIFF_NATIVE,
+    create_patchset,
+)
 from pcs.lib.pacemaker.env import PacemakerEnv
 from pcs.lib.cluster_conf_facade import ClusterConfFacade
 from pcs.lib.communication import qdevice
@@ -25,6 +36,7 @@ from pcs.lib.communication.corosync import (
 from pcs.lib.communication.tools import (
     run,
     run_and_raise,
+    run_concurrently_and_raise,
 )
 from pcs.lib.corosync.config_facade import ConfigFacade as CorosyncConfigFacade
 from pcs.lib.corosync.live import (
@@ -46,6 +58,7 @@ from pcs.lib.pacemaker.live import (
     ensure_cib_version,
     ensure_wait_for_idle_support,
     get_cib,
+    get_cib_root_xml,
     get_cib_xml,
     get_cluster_status_xml,
     push_cib_diff_xml,
@@ -73,6 +86,10 @@ class LibraryEnvironment(object):
         token_file_data_getter=None,
         cluster_conf_data=None,
         request_timeout=None,
+        connection_pool=None,
+        communication_debug_policy=None,
+        cib_cache=None,
+        cib_diff_engine=None,
     ):
         self._logger = logger
         self._report_processor = report_processor
@@ -99,11 +116,25 @@ class LibraryEnvironment(object):
         self.__loaded_cib_diff_source = None
         self.__loaded_cib_diff_source_feature_set = None
         self.__loaded_cib_to_modify = None
+        self.__in_cib_transaction = False
+        self.__cib_transaction_has_changes = False
+        # a CibCache shared by environments of consecutive commands or None
+        self._cib_cache = cib_cache
+        self._cib_diff_engine = (
+            cib_diff_engine if cib_diff_engine is not None
+            else settings.cib_diff_engine
+        )
+        if self._cib_diff_engine not in (CIB_DIFF_NATIVE, CIB_DIFF_CRM_DIFF):
+            raise AssertionError(
+                "Unknown CIB diff engine '{0}'".format(self._cib_diff_engine)
+            )
         self._communicator_factory = NodeCommunicatorFactory(
             LibCommunicatorLogger(self.logger, self.report_processor),
             self.user_login,
             self.user_groups,
-            self._request_timeout
+            self._request_timeout,
+            connection_pool=connection_pool,
+            debug_policy=communication_debug_policy,
         )
 
         self.__timeout_cache = {}
@@ -132,23 +163,19 @@ class LibraryEnvironment(object):
 
     def get_cib(self, minimal_version=None):
         if self.__loaded_cib_diff_source is not None:
-            raise AssertionError("CIB has already been loaded")
-        self.__loaded_cib_diff_source = get_cib_xml(self.cmd_runner())
-        self.__loaded_cib_to_modify = get_cib(self.__loaded_cib_diff_source)
-        if minimal_version is not None:
-            upgraded_cib = ensure_cib_version(
-                self.cmd_runner(),
-                self.__loaded_cib_to_modify,
-                minimal_version
+            if not self.__in_cib_transaction:
+                raise AssertionError("CIB has already been loaded")
+            return self.__get_cib_in_transaction(minimal_version)
+        with trace.span("load cib", trace.CATEGORY_CIB):
+            self.__loaded_cib_diff_source, self.__loaded_cib_to_modify = (
+                self.__load_cib()
             )
-            if upgraded_cib is not None:
-                self.__loaded_cib_to_modify = upgraded_cib
-                self.__loaded_cib_diff_source = etree_to_str(upgraded_cib)
-                if not self._cib_upgrade_reported:
-                    self.report_processor.process(
-                        reports.cib_upgrade_successful()
-                    )
-                self._cib_upgrade_reported = True
+        if minimal_version is not None:
+            self.__upgrade_loaded_cib(minimal_version)
+        self.__read_loaded_cib_versions()
+        return self.__loaded_cib_to_modify
+
+    def __read_loaded_cib_versions(self):
         self.__loaded_cib_diff_source_feature_set = (
             get_cib_crm_feature_set(
                 self.__loaded_cib_to_modify,
@@ -157,8 +184,101 @@ class LibraryEnvironment(object):
             or
             Version(0, 0, 0)
         )
+
+    def __upgrade_loaded_cib(self, minimal_version):
+        upgraded_cib = ensure_cib_version(
+            self.cmd_runner(),
+            self.__loaded_cib_to_modify,
+            minimal_version
+        )
+        if upgraded_cib is None:
+            return
+        self.__loaded_cib_to_modify = upgraded_cib
+        self.__loaded_cib_diff_source = etree_to_str(upgraded_cib)
+        if self.__is_cib_cache_used:
+            self._cib_cache.store(self.__loaded_cib_diff_source, upgraded_cib)
+        if not self._cib_upgrade_reported:
+            self.report_processor.process(reports.cib_upgrade_successful())
+        self._cib_upgrade_reported = True
+
+    def __get_cib_in_transaction(self, minimal_version):
+        if minimal_version is None:
+            return self.__loaded_cib_to_modify
+        current_version = get_pacemaker_version_by_which_cib_was_validated(
+            self.__loaded_cib_to_modify
+        )
+        if current_version >= minimal_version:
+            return self.__loaded_cib_to_modify
+        # The CIB is upgraded in the cluster and loaded again, so changes made
+        # to the loaded CIB so far would be lost.
+        if self.__cib_transaction_has_changes:
+            raise LibraryError(reports.cib_upgrade_with_pending_changes(
+                current_version, minimal_version
+            ))
+        self.__upgrade_loaded_cib(minimal_version)
+        self.__read_loaded_cib_versions()
         return self.__loaded_cib_to_modify
 
+    def __forget_loaded_cib(self):
+        self.__loaded_cib_diff_source = None
+        self.__loaded_cib_diff_source_feature_set = None
+        self.__loaded_cib_to_modify = None
+        self.__cib_transaction_has_changes = False
+
+    @contextmanager
+    def cib_transaction(self, wait=False):
+        """
+        Let several commands modify one loaded CIB and push it once at the end
+
+        Commands run in the transaction get the same instance of CIB and their
+        pushes are postponed until the transaction ends. Nothing is pushed if
+        the transaction is left by an exception.
+
+        mixed wait -- how many seconds to wait for pacemaker to process the
+            pushed CIB or False for not waiting at all
+        """
+        if self.__in_cib_transaction:
+            raise AssertionError("CIB transaction has already been started")
+        if self.__loaded_cib_diff_source is not None:
+            raise AssertionError("CIB has already been loaded")
+        self.ensure_wait_satisfiable(wait)
+        self.__in_cib_transaction = True
+        is_finished = False
+        try:
+            yield
+            is_finished = True
+        finally:
+            self.__in_cib_transaction = False
+            if not is_finished:
+                self.__forget_loaded_cib()
+        if self.__cib_transaction_has_changes:
+            self.push_cib(wait=wait)
+        else:
+            self.__forget_loaded_cib()
+
+    @property
+    def __is_cib_cache_used(self):
+        return self._cib_cache is not None and self.is_cib_live
+
+    def __load_cib(self):
+        if not self.__is_cib_cache_used:
+            cib_xml = get_cib_xml(self.cmd_runner())
+            return cib_xml, get_cib(cib_xml)
+        # an empty cache cannot be hit, do not ask for the live CIB version
+        if self._cib_cache.version is not None:
+            cached = self._cib_cache.get(self.__get_live_cib_version())
+            if cached is not None:
+                return cached
+        cib_xml = get_cib_xml(self.cmd_runner())
+        cib_tree = get_cib(cib_xml)
+        self._cib_cache.store(cib_xml, cib_tree)
+        return cib_xml, cib_tree
+
+    def __get_live_cib_version(self):
+        return get_cib_update_version(
+            get_cib(get_cib_root_xml(self.cmd_runner()))
+        )
+
     @property
     def cib(self):
         if self.__loaded_cib_diff_source is None:
@@ -186,6 +306,11 @@ class LibraryEnvironment(object):
 
         mixed wait can be False when waiting is not required or valid timeout
         """
+        if self.__in_cib_transaction and wait is not False:
+            raise AssertionError(
+                "Cannot wait in a CIB transaction, wait for the whole "
+                "transaction instead"
+            )
         self._get_wait_timeout(wait)
 
     def push_cib(self, custom_cib=None, wait=False):
@@ -198,6 +323,9 @@ class LibraryEnvironment(object):
         mixed wait -- how many seconds to wait for pacemaker to process new CIB
             or False for not waiting at all
         """
+        if self.__in_cib_transaction:
+            self.__postpone_push_cib(custom_cib, wait)
+            return None
         if custom_cib is not None:
             if self.__loaded_cib_diff_source is not None:
                 raise AssertionError(
@@ -221,6 +349,18 @@ class LibraryEnvironment(object):
             return self.__push_cib_full(self.__loaded_cib_to_modify, wait=wait)
         return self.__push_cib_diff(wait=wait)
 
+    def __postpone_push_cib(self, custom_cib, wait):
+        if custom_cib is not None:
+            raise AssertionError("Cannot push a custom CIB in a CIB transaction")
+        if wait is not False:
+            raise AssertionError(
+                "Cannot wait in a CIB transaction, wait for the whole "
+                "transaction instead"
+            )
+        if self.__loaded_cib_diff_source is None:
+            raise AssertionError("CIB has not been loaded")
+        self.__cib_transaction_has_changes = True
+
     def __push_cib_full(self, cib_to_push, wait=False):
         cmd_runner = self.cmd_runner()
         self.__do_push_cib(
@@ -238,22 +378,35 @@ class LibraryEnvironment(object):
         )
 
     def __main_push_cib_diff(self, cmd_runner):
-        cib_diff_xml = diff_cibs_xml(
-            cmd_runner,
-            self.report_processor,
-            self.__loaded_cib_diff_source,
-            etree_to_str(self.__loaded_cib_to_modify)
-        )
+        if self._cib_diff_engine == CIB_DIFF_NATIVE:
+            patchset = create_patchset(
+                get_cib(self.__loaded_cib_diff_source),
+                self.__loaded_cib_to_modify
+            )
+            cib_diff_xml = (
+                etree_to_str(patchset) if patchset is not None else None
+            )
+        else:
+            cib_diff_xml = diff_cibs_xml(
+                cmd_runner,
+                self.report_processor,
+                self.__loaded_cib_diff_source,
+                etree_to_str(self.__loaded_cib_to_modify)
+            )
         if cib_diff_xml:
             push_cib_diff_xml(cmd_runner, cib_diff_xml)
 
     def __do_push_cib(self, cmd_runner, push_strategy, wait):
         timeout = self._get_wait_timeout(wait)
-        push_strategy()
+        with trace.span("push cib", trace.CATEGORY_CIB):
+            push_strategy()
+        if self.__is_cib_cache_used:
+            # cibadmin does not tell the version of the CIB it has pushed and
+            # the CIB may have been changed by someone else meanwhile, so the
+            # pushed CIB is not cached, it is loaded again when needed
+            self._cib_cache.clear()
         self._cib_upgrade_reported = False
-        self.__loaded_cib_diff_source = None
-        self.__loaded_cib_diff_source_feature_set = None
-        self.__loaded_cib_to_modify = None
+        self.__forget_loaded_cib()
         if self.is_cib_live and timeout is not False:
             wait_for_idle(cmd_runner, timeout)
 
@@ -408,6 +561,18 @@ class LibraryEnvironment(object):
     def get_node_communicator(self):
         return self.communicator_factory.get_communicator()
 
+    def communicate_concurrently(self, cmd_list):
+        """
+        Run independent communication commands at once over one communicator.
+        Returns a list of their on_complete() return values in the order of
+        cmd_list. Raises LibraryError if any of the commands failed.
+
+        list cmd_list -- CommunicationCommandInterface commands to run
+        """
+        return run_concurrently_and_raise(
+            self.get_node_communicator(), cmd_list
+        )
+
     def get_node_target_factory(self):
         token_file = self.__get_token_file()
         return NodeTargetFactory(token_file["tokens"], token_file["ports"])
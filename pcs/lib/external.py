@@ -19,6 +19,7 @@ import re
 import signal
 import subprocess
 import sys
+import threading
 try:
     # python2
     from urllib import urlencode as urllib_urlencode
@@ -27,7 +28,7 @@ except ImportError:
     from urllib.parse import urlencode as urllib_urlencode
 
 from pcs import settings
-from pcs.common import pcs_pycurl as pycurl
+from pcs.common import pcs_pycurl as pycurl, trace
 from pcs.common.tools import (
     join_multilines,
     simple_cache,
@@ -347,6 +348,13 @@ def is_proxy_set(env_dict):
     return False
 
 
+class CommandTimeoutError(Exception):
+    #pylint: disable=super-init-not-called
+    def __init__(self, command, timeout):
+        self.command = command
+        self.timeout = timeout
+
+
 class CommandRunner(object):
     def __init__(self, logger, reporter, env_vars=None):
         self._logger = logger
@@ -364,8 +372,20 @@ class CommandRunner(object):
         return self._env_vars.copy()
 
     def run(
-        self, args, stdin_string=None, env_extend=None, binary_output=False
+        self, args, stdin_string=None, env_extend=None, binary_output=False,
+        timeout=None
     ):
+        """
+        Run a command and return its stdout, stderr and return value
+
+        list args -- the command and its arguments
+        string stdin_string -- data sent to stdin of the command
+        dict env_extend -- environment variables to be set for the command
+        bool binary_output -- do not decode stdout and stderr in python3
+        int timeout -- number of seconds after which the command and all its
+            child processes are killed and CommandTimeoutError is raised,
+            None means no limit
+        """
         # Allow overriding default settings. If a piece of code really wants to
         # set own PATH or CIB_file, we must allow it. I.e. it wants to run
         # a pacemaker tool on a CIB in a file but cannot afford the risk of
@@ -377,66 +397,230 @@ class CommandRunner(object):
 
         log_args = " ".join([shell_quote(x) for x in args])
         self._logger.debug(
-            "Running: {args}\nEnvironment:{env_vars}{stdin_string}".format(
-                args=log_args,
-                stdin_string=("" if not stdin_string else (
-                    "\n--Debug Input Start--\n{0}\n--Debug Input End--"
-                    .format(stdin_string)
-                )),
-                env_vars=("" if not env_vars else (
-                    "\n" + "\n".join([
-                        "  {0}={1}".format(key, val)
-                        for key, val in sorted(env_vars.items())
-                    ])
-                ))
-            )
+            ExternalProcessStartedLogMessage(log_args, env_vars, stdin_string)
         )
         self._reporter.process(
             reports.run_external_process_started(
-                log_args, stdin_string, env_vars
+                log_args, _limit_report_payload(stdin_string), env_vars
             )
         )
 
         try:
-            process = subprocess.Popen(
-                args,
-                # Some commands react differently if they get anything via stdin
-                stdin=(subprocess.PIPE if stdin_string is not None else None),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                preexec_fn=(
-                    lambda: signal.signal(signal.SIGPIPE, signal.SIG_DFL)
-                ),
-                close_fds=True,
-                shell=False,
-                env=env_vars,
-                # decodes newlines and in python3 also converts bytes to str
-                universal_newlines=(not self._python2 and not binary_output)
-            )
-            out_std, out_err = process.communicate(stdin_string)
-            retval = process.returncode
+            with trace.span(
+                os.path.basename(args[0]), trace.CATEGORY_PROCESS,
+                command=log_args
+            ) as span_args:
+                out_std, out_err, retval, killed = self._run_process(
+                    args, stdin_string, env_vars, binary_output, timeout
+                )
+                span_args["retval"] = retval
+            trace.add_process(stdin_string, out_std, out_err)
         except OSError as e:
             raise LibraryError(
                 reports.run_external_process_error(log_args, e.strerror)
             )
+        if killed and retval < 0:
+            self._logger.debug(
+                "Killed after {timeout} seconds: {args}".format(
+                    args=log_args, timeout=timeout
+                )
+            )
+            raise CommandTimeoutError(log_args, timeout)
 
         self._logger.debug(
-            (
-                "Finished running: {args}\nReturn value: {retval}"
-                + "\n--Debug Stdout Start--\n{out_std}\n--Debug Stdout End--"
-                + "\n--Debug Stderr Start--\n{out_err}\n--Debug Stderr End--"
-            ).format(
-                args=log_args,
-                retval=retval,
-                out_std=out_std,
-                out_err=out_err
-            )
+            ExternalProcessFinishedLogMessage(log_args, retval, out_std, out_err)
         )
         self._reporter.process(reports.run_external_process_finished(
-            log_args, retval, out_std, out_err
+            log_args,
+            retval,
+            _limit_report_payload(out_std),
+            _limit_report_payload(out_err)
         ))
         return out_std, out_err, retval
 
+    def _run_process(
+        self, args, stdin_string, env_vars, binary_output, timeout
+    ):
+        # Put the command and its children to a process group to be able to
+        # kill them all when the command times out.
+        if self._python2:
+            child_kwargs = dict(
+                preexec_fn=(lambda: _prepare_child(timeout is not None))
+            )
+        else:
+            # preexec_fn is not safe to use when other threads are running,
+            # python3 restores SIGPIPE in the child by itself
+            child_kwargs = dict(start_new_session=(timeout is not None))
+        process = subprocess.Popen(
+            args,
+            # Some commands react differently if they get anything via stdin
+            stdin=(subprocess.PIPE if stdin_string is not None else None),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            close_fds=True,
+            shell=False,
+            env=env_vars,
+            # decodes newlines and in python3 also converts bytes to str
+            universal_newlines=(not self._python2 and not binary_output),
+            **child_kwargs
+        )
+        timer = None
+        killed = threading.Event()
+        if timeout is not None:
+            timer = threading.Timer(
+                timeout, _kill_process_group, [process, killed]
+            )
+            timer.daemon = True
+            timer.start()
+        try:
+            out_std, out_err = process.communicate(stdin_string)
+        finally:
+            if timer is not None:
+                timer.cancel()
+        retval = process.returncode
+        return out_std, out_err, retval, killed.is_set()
+
+
+class ExternalProcessStartedLogMessage(object):
+    """
+    Debug log message of a started external process. It is formatted only when
+    a log handler emits it, so big inputs are not copied otherwise.
+    """
+    def __init__(self, command, environment, stdin):
+        """
+        string command -- the command, shell quoted
+        dict environment -- environment variables of the process
+        string stdin -- data passed to the process via its stdin
+        """
+        self.command = command
+        self.environment = environment
+        self.stdin = stdin
+
+    def __str__(self):
+        return "Running: {command}\nEnvironment:{env_vars}{stdin}".format(
+            command=self.command,
+            stdin=("" if not self.stdin else (
+                "\n--Debug Input Start--\n{0}\n--Debug Input End--"
+                .format(self.stdin)
+            )),
+            env_vars=("" if not self.environment else (
+                "\n" + "\n".join([
+                    "  {0}={1}".format(key, val)
+                    for key, val in sorted(self.environment.items())
+                ])
+            ))
+        )
+
+
+class ExternalProcessFinishedLogMessage(object):
+    """
+    Debug log message of a finished external process. It is formatted only
+    when a log handler emits it, so big outputs are not copied otherwise.
+    """
+    def __init__(self, command, retval, stdout, stderr):
+        """
+        string command -- the command, shell quoted
+        int retval -- return value of the process
+        string stdout -- stdout of the process
+        string stderr -- stderr of the process
+        """
+        self.command = command
+        self.retval = retval
+        self.stdout = stdout
+        self.stderr = stderr
+
+    def __str__(self):
+        return (
+            "Finished running: {command}\nReturn value: {retval}"
+            "\n--Debug Stdout Start--\n{stdout}"
+            "\n--Debug Stdout End--"
+            "\n--Debug Stderr Start--\n{stderr}"
+            "\n--Debug Stderr End--"
+        ).format(
+            command=self.command,
+            retval=self.retval,
+            stdout=self.stdout,
+            stderr=self.stderr
+        )
+
+
+class LimitedReportPayload(object):
+    """
+    Stdin, stdout or stderr of an external process in a report. It is
+    shortened to settings.external_process_report_payload_limit characters
+    only when it is formatted, so creating the report copies nothing.
+    """
+    def __init__(self, payload):
+        """
+        string payload -- the payload, not None
+        """
+        self._payload = payload
+
+    @property
+    def value(self):
+        """
+        The payload shortened to the size allowed in reports
+        """
+        limit = settings.external_process_report_payload_limit
+        if limit is None or len(self._payload) <= limit:
+            return self._payload
+        marker = "\n--Truncated, {0} more characters--".format(
+            len(self._payload) - limit
+        )
+        if isinstance(self._payload, bytes) and not isinstance(marker, bytes):
+            marker = marker.encode("utf-8")
+        return self._payload[:limit] + marker
+
+    def __str__(self):
+        value = self.value
+        if isinstance(value, bytes) and not isinstance(value, str):
+            # binary output in python3
+            return value.decode("utf-8", "replace")
+        return value
+
+    def __len__(self):
+        return len(self._payload)
+
+    def __eq__(self, other):
+        if isinstance(other, LimitedReportPayload):
+            other = other.value
+        return self.value == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return str("<LimitedReportPayload {0!r}>").format(self.value)
+
+
+def _limit_report_payload(payload):
+    """
+    Return a payload of an external process to be put into a report
+
+    string payload -- stdin, stdout or stderr of an external process
+    """
+    if payload is None:
+        return None
+    return LimitedReportPayload(payload)
+
+
+def _prepare_child(new_session):
+    # python2 only, python3 does all of this in Popen
+    signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+    if new_session:
+        os.setsid()
+
+
+def _kill_process_group(process, killed):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+        killed.set()
+    except OSError:
+        # the process has already finished
+        pass
+
 
 # deprecated
 class NodeCommunicationException(Exception):
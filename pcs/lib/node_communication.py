@@ -6,8 +6,13 @@ from __future__ import (
 
 import os
 
+from lxml import etree
+
 from pcs.common import pcs_pycurl as pycurl
-from pcs.common.node_communicator import CommunicatorLoggerInterface
+from pcs.common.node_communicator import (
+    CommunicatorLoggerInterface,
+    ResponseConsumer,
+)
 from pcs.lib.errors import ReportItemSeverity
 from pcs.lib import reports
 
@@ -67,8 +72,12 @@ class LibCommunicatorLogger(CommunicatorLoggerInterface):
             ))
 
     def _log_debug(self, response):
-        url = response.request.url
+        # the output is turned into text only here, it may not be collected at
+        # all depending on the debug policy of the communicator
         debug_data = response.debug
+        if not debug_data:
+            return
+        url = response.request.url
         self._logger.debug(
             (
                 "Communication debug info for calling: {url}\n"
@@ -109,6 +118,55 @@ class LibCommunicatorLogger(CommunicatorLoggerInterface):
             response.request.host_label, response.request.url
         ))
 
+    def log_connection_pool_stats(self, pool_stats):
+        self._logger.debug(
+            (
+                "Connection pool: {hits} reused, {misses} new, {evictions} "
+                "evicted, {idle} idle"
+            ).format(**pool_stats._asdict())
+        )
+        self._reporter.process(
+            reports.node_communication_connection_pool_stats(
+                pool_stats.hits,
+                pool_stats.misses,
+                pool_stats.evictions,
+                pool_stats.idle,
+            )
+        )
+
+
+class XmlResponseConsumer(ResponseConsumer):
+    """
+    Parses a response body as XML while it is being received, so neither the
+    raw body nor its decoded text is held in memory
+    """
+    def __init__(self):
+        super(XmlResponseConsumer, self).__init__()
+        self._parser = None
+        self._error = None
+
+    def _reset(self):
+        # it raises on a huge xml without the flag huge_tree=True
+        self._parser = etree.XMLParser(huge_tree=True)
+        self._error = None
+
+    def _consume(self, chunk):
+        # an exception must not get to curl, it would abort the transfer
+        if self._error is None:
+            try:
+                self._parser.feed(chunk)
+            except etree.XMLSyntaxError as e:
+                self._error = e
+
+    def get_root(self):
+        """
+        Returns the root element of the received document. Raises
+        etree.XMLSyntaxError if the body is not a well-formed XML.
+        """
+        if self._error is not None:
+            raise self._error
+        return self._parser.close()
+
 
 def response_to_report_item(
     response, severity=ReportItemSeverity.ERROR, forceable=None
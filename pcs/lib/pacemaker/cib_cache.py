@@ -0,0 +1,57 @@
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+)
+
+from copy import deepcopy
+
+from pcs.lib.cib.tools import get_cib_update_version
+
+
+class CibCache(object):
+    """
+    Keeps the last seen CIB, so commands run one after another in one process
+    do not need to load and parse the whole CIB until it changes. The cached
+    CIB is identified by its version (admin_epoch, epoch, num_updates).
+    """
+    def __init__(self):
+        self._version = None
+        self._xml = None
+        self._tree = None
+
+    @property
+    def version(self):
+        return self._version
+
+    def get(self, version):
+        """
+        Return a tuple (CIB xml string, CIB etree) if the cached CIB has
+        the specified version, None otherwise. The returned tree is a copy
+        which can be modified freely.
+
+        tuple version -- (admin_epoch, epoch, num_updates) of the wanted CIB
+        """
+        if version is None or version != self._version:
+            return None
+        return self._xml, deepcopy(self._tree)
+
+    def store(self, cib_xml, cib_tree):
+        """
+        Put a CIB to the cache replacing the cached one
+
+        string cib_xml -- the CIB as a string
+        etree cib_tree -- the same CIB parsed, a copy of it is kept
+        """
+        version = get_cib_update_version(cib_tree)
+        if version is None:
+            self.clear()
+            return
+        self._version = version
+        self._xml = cib_xml
+        self._tree = deepcopy(cib_tree)
+
+    def clear(self):
+        self._version = None
+        self._xml = None
+        self._tree = None
@@ -0,0 +1,321 @@
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+)
+
+from copy import deepcopy
+
+from lxml import etree
+
+from pcs.common.tools import is_string
+
+CIB_DIFF_NATIVE = "native"
+CIB_DIFF_CRM_DIFF = "crm_diff"
+
+_VERSION_ATTRIBUTES = ("admin_epoch", "epoch", "num_updates")
+
+
+def create_patchset(cib_old, cib_new):
+    """
+    Return a patchset in the v2 format transforming cib_old to cib_new or None
+    if there is no difference between them. Like in crm_diff --no-version,
+    version attributes of the CIBs are not considered a difference.
+
+    The patchset is built the same way pacemaker builds it (see
+    xml_calculate_changes and xml_create_patchset in pacemaker's xml.c), so
+    cibadmin --patch applies it exactly like an output of crm_diff.
+
+    etree cib_old -- original CIB
+    etree cib_new -- modified CIB, it is not changed
+    """
+    return _PatchsetBuilder(cib_old, cib_new).build()
+
+
+def _get_children(element):
+    # pacemaker parses CIBs without blank text nodes and ignores text content
+    return [
+        child for child in element
+        if is_string(child.tag) or child.tag is etree.Comment
+    ]
+
+def _is_comment(element):
+    return element.tag is etree.Comment
+
+def _get_name(element):
+    return "comment" if _is_comment(element) else element.tag
+
+def _get_id(element):
+    return None if _is_comment(element) else element.get("id")
+
+def _get_path_part(element):
+    element_id = _get_id(element)
+    if element_id is None:
+        return "/{0}".format(_get_name(element))
+    return "/{0}[@id='{1}']".format(_get_name(element), element_id)
+
+def _get_path(element):
+    path = []
+    while element is not None:
+        path.append(_get_path_part(element))
+        element = element.getparent()
+    return "".join(reversed(path))
+
+def _copy_without_blanks(element):
+    element_copy = deepcopy(element)
+    element_copy.tail = None
+    for descendant in element_copy.iterdescendants():
+        if descendant.text is not None and not descendant.text.strip():
+            descendant.text = None
+        if descendant.tail is not None and not descendant.tail.strip():
+            descendant.tail = None
+    if element_copy.text is not None and not element_copy.text.strip():
+        element_copy.text = None
+    return element_copy
+
+
+class _SkipCounter(object):
+    """
+    Keeps positions of siblings which pacemaker flags to be skipped when
+    counting an offset of a sibling. A binary indexed tree is used so big lists
+    of siblings (e.g. primitives in resources) do not take quadratic time.
+    """
+    def __init__(self, size):
+        self._tree = [0] * (size + 1)
+        self._skipped = [False] * size
+
+    def is_skipped(self, index):
+        return self._skipped[index]
+
+    def skip(self, index):
+        if self._skipped[index]:
+            return
+        self._skipped[index] = True
+        index += 1
+        while index < len(self._tree):
+            self._tree[index] += 1
+            index += index & (-index)
+
+    def offset(self, index):
+        """
+        Return a number of not skipped siblings preceding the specified one
+        """
+        skipped = 0
+        position = index
+        while position > 0:
+            skipped += self._tree[position]
+            position -= position & (-position)
+        return index - skipped
+
+
+class _Siblings(object):
+    def __init__(self, element_list):
+        self.elements = element_list
+        self.skip = _SkipCounter(len(element_list))
+        self._by_name = {}
+        self._by_name_id = {}
+        for index, element in enumerate(element_list):
+            if _is_comment(element):
+                continue
+            self._by_name.setdefault(element.tag, index)
+            element_id = element.get("id")
+            if element_id is not None:
+                self._by_name_id.setdefault((element.tag, element_id), index)
+
+    def find(self, needle, needle_siblings, needle_index):
+        """
+        Return an index of an element matching the needle or None
+
+        etree needle -- element from the other tree to be matched
+        _Siblings needle_siblings -- siblings of the needle
+        int needle_index -- index of the needle in its siblings
+        """
+        if _is_comment(needle):
+            return self._find_comment(
+                needle.text, needle_siblings.skip.offset(needle_index)
+            )
+        needle_id = needle.get("id")
+        if needle_id is None:
+            return self._by_name.get(needle.tag)
+        return self._by_name_id.get((needle.tag, needle_id))
+
+    def _find_comment(self, text, offset):
+        # comments are matched only if they are at the same position
+        for index, element in enumerate(self.elements):
+            if not _is_comment(element):
+                continue
+            element_offset = self.skip.offset(index)
+            if element_offset < offset or self.skip.is_skipped(index):
+                continue
+            if element_offset > offset or element.text != text:
+                return None
+            return index
+        return None
+
+
+class _PatchsetBuilder(object):
+    def __init__(self, cib_old, cib_new):
+        self._cib_old = cib_old
+        self._cib_new = cib_new
+        # crm_diff --no-version copies version attributes to the new CIB
+        self._new_root_attributes = dict(cib_new.attrib)
+        for name in _VERSION_ATTRIBUTES:
+            if cib_old.get(name) is not None:
+                self._new_root_attributes[name] = cib_old.get(name)
+        self._deleted = []
+        self._created = set()
+        self._moved = set()
+        self._attribute_changes = {}
+
+    def build(self):
+        self._diff_element(self._cib_old, self._cib_new)
+        if not (
+            self._deleted or self._created or self._moved
+            or
+            self._attribute_changes
+        ):
+            return None
+        patchset = etree.Element("diff", format="2")
+        version = etree.SubElement(patchset, "version")
+        for tag, attributes in (
+            ("source", self._cib_old.attrib),
+            ("target", self._new_root_attributes),
+        ):
+            version_element = etree.SubElement(version, tag)
+            for name in _VERSION_ATTRIBUTES:
+                version_element.set(name, attributes.get(name, "1"))
+        for path, position in self._deleted:
+            change = etree.SubElement(
+                patchset, "change", operation="delete", path=path
+            )
+            if position is not None:
+                change.set("position", str(position))
+        self._build_changes(self._cib_new, None, patchset)
+        return patchset
+
+    def _get_new_attributes(self, element):
+        if element is self._cib_new:
+            return [
+                (name, self._new_root_attributes[name])
+                for name in element.attrib.keys()
+            ]
+        return list(element.attrib.items())
+
+    def _diff_element(self, old, new):
+        old_siblings = _Siblings(_get_children(old))
+        new_siblings = _Siblings(_get_children(new))
+
+        for old_index, old_child in enumerate(old_siblings.elements):
+            new_index = new_siblings.find(old_child, old_siblings, old_index)
+            if new_index is not None:
+                self._diff_element(old_child, new_siblings.elements[new_index])
+                continue
+            self._deleted.append((
+                _get_path(new) + _get_path_part(old_child),
+                # pacemaker records a position of deleted comments only
+                old_siblings.skip.offset(old_index)
+                    if _is_comment(old_child) else None
+            ))
+            old_siblings.skip.skip(old_index)
+
+        if not _is_comment(new):
+            self._diff_attributes(old, new)
+
+        for new_index, new_child in enumerate(new_siblings.elements):
+            old_index = old_siblings.find(new_child, new_siblings, new_index)
+            if old_index is None:
+                self._created.add(new_child)
+                new_siblings.skip.skip(new_index)
+                continue
+            old_offset = old_siblings.skip.offset(old_index)
+            new_offset = new_siblings.skip.offset(new_index)
+            if old_offset != new_offset:
+                self._moved.add(new_child)
+                if old_offset > new_offset:
+                    old_siblings.skip.skip(old_index)
+                else:
+                    new_siblings.skip.skip(new_index)
+
+    def _diff_attributes(self, old, new):
+        old_attributes = list(old.attrib.items())
+        new_attributes = self._get_new_attributes(new)
+        new_values = dict(new_attributes)
+        new_indexes = dict(
+            (name, index) for index, (name, dummy_value)
+            in enumerate(new_attributes)
+        )
+        old_skip = _SkipCounter(len(old_attributes))
+        new_skip = _SkipCounter(len(new_attributes))
+        changed = set(
+            name for name, dummy_value in new_attributes
+            if name not in old.attrib
+        )
+        removed = []
+        for old_index, (name, value) in enumerate(old_attributes):
+            if name not in new_values:
+                removed.append(name)
+            elif new_values[name] != value:
+                changed.add(name)
+            else:
+                # pacemaker considers a change of attributes order a change
+                new_index = new_indexes[name]
+                old_offset = old_skip.offset(old_index)
+                new_offset = new_skip.offset(new_index)
+                if old_offset != new_offset:
+                    changed.add(name)
+                    if old_offset > new_offset:
+                        old_skip.skip(old_index)
+                    else:
+                        new_skip.skip(new_index)
+        if changed or removed:
+            self._attribute_changes[new] = (changed, removed)
+
+    def _build_changes(self, element, position, patchset):
+        if element in self._created:
+            change = etree.SubElement(
+                patchset,
+                "change",
+                operation="create",
+                path=_get_path(element.getparent()),
+                position=str(position),
+            )
+            change.append(_copy_without_blanks(element))
+            return
+
+        if element in self._attribute_changes:
+            changed, removed = self._attribute_changes[element]
+            attributes = self._get_new_attributes(element)
+            change = etree.SubElement(
+                patchset, "change", operation="modify", path=_get_path(element)
+            )
+            change_list = etree.SubElement(change, "change-list")
+            for name, value in attributes:
+                if name in changed:
+                    etree.SubElement(
+                        change_list,
+                        "change-attr",
+                        name=name,
+                        operation="set",
+                        value=value,
+                    )
+            for name in removed:
+                etree.SubElement(
+                    change_list, "change-attr", name=name, operation="unset"
+                )
+            result = etree.SubElement(
+                etree.SubElement(change, "change-result"), element.tag
+            )
+            for name, value in attributes:
+                result.set(name, value)
+
+        for child_position, child in enumerate(_get_children(element)):
+            self._build_changes(child, child_position, patchset)
+
+        if element in self._moved:
+            etree.SubElement(
+                patchset,
+                "change",
+                operation="move",
+                path=_get_path(element),
+                position=str(position),
+            )
@@ -8,6 +8,7 @@ from lxml import etree
 import os.path
 
 from pcs import settings
+from pcs.common import trace
 from pcs.common.tools import (
     join_multilines,
     xml_fromstring
@@ -65,12 +66,28 @@ def get_cib_xml(runner, scope=None):
             )
     return stdout
 
+def get_cib_root_xml(runner):
+    """
+    Return the root element of the CIB without its children. It contains the
+    CIB version and it is much cheaper to get than the whole CIB.
+    """
+    stdout, stderr, retval = runner.run([
+        __exec("cibadmin"), "--local", "--query", "--xpath", "/cib",
+        "--no-children"
+    ])
+    if retval != 0:
+        raise LibraryError(
+            reports.cib_load_error(join_multilines([stderr, stdout]))
+        )
+    return stdout
+
 def parse_cib_xml(xml):
     return xml_fromstring(xml)
 
 def get_cib(xml):
     try:
-        return parse_cib_xml(xml)
+        with trace.span("parse cib", trace.CATEGORY_CIB):
+            return parse_cib_xml(xml)
     except (etree.XMLSyntaxError, etree.DocumentInvalid) as e:
         raise LibraryError(reports.cib_load_error_invalid_format(str(e)))
 
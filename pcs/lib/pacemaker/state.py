@@ -22,7 +22,7 @@ from pcs.lib.pacemaker.values import (
     is_false,
     is_true,
 )
-from pcs.lib.xml_tools import find_parent
+from pcs.lib.xml_tools import find_parent, get_compiled_schema
 
 class ResourceNotFound(Exception):
     pass
@@ -63,18 +63,26 @@ class _Children(object):
         self.dom_part = dom_part
         self.children = children
         self.sections = sections
+        # the state is not changed, so every element is looked up only once
+        self._found_elements = {}
+
+    def _findall(self, element_name):
+        if element_name not in self._found_elements:
+            self._found_elements[element_name] = self.dom_part.findall(
+                './/' + element_name
+            )
+        return self._found_elements[element_name]
 
     def __getattr__(self, name):
         if name in self.children.keys():
             element_name, wrapper = self.children[name]
             return [
-                wrapper(element)
-                for element in self.dom_part.findall('.//' + element_name)
+                wrapper(element) for element in self._findall(element_name)
             ]
 
         if name in self.sections.keys():
             element_name, wrapper = self.sections[name]
-            return wrapper(self.dom_part.findall('.//' + element_name)[0])
+            return wrapper(self._findall(element_name)[0])
 
         raise AttributeError(
             "'{0}' does not declare child or section '{1}'"
@@ -141,11 +149,21 @@ class _NodeSection(_Element):
         'nodes': ('node', _Node),
     }
 
-def get_cluster_state_dom(xml):
+def get_cluster_state_dom(xml, validate=True):
+    """
+    Parse crm_mon xml output
+
+    string xml -- crm_mon xml output
+    bool validate -- check the xml against the crm_mon schema, it is meant to
+        be disabled only when the same state has been already validated, e.g.
+        when polling the cluster state repeatedly
+    """
     try:
         dom = xml_fromstring(xml)
-        if os.path.isfile(settings.crm_mon_schema):
-            etree.RelaxNG(file=settings.crm_mon_schema).assertValid(dom)
+        if validate and os.path.isfile(settings.crm_mon_schema):
+            get_compiled_schema(
+                etree.RelaxNG, settings.crm_mon_schema
+            ).assertValid(dom)
         return dom
     except (etree.XMLSyntaxError, etree.DocumentInvalid):
         raise LibraryError(reports.cluster_state_invalid_format())
@@ -160,31 +178,137 @@ class ClusterState(_Element):
         self.dom = get_cluster_state_dom(xml)
         super(ClusterState, self).__init__(self.dom)
 
-def _id_xpath_predicate(resource_id):
-    return """(@id="{0}" or starts-with(@id, "{0}:"))""".format(resource_id)
+class ClusterStateIndex(object):
+    """
+    Resources of a cluster state indexed by their ids for fast repeated
+    lookups, built in one pass over the crm_mon xml
+    """
+    def __init__(self, cluster_state):
+        """
+        etree cluster_state -- status of the cluster
+        """
+        # document order of resources, clones and bundles
+        self._position = {}
+        # resources and groups by their ids and ids without clone instance
+        # suffixes
+        self._resources = defaultdict(list)
+        self._groups = defaultdict(list)
+        # clones and bundles by their exact ids
+        self._clones = defaultdict(list)
+        self._bundles = defaultdict(list)
+        for position, element in enumerate(cluster_state.iterdescendants()):
+            if element.tag == "resource":
+                self._position[element] = position
+                for key in self._get_id_keys(element):
+                    self._resources[key].append(element)
+            elif element.tag == "group":
+                for key in self._get_id_keys(element):
+                    self._groups[key].append(element)
+            elif element.tag == "clone":
+                self._position[element] = position
+                self._clones[element.get("id")].append(element)
+            elif element.tag == "bundle":
+                self._position[element] = position
+                self._bundles[element.get("id")].append(element)
+
+    @staticmethod
+    def _get_id_keys(element):
+        # an element matches an id or the id followed by ":" and anything
+        element_id = element.get("id")
+        if element_id is None:
+            return []
+        key_list = [element_id]
+        position = element_id.find(":")
+        while position != -1:
+            key_list.append(element_id[:position])
+            position = element_id.find(":", position + 1)
+        return key_list
+
+    def _in_document_order(self, primitive_list):
+        return sorted(set(primitive_list), key=self._position.get)
+
+    @staticmethod
+    def _get_group_primitives(group):
+        return [child for child in group if child.tag == "resource"]
+
+    def get_primitives_for_state_check(self, resource_id, expected_running):
+        """
+        Return not failed primitive elements which represent the resource
+
+        string resource_id -- id of a resource
+        bool expected_running -- which primitive represents a running group
+        """
+        group_index = -1 if expected_running else 0
+        primitive_list = list(self._resources.get(resource_id, []))
+        for group in self._groups.get(resource_id, []):
+            group_primitives = self._get_group_primitives(group)
+            if group_primitives:
+                primitive_list.append(group_primitives[group_index])
+        for clone in self._clones.get(resource_id, []):
+            for child in clone:
+                if child.tag == "resource":
+                    primitive_list.append(child)
+                elif child.tag == "group":
+                    group_primitives = self._get_group_primitives(child)
+                    if group_primitives:
+                        primitive_list.append(group_primitives[group_index])
+        for bundle in self._bundles.get(resource_id, []):
+            for replica in bundle.iterchildren("replica"):
+                primitive_list.extend(replica.iterchildren("resource"))
+        return [
+            element for element in self._in_document_order(primitive_list)
+                if not is_true(element.attrib.get("failed", ""))
+        ]
+
+    def is_resource_managed(self, resource_id):
+        """
+        Check if the resource is managed
+
+        string resource_id -- id of the resource
+        """
+        primitive_list = list(self._resources.get(resource_id, []))
+        for group in self._groups.get(resource_id, []):
+            primitive_list.extend(self._get_group_primitives(group))
+        if primitive_list:
+            for primitive in self._in_document_order(primitive_list):
+                if is_false(primitive.attrib.get("managed", "")):
+                    return False
+                parent = find_parent(primitive, ["clone", "bundle"])
+                if (
+                    parent is not None
+                    and
+                    is_false(parent.attrib.get("managed", ""))
+                ):
+                    return False
+            return True
+
+        parent_list = (
+            self._clones.get(resource_id, [])
+            +
+            self._bundles.get(resource_id, [])
+        )
+        if parent_list:
+            parent = min(parent_list, key=self._position.get)
+            if is_false(parent.attrib.get("managed", "")):
+                return False
+            for primitive in parent.iterdescendants("resource"):
+                if is_false(primitive.attrib.get("managed", "")):
+                    return False
+            return True
+
+        raise ResourceNotFound(resource_id)
+
+def _get_index(cluster_state):
+    if isinstance(cluster_state, ClusterStateIndex):
+        return cluster_state
+    return ClusterStateIndex(cluster_state)
 
 def _get_primitives_for_state_check(
     cluster_state, resource_id, expected_running
 ):
-    primitives = cluster_state.xpath("""
-        .//resource[{predicate_id}]
-        |
-        .//group[{predicate_id}]/resource[{predicate_position}]
-        |
-        .//clone[@id="{id}"]/resource
-        |
-        .//clone[@id="{id}"]/group/resource[{predicate_position}]
-        |
-        .//bundle[@id="{id}"]/replica/resource
-    """.format(
-        id=resource_id,
-        predicate_id=_id_xpath_predicate(resource_id),
-        predicate_position=("last()" if expected_running else "1")
-    ))
-    return [
-        element for element in primitives
-            if not is_true(element.attrib.get("failed", ""))
-    ]
+    return _get_index(cluster_state).get_primitives_for_state_check(
+        resource_id, expected_running
+    )
 
 def _get_primitive_roles_with_nodes(primitive_el_list):
     # Clone resources are represented by multiple primitive elements.
@@ -249,40 +373,7 @@ def is_resource_managed(cluster_state, resource_id):
     """
     Check if the resource is managed
 
-    etree cluster_state -- status of the cluster
+    etree|ClusterStateIndex cluster_state -- status of the cluster
     string resource_id -- id of the resource
     """
-    primitive_list = cluster_state.xpath("""
-        .//resource[{predicate_id}]
-        |
-        .//group[{predicate_id}]/resource
-        """.format(predicate_id=_id_xpath_predicate(resource_id))
-    )
-    if primitive_list:
-        for primitive in primitive_list:
-            if is_false(primitive.attrib.get("managed", "")):
-                return False
-            parent = find_parent(primitive, ["clone", "bundle"])
-            if (
-                parent is not None
-                and
-                is_false(parent.attrib.get("managed", ""))
-            ):
-                return False
-        return True
-
-    parent_list = cluster_state.xpath("""
-        .//clone[@id="{0}"]
-        |
-        .//bundle[@id="{0}"]
-        """.format(resource_id)
-    )
-    for parent in parent_list:
-        if is_false(parent.attrib.get("managed", "")):
-            return False
-        for primitive in parent.xpath(".//resource"):
-            if is_false(primitive.attrib.get("managed", "")):
-                return False
-        return True
-
-    raise ResourceNotFound(resource_id)
+    return _get_index(cluster_state).is_resource_managed(resource_id)
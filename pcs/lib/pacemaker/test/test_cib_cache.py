@@ -0,0 +1,61 @@
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+)
+
+from lxml import etree
+
+from pcs.lib.pacemaker.cib_cache import CibCache
+from pcs.test.tools.pcs_unittest import TestCase
+
+
+CIB_XML = (
+    '<cib admin_epoch="0" epoch="5" num_updates="2">'
+    '<configuration/>'
+    '</cib>'
+)
+
+
+class CibCacheTest(TestCase):
+    def setUp(self):
+        self.cache = CibCache()
+
+    def test_empty(self):
+        self.assertIsNone(self.cache.version)
+        self.assertIsNone(self.cache.get((0, 5, 2)))
+        self.assertIsNone(self.cache.get(None))
+
+    def test_get_stored(self):
+        self.cache.store(CIB_XML, etree.fromstring(CIB_XML))
+        self.assertEqual((0, 5, 2), self.cache.version)
+        cib_xml, cib = self.cache.get((0, 5, 2))
+        self.assertEqual(CIB_XML, cib_xml)
+        self.assertEqual(CIB_XML, etree.tostring(cib).decode())
+
+    def test_version_mismatch(self):
+        self.cache.store(CIB_XML, etree.fromstring(CIB_XML))
+        self.assertIsNone(self.cache.get((0, 5, 3)))
+        self.assertIsNone(self.cache.get((0, 6, 0)))
+
+    def test_returned_tree_is_a_copy(self):
+        stored = etree.fromstring(CIB_XML)
+        self.cache.store(CIB_XML, stored)
+        stored.append(etree.Element("status"))
+        dummy_xml, cib = self.cache.get((0, 5, 2))
+        cib.find("configuration").append(etree.Element("resources"))
+        self.assertEqual(
+            CIB_XML, etree.tostring(self.cache.get((0, 5, 2))[1]).decode()
+        )
+
+    def test_store_without_version(self):
+        self.cache.store(CIB_XML, etree.fromstring(CIB_XML))
+        self.cache.store("<cib />", etree.fromstring("<cib />"))
+        self.assertIsNone(self.cache.version)
+        self.assertIsNone(self.cache.get((0, 5, 2)))
+
+    def test_clear(self):
+        self.cache.store(CIB_XML, etree.fromstring(CIB_XML))
+        self.cache.clear()
+        self.assertIsNone(self.cache.version)
+        self.assertIsNone(self.cache.get((0, 5, 2)))
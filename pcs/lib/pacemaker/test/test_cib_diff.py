@@ -0,0 +1,337 @@
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+)
+
+from copy import deepcopy
+import os.path
+
+from lxml import etree
+
+from pcs import settings
+from pcs.lib.pacemaker.cib_diff import create_patchset
+from pcs.lib.pacemaker.live import diff_cibs_xml
+from pcs.test.tools.assertions import assert_xml_equal
+from pcs.test.tools.custom_mock import MockLibraryReportProcessor
+from pcs.test.tools.misc import (
+    get_test_resource as rc,
+    runner,
+)
+from pcs.test.tools.pcs_unittest import TestCase, skipUnless
+from pcs.test.tools.xml import etree_to_str
+
+
+CIB = """
+    <cib admin_epoch="0" epoch="5" num_updates="2" crm_feature_set="3.0.9">
+        <configuration>
+            <resources>
+                <primitive id="A" class="ocf" provider="pacemaker"
+                    type="Dummy"
+                />
+                <primitive id="B" class="ocf" provider="pacemaker"
+                    type="Dummy"
+                >
+                    <meta_attributes id="B-meta">
+                        <nvpair id="B-meta-a" name="a" value="1"/>
+                    </meta_attributes>
+                </primitive>
+                <primitive id="C" class="ocf" provider="pacemaker"
+                    type="Dummy"
+                />
+            </resources>
+            <constraints/>
+        </configuration>
+        <status/>
+    </cib>
+"""
+
+VERSION = """
+    <version>
+        <source admin_epoch="0" epoch="5" num_updates="2"/>
+        <target admin_epoch="0" epoch="5" num_updates="2"/>
+    </version>
+"""
+
+
+def _patchset(changes):
+    return '<diff format="2">{0}{1}</diff>'.format(VERSION, changes)
+
+
+class CreatePatchset(TestCase):
+    def setUp(self):
+        self.cib_old = etree.fromstring(CIB)
+        self.cib_new = deepcopy(self.cib_old)
+        self.resources = self.cib_new.find("configuration/resources")
+
+    def assert_patchset(self, expected_changes):
+        assert_xml_equal(
+            _patchset(expected_changes),
+            etree_to_str(create_patchset(self.cib_old, self.cib_new))
+        )
+
+    def test_no_change(self):
+        self.assertIsNone(create_patchset(self.cib_old, self.cib_new))
+
+    def test_version_is_not_a_change(self):
+        self.cib_new.set("epoch", "6")
+        self.cib_new.set("num_updates", "0")
+        self.assertIsNone(create_patchset(self.cib_old, self.cib_new))
+
+    def test_does_not_modify_new_cib(self):
+        self.cib_new.set("epoch", "6")
+        create_patchset(self.cib_old, self.cib_new)
+        self.assertEqual("6", self.cib_new.get("epoch"))
+
+    def test_create(self):
+        self.resources.insert(1, etree.Element("primitive", id="D"))
+        self.assert_patchset("""
+            <change operation="create"
+                path="/cib/configuration/resources" position="1"
+            >
+                <primitive id="D"/>
+            </change>
+        """)
+
+    def test_create_copies_whole_subtree(self):
+        constraints = self.cib_new.find("configuration/constraints")
+        rsc_set = etree.SubElement(
+            etree.SubElement(constraints, "rsc_order", id="O"),
+            "resource_set",
+            id="O-set",
+        )
+        etree.SubElement(rsc_set, "resource_ref", id="A")
+        self.assert_patchset("""
+            <change operation="create"
+                path="/cib/configuration/constraints" position="0"
+            >
+                <rsc_order id="O">
+                    <resource_set id="O-set">
+                        <resource_ref id="A"/>
+                    </resource_set>
+                </rsc_order>
+            </change>
+        """)
+
+    def test_delete(self):
+        self.resources.remove(self.resources.find("primitive[@id='B']"))
+        self.assert_patchset("""
+            <change operation="delete"
+                path="/cib/configuration/resources/primitive[@id='B']"
+            />
+        """)
+
+    def test_delete_element_without_id(self):
+        self.cib_new.find("configuration").remove(
+            self.cib_new.find("configuration/constraints")
+        )
+        self.assert_patchset("""
+            <change operation="delete" path="/cib/configuration/constraints"/>
+        """)
+
+    def test_delete_comment(self):
+        self.cib_old.find("configuration/resources").insert(
+            1, etree.Comment("comment")
+        )
+        self.assert_patchset("""
+            <change operation="delete"
+                path="/cib/configuration/resources/comment" position="1"
+            />
+        """)
+
+    def test_modify(self):
+        # like pacemaker, report attributes whose position has changed
+        nvpair = self.resources.find(".//nvpair")
+        nvpair.set("value", "2")
+        nvpair.set("description", "desc")
+        self.resources.find("primitive[@id='C']").attrib.pop("provider")
+        self.assert_patchset("""
+            <change operation="modify" path="/cib/configuration/resources/primitive[@id='B']/meta_attributes[@id='B-meta']/nvpair[@id='B-meta-a']">
+                <change-list>
+                    <change-attr name="value" operation="set" value="2"/>
+                    <change-attr name="description" operation="set"
+                        value="desc"
+                    />
+                </change-list>
+                <change-result>
+                    <nvpair id="B-meta-a" name="a" value="2"
+                        description="desc"
+                    />
+                </change-result>
+            </change>
+            <change operation="modify"
+                path="/cib/configuration/resources/primitive[@id='C']"
+            >
+                <change-list>
+                    <change-attr name="type" operation="set" value="Dummy"/>
+                    <change-attr name="provider" operation="unset"/>
+                </change-list>
+                <change-result>
+                    <primitive id="C" class="ocf" type="Dummy"/>
+                </change-result>
+            </change>
+        """)
+
+    def test_modify_root(self):
+        self.cib_new.set("epoch", "6")
+        self.cib_new.set("crm_feature_set", "3.0.14")
+        self.assert_patchset("""
+            <change operation="modify" path="/cib">
+                <change-list>
+                    <change-attr name="crm_feature_set" operation="set"
+                        value="3.0.14"
+                    />
+                </change-list>
+                <change-result>
+                    <cib admin_epoch="0" epoch="5" num_updates="2"
+                        crm_feature_set="3.0.14"
+                    />
+                </change-result>
+            </change>
+        """)
+
+    def test_move(self):
+        # like pacemaker, report a move of a shifted sibling as well
+        self.resources.insert(0, self.resources.find("primitive[@id='C']"))
+        self.assert_patchset("""
+            <change operation="move"
+                path="/cib/configuration/resources/primitive[@id='C']"
+                position="0"
+            />
+            <change operation="move"
+                path="/cib/configuration/resources/primitive[@id='A']"
+                position="1"
+            />
+        """)
+
+    def test_changes_order(self):
+        self.resources.remove(self.resources.find("primitive[@id='A']"))
+        self.resources.find("primitive[@id='B']").set("description", "desc")
+        etree.SubElement(self.resources, "primitive", id="D")
+        self.assert_patchset("""
+            <change operation="delete"
+                path="/cib/configuration/resources/primitive[@id='A']"
+            />
+            <change operation="modify"
+                path="/cib/configuration/resources/primitive[@id='B']"
+            >
+                <change-list>
+                    <change-attr name="description" operation="set"
+                        value="desc"
+                    />
+                </change-list>
+                <change-result>
+                    <primitive id="B" class="ocf" provider="pacemaker"
+                        type="Dummy" description="desc"
+                    />
+                </change-result>
+            </change>
+            <change operation="create"
+                path="/cib/configuration/resources" position="2"
+            >
+                <primitive id="D"/>
+            </change>
+        """)
+
+
+def _add_resource(cib):
+    primitive = etree.SubElement(
+        cib.find("configuration/resources"),
+        "primitive",
+        id="conformance-R",
+        type="Dummy",
+        provider="pacemaker",
+    )
+    primitive.set("class", "ocf")
+    operations = etree.SubElement(primitive, "operations")
+    etree.SubElement(
+        operations,
+        "op",
+        id="conformance-R-monitor",
+        name="monitor",
+        interval="10s",
+    )
+
+def _remove_first_resource(cib):
+    resources = cib.find("configuration/resources")
+    if len(resources):
+        resources.remove(resources[0])
+
+def _modify_resources(cib):
+    for primitive in cib.findall(".//primitive")[:5]:
+        primitive.set("description", "conformance")
+        primitive.attrib.pop("provider", None)
+
+def _move_last_resource_first(cib):
+    resources = cib.find("configuration/resources")
+    if len(resources) > 1:
+        resources.insert(0, resources[-1])
+
+def _change_nodes(cib):
+    nodes = cib.find("configuration/nodes")
+    if len(nodes):
+        nodes.remove(nodes[-1])
+    etree.SubElement(nodes, "node", id="100", uname="conformance-node")
+
+def _change_root(cib):
+    cib.set("epoch", str(int(cib.get("epoch", "0")) + 1))
+    cib.set("crm_feature_set", "3.0.14")
+
+def _combined(cib):
+    for modifier in (
+        _remove_first_resource, _add_resource, _modify_resources,
+        _move_last_resource_first, _change_nodes, _change_root,
+    ):
+        modifier(cib)
+
+def _is_crm_diff_available():
+    return os.path.exists(os.path.join(settings.pacemaker_binaries, "crm_diff"))
+
+@skipUnless(_is_crm_diff_available(), "crm_diff is not available")
+class ConformanceWithCrmDiff(TestCase):
+    """
+    The native patchset must be the same as the one produced by crm_diff
+    """
+    fixture_list = [
+        "cib-empty.xml",
+        "cib-empty-2.0.xml",
+        "cib-empty-2.8.xml",
+        "cib-empty-withnodes.xml",
+        "cib-large.xml",
+    ]
+    modifier_list = [
+        _add_resource,
+        _remove_first_resource,
+        _modify_resources,
+        _move_last_resource_first,
+        _change_nodes,
+        _change_root,
+        _combined,
+    ]
+
+    def assert_conforms(self, fixture, modifier):
+        with open(rc(fixture)) as cib_file:
+            cib_old_xml = cib_file.read()
+        cib_old = etree.fromstring(cib_old_xml)
+        cib_new = deepcopy(cib_old)
+        modifier(cib_new)
+        crm_diff_xml = diff_cibs_xml(
+            runner,
+            MockLibraryReportProcessor(),
+            cib_old_xml,
+            etree_to_str(cib_new),
+        )
+        native_patchset = create_patchset(cib_old, cib_new)
+        explanation = "{0}: {1}".format(fixture, modifier.__name__)
+        if not crm_diff_xml:
+            self.assertIsNone(native_patchset, explanation)
+            return
+        self.assertIsNotNone(native_patchset, explanation)
+        assert_xml_equal(
+            crm_diff_xml, etree_to_str(native_patchset), explanation
+        )
+
+    def test_conformance(self):
+        for fixture in self.fixture_list:
+            for modifier in self.modifier_list:
+                self.assert_conforms(fixture, modifier)
@@ -204,6 +204,34 @@ class GetCibXmlTest(LibraryPacemakerTest):
             ]
         )
 
+class GetCibRootXmlTest(LibraryPacemakerTest):
+    def test_success(self):
+        expected_stdout = '<cib epoch="1" num_updates="2" admin_epoch="0"/>'
+        mock_runner = get_runner(expected_stdout, "", 0)
+
+        real_xml = lib.get_cib_root_xml(mock_runner)
+
+        mock_runner.run.assert_called_once_with([
+            self.path("cibadmin"), "--local", "--query", "--xpath", "/cib",
+            "--no-children"
+        ])
+        self.assertEqual(expected_stdout, real_xml)
+
+    def test_error(self):
+        mock_runner = get_runner("some info", "some error", 1)
+
+        assert_raise_library_error(
+            lambda: lib.get_cib_root_xml(mock_runner),
+            (
+                Severity.ERROR,
+                report_codes.CIB_LOAD_ERROR,
+                {
+                    "reason": "some error\nsome info",
+                }
+            )
+        )
+
+
 class GetCibTest(LibraryPacemakerTest):
     def test_success(self):
         xml = "<xml />"
@@ -97,6 +97,53 @@ class ClusterStatusTest(TestBase):
         )
 
 
+def fixture_schema(root_name):
+    return etree.RelaxNG(etree.fromstring("""
+        <grammar xmlns="http://relaxng.org/ns/structure/1.0">
+            <start>
+                <element name="{0}"><ref name="any"/></element>
+            </start>
+            <define name="any">
+                <zeroOrMore>
+                    <choice>
+                        <attribute><anyName/></attribute>
+                        <text/>
+                        <element><anyName/><ref name="any"/></element>
+                    </choice>
+                </zeroOrMore>
+            </define>
+        </grammar>
+    """.format(root_name)))
+
+@mock.patch("pcs.lib.pacemaker.state.os.path.isfile", lambda path: True)
+@mock.patch("pcs.lib.pacemaker.state.get_compiled_schema")
+class GetClusterStateDom(TestCase):
+    def setUp(self):
+        with open(rc("crm_mon.minimal.xml")) as state_file:
+            self.xml = state_file.read()
+
+    def test_validate(self, mock_get_schema):
+        mock_get_schema.return_value = fixture_schema("crm_mon")
+        dom = state.get_cluster_state_dom(self.xml)
+        self.assertEqual("crm_mon", dom.tag)
+        mock_get_schema.assert_called_once_with(
+            etree.RelaxNG, state.settings.crm_mon_schema
+        )
+
+    def test_refuse_invalid_document(self, mock_get_schema):
+        mock_get_schema.return_value = fixture_schema("other")
+        assert_raise_library_error(
+            lambda: state.get_cluster_state_dom(self.xml),
+            (severities.ERROR, report_codes.BAD_CLUSTER_STATE_FORMAT, {})
+        )
+
+    def test_skip_validation(self, mock_get_schema):
+        mock_get_schema.return_value = fixture_schema("other")
+        dom = state.get_cluster_state_dom(self.xml, validate=False)
+        self.assertEqual("crm_mon", dom.tag)
+        mock_get_schema.assert_not_called()
+
+
 class WorkWithClusterStatusNodesTest(TestBase):
     def fixture_node_string(self, **kwargs):
         attrs = dict(name='name', id='id', type='member')
@@ -490,6 +537,50 @@ class GetPrimitivesForStateCheck(TestCase):
         self.assert_primitives("B2-R2", ["B2-R2", "B2-R2"], False)
 
 
+class ClusterStateIndexPrimitivesForStateCheck(GetPrimitivesForStateCheck):
+    def setUp(self):
+        super(ClusterStateIndexPrimitivesForStateCheck, self).setUp()
+        self.index = state.ClusterStateIndex(self.status)
+
+    def assert_primitives(self, resource_id, primitive_ids, expected_running):
+        # one index serves all the lookups
+        self.assertEqual(
+            [
+                elem.attrib["id"]
+                for elem in self.index.get_primitives_for_state_check(
+                    resource_id, expected_running
+                )
+            ],
+            primitive_ids
+        )
+
+    def test_nested_instance_suffix(self):
+        status = etree.fromstring("""
+            <crm_mon>
+                <resources>
+                    <resource id="R:a:0" failed="false" />
+                    <resource id="R:a" failed="false" />
+                    <resource id="Ra:0" failed="false" />
+                </resources>
+            </crm_mon>
+        """)
+        index = state.ClusterStateIndex(status)
+        self.assertEqual(
+            ["R:a:0", "R:a"],
+            [
+                elem.attrib["id"]
+                for elem in index.get_primitives_for_state_check("R", True)
+            ]
+        )
+        self.assertEqual(
+            ["R:a:0", "R:a"],
+            [
+                elem.attrib["id"]
+                for elem in index.get_primitives_for_state_check("R:a", True)
+            ]
+        )
+
+
 class CommonResourceState(TestCase):
     resource_id = "R"
     def setUp(self):
@@ -961,3 +1052,16 @@ class IsResourceManaged(TestCase):
         self.assert_managed("R46", False)
         self.assert_managed("R47", False)
         self.assert_managed("R48", False)
+
+
+class ClusterStateIndexIsResourceManaged(IsResourceManaged):
+    def setUp(self):
+        super(ClusterStateIndexIsResourceManaged, self).setUp()
+        self.index = state.ClusterStateIndex(self.status)
+
+    def assert_managed(self, resource, managed):
+        # one index serves all the lookups
+        self.assertEqual(
+            managed,
+            state.is_resource_managed(self.index, resource)
+        )
@@ -518,6 +518,25 @@ def node_communication_debug_info(target, data):
     )
 
 
+def node_communication_connection_pool_stats(hits, misses, evictions, idle):
+    """
+    Node communication connection pool counters, debug info
+    int hits -- number of requests which reused a pooled connection handle
+    int misses -- number of requests which needed a new connection handle
+    int evictions -- number of handles closed due to pool size or idle time
+    int idle -- number of handles currently waiting in the pool
+    """
+    return ReportItem.debug(
+        report_codes.NODE_COMMUNICATION_CONNECTION_POOL_STATS,
+        info={
+            "hits": hits,
+            "misses": misses,
+            "evictions": evictions,
+            "idle": idle,
+        }
+    )
+
+
 def node_communication_not_connected(node, reason):
     """
     an error occured when connecting to a remote node, debug info
@@ -2571,6 +2590,23 @@ def unable_to_upgrade_cib_to_required_version(
         }
     )
 
+
+def cib_upgrade_with_pending_changes(current_version, required_version):
+    """
+    CIB cannot be upgraded as it has been modified in a transaction and the
+    changes have not been pushed yet.
+
+    pcs.common.tools.Version current_version -- current version of CIB schema
+    pcs.common.tools.Version required_version -- required version of CIB schema
+    """
+    return ReportItem.error(
+        report_codes.CIB_UPGRADE_WITH_PENDING_CHANGES,
+        info={
+            "required_version": str(required_version),
+            "current_version": str(current_version)
+        }
+    )
+
 def file_already_exists(
         file_role, file_path, severity=ReportItemSeverity.ERROR,
         forceable=None, node=None
@@ -13,12 +13,44 @@ from pcs import settings
 from pcs.common import report_codes
 from pcs.common.tools import xml_fromstring
 from pcs.lib import reports
+from pcs.lib.agent_metadata_cache import AgentMetadataCache
 from pcs.lib.errors import LibraryError, ReportItemSeverity
+from pcs.lib.external import CommandTimeoutError
 from pcs.lib.pacemaker.values import is_true
 
 
 _crm_resource = os.path.join(settings.pacemaker_binaries, "crm_resource")
 
+# Persistent cache of agents' metadata shared by pcs processes. It is disabled
+# until enable_metadata_cache is called.
+_metadata_cache = None
+
+
+def enable_metadata_cache(cache_dir):
+    """
+    Store agents' metadata to and load them from a persistent cache
+
+    string cache_dir -- directory of the cache
+    """
+    global _metadata_cache
+    # agents' metadata are loaded by crm_resource, a new pacemaker version
+    # may produce different metadata
+    _metadata_cache = AgentMetadataCache(cache_dir, _crm_resource)
+
+
+def disable_metadata_cache():
+    global _metadata_cache
+    _metadata_cache = None
+
+
+def clear_metadata_cache():
+    """
+    Remove all cached agents' metadata
+    """
+    if _metadata_cache is not None:
+        _metadata_cache.invalidate()
+
+
 # Operation monitor is required always! No matter if --no-default-ops was
 # entered or if agent does not specify it. See
 # http://clusterlabs.org/doc/en-US/Pacemaker/1.1-pcs/html-single/Pacemaker_Explained/index.html#_resource_operations
@@ -76,6 +108,9 @@ class ResourceAgentError(Exception):
 class UnableToGetAgentMetadata(ResourceAgentError):
     pass
 
+class AgentMetadataTimedOut(UnableToGetAgentMetadata):
+    pass
+
 class InvalidResourceAgentName(ResourceAgentError):
     pass
 
@@ -593,14 +628,51 @@ class Agent(object):
             or parse its metadata
         """
         if self._metadata is None:
-            self._metadata = self._parse_metadata(self._load_metadata())
+            self._metadata = self._parse_metadata(self._load_cached_metadata())
         return self._metadata
 
 
+    def _load_cached_metadata(self):
+        agent_path = self._get_agent_path()
+        if _metadata_cache is None or agent_path is None:
+            return self._load_metadata()
+        metadata = _metadata_cache.get(self.get_name(), agent_path)
+        if metadata is None:
+            metadata = self._load_metadata()
+            _metadata_cache.put(self.get_name(), agent_path, metadata)
+        return metadata
+
+
+    def _get_agent_path(self):
+        """
+        Return path to the agent's file or None if it is unknown, metadata of
+        agents with an unknown file are not cached
+        """
+        return None
+
+
     def _load_metadata(self):
         raise NotImplementedError()
 
 
+    def _run_metadata_command(self, args, env_extend=None):
+        """
+        Run a command printing the agent's metadata, an agent which hangs
+        cannot block pcs
+        """
+        try:
+            return self._runner.run(
+                args,
+                env_extend=env_extend,
+                timeout=settings.agent_metadata_timeout
+            )
+        except CommandTimeoutError as e:
+            raise AgentMetadataTimedOut(
+                self.get_name(),
+                "timed out after {0} seconds".format(e.timeout)
+            )
+
+
     def _parse_metadata(self, metadata):
         try:
             dom = xml_fromstring(metadata)
@@ -609,7 +681,9 @@ class Agent(object):
             # and/or agents are fixed.
             # When enabling this check for overrides in child classes.
             #if os.path.isfile(settings.agent_metadata_schema):
-            #    etree.DTD(file=settings.agent_metadata_schema).assertValid(dom)
+            #    get_compiled_schema(
+            #        etree.DTD, settings.agent_metadata_schema
+            #    ).assertValid(dom)
             return dom
         except (etree.XMLSyntaxError, etree.DocumentInvalid) as e:
             raise UnableToGetAgentMetadata(self.get_name(), str(e))
@@ -663,8 +737,12 @@ class StonithdMetadata(FakeAgentMetadata):
         return parameter
 
 
+    def _get_agent_path(self):
+        return settings.stonithd_binary
+
+
     def _load_metadata(self):
-        stdout, stderr, dummy_retval = self._runner.run(
+        stdout, stderr, dummy_retval = self._run_metadata_command(
             [settings.stonithd_binary, "metadata"]
         )
         metadata = stdout.strip()
@@ -673,6 +751,45 @@ class StonithdMetadata(FakeAgentMetadata):
         return metadata
 
 
+class PacemakerDaemonMetadata(FakeAgentMetadata):
+    """
+    Provides access to metadata of a pacemaker daemon, e.g. pengine
+    """
+    def __init__(self, runner, name, binary):
+        """
+        CommandRunner runner
+        string name -- name of the daemon
+        string binary -- path to the daemon's binary
+        """
+        super(PacemakerDaemonMetadata, self).__init__(runner)
+        self._name = name
+        self._binary = binary
+
+
+    def get_name(self):
+        return self._name
+
+
+    def get_parameter_elements(self):
+        """
+        Return elements describing the daemon's options
+        """
+        return self._get_metadata().findall("./parameters/parameter")
+
+
+    def _get_agent_path(self):
+        return self._binary
+
+
+    def _load_metadata(self):
+        stdout, stderr, retval = self._run_metadata_command(
+            [self._binary, "metadata"]
+        )
+        if retval != 0:
+            raise UnableToGetAgentMetadata(self.get_name(), stderr.strip())
+        return stdout.strip()
+
+
 class CrmAgent(Agent):
     #pylint:disable=abstract-method
     def __init__(self, runner, name):
@@ -726,7 +843,7 @@ class CrmAgent(Agent):
             # otherwise heartbeat and cluster-glue agents don't work
             "/usr/bin/",
         ])
-        stdout, stderr, retval = self._runner.run(
+        stdout, stderr, retval = self._run_metadata_command(
             [_crm_resource, "--show-metadata", self._get_full_name()],
             env_extend={
                 "PATH": env_path,
@@ -747,6 +864,15 @@ class ResourceAgent(CrmAgent):
     def get_name(self):
         return self._get_full_name()
 
+    def _get_agent_path(self):
+        if self.get_standard() != "ocf":
+            return None
+        return os.path.join(
+            settings.ocf_resource_agents_dir,
+            self.get_provider(),
+            self.get_type()
+        )
+
     def get_parameters(self):
         parameters = super(ResourceAgent, self).get_parameters()
         if (
@@ -819,6 +945,9 @@ class ResourceAgent(CrmAgent):
 
 
 class AbsentAgentMixin(object):
+    def _get_agent_path(self):
+        return None
+
     def _load_metadata(self):
         return "<resource-agent/>"
 
@@ -849,6 +978,9 @@ class StonithAgent(CrmAgent):
     def get_name(self):
         return self.get_type()
 
+    def _get_agent_path(self):
+        return os.path.join(settings.fence_agent_binaries, self.get_type())
+
     def get_parameters(self):
         return (
             self._filter_parameters(
@@ -958,7 +1090,7 @@ def resource_agent_error_to_report_item(
     Transform ResourceAgentError to ReportItem
     """
     force = None
-    if e.__class__ == UnableToGetAgentMetadata:
+    if isinstance(e, UnableToGetAgentMetadata):
         if severity == ReportItemSeverity.ERROR and forceable:
             force = report_codes.FORCE_METADATA_ISSUE
         return reports.unable_to_get_agent_metadata(
@@ -0,0 +1,135 @@
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+)
+
+import os
+import os.path
+import shutil
+import tempfile
+
+from pcs.lib.agent_metadata_cache import AgentMetadataCache
+from pcs.test.tools.pcs_unittest import TestCase
+
+
+AGENT_NAME = "ocf:pacemaker:Dummy"
+METADATA = "<resource-agent><shortdesc>Dummy</shortdesc></resource-agent>"
+
+
+class AgentMetadataCacheTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, "cache")
+        self.agent_path = os.path.join(self.tmp_dir, "Dummy")
+        self.pacemaker_path = os.path.join(self.tmp_dir, "crm_resource")
+        self.write_file(self.agent_path, "agent", 1000)
+        self.write_file(self.pacemaker_path, "pacemaker", 1000)
+        self.cache = AgentMetadataCache(self.cache_dir, self.pacemaker_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    @staticmethod
+    def write_file(path, content, mtime):
+        with open(path, "w") as a_file:
+            a_file.write(content)
+        os.utime(path, (mtime, mtime))
+
+    def list_cache_dir(self):
+        return os.listdir(self.cache_dir)
+
+    def test_empty(self):
+        self.assertIsNone(self.cache.get(AGENT_NAME, self.agent_path))
+
+    def test_put_and_get(self):
+        self.cache.put(AGENT_NAME, self.agent_path, METADATA)
+        self.assertEqual(
+            METADATA, self.cache.get(AGENT_NAME, self.agent_path)
+        )
+        self.assertEqual(1, len(self.list_cache_dir()))
+
+    def test_shared_by_instances(self):
+        self.cache.put(AGENT_NAME, self.agent_path, METADATA)
+        self.assertEqual(
+            METADATA,
+            AgentMetadataCache(self.cache_dir, self.pacemaker_path).get(
+                AGENT_NAME, self.agent_path
+            )
+        )
+
+    def test_other_agent(self):
+        self.cache.put(AGENT_NAME, self.agent_path, METADATA)
+        self.assertIsNone(self.cache.get("ocf:heartbeat:Dummy", self.agent_path))
+
+    def test_rewrite(self):
+        self.cache.put(AGENT_NAME, self.agent_path, METADATA)
+        self.cache.put(AGENT_NAME, self.agent_path, "<resource-agent/>")
+        self.assertEqual(
+            "<resource-agent/>", self.cache.get(AGENT_NAME, self.agent_path)
+        )
+        self.assertEqual(1, len(self.list_cache_dir()))
+
+    def test_agent_changed(self):
+        self.cache.put(AGENT_NAME, self.agent_path, METADATA)
+        self.write_file(self.agent_path, "agent", 2000)
+        self.assertIsNone(self.cache.get(AGENT_NAME, self.agent_path))
+
+    def test_agent_size_changed(self):
+        self.cache.put(AGENT_NAME, self.agent_path, METADATA)
+        self.write_file(self.agent_path, "new agent", 1000)
+        self.assertIsNone(self.cache.get(AGENT_NAME, self.agent_path))
+
+    def test_pacemaker_changed(self):
+        self.cache.put(AGENT_NAME, self.agent_path, METADATA)
+        self.write_file(self.pacemaker_path, "pacemaker", 2000)
+        self.assertIsNone(self.cache.get(AGENT_NAME, self.agent_path))
+
+    def test_agent_missing(self):
+        missing_path = os.path.join(self.tmp_dir, "missing")
+        self.cache.put(AGENT_NAME, missing_path, METADATA)
+        self.assertIsNone(self.cache.get(AGENT_NAME, missing_path))
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    def test_pacemaker_missing(self):
+        os.remove(self.pacemaker_path)
+        self.cache.put(AGENT_NAME, self.agent_path, METADATA)
+        self.assertIsNone(self.cache.get(AGENT_NAME, self.agent_path))
+
+    def test_corrupted_entry(self):
+        self.cache.put(AGENT_NAME, self.agent_path, METADATA)
+        entry_path = os.path.join(self.cache_dir, self.list_cache_dir()[0])
+        with open(entry_path, "w") as entry_file:
+            entry_file.write("{ garbage")
+        self.assertIsNone(self.cache.get(AGENT_NAME, self.agent_path))
+
+    def test_cache_dir_cannot_be_created(self):
+        cache = AgentMetadataCache(
+            os.path.join(self.tmp_dir, "missing", "cache"),
+            self.pacemaker_path
+        )
+        cache.put(AGENT_NAME, self.agent_path, METADATA)
+        self.assertIsNone(cache.get(AGENT_NAME, self.agent_path))
+
+    def test_invalidate_agent(self):
+        self.cache.put(AGENT_NAME, self.agent_path, METADATA)
+        self.cache.put("ocf:heartbeat:Dummy", self.agent_path, METADATA)
+        self.cache.invalidate(AGENT_NAME)
+        self.assertIsNone(self.cache.get(AGENT_NAME, self.agent_path))
+        self.assertEqual(
+            METADATA, self.cache.get("ocf:heartbeat:Dummy", self.agent_path)
+        )
+
+    def test_invalidate_all(self):
+        self.cache.put(AGENT_NAME, self.agent_path, METADATA)
+        self.cache.put("ocf:heartbeat:Dummy", self.agent_path, METADATA)
+        self.cache.invalidate()
+        self.assertIsNone(self.cache.get(AGENT_NAME, self.agent_path))
+        self.assertIsNone(
+            self.cache.get("ocf:heartbeat:Dummy", self.agent_path)
+        )
+        self.assertEqual([], self.list_cache_dir())
+
+    def test_invalidate_missing_cache_dir(self):
+        self.cache.invalidate()
+        self.cache.invalidate(AGENT_NAME)
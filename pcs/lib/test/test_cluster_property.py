@@ -0,0 +1,187 @@
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+)
+
+from lxml import etree
+
+from pcs.common import report_codes
+from pcs.lib import cluster_property
+from pcs.lib.errors import ReportItemSeverity as severity
+from pcs.lib.external import CommandRunner
+from pcs.test.tools.assertions import assert_raise_library_error
+from pcs.test.tools.pcs_unittest import TestCase, mock
+
+
+def fixture_metadata(name, parameters):
+    return """
+        <resource-agent name="{0}">
+            <parameters>{1}</parameters>
+        </resource-agent>
+    """.format(name, parameters)
+
+METADATA = {
+    "/usr/libexec/pacemaker/pengine": fixture_metadata(
+        "pengine",
+        """
+        <parameter name="no-quorum-policy" unique="0">
+            <shortdesc lang="en">What to do when the cluster does not have quorum</shortdesc>
+            <content type="enum" default="stop"/>
+            <longdesc lang="en">What to do when the cluster does not have quorum  Allowed values: stop, freeze, ignore, suicide</longdesc>
+        </parameter>
+        <parameter name="default-resource-stickiness" unique="0">
+            <shortdesc lang="en"></shortdesc>
+            <content type="integer" default="0"/>
+            <longdesc lang="en"></longdesc>
+        </parameter>
+        """
+    ),
+    "/usr/libexec/pacemaker/crmd": fixture_metadata(
+        "crmd",
+        """
+        <parameter name="dc-version" unique="0">
+            <shortdesc lang="en">Version of Pacemaker on the DC</shortdesc>
+            <content type="string" default="none"/>
+        </parameter>
+        <parameter name="cluster-delay" unique="0">
+            <shortdesc lang="en">Delay</shortdesc>
+            <content type="time" default="60s"/>
+            <longdesc lang="en">Round trip delay over the network</longdesc>
+        </parameter>
+        """
+    ),
+    "/usr/libexec/pacemaker/cib": fixture_metadata("cib", ""),
+}
+
+
+class GetClusterPropertiesDefinition(TestCase):
+    def setUp(self):
+        self.runner = mock.MagicMock(spec_set=CommandRunner)
+        self.runner.run.side_effect = (
+            lambda args, **kwargs: (METADATA[args[0]], "", 0)
+        )
+
+    def test_success(self):
+        self.assertEqual(
+            {
+                "no-quorum-policy": {
+                    "name": "no-quorum-policy",
+                    "shortdesc":
+                        "What to do when the cluster does not have quorum",
+                    "longdesc": "",
+                    "type": "enum",
+                    "default": "stop",
+                    "enum": ["stop", "freeze", "ignore", "suicide"],
+                    "source": "pengine",
+                    "advanced": False,
+                    "readable_name": "No Quorum Policy",
+                },
+                "default-resource-stickiness": {
+                    "name": "default-resource-stickiness",
+                    "shortdesc": "",
+                    "longdesc": "",
+                    "type": "integer",
+                    "default": "0",
+                    "source": "pengine",
+                    "advanced": True,
+                    "readable_name": "default-resource-stickiness",
+                },
+                "cluster-delay": {
+                    "name": "cluster-delay",
+                    "shortdesc": "Delay",
+                    "longdesc": "Round trip delay over the network",
+                    "type": "time",
+                    "default": "60s",
+                    "source": "crmd",
+                    "advanced": False,
+                    "readable_name": "Cluster Delay",
+                },
+            },
+            cluster_property.get_cluster_properties_definition(self.runner)
+        )
+        self.assertEqual(
+            sorted(METADATA.keys()),
+            sorted(call[1][0][0] for call in self.runner.run.mock_calls)
+        )
+
+    def test_daemon_failure(self):
+        def run(args, **kwargs):
+            if args[0] == "/usr/libexec/pacemaker/crmd":
+                return "", "crmd error", 1
+            return METADATA[args[0]], "", 0
+        self.runner.run.side_effect = run
+        assert_raise_library_error(
+            lambda: cluster_property.get_cluster_properties_definition(
+                self.runner
+            ),
+            (
+                severity.ERROR,
+                report_codes.UNABLE_TO_GET_AGENT_METADATA,
+                {
+                    "agent": "crmd",
+                    "reason": "crmd error",
+                },
+            )
+        )
+
+    def test_invalid_metadata(self):
+        def run(args, **kwargs):
+            if args[0] == "/usr/libexec/pacemaker/cib":
+                return "not xml", "", 0
+            return METADATA[args[0]], "", 0
+        self.runner.run.side_effect = run
+        assert_raise_library_error(
+            lambda: cluster_property.get_cluster_properties_definition(
+                self.runner
+            ),
+            (
+                severity.ERROR,
+                report_codes.UNABLE_TO_GET_AGENT_METADATA,
+                {
+                    "agent": "cib",
+                    "reason": mock.ANY,
+                },
+            )
+        )
+
+
+class GetPropertyFromElement(TestCase):
+    def test_enum(self):
+        el = etree.fromstring("""
+        <parameter name="no-quorum-policy" unique="0">
+            <shortdesc lang="en">What to do when the cluster does not have quorum</shortdesc>
+            <content type="enum" default="stop"/>
+            <longdesc lang="en">What to do when the cluster does not have quorum  Allowed values: stop, freeze, ignore, suicide</longdesc>
+        </parameter>
+        """)
+        expected = {
+            "name": "no-quorum-policy",
+            "shortdesc": "What to do when the cluster does not have quorum",
+            "longdesc": "",
+            "type": "enum",
+            "default": "stop",
+            "enum": ["stop", "freeze", "ignore", "suicide"]
+        }
+        self.assertEqual(
+            expected, cluster_property._get_property_from_element(el)
+        )
+
+    def test_basic(self):
+        el = etree.fromstring("""
+        <parameter name="default-resource-stickiness" unique="0">
+            <shortdesc lang="en"></shortdesc>
+            <content type="integer" default="0"/>
+            <longdesc lang="en"></longdesc>
+        </parameter>
+        """)
+        expected = {
+            "name": "default-resource-stickiness",
+            "shortdesc": "",
+            "longdesc": "",
+            "type": "integer",
+            "default": "0"
+        }
+        self.assertEqual(
+            expected, cluster_property._get_property_from_element(el)
+        )
@@ -11,6 +11,12 @@ from lxml import etree
 from pcs.common import report_codes
 from pcs.common.tools import Version
 from pcs.lib.env import LibraryEnvironment
+from pcs.lib.errors import LibraryError
+from pcs.lib.pacemaker.cib_cache import CibCache
+from pcs.lib.pacemaker.cib_diff import (
+    CIB_DIFF_CRM_DIFF,
+    CIB_DIFF_NATIVE,
+)
 from pcs.test.tools import fixture
 from pcs.test.tools.assertions import  assert_xml_equal
 from pcs.test.tools.command_env import get_env_tools
@@ -157,6 +163,7 @@ class PushLoadedCib(TestCase, ManageCibAssertionMixin):
         self.cib_can_diff = "cib-empty-2.0.xml"
         self.cib_cannot_diff = "cib-empty-1.2.xml"
         self.env_assist, self.config = get_env_tools(test_case=self)
+        self.config.env.set_cib_diff_engine(CIB_DIFF_CRM_DIFF)
 
     def config_load_and_push_diff(self):
         (self.config
@@ -425,6 +432,226 @@ class PushLoadedCib(TestCase, ManageCibAssertionMixin):
         )
 
 
+class PushLoadedCibNativeDiff(TestCase):
+    def setUp(self):
+        self.env_assist, self.config = get_env_tools(test_case=self)
+        self.config.env.set_cib_diff_engine(CIB_DIFF_NATIVE)
+        self.config.runner.cib.load(filename="cib-empty-2.0.xml")
+
+    def test_push_patchset(self):
+        self.config.runner.cib.push_diff(cib_diff="""
+            <diff format="2">
+                <version>
+                    <source admin_epoch="0" epoch="557" num_updates="122"/>
+                    <target admin_epoch="0" epoch="557" num_updates="122"/>
+                </version>
+                <change operation="create"
+                    path="/cib/configuration/resources" position="0"
+                >
+                    <primitive id="R"/>
+                </change>
+            </diff>
+        """)
+        env = self.env_assist.get_env()
+
+        cib = env.get_cib()
+        etree.SubElement(
+            cib.find("configuration/resources"), "primitive", id="R"
+        )
+        env.push_cib()
+
+    def test_nothing_to_push(self):
+        env = self.env_assist.get_env()
+
+        env.get_cib()
+        env.push_cib()
+
+    def test_push_fails(self):
+        self.config.runner.cib.push_diff(
+            cib_diff="""
+                <diff format="2">
+                    <version>
+                        <source admin_epoch="0" epoch="557" num_updates="122"/>
+                        <target admin_epoch="0" epoch="557" num_updates="122"/>
+                    </version>
+                    <change operation="delete"
+                        path="/cib/configuration/resources"
+                    />
+                </diff>
+            """,
+            stderr="invalid cib",
+            returncode=1
+        )
+        env = self.env_assist.get_env()
+
+        cib = env.get_cib()
+        cib.find("configuration").remove(cib.find("configuration/resources"))
+        self.env_assist.assert_raise_library_error(
+            env.push_cib,
+            [
+                fixture.error(
+                    report_codes.CIB_PUSH_ERROR,
+                    reason="invalid cib",
+                )
+            ],
+            expected_in_processor=False
+        )
+
+
+def _create_primitive_patchset(*resource_id_list):
+    return """
+        <diff format="2">
+            <version>
+                <source admin_epoch="0" epoch="557" num_updates="122"/>
+                <target admin_epoch="0" epoch="557" num_updates="122"/>
+            </version>
+            {0}
+        </diff>
+    """.format("".join([
+        """
+            <change operation="create"
+                path="/cib/configuration/resources" position="{0}"
+            >
+                <primitive id="{1}"/>
+            </change>
+        """.format(position, resource_id)
+        for position, resource_id in enumerate(resource_id_list)
+    ]))
+
+def _add_primitive(env, resource_id, minimal_version=None):
+    # mimics a lib command
+    cib = env.get_cib(minimal_version)
+    etree.SubElement(
+        cib.find("configuration/resources"), "primitive", id=resource_id
+    )
+    env.push_cib()
+
+
+class CibTransaction(TestCase):
+    wait_timeout = 10
+    def setUp(self):
+        self.env_assist, self.config = get_env_tools(test_case=self)
+        self.config.env.set_cib_diff_engine(CIB_DIFF_NATIVE)
+
+    def test_commands_share_one_load_and_push(self):
+        (self.config
+            .runner.cib.load(filename="cib-empty-2.0.xml")
+            .runner.cib.push_diff(cib_diff=_create_primitive_patchset("A", "B"))
+        )
+        env = self.env_assist.get_env()
+
+        with env.cib_transaction():
+            _add_primitive(env, "A")
+            self.assertEqual(
+                ["A"],
+                [el.get("id") for el in env.cib.findall(".//primitive")]
+            )
+            _add_primitive(env, "B")
+
+    def test_wait(self):
+        (self.config
+            .runner.pcmk.can_wait()
+            .runner.cib.load(filename="cib-empty-2.0.xml")
+            .runner.cib.push_diff(cib_diff=_create_primitive_patchset("A"))
+            .runner.pcmk.wait(timeout=self.wait_timeout)
+        )
+        env = self.env_assist.get_env()
+
+        with env.cib_transaction(wait=self.wait_timeout):
+            _add_primitive(env, "A")
+
+    def test_nothing_pushed_without_changes(self):
+        self.config.runner.cib.load(filename="cib-empty-2.0.xml")
+        env = self.env_assist.get_env()
+
+        with env.cib_transaction():
+            env.get_cib()
+        # the environment can be used again
+        self.assertRaises(AssertionError, lambda: env.cib)
+
+    def test_nothing_pushed_on_error(self):
+        self.config.runner.cib.load(filename="cib-empty-2.0.xml")
+        env = self.env_assist.get_env()
+
+        def run_transaction():
+            with env.cib_transaction():
+                _add_primitive(env, "A")
+                raise LibraryError()
+        self.assertRaises(LibraryError, run_transaction)
+        self.assertRaises(AssertionError, lambda: env.cib)
+
+    def test_upgrade_without_changes(self):
+        (self.config
+            .runner.cib.load(name="load_cib_old", filename="cib-empty-2.6.xml")
+            .runner.cib.upgrade()
+            .runner.cib.load(filename="cib-empty-2.8.xml")
+            .runner.cib.push_diff(cib_diff=_create_primitive_patchset("A"))
+        )
+        env = self.env_assist.get_env()
+
+        with env.cib_transaction():
+            env.get_cib()
+            _add_primitive(env, "A", Version(2, 8, 0))
+        self.env_assist.assert_reports(
+            [fixture.info(report_codes.CIB_UPGRADE_SUCCESSFUL)]
+        )
+
+    def test_upgrade_with_pending_changes(self):
+        self.config.runner.cib.load(filename="cib-empty-2.6.xml")
+        env = self.env_assist.get_env()
+
+        def run_transaction():
+            with env.cib_transaction():
+                _add_primitive(env, "A")
+                _add_primitive(env, "B", Version(2, 8, 0))
+        self.env_assist.assert_raise_library_error(
+            run_transaction,
+            [
+                fixture.error(
+                    report_codes.CIB_UPGRADE_WITH_PENDING_CHANGES,
+                    current_version="2.6",
+                    required_version="2.8.0",
+                ),
+            ],
+            expected_in_processor=False
+        )
+
+    def test_no_upgrade_needed(self):
+        (self.config
+            .runner.cib.load(filename="cib-empty-2.8.xml")
+            .runner.cib.push_diff(cib_diff=_create_primitive_patchset("A", "B"))
+        )
+        env = self.env_assist.get_env()
+
+        with env.cib_transaction():
+            _add_primitive(env, "A")
+            _add_primitive(env, "B", Version(2, 8, 0))
+
+    def test_command_cannot_wait(self):
+        env = self.env_assist.get_env()
+        with env.cib_transaction():
+            self.assertRaises(
+                AssertionError,
+                lambda: env.ensure_wait_satisfiable(self.wait_timeout)
+            )
+
+    def test_command_cannot_push_custom_cib(self):
+        env = self.env_assist.get_env()
+        with env.cib_transaction():
+            self.assertRaises(
+                AssertionError,
+                lambda: env.push_cib(etree.XML("<custom_cib />"))
+            )
+
+    def test_cannot_be_nested(self):
+        env = self.env_assist.get_env()
+        def run_nested():
+            with env.cib_transaction():
+                with env.cib_transaction():
+                    pass
+        self.assertRaises(AssertionError, run_nested)
+
+
 class PushCustomCib(TestCase, ManageCibAssertionMixin):
     custom_cib = "<custom_cib />"
     wait_timeout = 10
@@ -507,3 +734,116 @@ class PushCibMockedWithWait(TestCase):
             ],
             expected_in_processor=False
         )
+
+
+class GetCibCached(TestCase):
+    def setUp(self):
+        self.env_assist, self.config = get_env_tools(test_case=self)
+        self.config.env.set_cib_diff_engine(CIB_DIFF_CRM_DIFF)
+        self.cache = CibCache()
+        self.config.env.set_cib_cache(self.cache)
+
+    def fixture_cache(self, filename="cib-empty.xml"):
+        cib_xml = open(rc(filename)).read()
+        self.cache.store(cib_xml, etree.fromstring(cib_xml))
+        return cib_xml
+
+    def test_store_loaded_cib(self):
+        # the cache is empty, the version of the live CIB is not checked
+        self.config.runner.cib.load()
+        cib = self.env_assist.get_env().get_cib()
+        self.assertEqual((0, 557, 122), self.cache.version)
+        cib_xml, cib_cached = self.cache.get((0, 557, 122))
+        self.assertEqual(
+            self.config.calls.get("runner.cib.load").stdout, cib_xml
+        )
+        assert_xml_equal(etree_to_str(cib), etree_to_str(cib_cached))
+
+    def test_cache_hit(self):
+        cib_xml = self.fixture_cache()
+        self.config.runner.cib.load_root()
+        cib = self.env_assist.get_env().get_cib()
+        assert_xml_equal(cib_xml, etree_to_str(cib))
+        cib.find("configuration").clear()
+        assert_xml_equal(
+            cib_xml, etree_to_str(self.cache.get((0, 557, 122))[1])
+        )
+
+    def test_cache_stale(self):
+        self.fixture_cache("cib-empty-2.0.xml")
+        (self.config
+            .runner.cib.load_root(num_updates=123)
+            .runner.cib.load(filename="cib-empty-2.8.xml")
+        )
+        cib = self.env_assist.get_env().get_cib()
+        self.assertEqual("pacemaker-2.8", cib.get("validate-with"))
+        self.assertEqual(
+            "pacemaker-2.8",
+            self.cache.get((0, 557, 122))[1].get("validate-with")
+        )
+
+    def test_not_used_with_cib_file(self):
+        self.fixture_cache()
+        self.config.env.set_cib_data(open(rc("cib-empty-2.8.xml")).read())
+        self.config.runner.cib.load(filename="cib-empty-2.8.xml")
+        cib = self.env_assist.get_env().get_cib()
+        self.assertEqual("pacemaker-2.8", cib.get("validate-with"))
+        self.assertEqual(
+            "pacemaker-2.0",
+            self.cache.get((0, 557, 122))[1].get("validate-with")
+        )
+
+
+class PushCibCached(TestCase):
+    def setUp(self):
+        tmpfile_patcher = mock.patch("pcs.lib.pacemaker.live.write_tmpfile")
+        self.addCleanup(tmpfile_patcher.stop)
+        self.mock_write_tmpfile = tmpfile_patcher.start()
+        self.tmpfile_old = mock_tmpfile("old.cib")
+        self.tmpfile_new = mock_tmpfile("new.cib")
+        self.mock_write_tmpfile.side_effect = [
+            self.tmpfile_old, self.tmpfile_new
+        ]
+        self.env_assist, self.config = get_env_tools(test_case=self)
+        self.config.env.set_cib_diff_engine(CIB_DIFF_CRM_DIFF)
+
+    def config_load_and_push(self):
+        (self.config
+            .runner.cib.load(filename="cib-empty-2.0.xml")
+            .runner.cib.diff(self.tmpfile_old.name, self.tmpfile_new.name)
+            .runner.cib.push_diff()
+        )
+
+    def get_and_push(self):
+        env = self.env_assist.get_env()
+        cib = env.get_cib()
+        etree.SubElement(
+            cib.find("configuration/resources"), "primitive", id="R"
+        )
+        env.push_cib()
+        self.env_assist.assert_reports([
+            fixture.debug(report_codes.TMP_FILE_WRITE, file_path=file_path)
+            for file_path in (self.tmpfile_old.name, self.tmpfile_new.name)
+        ])
+
+    def test_pushed_cib_not_cached(self):
+        cache = CibCache()
+        self.config.env.set_cib_cache(cache)
+        # no version queries around the push
+        self.config_load_and_push()
+        self.get_and_push()
+        self.assertEqual(None, cache.version)
+
+    def test_no_cache(self):
+        self.config_load_and_push()
+        self.get_and_push()
+
+    def test_push_custom_cib_clears_cache(self):
+        cache = CibCache()
+        self.config.env.set_cib_cache(cache)
+        self.config.runner.cib.push_independent("<custom_cib />")
+        cache.store("<cib/>", etree.fromstring(
+            '<cib admin_epoch="0" epoch="1" num_updates="0"/>'
+        ))
+        self.env_assist.get_env().push_cib(etree.XML("<custom_cib />"))
+        self.assertEqual(None, cache.version)
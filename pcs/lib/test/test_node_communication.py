@@ -24,6 +24,7 @@ from pcs.common import (
     report_codes,
 )
 from pcs.common.node_communicator import (
+    ConnectionPoolStats,
     Request,
     RequestData,
     RequestTarget,
@@ -410,6 +411,29 @@ class CommunicatorLoggerTest(TestCase):
         )
         self.assertEqual(logger_calls, self.logger.mock_calls)
 
+    def test_log_response_no_debug_data(self):
+        response = Response.connection_successful(
+            MockCurlSimple(
+                info={pycurl.RESPONSE_CODE: 200},
+                output=b"data",
+                request=fixture_request(),
+            )
+        )
+        self.com_logger.log_response(response)
+        self.reporter.assert_reports(
+            fixture_report_item_list_connected(
+                response.request.url, 200, "data"
+            )
+        )
+        self.assertEqual(
+            [
+                fixture_logger_call_connected(
+                    response.request.url, 200, "data"
+                )
+            ],
+            self.logger.mock_calls
+        )
+
     @mock.patch("pcs.lib.node_communication.is_proxy_set")
     def test_log_response_not_connected(self, mock_proxy):
         mock_proxy.return_value = False
@@ -537,3 +561,57 @@ class CommunicatorLoggerTest(TestCase):
         )
         self.assertEqual([logger_call], self.logger.mock_calls)
 
+
+    def test_log_connection_pool_stats(self):
+        self.com_logger.log_connection_pool_stats(
+            ConnectionPoolStats(hits=3, misses=2, evictions=1, idle=4)
+        )
+        self.reporter.assert_reports([(
+            severity.DEBUG,
+            report_codes.NODE_COMMUNICATION_CONNECTION_POOL_STATS,
+            {
+                "hits": 3,
+                "misses": 2,
+                "evictions": 1,
+                "idle": 4,
+            },
+            None
+        )])
+        logger_call = mock.call.debug(
+            "Connection pool: 3 reused, 2 new, 1 evicted, 4 idle"
+        )
+        self.assertEqual([logger_call], self.logger.mock_calls)
+
+
+class XmlResponseConsumerTest(TestCase):
+    def setUp(self):
+        self.consumer = lib.XmlResponseConsumer()
+        self.consumer.reset()
+
+    def test_chunks(self):
+        for chunk in [b"<cib><config", b"uration a='", b"1'/></cib>"]:
+            self.consumer.write(chunk)
+        root = self.consumer.get_root()
+        self.assertEqual("cib", root.tag)
+        self.assertEqual("1", root[0].get("a"))
+        self.assertEqual(
+            b"<cib><configuration a='1'/></cib>", self.consumer.head
+        )
+
+    def test_not_xml(self):
+        self.consumer.write(b"not xml")
+        self.consumer.write(b"<cib/>")
+        self.assertRaises(lib.etree.XMLSyntaxError, self.consumer.get_root)
+
+    def test_incomplete(self):
+        self.consumer.write(b"<cib><configuration>")
+        self.assertRaises(lib.etree.XMLSyntaxError, self.consumer.get_root)
+
+    def test_empty(self):
+        self.assertRaises(lib.etree.XMLSyntaxError, self.consumer.get_root)
+
+    def test_reset(self):
+        self.consumer.write(b"<cib><confi")
+        self.consumer.reset()
+        self.consumer.write(b"<cib/>")
+        self.assertEqual("cib", self.consumer.get_root().tag)
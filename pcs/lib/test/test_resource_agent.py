@@ -6,6 +6,10 @@ from __future__ import (
 
 from lxml import etree
 from functools import partial
+import os
+import os.path
+import shutil
+import tempfile
 
 from pcs.test.tools.assertions import (
     ExtendedAssertionsMixin,
@@ -18,10 +22,12 @@ from pcs.test.tools.misc import create_patcher
 from pcs.test.tools.pcs_unittest import TestCase, mock
 from pcs.test.tools.xml import XmlManipulation
 
+from pcs import settings
 from pcs.common import report_codes
 from pcs.lib import resource_agent as lib_ra
+from pcs.lib.agent_metadata_cache import AgentMetadataCache
 from pcs.lib.errors import ReportItemSeverity as severity, LibraryError
-from pcs.lib.external import CommandRunner
+from pcs.lib.external import CommandRunner, CommandTimeoutError
 
 patch_agent = create_patcher("pcs.lib.resource_agent")
 patch_agent_object = partial(mock.patch.object, lib_ra.Agent)
@@ -1483,7 +1489,9 @@ class StonithdMetadataGetMetadataTest(TestCase, ExtendedAssertionsMixin):
         )
 
         self.mock_runner.run.assert_called_once_with(
-            ["/usr/libexec/pacemaker/stonithd", "metadata"]
+            ["/usr/libexec/pacemaker/stonithd", "metadata"],
+            env_extend=None,
+            timeout=settings.agent_metadata_timeout,
         )
 
     def test_failed_to_get_xml(self):
@@ -1499,7 +1507,9 @@ class StonithdMetadataGetMetadataTest(TestCase, ExtendedAssertionsMixin):
         )
 
         self.mock_runner.run.assert_called_once_with(
-            ["/usr/libexec/pacemaker/stonithd", "metadata"]
+            ["/usr/libexec/pacemaker/stonithd", "metadata"],
+            env_extend=None,
+            timeout=settings.agent_metadata_timeout,
         )
 
     def test_invalid_xml(self):
@@ -1515,7 +1525,9 @@ class StonithdMetadataGetMetadataTest(TestCase, ExtendedAssertionsMixin):
         )
 
         self.mock_runner.run.assert_called_once_with(
-            ["/usr/libexec/pacemaker/stonithd", "metadata"]
+            ["/usr/libexec/pacemaker/stonithd", "metadata"],
+            env_extend=None,
+            timeout=settings.agent_metadata_timeout,
         )
 
 
@@ -1611,7 +1623,8 @@ class CrmAgentMetadataGetMetadataTest(TestCase, ExtendedAssertionsMixin):
             ],
              env_extend={
                  "PATH": "/usr/sbin/:/bin/:/usr/bin/",
-             }
+             },
+             timeout=settings.agent_metadata_timeout,
         )
 
     def test_failed_to_get_xml(self):
@@ -1634,7 +1647,8 @@ class CrmAgentMetadataGetMetadataTest(TestCase, ExtendedAssertionsMixin):
             ],
              env_extend={
                  "PATH": "/usr/sbin/:/bin/:/usr/bin/",
-             }
+             },
+             timeout=settings.agent_metadata_timeout,
         )
 
     def test_invalid_xml(self):
@@ -1657,10 +1671,29 @@ class CrmAgentMetadataGetMetadataTest(TestCase, ExtendedAssertionsMixin):
             ],
              env_extend={
                  "PATH": "/usr/sbin/:/bin/:/usr/bin/",
-             }
+             },
+             timeout=settings.agent_metadata_timeout,
         )
 
 
+class CrmAgentMetadataTimeoutTest(TestCase, ExtendedAssertionsMixin):
+    def test_timed_out(self):
+        mock_runner = mock.MagicMock(spec_set=CommandRunner)
+        mock_runner.run.side_effect = CommandTimeoutError(
+            "crm_resource --show-metadata STANDARD:TYPE", 30
+        )
+        agent = CrmAgentDescendant(mock_runner, "TYPE")
+        self.assert_raises(
+            lib_ra.AgentMetadataTimedOut,
+            agent._get_metadata,
+            {
+                "agent": "TYPE",
+                "message": "timed out after 30 seconds",
+            }
+        )
+        self.assertFalse(agent.is_valid_metadata())
+
+
 class CrmAgentMetadataIsValidAgentTest(TestCase):
     def setUp(self):
         self.mock_runner = mock.MagicMock(spec_set=CommandRunner)
@@ -1726,7 +1759,8 @@ class StonithAgentMetadataGetMetadataTest(TestCase, ExtendedAssertionsMixin):
             ],
              env_extend={
                  "PATH": "/usr/sbin/:/bin/:/usr/bin/",
-             }
+             },
+             timeout=settings.agent_metadata_timeout,
         )
 
 
@@ -1863,10 +1897,13 @@ class StonithAgentMetadataGetParametersTest(TestCase):
                 ],
                  env_extend={
                      "PATH": "/usr/sbin/:/bin/:/usr/bin/",
-                 }
+                 },
+                 timeout=settings.agent_metadata_timeout,
             ),
             mock.call(
-                ["/usr/libexec/pacemaker/stonithd", "metadata"]
+                ["/usr/libexec/pacemaker/stonithd", "metadata"],
+                env_extend=None,
+                timeout=settings.agent_metadata_timeout,
             ),
         ])
 
@@ -2175,3 +2212,97 @@ class AbsentResourceAgentTest(TestCase):
         self.assertEqual(([], []), absent.validate_parameters_values({
             "whatever": "anything"
         }))
+
+
+class AgentMetadataCacheTest(TestCase):
+    metadata = """
+        <resource-agent>
+            <shortdesc>cached</shortdesc>
+            <parameters><parameter name="test"/></parameters>
+        </resource-agent>
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.ocf_dir = os.path.join(self.tmp_dir, "resource.d")
+        os.makedirs(os.path.join(self.ocf_dir, "pacemaker"))
+        self.agent_path = os.path.join(self.ocf_dir, "pacemaker", "Dummy")
+        pacemaker_path = os.path.join(self.tmp_dir, "crm_resource")
+        for path in (self.agent_path, pacemaker_path):
+            with open(path, "w") as a_file:
+                a_file.write(path)
+        self.cache = AgentMetadataCache(
+            os.path.join(self.tmp_dir, "cache"), pacemaker_path
+        )
+        patcher_list = [
+            patch_agent("_metadata_cache", self.cache),
+            patch_agent(
+                "settings.ocf_resource_agents_dir", self.ocf_dir
+            ),
+        ]
+        for patcher in patcher_list:
+            self.addCleanup(patcher.stop)
+            patcher.start()
+        self.mock_runner = mock.MagicMock(spec_set=CommandRunner)
+        self.mock_runner.run.return_value = (self.metadata, "", 0)
+
+    def get_shortdesc(self, agent_class, name):
+        return agent_class(self.mock_runner, name).get_shortdesc()
+
+    def test_loaded_once(self):
+        for dummy_i in range(2):
+            self.assertEqual(
+                "cached",
+                self.get_shortdesc(lib_ra.ResourceAgent, "ocf:pacemaker:Dummy")
+            )
+        self.assertEqual(1, len(self.mock_runner.run.mock_calls))
+        self.assertEqual(
+            self.metadata.strip(),
+            self.cache.get("ocf:pacemaker:Dummy", self.agent_path)
+        )
+
+    def test_failure_not_cached(self):
+        self.mock_runner.run.return_value = ("", "error", 1)
+        agent = lib_ra.ResourceAgent(self.mock_runner, "ocf:pacemaker:Dummy")
+        self.assertFalse(agent.is_valid_metadata())
+        self.assertIsNone(
+            self.cache.get("ocf:pacemaker:Dummy", self.agent_path)
+        )
+
+    def test_missing_agent_not_cached(self):
+        for dummy_i in range(2):
+            self.get_shortdesc(lib_ra.ResourceAgent, "ocf:pacemaker:Stateful")
+        self.assertEqual(2, len(self.mock_runner.run.mock_calls))
+
+    def test_not_ocf_agent_not_cached(self):
+        for dummy_i in range(2):
+            self.get_shortdesc(lib_ra.ResourceAgent, "systemd:Dummy")
+        self.assertEqual(2, len(self.mock_runner.run.mock_calls))
+
+    def test_absent_agent_not_cached(self):
+        self.assertEqual(
+            "",
+            self.get_shortdesc(
+                lib_ra.AbsentResourceAgent, "ocf:pacemaker:Dummy"
+            )
+        )
+        self.assertEqual(
+            "cached",
+            self.get_shortdesc(lib_ra.ResourceAgent, "ocf:pacemaker:Dummy")
+        )
+        self.assertEqual(1, len(self.mock_runner.run.mock_calls))
+
+    def test_pacemaker_daemon_cached(self):
+        for dummy_i in range(2):
+            daemon = lib_ra.PacemakerDaemonMetadata(
+                self.mock_runner, "pengine", self.agent_path
+            )
+            self.assertEqual(
+                ["test"],
+                [
+                    element.get("name")
+                    for element in daemon.get_parameter_elements()
+                ]
+            )
+        self.assertEqual(1, len(self.mock_runner.run.mock_calls))
@@ -4,6 +4,10 @@ from __future__ import (
     print_function,
 )
 
+import os
+import shutil
+import tempfile
+
 from lxml import etree
 
 from pcs.lib import xml_tools as lib
@@ -79,6 +83,53 @@ class GetSubElementTest(TestCase):
         )
 
 
+RNG_ROOT = """
+    <element name="{0}" xmlns="http://relaxng.org/ns/structure/1.0">
+        <empty/>
+    </element>
+"""
+
+class GetCompiledSchema(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "schema.rng")
+        self.write_schema("a", 1000)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write_schema(self, root_name, mtime):
+        with open(self.path, "w") as schema_file:
+            schema_file.write(RNG_ROOT.format(root_name))
+        os.utime(self.path, (mtime, mtime))
+
+    def test_validates(self):
+        schema = lib.get_compiled_schema(etree.RelaxNG, self.path)
+        self.assertTrue(schema.validate(etree.fromstring("<a/>")))
+        self.assertFalse(schema.validate(etree.fromstring("<b/>")))
+
+    def test_cached(self):
+        self.assertIs(
+            lib.get_compiled_schema(etree.RelaxNG, self.path),
+            lib.get_compiled_schema(etree.RelaxNG, self.path)
+        )
+
+    def test_compiled_again_when_file_changes(self):
+        schema = lib.get_compiled_schema(etree.RelaxNG, self.path)
+        self.write_schema("b", 2000)
+        schema_changed = lib.get_compiled_schema(etree.RelaxNG, self.path)
+        self.assertIsNot(schema, schema_changed)
+        self.assertTrue(schema_changed.validate(etree.fromstring("<b/>")))
+
+    def test_missing_file(self):
+        self.assertRaises(
+            EnvironmentError,
+            lambda: lib.get_compiled_schema(
+                etree.RelaxNG, os.path.join(self.tmp_dir, "missing.rng")
+            )
+        )
+
+
 class UpdateAttributeRemoveEmpty(TestCase):
     def setUp(self):
         self.el = etree.Element(
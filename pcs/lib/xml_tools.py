@@ -4,12 +4,33 @@ from __future__ import (
     print_function,
 )
 
+import os
+
 from lxml import etree
 
+# (schema class, path) -> (mtime, compiled schema)
+_compiled_schema_cache = {}
+
 def get_root(tree):
     # ElementTree has getroot, Elemet has getroottree
     return tree.getroot() if hasattr(tree, "getroot") else tree.getroottree()
 
+def get_compiled_schema(schema_class, path):
+    """
+    Return a compiled schema loaded from a file. Compiled schemas are cached
+    for the whole process and compiled again only when their file changes.
+
+    class schema_class -- etree.RelaxNG, etree.DTD or etree.XMLSchema
+    string path -- path to the schema file
+    """
+    mtime = os.stat(path).st_mtime
+    key = (schema_class, path)
+    cached = _compiled_schema_cache.get(key)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, schema_class(file=path))
+        _compiled_schema_cache[key] = cached
+    return cached[1]
+
 def find_parent(element, tag_names):
     """
     Find parent of an element based on parent's tag name. Return the parent
@@ -5,13 +5,14 @@ from __future__ import (
 )
 
 import sys
-import xml.dom.minidom
 from xml.dom.minidom import parseString
 import re
 import textwrap
 import time
 import json
 
+from lxml import etree
+
 from pcs import (
     usage,
     utils,
@@ -113,8 +114,7 @@ def resource_cmd(argv):
             if len(argv_next) == 0:
                 usage.resource(["delete"])
                 sys.exit(1)
-            res_id = argv_next.pop(0)
-            resource_remove(res_id)
+            resource_remove_list(argv_next)
         elif sub_cmd == "show":
             resource_show(argv_next)
         elif sub_cmd == "group":
@@ -704,6 +704,9 @@ def resource_agents(lib, argv, modifiers):
 
     standard = argv[0] if argv else None
 
+    if modifiers["refresh_cache"]:
+        lib.resource_agent.clear_metadata_cache()
+
     agents = lib.resource_agent.list_agents_for_standard_and_provider(standard)
 
     if agents:
@@ -1180,7 +1183,9 @@ def resource_group(argv):
             sys.exit(1)
         group_name = argv.pop(0)
         resource_ids = argv
-        cib = resource_group_add(utils.get_cib_dom(), group_name, resource_ids)
+        cib = resource_group_add(
+            utils.get_cib_tree(), group_name, resource_ids
+        )
 
         if "--wait" in utils.pcs_options:
             wait_timeout = utils.validate_wait_get_timeout()
@@ -1484,252 +1489,243 @@ def resource_master_create(dom, argv, update=False, master_id=None):
     return dom, master_element.getAttribute("id")
 
 def resource_remove(resource_id, output=True, is_remove_remote_context=False):
-    def is_bundle_running(bundle_id):
-        roles_with_nodes = _get_primitive_roles_with_nodes(
-            _get_primitives_for_state_check(
-                get_cluster_state_dom(
-                    lib_pacemaker.get_cluster_status_xml(utils.cmd_runner())
-                ),
-                bundle_id,
-                expected_running=True
-            )
-        )
-        return True if roles_with_nodes else False
+    return resource_remove_list(
+        [resource_id], output, is_remove_remote_context
+    )
 
+def resource_remove_list(
+    resource_id_list, output=True, is_remove_remote_context=False
+):
+    """
+    Remove resources, their inner resources and references to them
+
+    Running resources are stopped in one disable and wait cycle. Everything
+    is removed from one loaded CIB which is then pushed at once as a diff.
+
+    list resource_id_list -- ids of primitives, groups, clones, masters or
+        bundles to remove
+    bool output -- print removed resources and constraints
+    bool is_remove_remote_context -- do not warn that removing a remote or
+        guest node needs more steps
+    """
     dom = utils.get_cib_dom()
-    # if resource is a clone or a master, work with its child instead
-    cloned_resource = utils.dom_get_clone_ms_resource(dom, resource_id)
-    if cloned_resource:
-        resource_id = cloned_resource.getAttribute("id")
-
-    bundle = utils.dom_get_bundle(dom, resource_id)
-    if bundle is not None:
-        primitive_el = utils.dom_get_resource_bundle(bundle)
-        if primitive_el is None:
-            print("Deleting bundle '{0}'".format(resource_id))
-        else:
-            print(
-                "Deleting bundle '{0}' and its inner resource '{1}'".format(
-                    resource_id,
-                    primitive_el.getAttribute("id")
+    removal_list = _get_resource_removal_list(dom, resource_id_list)
+    for kind, resource_id, primitive_id_list in removal_list:
+        if kind == "bundle":
+            if primitive_id_list:
+                print(
+                    "Deleting bundle '{0}' and its inner resource '{1}'"
+                    .format(resource_id, primitive_id_list[0])
                 )
+            else:
+                print("Deleting bundle '{0}'".format(resource_id))
+        elif kind == "group":
+            print(
+                "Removing group: " + resource_id
+                + " (and all resources within group)"
             )
-
-        if (
-            "--force" not in utils.pcs_options
-            and
-            not utils.usefile
-            and
-            is_bundle_running(resource_id)
-        ):
-            sys.stdout.write("Stopping bundle '{0}'... ".format(resource_id))
-            sys.stdout.flush()
-            lib = utils.get_library_wrapper()
-            lib.resource.disable([resource_id], False)
-            output, retval = utils.run(["crm_resource", "--wait"])
-            # pacemaker which supports bundles supports --wait as well
-            if is_bundle_running(resource_id):
-                msg = [
-                    "Unable to stop: %s before deleting "
-                    "(re-run with --force to force deletion)"
-                    % resource_id
-                ]
-                if retval != 0 and output:
-                    msg.append("\n" + output)
-                utils.err("\n".join(msg).strip())
-            print("Stopped")
-
-        if primitive_el is not None:
-            resource_remove(primitive_el.getAttribute("id"))
-        utils.replace_cib_configuration(
-            remove_resource_references(utils.get_cib_dom(), resource_id, output)
-        )
-        args = [
-            "cibadmin", "-o", "resources", "-D", "--xpath",
-            "//bundle[@id='{0}']".format(resource_id)
-        ]
-        dummy_cmdoutput, retVal = utils.run(args)
-        if retVal != 0:
-            utils.err("Unable to remove resource '{0}'".format(resource_id))
-        return True
-
-    if utils.does_exist('//group[@id="'+resource_id+'"]'):
-        print("Removing group: " + resource_id + " (and all resources within group)")
-        group = utils.get_cib_xpath('//group[@id="'+resource_id+'"]')
-        group_dom = parseString(group)
-        print("Stopping all resources in group: %s..." % resource_id)
-        resource_disable([resource_id])
-        if "--force" not in utils.pcs_options and not utils.usefile:
-            output, retval = utils.run(["crm_resource", "--wait"])
-            if retval != 0 and "unrecognized option '--wait'" in output:
-                output = ""
-                retval = 0
-                for res in reversed(
-                    group_dom.documentElement.getElementsByTagName("primitive")
-                ):
-                    res_id = res.getAttribute("id")
-                    res_stopped = False
-                    for _ in range(15):
-                        time.sleep(1)
-                        if not utils.resource_running_on(res_id)["is_running"]:
-                            res_stopped = True
-                            break
-                    if not res_stopped:
-                        break
-            stopped = True
-            state = utils.getClusterState()
-            for res in group_dom.documentElement.getElementsByTagName("primitive"):
-                res_id = res.getAttribute("id")
-                if utils.resource_running_on(res_id, state)["is_running"]:
-                    stopped = False
-                    break
-            if not stopped:
-                msg = [
-                    "Unable to stop group: %s before deleting "
-                    "(re-run with --force to force deletion)"
-                    % resource_id
-                ]
-                if retval != 0 and output:
-                    msg.append("\n" + output)
-                utils.err("\n".join(msg).strip())
-        for res in group_dom.documentElement.getElementsByTagName("primitive"):
-            resource_remove(res.getAttribute("id"))
-        sys.exit(0)
-
-    # now we know resource is not a group, a clone, a master nor a bundle
-    # because of the conditions above
-    if not utils.does_exist('//resources/descendant::primitive[@id="'+resource_id+'"]'):
-        utils.err("Resource '{0}' does not exist.".format(resource_id))
-
-    group_xpath = '//group/primitive[@id="'+resource_id+'"]/..'
-    group = utils.get_cib_xpath(group_xpath)
-    num_resources_in_group = 0
-
-    if (group != ""):
-        num_resources_in_group = len(parseString(group).documentElement.getElementsByTagName("primitive"))
+            print("Stopping all resources in group: %s..." % resource_id)
 
     if (
         "--force" not in utils.pcs_options
         and
         not utils.usefile
         and
-        utils.resource_running_on(resource_id)["is_running"]
+        _stop_resources_before_removal(removal_list)
     ):
-        sys.stdout.write("Attempting to stop: "+ resource_id + "... ")
-        sys.stdout.flush()
-        lib = utils.get_library_wrapper()
-        # we are not using wait from disable command, because if wait is not
-        # supported in pacemaker, we don't want error message but we try to
-        # simulate wait by waiting for resource to stop
-        lib.resource.disable([resource_id], False)
-        output, retval = utils.run(["crm_resource", "--wait"])
-        if retval != 0 and "unrecognized option '--wait'" in output:
-            output = ""
-            retval = 0
-            for _ in range(15):
-                time.sleep(1)
-                if not utils.resource_running_on(resource_id)["is_running"]:
-                    break
-        if utils.resource_running_on(resource_id)["is_running"]:
-            msg = [
-                "Unable to stop: %s before deleting "
-                "(re-run with --force to force deletion)"
-                % resource_id
-            ]
-            if retval != 0 and output:
-                msg.append("\n" + output)
-            utils.err("\n".join(msg).strip())
-        print("Stopped")
-
-    utils.replace_cib_configuration(
-        remove_resource_references(utils.get_cib_dom(), resource_id, output)
-    )
-    dom = utils.get_cib_dom()
-    resource_el = utils.dom_get_resource(dom, resource_id)
-    remote_node_name = None
-    if resource_el:
-        remote_node_name = utils.dom_get_resource_remote_node_name(resource_el)
-        if remote_node_name:
-            dom = constraint.remove_constraints_containing_node(
-                dom, remote_node_name, output
-            )
-            utils.replace_cib_configuration(dom)
-            dom = utils.get_cib_dom()
-
-    if (group == "" or num_resources_in_group > 1):
-        master_xpath = '//master/primitive[@id="'+resource_id+'"]/..'
-        clone_xpath = '//clone/primitive[@id="'+resource_id+'"]/..'
-        if utils.get_cib_xpath(clone_xpath) != "":
-            args = ["cibadmin", "-o", "resources", "-D", "--xpath", clone_xpath]
-        elif utils.get_cib_xpath(master_xpath) != "":
-            args = ["cibadmin", "-o", "resources", "-D", "--xpath", master_xpath]
-        else:
-            args = ["cibadmin", "-o", "resources", "-D", "--xpath", "//primitive[@id='"+resource_id+"']"]
-        if output == True:
-            print("Deleting Resource - " + resource_id)
-        output,retVal = utils.run(args)
-        if retVal != 0:
-            utils.err("unable to remove resource: %s, it may still be referenced in constraints." % resource_id)
-    else:
-        top_master_xpath = '//master/group/primitive[@id="'+resource_id+'"]/../..'
-        top_clone_xpath = '//clone/group/primitive[@id="'+resource_id+'"]/../..'
-        top_master = utils.get_cib_xpath(top_master_xpath)
-        top_clone = utils.get_cib_xpath(top_clone_xpath)
-        if top_master != "":
-            to_remove_xpath = top_master_xpath
-            msg = "and group and M/S"
-            to_remove_dom = parseString(top_master).getElementsByTagName("master")
-            to_remove_id = to_remove_dom[0].getAttribute("id")
-            utils.replace_cib_configuration(
-                remove_resource_references(
-                    utils.get_cib_dom(),
-                    to_remove_dom[0].getElementsByTagName("group")[0].getAttribute("id")
-                )
-            )
-        elif top_clone != "":
-            to_remove_xpath = top_clone_xpath
-            msg = "and group and clone"
-            to_remove_dom = parseString(top_clone).getElementsByTagName("clone")
-            to_remove_id = to_remove_dom[0].getAttribute("id")
-            utils.replace_cib_configuration(
-                remove_resource_references(
-                    utils.get_cib_dom(),
-                    to_remove_dom[0].getElementsByTagName("group")[0].getAttribute("id")
-                )
-            )
-        else:
-            to_remove_xpath = group_xpath
-            msg = "and group"
-            to_remove_dom = parseString(group).getElementsByTagName("group")
-            to_remove_id = to_remove_dom[0].getAttribute("id")
-
-        utils.replace_cib_configuration(
-            remove_resource_references(
-                utils.get_cib_dom(), to_remove_id, output
-            )
-        )
-
-        args = ["cibadmin", "-o", "resources", "-D", "--xpath", to_remove_xpath]
-        if output == True:
-            print("Deleting Resource ("+msg+") - " + resource_id)
-        dummy_cmdoutput,retVal = utils.run(args)
-        if retVal != 0:
-            if output == True:
-                utils.err("Unable to remove resource '%s' (do constraints exist?)" % (resource_id))
-            return False
-    if remote_node_name and not utils.usefile:
+        # disabling the resources has changed the CIB
+        dom = utils.get_cib_dom()
+    # the removal is pushed as a diff so concurrent changes are not overwritten
+    cib_original_xml = dom.toxml()
+
+    remote_node_list = []
+    for kind, resource_id, primitive_id_list in removal_list:
+        for primitive_id in primitive_id_list:
+            remote_node_name = _remove_primitive(dom, primitive_id, output)
+            if remote_node_name:
+                remote_node_list.append(remote_node_name)
+        if kind == "bundle":
+            bundle_el = utils.dom_get_bundle(dom, resource_id)
+            if bundle_el is not None:
+                remove_resource_references(dom, resource_id, output)
+                bundle_el.parentNode.removeChild(bundle_el)
+    utils.push_cib_diff(cib_original_xml, dom)
+
+    if remote_node_list and not utils.usefile:
         if not is_remove_remote_context:
             warn(
                 "This command is not sufficient for removing remote and guest "
                 "nodes. To complete the removal, remove pacemaker authkey and "
                 "stop and disable pacemaker_remote on the node(s) manually."
             )
-        output, retval = utils.run(["crm_resource", "--wait"])
-        output, retval = utils.run([
-            "crm_node", "--force", "--remove", remote_node_name
-        ])
+        utils.run(["crm_resource", "--wait"])
+        for remote_node_name in remote_node_list:
+            utils.run(["crm_node", "--force", "--remove", remote_node_name])
+    return True
+
+def _get_resource_removal_list(dom, resource_id_list):
+    # Return a list of (kind, resource id, list of primitive ids) describing
+    # what to remove. Clones and masters are removed together with their
+    # inner resource once it is gone, so they are represented by it.
+    resources_el = dom.getElementsByTagName("resources")[0]
+    removal_list = []
+    planned_primitive_set = set()
+    planned_bundle_set = set()
+    for resource_id in resource_id_list:
+        cloned_resource = utils.dom_get_clone_ms_resource(dom, resource_id)
+        if cloned_resource:
+            resource_id = cloned_resource.getAttribute("id")
+
+        bundle_el = utils.dom_get_bundle(dom, resource_id)
+        group_el = utils.dom_get_group(resources_el, resource_id)
+        if bundle_el is not None:
+            kind = "bundle"
+            primitive_el = utils.dom_get_resource_bundle(bundle_el)
+            primitive_id_list = (
+                [] if primitive_el is None
+                else [primitive_el.getAttribute("id")]
+            )
+        elif group_el:
+            kind = "group"
+            primitive_id_list = [
+                primitive_el.getAttribute("id")
+                for primitive_el in group_el.getElementsByTagName("primitive")
+            ]
+        elif utils.dom_get_resource(resources_el, resource_id):
+            kind = "primitive"
+            primitive_id_list = [resource_id]
+        else:
+            utils.err("Resource '{0}' does not exist.".format(resource_id))
+
+        # skip resources which have been specified more than once
+        if kind == "bundle":
+            if resource_id in planned_bundle_set:
+                continue
+            planned_bundle_set.add(resource_id)
+        elif planned_primitive_set.issuperset(primitive_id_list):
+            continue
+        removal_list.append((
+            kind,
+            resource_id,
+            [
+                primitive_id for primitive_id in primitive_id_list
+                if primitive_id not in planned_primitive_set
+            ],
+        ))
+        planned_primitive_set.update(primitive_id_list)
+    return removal_list
+
+def _stop_resources_before_removal(removal_list):
+    def get_running():
+        # one crm_mon run serves the check of all the resources
+        state_xml = utils.getClusterStateXml()
+        state = parseString(state_xml)
+        bundle_state = None
+        running_list = []
+        for kind, resource_id, primitive_id_list in removal_list:
+            if kind == "bundle":
+                if bundle_state is None:
+                    bundle_state = get_cluster_state_dom(state_xml)
+                is_running = _is_bundle_running(bundle_state, resource_id)
+            else:
+                is_running = any([
+                    utils.resource_running_on(primitive_id, state)["is_running"]
+                    for primitive_id in primitive_id_list
+                ])
+            if is_running:
+                running_list.append(resource_id)
+        return running_list
+
+    to_stop_list = get_running()
+    if not to_stop_list:
+        return False
+    sys.stdout.write(
+        "Attempting to stop: {0}... ".format(", ".join(to_stop_list))
+    )
+    sys.stdout.flush()
+    lib = utils.get_library_wrapper()
+    # we are not using wait from disable command, because if wait is not
+    # supported in pacemaker, we don't want error message but we try to
+    # simulate wait by waiting for resources to stop
+    lib.resource.disable(to_stop_list, False)
+    output, retval = utils.run(["crm_resource", "--wait"])
+    if retval != 0 and "unrecognized option '--wait'" in output:
+        output = ""
+        retval = 0
+        for _ in range(15):
+            time.sleep(1)
+            if not get_running():
+                break
+    still_running_list = get_running()
+    if still_running_list:
+        msg = [
+            "Unable to stop: %s before deleting "
+            "(re-run with --force to force deletion)"
+            % ", ".join(still_running_list)
+        ]
+        if retval != 0 and output:
+            msg.append("\n" + output)
+        utils.err("\n".join(msg).strip())
+    print("Stopped")
     return True
 
+def _is_bundle_running(cluster_state, bundle_id):
+    roles_with_nodes = _get_primitive_roles_with_nodes(
+        _get_primitives_for_state_check(
+            cluster_state,
+            bundle_id,
+            expected_running=True
+        )
+    )
+    return True if roles_with_nodes else False
+
+def _remove_primitive(dom, resource_id, output):
+    # Remove a primitive and references to it from the dom. Its group, clone
+    # or master is removed as well if it would be left empty. Return a name of
+    # a remote node defined by the primitive.
+    resource_el = constraint.get_resource_reference_index(dom).get_primitive(
+        resource_id
+    )
+    if resource_el is None:
+        return None
+    remove_resource_references(dom, resource_id, output)
+    remote_node_name = utils.dom_get_resource_remote_node_name(resource_el)
+    if remote_node_name:
+        constraint.remove_constraints_containing_node(
+            dom, remote_node_name, output
+        )
+
+    parent_el = resource_el.parentNode
+    to_remove_el = resource_el
+    message = "Deleting Resource - " + resource_id
+    if (
+        parent_el.tagName == "group"
+        and
+        len(parent_el.getElementsByTagName("primitive")) == 1
+    ):
+        top_el = parent_el.parentNode
+        if top_el.tagName in ["clone", "master"]:
+            remove_resource_references(dom, parent_el.getAttribute("id"))
+            to_remove_el = top_el
+            message = "Deleting Resource (and group and {0}) - {1}".format(
+                "M/S" if top_el.tagName == "master" else "clone",
+                resource_id
+            )
+        else:
+            to_remove_el = parent_el
+            message = "Deleting Resource (and group) - " + resource_id
+        remove_resource_references(
+            dom, to_remove_el.getAttribute("id"), output
+        )
+    elif parent_el.tagName in ["clone", "master"]:
+        to_remove_el = parent_el
+        remove_resource_references(dom, parent_el.getAttribute("id"), output)
+
+    if output:
+        print(message)
+    to_remove_el.parentNode.removeChild(to_remove_el)
+    return remote_node_name
+
 # moved to pcs.lib.cib.fencing_topology.remove_device_from_all_levels
 def stonith_level_rm_device(cib_dom, stn_id):
     topology_el_list = cib_dom.getElementsByTagName("fencing-topology")
@@ -1749,12 +1745,8 @@ def stonith_level_rm_device(cib_dom, stn_id):
     return cib_dom
 
 
-def remove_resource_references(
-    dom, resource_id, output=False, constraints_element=None
-):
-    constraint.remove_constraints_containing(
-        resource_id, output, constraints_element, dom
-    )
+def remove_resource_references(dom, resource_id, output=False):
+    constraint.remove_constraints_containing(resource_id, output, dom)
     stonith_level_rm_device(dom, resource_id)
     lib_acl.dom_remove_permissions_referencing(dom, resource_id)
     return dom
@@ -1811,38 +1803,43 @@ def resource_group_rm(cib_dom, group_name, resource_ids):
 
     return cib_dom
 
-def resource_group_add(cib_dom, group_name, resource_ids):
-    resources_element = cib_dom.getElementsByTagName("resources")[0]
+def resource_group_add(cib, group_name, resource_ids):
+    resources_element = cib.find(".//resources")
 
     name_valid, name_error = utils.validate_xml_id(group_name, 'group name')
     if not name_valid:
         utils.err(name_error)
 
-    mygroup = utils.dom_get_group(resources_element, group_name)
-    if not mygroup:
-        if utils.dom_get_resource(resources_element, group_name):
-            utils.err("'%s' is already a resource" % group_name)
-        if utils.dom_get_clone(resources_element, group_name):
-            utils.err("'%s' is already a clone resource" % group_name)
-        if utils.dom_get_master(resources_element, group_name):
-            utils.err("'%s' is already a master/slave resource" % group_name)
-        mygroup = cib_dom.createElement("group")
-        mygroup.setAttribute("id", group_name)
-        resources_element.appendChild(mygroup)
+    mygroup = utils.tree_get_element(resources_element, "group", group_name)
+    if mygroup is None:
+        for tag, message in (
+            ("primitive", "'%s' is already a resource"),
+            ("clone", "'%s' is already a clone resource"),
+            ("master", "'%s' is already a master/slave resource"),
+        ):
+            if utils.tree_get_element(
+                resources_element, tag, group_name
+            ) is not None:
+                utils.err(message % group_name)
+        mygroup = etree.SubElement(resources_element, "group", id=group_name)
 
     after = before = None
     if "--after" in utils.pcs_options and "--before" in utils.pcs_options:
         utils.err("you cannot specify both --before and --after")
     if "--after" in utils.pcs_options:
-        after = utils.dom_get_resource(mygroup, utils.pcs_options["--after"])
-        if not after:
+        after = utils.tree_get_element(
+            mygroup, "primitive", utils.pcs_options["--after"]
+        )
+        if after is None:
             utils.err(
                 "there is no resource '%s' in the group '%s'"
                 % (utils.pcs_options["--after"], group_name)
             )
     if "--before" in utils.pcs_options:
-        before = utils.dom_get_resource(mygroup, utils.pcs_options["--before"])
-        if not before:
+        before = utils.tree_get_element(
+            mygroup, "primitive", utils.pcs_options["--before"]
+        )
+        if before is None:
             utils.err(
                 "there is no resource '%s' in the group '%s'"
                 % (utils.pcs_options["--before"], group_name)
@@ -1851,56 +1848,52 @@ def resource_group_add(cib_dom, group_name, resource_ids):
     resources_to_move = []
     for resource_id in resource_ids:
         if (
-            utils.dom_get_resource(mygroup, resource_id)
-            and not after and not before
+            utils.tree_get_element(mygroup, "primitive", resource_id)
+            is not None
+            and after is None and before is None
         ):
             utils.err(resource_id + " already exists in " + group_name)
-        if after and after.getAttribute("id") == resource_id:
+        if after is not None and after.get("id") == resource_id:
             utils.err("cannot put resource after itself")
-        if before and before.getAttribute("id") == resource_id:
+        if before is not None and before.get("id") == resource_id:
             utils.err("cannot put resource before itself")
 
-        resource_found = False
-        for resource in resources_element.getElementsByTagName("primitive"):
-            if resource.nodeType == xml.dom.minidom.Node.TEXT_NODE:
-                continue
-            if resource.getAttribute("id") == resource_id:
-                if resource.parentNode.tagName == "master":
-                    utils.err("cannot group master/slave resources")
-                if resource.parentNode.tagName == "clone":
-                    utils.err("cannot group clone resources")
-                if resource.parentNode.tagName == "bundle":
-                    utils.err("cannot group bundle resources")
-                resources_to_move.append(resource)
-                resource_found = True
-                break
-
-        if resource_found == False:
+        resource = utils.tree_get_element(
+            resources_element, "primitive", resource_id
+        )
+        if resource is None:
             utils.err("Unable to find resource: " + resource_id)
             continue
+        if resource.getparent().tag == "master":
+            utils.err("cannot group master/slave resources")
+        if resource.getparent().tag == "clone":
+            utils.err("cannot group clone resources")
+        if resource.getparent().tag == "bundle":
+            utils.err("cannot group bundle resources")
+        resources_to_move.append(resource)
 
     if resources_to_move:
         for resource in resources_to_move:
-            oldParent = resource.parentNode
-            if after and after.nextSibling:
-                mygroup.insertBefore(resource, after.nextSibling)
+            old_parent = resource.getparent()
+            if after is not None:
+                after.addnext(resource)
                 after = resource
-            elif before:
-                mygroup.insertBefore(resource, before)
+            elif before is not None:
+                before.addprevious(resource)
             else:
-                mygroup.appendChild(resource)
+                mygroup.append(resource)
             if (
-                oldParent.tagName == "group"
+                old_parent.tag == "group"
                 and
-                len(oldParent.getElementsByTagName("primitive")) == 0
+                old_parent.find(".//primitive") is None
             ):
-                if oldParent.parentNode.tagName in ["clone", "master"]:
-                    oldParent.parentNode.parentNode.removeChild(
-                        oldParent.parentNode
+                if old_parent.getparent().tag in ["clone", "master"]:
+                    old_parent.getparent().getparent().remove(
+                        old_parent.getparent()
                     )
                 else:
-                    oldParent.parentNode.removeChild(oldParent)
-        return cib_dom
+                    old_parent.getparent().remove(old_parent)
+        return cib
     else:
         utils.err("No resources to add.")
 
@@ -1943,7 +1936,7 @@ def resource_show(argv, stonith=False):
         return
 
     if "--full" in utils.pcs_options:
-        root = utils.get_cib_etree()
+        root = utils.get_cib_tree()
         resources = root.find(".//resources")
         for child in resources:
             if stonith and "class" in child.attrib and child.attrib["class"] == "stonith":
@@ -1996,12 +1989,15 @@ def resource_show(argv, stonith=False):
                     print(line)
         return
 
-    root = utils.get_cib_etree()
+    root = utils.get_cib_tree()
     resources = root.find(".//resources")
     resource_found = False
     for arg in argv:
-        for child in resources.findall(str(".//*")):
-            if "id" in child.attrib and child.attrib["id"] == arg and ((stonith and utils.is_stonith_resource(arg)) or (not stonith and not utils.is_stonith_resource(arg))):
+        for child in resources.xpath(".//*[@id=$id]", id=arg):
+            is_stonith = (
+                child.tag == "primitive" and child.get("class") == "stonith"
+            )
+            if stonith == is_stonith:
                 print_node(child,1)
                 resource_found = True
                 break
@@ -28,6 +28,11 @@ pengine_binary = "/usr/libexec/pacemaker/pengine"
 crmd_binary = "/usr/libexec/pacemaker/crmd"
 cib_binary = "/usr/libexec/pacemaker/cib"
 stonithd_binary = "/usr/libexec/pacemaker/stonithd"
+ocf_resource_agents_dir = "/usr/lib/ocf/resource.d/"
+# Agents taking longer to provide their metadata are considered invalid.
+agent_metadata_timeout = 30
+# Limit of agents loading their metadata at the same time when listing agents.
+agent_metadata_max_in_flight = 8
 pcs_version = "0.9.162"
 crm_report = pacemaker_binaries + "crm_report"
 crm_verify = pacemaker_binaries + "crm_verify"
@@ -38,6 +43,7 @@ pcsd_key_location = "/var/lib/pcsd/pcsd.key"
 pcsd_tokens_location = "/var/lib/pcsd/tokens"
 pcsd_users_conf_location = "/var/lib/pcsd/pcs_users.conf"
 pcsd_settings_conf_location = "/var/lib/pcsd/pcs_settings.conf"
+agent_metadata_cache_dir = "/var/lib/pcsd/agent_metadata_cache"
 pcsd_exec_location = "/usr/lib/pcsd/"
 pcsd_default_port = 2224
 cib_dir = "/var/lib/pacemaker/cib/"
@@ -54,5 +60,49 @@ pacemaker_wait_timeout_status = 62
 booth_config_dir = "/etc/booth"
 booth_binary = "/usr/sbin/booth"
 default_request_timeout = 60
+# Maximal number of characters of stdin, stdout and stderr of external processes
+# printed in reports, None means no limit.
+external_process_report_payload_limit = 1024 * 1024
+# Limits of requests to nodes processed at the same time, None means no limit.
+# Waiting requests are taken in the order they were added or, if
+# node_communication_per_host_fair is True, round-robin over nodes.
+node_communication_max_in_flight = 64
+node_communication_max_per_host = None
+node_communication_per_host_fair = False
+# Before a request to a node with several addresses (rings) is sent, its
+# addresses are connected to, the next one after this number of seconds unless
+# the previous one has connected. The request is then sent once via whichever
+# connects first. None disables racing of addresses.
+node_communication_race_stagger = None
+# How to wait for network events, "socket_events" (python3 only, falls back to
+# "select" otherwise) or "select"
+node_communication_engine = "socket_events"
+# When to collect curl debug output of requests to nodes: "off", "on_failure"
+# (only the last node_communication_debug_max_size bytes are kept) or "always"
+node_communication_debug_policy = "off"
+node_communication_debug_max_size = 64 * 1024
+# How to compute differences between the loaded and the modified CIB when
+# pushing it to the cluster, "crm_diff" or "native" (in pcs, experimental)
+cib_diff_engine = "crm_diff"
 pcs_bundled_dir = "/usr/lib/pcs/bundled/"
 pcs_bundled_pacakges_dir = os.path.join(pcs_bundled_dir, "packages")
+# Bash completion tree precomputed from usage when pcs is built, it is
+# generated on the fly if it is missing or outdated.
+completion_tree_file = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "completion_tree.json"
+)
+# Ids of resources, nodes and constraints completed in bash are kept for this
+# number of seconds, so the CIB is not loaded on every TAB press.
+completion_id_cache_file = os.path.expanduser(
+    "~/.cache/pcs/completion_ids.json"
+)
+completion_id_cache_ttl = 10
+# pcs status --watch refreshes the status on a change of the cluster at most
+# every this number of seconds unless specified in the command, and at least
+# every status_watch_refresh_interval seconds even if the cluster has not
+# changed to show changes of daemons. None disables the periodic refresh.
+# When the status cannot be collected, pcs tries again after a wait which is
+# doubled each time up to status_watch_max_backoff seconds.
+status_watch_interval = 1
+status_watch_refresh_interval = 60
+status_watch_max_backoff = 30
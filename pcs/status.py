@@ -4,11 +4,23 @@ from __future__ import (
     print_function,
 )
 
-import sys
+from contextlib import contextmanager
+import json
 import os
+import subprocess
+import sys
+import threading
+import time
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    #python 3
+    from io import StringIO
 
 from pcs import (
     resource,
+    settings,
     usage,
     utils,
 )
@@ -17,12 +29,29 @@ from pcs.quorum import quorum_status_cmd
 from pcs.cli.booth.command import status as booth_status_cmd
 from pcs.cli.common.console_report import indent
 from pcs.cli.common.errors import CmdLineInputError
+from pcs.common import trace
 from pcs.lib.errors import LibraryError
-from pcs.lib.pacemaker.state import ClusterState
+from pcs.lib.pacemaker.state import ClusterState, get_cluster_state_dom
 from pcs.lib.pacemaker.values import is_false
 from pcs.lib.resource_agent import _STONITH_ACTION_REPLACED_BY
 from pcs.lib.sbd import get_sbd_service_name
 
+OUTPUT_FORMAT_LIST = ("text", "json")
+
+# boolean values in crm_mon xml
+_CRM_MON_BOOLEANS = {"true": True, "false": False}
+
+# crm_mon prints the status at least every this number of seconds even if the
+# cluster has not changed, the refreshes are scheduled by pcs itself
+_CRM_MON_SUBSCRIPTION_INTERVAL = 3600
+
+_PCSD_STATUS_ONLINE = 0
+_PCSD_STATUS_DESC_MAP = {
+    _PCSD_STATUS_ONLINE: "Online",
+    3: "Unable to authenticate",
+}
+
+
 def status_cmd(lib, argv, modifiers):
     if len(argv) < 1:
         full_status()
@@ -63,38 +92,414 @@ def full_status():
     if "--hide-inactive" in utils.pcs_options and "--full" in utils.pcs_options:
         utils.err("you cannot specify both --hide-inactive and --full")
 
+    output_format = utils.pcs_options.get("--output-format", "text")
+    if output_format not in OUTPUT_FORMAT_LIST:
+        utils.err(
+            "Unknown value '{0}' of --output-format, supported values are: "
+            "{1}".format(output_format, ", ".join(OUTPUT_FORMAT_LIST))
+        )
+
+    if "--watch" in utils.pcs_options:
+        interval = _get_watch_interval(utils.pcs_options["--watch"])
+        try:
+            watch_full_status(output_format, interval)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    probe_results = collect_full_status(output_format == "json")
+    if output_format == "json":
+        print(json.dumps(
+            get_full_status_dict(probe_results), indent=4, sort_keys=True
+        ))
+    else:
+        print_full_status(probe_results)
+
+def watch_full_status(output_format, interval):
+    """
+    Print the status each time the cluster changes, until interrupted
+
+    Changes are notified by a subscription, the cluster is not polled for
+    them. The status is also refreshed when
+    settings.status_watch_refresh_interval has passed since the last refresh to
+    show changes of daemons. When the status cannot be collected, it is tried
+    again after a wait which doubles up to settings.status_watch_max_backoff.
+
+    string output_format -- text clears the screen and prints the status, json
+        prints each status as a json object on one line
+    float interval -- minimal number of seconds between two refreshes
+    """
+    refresh_interval = settings.status_watch_refresh_interval
+    subscription = _ClusterChangeSubscription()
+    backoff = interval
+    try:
+        while True:
+            started = time.time()
+            # changes done while the status is being collected are notified
+            subscription.clear()
+            stdout, stderr, success = _get_full_status_output(output_format)
+            if not subscription.is_running():
+                stderr += subscription.start()
+            if output_format == "text" and sys.stdout.isatty():
+                # move the cursor home and clear the screen
+                sys.stdout.write("\033[H\033[2J")
+            sys.stdout.write(stdout)
+            sys.stdout.flush()
+            sys.stderr.write(stderr)
+            sys.stderr.flush()
+            if success:
+                backoff = interval
+                subscription.wait(refresh_interval)
+            else:
+                # the cluster is unreachable, notifications may not come
+                backoff = min(2 * backoff, settings.status_watch_max_backoff)
+                time.sleep(backoff)
+            time.sleep(max(0, interval - (time.time() - started)))
+    finally:
+        subscription.stop()
+
+class _ClusterChangeSubscription(object):
+    """
+    Notifies about changes of the cluster
+
+    crm_mon, unless run in the one-shot mode, subscribes to notifications of
+    CIB changes and prints the status each time the cluster changes. Its
+    output is not used, it only signals a change.
+    """
+    # the longest wait for a change without checking for KeyboardInterrupt
+    _WAIT_STEP = 1
+
+    def __init__(self):
+        self._process = None
+        self._changed = threading.Event()
+
+    def start(self):
+        """
+        Run crm_mon, return an error message if it cannot be run
+        """
+        env = dict(os.environ)
+        env["LC_ALL"] = "C"
+        # the output goes to a pipe, not to the terminal pcs is running in
+        env["TERM"] = "dumb"
+        if utils.usefile:
+            env["CIB_file"] = utils.filename
+        try:
+            with open(os.devnull, "w") as devnull:
+                # crm_mon reads keys from stdin, the pipe is never written to
+                self._process = subprocess.Popen(
+                    [
+                        os.path.join(settings.pacemaker_binaries, "crm_mon"),
+                        "--interval", str(_CRM_MON_SUBSCRIPTION_INTERVAL),
+                    ],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=devnull,
+                    env=env,
+                )
+        except EnvironmentError as e:
+            self._process = None
+            return "Error: unable to watch cluster changes: {0}\n".format(
+                e.strerror
+            )
+        thread = threading.Thread(
+            target=self._read, args=(self._process.stdout, )
+        )
+        thread.daemon = True
+        thread.start()
+        return ""
+
+    def _read(self, stream):
+        # the end of the output is a change too, crm_mon is to be started again
+        while os.read(stream.fileno(), 4096):
+            self._changed.set()
+        self._changed.set()
+
+    def is_running(self):
+        return self._process is not None and self._process.poll() is None
+
+    def clear(self):
+        self._changed.clear()
+
+    def wait(self, timeout=None):
+        """
+        Wait until the cluster changes, return True if it has changed
+
+        float timeout -- max number of seconds to wait, None means no limit
+        """
+        waited = 0
+        while timeout is None or waited < timeout:
+            step = self._WAIT_STEP
+            if timeout is not None:
+                step = min(step, timeout - waited)
+            if self._changed.wait(step):
+                return True
+            waited += step
+        return False
+
+    def stop(self):
+        if self._process is None:
+            return
+        if self.is_running():
+            self._process.terminate()
+        self._process.wait()
+        self._process.stdin.close()
+        self._process = None
+
+def _get_watch_interval(value):
+    if value is None:
+        return settings.status_watch_interval
+    try:
+        interval = float(value)
+        if interval > 0:
+            return interval
+    except ValueError:
+        pass
+    utils.err(
+        "'{0}' is not a valid --watch value, use a positive number".format(
+            value
+        )
+    )
+
+@contextmanager
+def _redirect_output(stdout, stderr):
+    orig_stdout, orig_stderr = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = stdout, stderr
+    try:
+        yield
+    finally:
+        sys.stdout, sys.stderr = orig_stdout, orig_stderr
+
+def _get_full_status_output(output_format):
+    # Return stdout and stderr of one pcs status and whether it has succeeded.
+    # Errors exiting pcs status are captured as well, they do not stop
+    # watching. Stdout is redirected after collecting the status, as local
+    # pcsd may ask for credentials.
+    stdout = StringIO()
+    stderr = StringIO()
+    try:
+        with _redirect_output(sys.stdout, stderr):
+            # a new CIB is to be loaded on each refresh
+            utils.drop_cib_tree()
+            probe_results = collect_full_status(output_format == "json")
+        with _redirect_output(stdout, stderr):
+            if output_format == "json":
+                print(json.dumps(
+                    get_full_status_dict(probe_results), sort_keys=True
+                ))
+            else:
+                print_full_status(probe_results)
+    except SystemExit:
+        return stdout.getvalue(), stderr.getvalue(), False
+    except LibraryError as e:
+        with _redirect_output(stdout, stderr):
+            try:
+                utils.process_library_reports(e.args)
+            except SystemExit:
+                pass
+        return stdout.getvalue(), stderr.getvalue(), False
+    except EnvironmentError as e:
+        stderr.write("Error: {0}\n".format(e))
+        return stdout.getvalue(), stderr.getvalue(), False
+    return stdout.getvalue(), stderr.getvalue(), True
+
+class ProbeResults(object):
+    """
+    Results of probes run concurrently by run_probes
+    """
+    def __init__(self):
+        self._results = {}
+        self._errors = {}
+        self._stderr = {}
+
+    def set_result(self, name, result):
+        self._results[name] = result
+
+    def set_error(self, name, error):
+        self._errors[name] = error
+
+    def set_stderr(self, name, stderr):
+        if stderr:
+            self._stderr[name] = stderr
+
+    def has(self, name):
+        return name in self._results or name in self._errors
+
+    def get(self, name, default=None):
+        """
+        Return the result of a probe, raise an exception raised by the probe
+
+        Messages the probe wrote to stderr are printed on the first reading of
+        the result.
+
+        string name -- name of the probe
+        default -- returned if the probe has not been run
+        """
+        if name in self._stderr:
+            sys.stderr.write(self._stderr.pop(name))
+            sys.stderr.flush()
+        if name in self._errors:
+            raise self._errors[name]
+        return self._results.get(name, default)
+
+class _ProbeStderr(object):
+    """
+    Replacement of sys.stderr which keeps messages written by probe threads
+    instead of printing them right away
+    """
+    def __init__(self, stderr):
+        self._stderr = stderr
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def start_capture(self):
+        with self._lock:
+            self._buffers[threading.current_thread().ident] = []
+
+    def stop_capture(self):
+        with self._lock:
+            return "".join(
+                self._buffers.pop(threading.current_thread().ident)
+            )
+
+    def write(self, data):
+        with self._lock:
+            buffer_list = self._buffers.get(threading.current_thread().ident)
+            if buffer_list is not None:
+                buffer_list.append(data)
+                return
+        self._stderr.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._stderr, name)
+
+def run_probes(probe_dict):
+    """
+    Run probes concurrently and wait for all of them to finish
+
+    Exceptions raised by a probe, including SystemExit raised by utils.err, and
+    messages the probe wrote to stderr are raised and printed when reading
+    the result of the probe. That way the output printed up to that point is
+    the same as if the probes were run one by one.
+
+    dict probe_dict -- functions without arguments by their names
+    """
+    probe_results = ProbeResults()
+    probe_stderr = _ProbeStderr(sys.stderr)
+    def create_worker(name, probe):
+        def worker():
+            probe_stderr.start_capture()
+            try:
+                probe_results.set_result(name, probe())
+            except (Exception, SystemExit) as e:
+                probe_results.set_error(name, e)
+            finally:
+                probe_results.set_stderr(name, probe_stderr.stop_capture())
+        return worker
+    orig_stderr = sys.stderr
+    sys.stderr = probe_stderr
+    try:
+        utils.run_parallel([
+            create_worker(name, probe) for name, probe in probe_dict.items()
+        ])
+    finally:
+        sys.stderr = orig_stderr
+    return probe_results
+
+def collect_full_status(structured=False):
+    """
+    Run all commands needed by pcs status concurrently once crm_mon has
+    confirmed the cluster is running
+
+    bool structured -- get the cluster status as crm_mon xml to be transformed
+        to a structure instead of crm_mon plain text
+    """
+    full = "--full" in utils.pcs_options
     monitor_command = ["crm_mon", "--one-shot"]
     if "--hide-inactive" not in utils.pcs_options:
-        monitor_command.append('--inactive')
-    if "--full" in utils.pcs_options:
+        monitor_command.append("--inactive")
+    if structured:
+        # tickets are a part of crm_mon xml
+        monitor_command.append("--as-xml")
+    elif full:
         monitor_command.extend(
             ["--show-detail", "--show-node-attributes", "--failcounts"]
         )
 
-    output, retval = utils.run(monitor_command)
-
-    if (retval != 0):
-        utils.err("cluster is not currently running on this node")
-
+    # Resolve cached values shared by the probes before running them so that
+    # the probes do not compete for them.
+    is_rhel6 = utils.is_rhel6()
+    is_root = os.getuid() == 0
+    # Local pcsd may ask for credentials, we do not want the user to be asked
+    # from several threads at once.
+    local_pcsd_lock = threading.Lock()
+    def via_local_pcsd(probe):
+        if is_root:
+            return probe
+        def locked_probe():
+            with local_pcsd_lock:
+                return probe()
+        return locked_probe
+
+    probe_dict = {
+        "cib": utils.get_cib_tree,
+    }
     if not utils.usefile or "--corosync_conf" in utils.pcs_options:
-        cluster_name = utils.getClusterName()
-        print("Cluster name: %s" % cluster_name)
+        probe_dict["cluster_name"] = utils.getClusterName
+    if full and not structured:
+        probe_dict["tickets"] = lambda: utils.run(["crm_ticket", "-L"])
+    if not utils.usefile:
+        probe_dict["sbd_running"] = _is_sbd_running
+        for service, dummy_display_always in utils.get_status_service_list():
+            probe_dict["service:" + service] = (
+                lambda service=service: utils.get_service_status(service)
+            )
+        if not is_rhel6:
+            probe_dict["pacemaker_nodes"] = via_local_pcsd(
+                lambda: utils.getPacemakerNodesID(allow_failure=True)
+            )
+            probe_dict["corosync_nodes"] = via_local_pcsd(
+                lambda: utils.getCorosyncNodesID(allow_failure=True)
+            )
+        if full and utils.hasCorosyncConf():
+            if is_root:
+                probe_dict["pcsd"] = lambda: _get_pcsd_status(
+                    _get_cluster_pcsd_node_list()
+                )
+            else:
+                probe_dict["pcsd_local"] = via_local_pcsd(
+                    lambda: utils.call_local_pcsd(["status", "pcsd"], True)
+                )
+
+    with trace.span("collect status", trace.CATEGORY_COMMAND):
+        # The status is not printed beyond the crm_mon error, so do not bother
+        # the nodes and local services when the cluster is not running.
+        crm_mon_result = utils.run(monitor_command)
+        if crm_mon_result[1] != 0:
+            probe_dict = {}
+        probe_results = run_probes(probe_dict)
+        probe_results.set_result("crm_mon", crm_mon_result)
+        return probe_results
+
+def print_full_status(probe_results):
+    output, retval = probe_results.get("crm_mon")
+    if retval != 0:
+        utils.err("cluster is not currently running on this node")
 
-    status_stonith_check()
+    if probe_results.has("cluster_name"):
+        print("Cluster name: %s" % probe_results.get("cluster_name"))
 
-    if (
-        not utils.usefile
-        and
-        not utils.is_rhel6()
-        and
-        utils.corosyncPacemakerNodeCheck()
+    for warning in _get_stonith_warnings(
+        probe_results.get("cib"), probe_results.get("sbd_running", False)
     ):
+        print("WARNING: " + warning)
+
+    if _has_node_names_mismatch(probe_results):
         print("WARNING: corosync and pacemaker node names do not match (IPs used in setup?)")
 
     print(output)
 
-    if "--full" in utils.pcs_options:
-        tickets, retval = utils.run(["crm_ticket", "-L"])
+    if probe_results.has("tickets"):
+        tickets, retval = probe_results.get("tickets")
         if retval != 0:
             print("WARNING: Unable to get information about tickets")
             print()
@@ -103,73 +508,151 @@ def full_status():
             print("\n".join(indent(tickets.split("\n"))))
 
     if not utils.usefile:
-        if  "--full" in utils.pcs_options and utils.hasCorosyncConf():
-            print_pcsd_daemon_status()
+        if probe_results.has("pcsd") or probe_results.has("pcsd_local"):
+            print("PCSD Status:")
+            if probe_results.has("pcsd"):
+                for line in _get_pcsd_status_lines(
+                    probe_results.get("pcsd"),
+                    probe_results.get("pacemaker_nodes"),
+                    probe_results.get("corosync_nodes"),
+                    "  "
+                ):
+                    print(line)
+            else:
+                _print_local_pcsd_status(probe_results.get("pcsd_local"))
             print()
-        utils.serviceStatus("  ")
+        utils.serviceStatus("  ", _get_service_status_dict(probe_results))
+
+def get_full_status_dict(probe_results):
+    """
+    Return pcs status as a structure to be exported to json
 
-def status_stonith_check():
+    ProbeResults probe_results -- results of collect_full_status(True)
+    """
+    output, retval = probe_results.get("crm_mon")
+    if retval != 0:
+        utils.err("cluster is not currently running on this node")
+    try:
+        cluster_state = get_cluster_state_dom(output)
+    except LibraryError as e:
+        utils.process_library_reports(e.args)
+
+    warning_list = _get_stonith_warnings(
+        probe_results.get("cib"), probe_results.get("sbd_running", False)
+    )
+    if _has_node_names_mismatch(probe_results):
+        warning_list.append(
+            "corosync and pacemaker node names do not match (IPs used in "
+            "setup?)"
+        )
+
+    pcsd_status = None
+    if probe_results.has("pcsd"):
+        pcsd_status = [
+            {
+                "node": node,
+                "status": _PCSD_STATUS_DESC_MAP.get(returncode, "Offline"),
+            }
+            for node, returncode in probe_results.get("pcsd")
+        ]
+    elif probe_results.has("pcsd_local"):
+        err_msgs, exitcode, std_out, dummy_std_err = probe_results.get(
+            "pcsd_local"
+        )
+        warning_list.extend(err_msgs)
+        if exitcode == 0:
+            pcsd_status = _parse_pcsd_status_lines(std_out)
+        else:
+            warning_list.append("Unable to get PCSD status")
+
+    daemon_list = None
+    if not utils.usefile:
+        daemon_list = []
+        service_status_dict = _get_service_status_dict(probe_results)
+        for service, display_always in utils.get_status_service_list():
+            if service_status_dict.get(service) is None:
+                continue
+            running, enabled = service_status_dict[service]
+            if display_always or enabled or running:
+                daemon_list.append({
+                    "name": service,
+                    "active": running,
+                    "enabled": enabled,
+                })
+
+    return {
+        "cluster_name": probe_results.get("cluster_name"),
+        "warnings": warning_list,
+        "cluster": _cluster_state_to_dict(cluster_state),
+        "pcsd": pcsd_status,
+        "daemons": daemon_list,
+    }
+
+def _is_sbd_running():
+    try:
+        return utils.is_service_running(
+            utils.cmd_runner(),
+            get_sbd_service_name()
+        )
+    except LibraryError:
+        return False
+
+def _has_node_names_mismatch(probe_results):
+    if not probe_results.has("pacemaker_nodes"):
+        return False
+    return utils.corosyncPacemakerNodeCheck(
+        probe_results.get("pacemaker_nodes"),
+        probe_results.get("corosync_nodes")
+    )
+
+def _get_service_status_dict(probe_results):
+    return dict([
+        (service, probe_results.get("service:" + service))
+        for service, dummy_display_always in utils.get_status_service_list()
+    ])
+
+def _get_stonith_warnings(cib, sbd_running):
     # We should read the default value from pacemaker. However that may slow
     # pcs down as we need to run 'pengine metadata' to get it.
     stonith_enabled = True
     stonith_devices = []
     stonith_devices_id_action = []
     stonith_devices_id_method_cycle = []
-    sbd_running = False
-
-    cib = utils.get_cib_dom()
-    for conf in cib.getElementsByTagName("configuration"):
-        for crm_config in conf.getElementsByTagName("crm_config"):
-            for nvpair in crm_config.getElementsByTagName("nvpair"):
-                if (
-                    nvpair.getAttribute("name") == "stonith-enabled"
-                    and
-                    is_false(nvpair.getAttribute("value"))
-                ):
-                    stonith_enabled = False
-                    break
-            if not stonith_enabled:
+
+    for conf in cib.iterfind(".//configuration"):
+        for nvpair in conf.iterfind("crm_config//nvpair"):
+            if (
+                nvpair.get("name") == "stonith-enabled"
+                and
+                is_false(nvpair.get("value", ""))
+            ):
+                stonith_enabled = False
                 break
-        for resource in conf.getElementsByTagName("primitive"):
-            if resource.getAttribute("class") == "stonith":
+        for resource in conf.iter("primitive"):
+            if resource.get("class") == "stonith":
                 stonith_devices.append(resource)
-                for attribs in resource.getElementsByTagName(
-                    "instance_attributes"
+                for nvpair in resource.iterfind(
+                    ".//instance_attributes//nvpair"
                 ):
-                    for nvpair in attribs.getElementsByTagName("nvpair"):
-                        if (
-                            nvpair.getAttribute("name") == "action"
-                            and
-                            nvpair.getAttribute("value")
-                        ):
-                            stonith_devices_id_action.append(
-                                resource.getAttribute("id")
-                            )
-                        if (
-                            nvpair.getAttribute("name") == "method"
-                            and
-                            nvpair.getAttribute("value") == "cycle"
-                        ):
-                            stonith_devices_id_method_cycle.append(
-                                resource.getAttribute("id")
-                            )
-
-    if not utils.usefile:
-        # check if SBD daemon is running
-        try:
-            sbd_running = utils.is_service_running(
-                utils.cmd_runner(),
-                get_sbd_service_name()
-            )
-        except LibraryError:
-            pass
-
+                    if nvpair.get("name") == "action" and nvpair.get("value"):
+                        stonith_devices_id_action.append(resource.get("id"))
+                    if (
+                        nvpair.get("name") == "method"
+                        and
+                        nvpair.get("value") == "cycle"
+                    ):
+                        stonith_devices_id_method_cycle.append(
+                            resource.get("id")
+                        )
+
+    warning_list = []
     if stonith_enabled and not stonith_devices and not sbd_running:
-        print("WARNING: no stonith devices and stonith-enabled is not false")
-
+        warning_list.append(
+            "no stonith devices and stonith-enabled is not false"
+        )
     if stonith_devices_id_action:
-        print(
-            "WARNING: following stonith devices have the 'action' option set, "
+        warning_list.append(
+            "following stonith devices have the 'action' option set, "
             "it is recommended to set {0} instead: {1}".format(
                 ", ".join(
                     ["'{0}'".format(x) for x in _STONITH_ACTION_REPLACED_BY]
@@ -178,13 +661,68 @@ def status_stonith_check():
             )
         )
     if stonith_devices_id_method_cycle:
-        print(
-            "WARNING: following stonith devices have the 'method' option set "
+        warning_list.append(
+            "following stonith devices have the 'method' option set "
             "to 'cycle' which is potentially dangerous, please consider using "
             "'onoff': {0}".format(
                 ", ".join(sorted(stonith_devices_id_method_cycle))
             )
         )
+    return warning_list
+
+def _cluster_state_to_dict(cluster_state):
+    node_attributes = {}
+    for node in cluster_state.iterfind("node_attributes/node"):
+        node_attributes[node.get("name")] = dict([
+            (attribute.get("name"), attribute.get("value"))
+            for attribute in node.iterfind("attribute")
+        ])
+    return {
+        "summary": dict([
+            (element.tag, _crm_mon_attrs_to_dict(element))
+            for element in cluster_state.iterfind("summary/*")
+        ]),
+        "nodes": [
+            _crm_mon_attrs_to_dict(node)
+            for node in cluster_state.iterfind("nodes/node")
+        ],
+        "resources": [
+            _crm_mon_resource_to_dict(element)
+            for element in cluster_state.iterfind("resources/*")
+        ],
+        "node_attributes": node_attributes,
+        "failures": [
+            _crm_mon_attrs_to_dict(failure)
+            for failure in cluster_state.iterfind("failures/failure")
+        ],
+        "tickets": [
+            _crm_mon_attrs_to_dict(ticket)
+            for ticket in cluster_state.iterfind("tickets/ticket")
+        ],
+    }
+
+def _crm_mon_resource_to_dict(element):
+    # resource, group, clone, bundle or replica
+    resource = _crm_mon_attrs_to_dict(element)
+    resource["kind"] = element.tag
+    for child in element.iterfind("*"):
+        if child.tag == "node":
+            resource.setdefault("nodes", []).append(child.get("name"))
+        elif child.tag == "replica":
+            resource.setdefault("replicas", []).append(
+                _crm_mon_resource_to_dict(child)
+            )
+        else:
+            resource.setdefault("resources", []).append(
+                _crm_mon_resource_to_dict(child)
+            )
+    return resource
+
+def _crm_mon_attrs_to_dict(element):
+    return dict([
+        (name, _CRM_MON_BOOLEANS.get(value, value))
+        for name, value in element.attrib.items()
+    ])
 
 # Parse crm_mon for status
 def nodes_status(argv):
@@ -355,59 +893,91 @@ def print_pcsd_daemon_status():
     if os.getuid() == 0:
         cluster_pcsd_status([], True)
     else:
-        err_msgs, exitcode, std_out, dummy_std_err = utils.call_local_pcsd(
-            ['status', 'pcsd'], True
+        _print_local_pcsd_status(
+            utils.call_local_pcsd(['status', 'pcsd'], True)
         )
-        if err_msgs:
-            for msg in err_msgs:
-                print(msg)
-        if 0 == exitcode:
-            print(std_out)
-        else:
-            print("Unable to get PCSD status")
 
-def check_nodes(node_list, prefix=""):
-    """
-    Print pcsd status on node_list, return if there is any pcsd not online
+def _print_local_pcsd_status(local_pcsd_result):
+    err_msgs, exitcode, std_out, dummy_std_err = local_pcsd_result
+    if err_msgs:
+        for msg in err_msgs:
+            print(msg)
+    if 0 == exitcode:
+        print(std_out)
+    else:
+        print("Unable to get PCSD status")
+
+def _get_pcsd_status(node_list):
     """
-    if not utils.is_rhel6():
-        pm_nodes = utils.getPacemakerNodesID(allow_failure=True)
-        cs_nodes = utils.getCorosyncNodesID(allow_failure=True)
+    Return a list of (node, status code) of pcsd on nodes in node_list order
 
-    STATUS_ONLINE = 0
-    status_desc_map = {
-        STATUS_ONLINE: 'Online',
-        3: 'Unable to authenticate'
-    }
-    status_list = []
+    list node_list -- names of nodes to check
+    """
+    status_dict = {}
     def report(node, returncode, output):
-        print("{0}{1}: {2}".format(
+        status_dict[node] = returncode
+    utils.run_parallel(
+        utils.create_task_list(report, utils.checkAuthorization, node_list)
+    )
+    return [(node, status_dict.get(node)) for node in node_list]
+
+def _get_pcsd_status_lines(status_list, pm_nodes, cs_nodes, prefix=""):
+    return [
+        "{0}{1}: {2}".format(
             prefix,
             node if utils.is_rhel6() else utils.prepare_node_name(
                 node, pm_nodes, cs_nodes
             ),
-            status_desc_map.get(returncode, 'Offline')
-        ))
-        status_list.append(returncode)
+            _PCSD_STATUS_DESC_MAP.get(returncode, "Offline")
+        )
+        for node, returncode in status_list
+    ]
 
-    utils.run_parallel(
-        utils.create_task_list(report, utils.checkAuthorization, node_list)
-    )
+def _parse_pcsd_status_lines(output):
+    # lines printed by check_nodes: "<prefix><node>: <status>"
+    status_list = []
+    for line in output.splitlines():
+        if ": " in line:
+            node, status = line.strip().rsplit(": ", 1)
+            status_list.append({"node": node, "status": status})
+    return status_list
 
-    return any([status != STATUS_ONLINE for status in status_list])
+def check_nodes(node_list, prefix=""):
+    """
+    Print pcsd status on node_list, return if there is any pcsd not online
+    """
+    pm_nodes = None
+    cs_nodes = None
+    if not utils.is_rhel6():
+        pm_nodes = utils.getPacemakerNodesID(allow_failure=True)
+        cs_nodes = utils.getCorosyncNodesID(allow_failure=True)
+
+    status_list = _get_pcsd_status(node_list)
+    for line in _get_pcsd_status_lines(
+        status_list, pm_nodes, cs_nodes, prefix
+    ):
+        print(line)
+
+    return any([
+        returncode != _PCSD_STATUS_ONLINE
+        for dummy_node, returncode in status_list
+    ])
+
+def _get_cluster_pcsd_node_list():
+    nodes = utils.getNodesFromCorosyncConf()
+    if len(nodes) == 0:
+        if utils.is_rhel6():
+            utils.err("no nodes found in cluster.conf")
+        else:
+            utils.err("no nodes found in corosync.conf")
+    return nodes
 
 # If no arguments get current cluster node status, otherwise get listed
 # nodes status
 def cluster_pcsd_status(argv, dont_exit=False):
     bad_nodes = False
     if len(argv) == 0:
-        nodes = utils.getNodesFromCorosyncConf()
-        if len(nodes) == 0:
-            if utils.is_rhel6():
-                utils.err("no nodes found in cluster.conf")
-            else:
-                utils.err("no nodes found in corosync.conf")
-        bad_nodes = check_nodes(nodes, "  ")
+        bad_nodes = check_nodes(_get_cluster_pcsd_node_list(), "  ")
     else:
         bad_nodes = check_nodes(argv, "  ")
     if bad_nodes and not dont_exit:
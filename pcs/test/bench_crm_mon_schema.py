@@ -0,0 +1,118 @@
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+)
+
+# This module is not a part of the test suite. It measures the cost of parsing
+# crm_mon xml output when the crm_mon schema is compiled for every call, when
+# the compiled schema is cached and when the validation is skipped.
+#
+# usage: python pcs/test/bench_crm_mon_schema.py [crm_mon.rng [resource_count]]
+
+import os.path
+import sys
+import timeit
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)
+)))
+sys.path.insert(0, PACKAGE_DIR)
+
+from lxml import etree
+
+from pcs import settings
+from pcs.common.tools import xml_fromstring
+from pcs.lib.pacemaker.state import get_cluster_state_dom
+
+
+RESOURCE_COUNT = 500
+NODE_COUNT = 3
+CALLS = 20
+
+
+def fixture_crm_mon(resource_count, node_count):
+    crm_mon = etree.Element("crm_mon", version="1.1.18")
+    summary = etree.SubElement(crm_mon, "summary")
+    etree.SubElement(summary, "current_dc", present="false")
+    etree.SubElement(
+        summary,
+        "nodes_configured",
+        number=str(node_count),
+        expected_votes="unknown",
+    )
+    etree.SubElement(
+        summary, "resources_configured", number=str(resource_count)
+    )
+    nodes = etree.SubElement(crm_mon, "nodes")
+    for i in range(node_count):
+        etree.SubElement(
+            nodes,
+            "node",
+            name="node{0}".format(i),
+            id=str(i + 1),
+            online="true",
+            standby="false",
+            standby_onfail="false",
+            maintenance="false",
+            pending="false",
+            unclean="false",
+            shutdown="false",
+            expected_up="true",
+            is_dc="false" if i else "true",
+            resources_running=str(resource_count // node_count),
+            type="member",
+        )
+    resources = etree.SubElement(crm_mon, "resources")
+    for i in range(resource_count):
+        resource = etree.SubElement(
+            resources,
+            "resource",
+            id="R{0}".format(i),
+            resource_agent="ocf::heartbeat:Dummy",
+            role="Started",
+            active="true",
+            orphaned="false",
+            managed="true",
+            failed="false",
+            failure_ignored="false",
+            nodes_running_on="1",
+        )
+        etree.SubElement(
+            resource,
+            "node",
+            name="node{0}".format(i % node_count),
+            id=str(i % node_count + 1),
+            cached="false",
+        )
+    return etree.tostring(crm_mon).decode()
+
+def parse_compiling_schema(xml, schema_path):
+    # how get_cluster_state_dom validated the xml before caching the schema
+    dom = xml_fromstring(xml)
+    etree.RelaxNG(file=schema_path).assertValid(dom)
+    return dom
+
+def main(schema_path, resource_count):
+    if not os.path.isfile(schema_path):
+        print("crm_mon schema '{0}' does not exist".format(schema_path))
+        sys.exit(1)
+    settings.crm_mon_schema = schema_path
+    xml = fixture_crm_mon(resource_count, NODE_COUNT)
+    print("{0:>20} {1:>12}".format("validation", "call [ms]"))
+    for name, call in (
+        ("compiled every call", lambda: parse_compiling_schema(xml, schema_path)),
+        ("cached schema", lambda: get_cluster_state_dom(xml)),
+        ("skipped", lambda: get_cluster_state_dom(xml, validate=False)),
+    ):
+        # the first call compiles the cached schema
+        call()
+        seconds = min(timeit.repeat(call, number=CALLS, repeat=3)) / CALLS
+        print("{0:>20} {1:>12.2f}".format(name, 1000 * seconds))
+
+
+if __name__ == "__main__":
+    main(
+        sys.argv[1] if len(sys.argv) > 1 else settings.crm_mon_schema,
+        int(sys.argv[2]) if len(sys.argv) > 2 else RESOURCE_COUNT,
+    )
@@ -0,0 +1,96 @@
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+)
+
+# This module is not a part of the test suite. It measures time spent
+# importing python modules when pcs starts, using 'python -X importtime', and
+# fails if it exceeds a threshold.
+#
+# usage: python3 pcs/test/bench_import_time.py [threshold multiplier]
+
+import os
+import os.path
+import subprocess
+import sys
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)
+)))
+PCS = os.path.join(PACKAGE_DIR, "pcs", "pcs")
+RUNS = 5
+
+# Help of a command imports the same modules as the command itself, but it
+# does not need a running cluster.
+SCENARIO_LIST = [
+    # name, pcs arguments, extra environment, threshold in ms
+    ("status", ["status", "help"], {}, 400),
+    ("resource show", ["resource", "help"], {}, 400),
+    (
+        "completion",
+        [],
+        {
+            "COMP_WORDS": "pcs resource",
+            "COMP_LENGTHS": "3 8",
+            "COMP_CWORD": "1",
+            "PCS_AUTO_COMPLETE": "1",
+        },
+        80,
+    ),
+]
+
+
+def get_import_time(args, env_extend):
+    """
+    Return total time in ms spent importing modules and the number of pcs
+    modules imported
+    """
+    env = dict(os.environ)
+    env.update(env_extend)
+    process = subprocess.Popen(
+        [sys.executable, "-X", "importtime", PCS] + args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+        universal_newlines=True,
+    )
+    dummy_stdout, stderr = process.communicate()
+    total_us = 0
+    pcs_module_count = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if not parts[0].strip().isdigit():
+            # header line
+            continue
+        total_us += int(parts[0])
+        if parts[2].strip().startswith("pcs."):
+            pcs_module_count += 1
+    return total_us / 1000, pcs_module_count
+
+def main(multiplier):
+    if sys.version_info < (3, 7):
+        print("python 3.7 or newer is required for -X importtime")
+        sys.exit(1)
+    failed = False
+    print("{0:>15} {1:>12} {2:>12} {3:>12}".format(
+        "scenario", "pcs modules", "import [ms]", "limit [ms]"
+    ))
+    for name, args, env_extend, threshold in SCENARIO_LIST:
+        result_list = [get_import_time(args, env_extend) for _ in range(RUNS)]
+        # the fastest run is the least affected by the noise of the system
+        import_ms, pcs_module_count = min(result_list)
+        limit = threshold * multiplier
+        print("{0:>15} {1:>12} {2:>12.1f} {3:>12.1f}{4}".format(
+            name, pcs_module_count, import_ms, limit,
+            "  REGRESSION" if import_ms > limit else ""
+        ))
+        failed = failed or import_ms > limit
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 1.0)
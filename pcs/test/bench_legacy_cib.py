@@ -0,0 +1,199 @@
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+)
+
+# This module is not a part of the test suite. It generates a CIB with many
+# resources and constraints and measures runtime and peak RSS of parsing it
+# with minidom, ElementTree and lxml. If pacemaker's cibadmin is available, it
+# also measures 'pcs constraint', 'pcs resource show --full' and
+# 'pcs resource group add' run against the generated CIB with -f. Run it on
+# two revisions of pcs to compare the commands. Only these commands (and
+# 'pcs resource show <id>' and 'pcs constraint rule remove') parse the CIB with
+# lxml, the other resource and constraint commands still use minidom and are
+# not measured here.
+#
+# usage: python pcs/test/bench_legacy_cib.py [resource_count]
+
+import os.path
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)
+)))
+PCS = os.path.join(PACKAGE_DIR, "pcs", "pcs")
+EMPTY_CIB = os.path.join(
+    PACKAGE_DIR, "pcs", "test", "resources", "cib-empty.xml"
+)
+RESOURCE_COUNT = 2000
+GROUP_SIZE = 4
+ROUNDS = 3
+
+PARSER_MAP = {
+    "minidom": "from xml.dom.minidom import parse; parse(path)",
+    "etree": "import xml.etree.ElementTree as ET; ET.parse(path)",
+    "lxml": (
+        "from lxml import etree; "
+        "etree.parse(path, etree.XMLParser(huge_tree=True))"
+    ),
+}
+
+COMMAND_LIST = [
+    ["constraint"],
+    ["resource", "show", "--full"],
+    ["resource", "group", "add", "bench-group", "R1", "R2"],
+]
+
+# Run a snippet in a fresh interpreter and report its peak RSS, so that memory
+# used by one parser does not affect the others.
+MEASURE_TEMPLATE = """
+import resource, sys, time
+path = sys.argv[1]
+start = time.time()
+{0}
+duration = time.time() - start
+print(duration, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def generate_cib(path, resource_count):
+    from lxml import etree
+    cib = etree.parse(EMPTY_CIB).getroot()
+    resources = cib.find("configuration/resources")
+    constraints = cib.find("configuration/constraints")
+    group = None
+    for index in range(1, resource_count + 1):
+        resource_id = "R{0}".format(index)
+        # the first resources stay ungrouped so that they can be grouped
+        if index > 10 and (index - 11) % GROUP_SIZE == 0:
+            group = etree.SubElement(
+                resources, "group", id="G{0}".format(index)
+            )
+        parent = group if index > 10 else resources
+        primitive = etree.SubElement(
+            parent, "primitive", id=resource_id,
+            attrib={"class": "ocf", "provider": "heartbeat", "type": "Dummy"}
+        )
+        attrs = etree.SubElement(
+            primitive, "instance_attributes",
+            id="{0}-instance_attributes".format(resource_id)
+        )
+        etree.SubElement(
+            attrs, "nvpair", id="{0}-fake".format(resource_id),
+            name="fake", value=str(index)
+        )
+        operations = etree.SubElement(primitive, "operations")
+        for name, interval in (("monitor", "10"), ("start", "0s"),
+            ("stop", "0s")
+        ):
+            etree.SubElement(
+                operations, "op", name=name, interval=interval,
+                timeout="20", id="{0}-{1}".format(resource_id, name)
+            )
+        etree.SubElement(
+            constraints, "rsc_location", id="location-{0}".format(index),
+            rsc=resource_id, node="node{0}".format(index % 16), score="100"
+        )
+        if index % 10 == 0:
+            location = etree.SubElement(
+                constraints, "rsc_location",
+                id="location-rule-{0}".format(index), rsc=resource_id
+            )
+            rule = etree.SubElement(
+                location, "rule", id="rule-{0}".format(index),
+                score="INFINITY"
+            )
+            etree.SubElement(
+                rule, "expression", id="rule-{0}-expr".format(index),
+                attribute="#uname", operation="eq", value="node1"
+            )
+            etree.SubElement(
+                constraints, "rsc_colocation",
+                id="colocation-{0}".format(index), rsc=resource_id,
+                attrib={
+                    "with-rsc": "R{0}".format(index - 1),
+                    "score": "INFINITY",
+                }
+            )
+    etree.ElementTree(cib).write(path)
+
+def measure_parser(code, path):
+    output = subprocess.check_output(
+        [sys.executable, "-c", MEASURE_TEMPLATE.format(code), path],
+        universal_newlines=True,
+    )
+    duration, max_rss = output.split()
+    return float(duration), int(max_rss)
+
+def measure_command(args, cib_file):
+    start = time.time()
+    process = subprocess.Popen(
+        [sys.executable, PCS, "-f", cib_file] + args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    process.stdout.read()
+    dummy_pid, status, rusage = os.wait4(process.pid, 0)
+    duration = time.time() - start
+    if status != 0:
+        raise AssertionError("'pcs {0}' failed".format(" ".join(args)))
+    # wait4 already reaped the process
+    process.returncode = 0
+    return duration, rusage.ru_maxrss
+
+def print_result(name, result_list):
+    # the fastest run is the least affected by the noise of the system
+    duration = min([result[0] for result in result_list])
+    max_rss = max([result[1] for result in result_list])
+    print("{0:>40} {1:>10.3f} {2:>12.1f}".format(
+        name, duration, max_rss / 1024
+    ))
+
+def has_cibadmin():
+    sys.path.insert(0, PACKAGE_DIR)
+    from pcs import settings
+    return os.path.exists(
+        os.path.join(settings.pacemaker_binaries, "cibadmin")
+    )
+
+def main(resource_count):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        cib_path = os.path.join(tmp_dir, "cib.xml")
+        generate_cib(cib_path, resource_count)
+        print("{0} resources, CIB size {1:.1f} MB".format(
+            resource_count, os.path.getsize(cib_path) / 1024 / 1024
+        ))
+        print("{0:>40} {1:>10} {2:>12}".format(
+            "scenario", "time [s]", "max RSS [MB]"
+        ))
+        for name in sorted(PARSER_MAP):
+            print_result(
+                "parse with " + name,
+                [
+                    measure_parser(PARSER_MAP[name], cib_path)
+                    for _ in range(ROUNDS)
+                ]
+            )
+        if not has_cibadmin():
+            print("cibadmin not found, skipping pcs commands")
+            return
+        for args in COMMAND_LIST:
+            result_list = []
+            for _ in range(ROUNDS):
+                # each run starts with the generated CIB
+                run_cib_path = os.path.join(tmp_dir, "run-cib.xml")
+                shutil.copy(cib_path, run_cib_path)
+                result_list.append(measure_command(args, run_cib_path))
+            print_result("pcs " + " ".join(args), result_list)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else RESOURCE_COUNT)
@@ -0,0 +1,190 @@
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+)
+
+# This module is not a part of the test suite. It compares latencies of
+# the Communicator engines by sending requests to a local HTTPS server which
+# stands in for pcsd running on cluster nodes.
+#
+# usage: python pcs/test/bench_node_communicator.py [node_count ...]
+
+import os.path
+import random
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    # python2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+except ImportError:
+    # python3
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)
+)))
+sys.path.insert(0, PACKAGE_DIR)
+
+from pcs.common.node_communicator import (
+    Communicator,
+    CommunicatorLoggerInterface,
+    ENGINE_SELECT,
+    ENGINE_SOCKET_EVENTS,
+    Request,
+    RequestData,
+    RequestTarget,
+)
+
+
+NODE_COUNT_LIST = [1, 10, 50, 100, 200]
+# simulated processing time of a request in pcsd, in seconds
+RESPONSE_DELAY_RANGE = (0.001, 0.05)
+ROUNDS = 3
+
+
+class NullLogger(CommunicatorLoggerInterface):
+    def log_request_start(self, request):
+        pass
+
+    def log_response(self, response):
+        pass
+
+    def log_retry(self, response, previous_host):
+        pass
+
+    def log_no_more_addresses(self, response):
+        pass
+
+    def log_connection_pool_stats(self, pool_stats):
+        pass
+
+
+class PcsdStandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _respond(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length:
+            self.rfile.read(length)
+        time.sleep(random.uniform(*RESPONSE_DELAY_RANGE))
+        body = b'{"status": "ok"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _respond
+    do_POST = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 512
+
+
+def create_certificate(directory):
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.check_call(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+            "-days", "1", "-subj", "/CN=localhost",
+            "-keyout", key, "-out", cert,
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    return cert, key
+
+
+def start_server(cert, key):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PcsdStandInHandler)
+    if hasattr(ssl, "SSLContext"):
+        context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+        context.load_cert_chain(cert, key)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    else:
+        server.socket = ssl.wrap_socket(
+            server.socket, certfile=cert, keyfile=key, server_side=True
+        )
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def percentile(sorted_values, fraction):
+    index = int(round(fraction * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def run_round(engine, port, node_count):
+    communicator = Communicator(NullLogger(), None, None, engine=engine)
+    communicator.add_requests([
+        Request(
+            RequestTarget(
+                "node{0}".format(i), address_list=["127.0.0.1"], port=port
+            ),
+            RequestData("remote/status", [("version", "2")]),
+        )
+        for i in range(node_count)
+    ])
+    latency_list = []
+    failed = 0
+    start = time.time()
+    for response in communicator.start_loop():
+        latency_list.append(time.time() - start)
+        if not response.was_connected or response.response_code != 200:
+            failed += 1
+    return latency_list, failed
+
+
+def main(node_count_list):
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        cert, key = create_certificate(tmp_dir)
+        server = start_server(cert, key)
+        port = server.server_address[1]
+        print(
+            "{0:>14} {1:>6} {2:>10} {3:>10} {4:>7}".format(
+                "engine", "nodes", "p50 [ms]", "p99 [ms]", "failed"
+            )
+        )
+        for node_count in node_count_list:
+            for engine in (ENGINE_SELECT, ENGINE_SOCKET_EVENTS):
+                latency_list = []
+                failed = 0
+                for dummy_round in range(ROUNDS):
+                    round_latency_list, round_failed = run_round(
+                        engine, port, node_count
+                    )
+                    latency_list.extend(round_latency_list)
+                    failed += round_failed
+                latency_list.sort()
+                print("{0:>14} {1:>6} {2:>10.1f} {3:>10.1f} {4:>7}".format(
+                    engine,
+                    node_count,
+                    1000 * percentile(latency_list, 0.5),
+                    1000 * percentile(latency_list, 0.99),
+                    failed,
+                ))
+        server.shutdown()
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or NODE_COUNT_LIST)
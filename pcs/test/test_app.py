@@ -0,0 +1,53 @@
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+)
+
+import os
+import subprocess
+import sys
+
+from pcs.test.tools.pcs_unittest import TestCase
+
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)
+)))
+
+
+class LazyImport(TestCase):
+    def get_imported_modules(self, code):
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                (
+                    "import sys; sys.path.insert(0, {0!r}); {1}; "
+                    "print('\\n'.join(sys.modules))"
+                ).format(PACKAGE_DIR, code),
+            ],
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        stdout, dummy_stderr = process.communicate()
+        self.assertEqual(0, process.returncode)
+        return set(stdout.splitlines())
+
+    def test_app_does_not_import_commands(self):
+        module_set = self.get_imported_modules("import pcs.app")
+        for module in (
+            "pcs.utils", "pcs.resource", "pcs.cluster", "pcs.lib.env",
+            "lxml.etree", "pycurl",
+        ):
+            self.assertNotIn(module, module_set)
+
+    def test_library_imports_only_used_commands(self):
+        module_set = self.get_imported_modules(
+            "from pcs.cli.common.lib_wrapper import load_module; "
+            "from pcs.test.tools.pcs_unittest import mock; "
+            "load_module(mock.MagicMock(), mock.MagicMock(), 'acl')"
+        )
+        self.assertIn("pcs.lib.commands.acl", module_set)
+        self.assertNotIn("pcs.lib.commands.booth", module_set)
+        self.assertNotIn("pcs.lib.commands.resource", module_set)
@@ -0,0 +1,159 @@
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+)
+
+import shutil
+
+from pcs.batch import parse_batch
+from pcs.cli.common.errors import CmdLineInputError
+from pcs.test.tools.assertions import ac
+from pcs.test.tools.misc import get_test_resource as rc
+from pcs.test.tools.pcs_runner import pcs
+from pcs.test.tools import pcs_unittest as unittest
+
+
+empty_cib = rc("cib-empty.xml")
+temp_cib = rc("temp-cib.xml")
+
+
+class ParseBatch(unittest.TestCase):
+    def assert_error(self, line_list, message):
+        with self.assertRaises(CmdLineInputError) as cm:
+            parse_batch(line_list)
+        self.assertEqual(message, cm.exception.message)
+
+    def test_empty(self):
+        self.assertEqual([], parse_batch([]))
+
+    def test_skip_empty_lines_and_comments(self):
+        self.assertEqual(
+            [(3, ["acl", "role", "create", "R"], {})],
+            parse_batch(["", "# comment", "acl role create R # comment", " "])
+        )
+
+    def test_strip_pcs(self):
+        self.assertEqual(
+            [(1, ["alert", "remove", "A"], {})],
+            parse_batch(["pcs alert remove A"])
+        )
+
+    def test_quotes(self):
+        self.assertEqual(
+            [(1, ["alert", "create", "path=/my path", "description=a b"], {})],
+            parse_batch(["alert create 'path=/my path' description=\"a b\""])
+        )
+
+    def test_options(self):
+        self.assertEqual(
+            [
+                (
+                    1,
+                    ["resource", "create", "R", "ocf:heartbeat:Dummy"],
+                    {"--group": "G", "--force": ""},
+                ),
+                (2, ["resource", "create", "S", "ocf:heartbeat:Dummy"], {}),
+            ],
+            parse_batch([
+                "resource create R ocf:heartbeat:Dummy --group G --force",
+                "resource create S ocf:heartbeat:Dummy",
+            ])
+        )
+
+    def test_unsupported_command(self):
+        self.assert_error(
+            ["acl role create R", "resource delete R"],
+            "line 2: command 'resource delete R' cannot be used in a batch"
+        )
+
+    def test_incomplete_command(self):
+        self.assert_error(
+            ["constraint ticket"],
+            "line 1: command 'constraint ticket' cannot be used in a batch"
+        )
+
+    def test_batch_only_options(self):
+        for option in ["-f file", "--wait", "--wait=10", "--debug"]:
+            self.assert_error(
+                ["acl role create R {0}".format(option)],
+                "line 1: option '{0}' can be specified only for the whole batch"
+                    .format(option.split(" ")[0].split("=")[0])
+            )
+
+    def test_unknown_option(self):
+        self.assert_error(
+            ["acl role create R --unknown"],
+            "line 1: option --unknown not recognized"
+        )
+
+    def test_duplicate_option(self):
+        self.assert_error(
+            ["resource create R ocf:heartbeat:Dummy --group G --group H"],
+            "line 1: --group can only be used once"
+        )
+
+    def test_unclosed_quotes(self):
+        self.assert_error(
+            ["alert create 'path=/path"],
+            "line 1: No closing quotation"
+        )
+
+
+class Batch(unittest.TestCase):
+    def setUp(self):
+        shutil.copy(empty_cib, temp_cib)
+
+    def test_success(self):
+        output, returnVal = pcs(
+            temp_cib,
+            "batch",
+            string_for_stdin=(
+                "acl role create role1 read xpath /xpath1/\n"
+                "pcs acl user create user1 role1\n"
+            )
+        )
+        ac(output, "")
+        self.assertEqual(0, returnVal)
+
+        output, returnVal = pcs(temp_cib, "acl")
+        ac(output, """\
+ACLs are disabled, run 'pcs acl enable' to enable
+
+User: user1
+  Roles: role1
+Role: role1
+  Permission: read xpath /xpath1/ (role1-read)
+""")
+        self.assertEqual(0, returnVal)
+
+    def test_failure_makes_no_changes(self):
+        output, returnVal = pcs(
+            temp_cib,
+            "batch",
+            string_for_stdin=(
+                "acl role create role1\n"
+                "acl user create user1 roleX\n"
+            )
+        )
+        ac(output, """\
+Error: ACL role 'roleX' does not exist
+Error: line 2 failed, no changes have been made
+""")
+        self.assertEqual(1, returnVal)
+
+        output, returnVal = pcs(temp_cib, "acl")
+        ac(output, """\
+ACLs are disabled, run 'pcs acl enable' to enable
+
+""")
+        self.assertEqual(0, returnVal)
+
+    def test_invalid_batch(self):
+        output, returnVal = pcs(
+            temp_cib,
+            "batch",
+            string_for_stdin="acl role create role1\nstatus\n"
+        )
+        ac(output, "Error: line 2: command 'status' cannot be used in a batch\n")
+        self.assertEqual(1, returnVal)
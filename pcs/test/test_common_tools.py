@@ -5,6 +5,7 @@ from __future__ import (
 )
 
 from pcs.test.tools.pcs_unittest import TestCase
+import threading
 import time
 
 from pcs.common import tools
@@ -64,6 +65,46 @@ class RunParallelTestCase(TestCase):
         self.assertTrue(elapsed_time < sum([i + 1 for i in range(x)]))
 
 
+class MapParallelTestCase(TestCase):
+    def test_empty(self):
+        self.assertEqual([], tools.map_parallel(str, [], 4))
+
+    def test_keep_order(self):
+        def worker(i):
+            # later items finish first
+            time.sleep((10 - i) * 0.01)
+            return i * 2
+        self.assertEqual(
+            [i * 2 for i in range(10)],
+            tools.map_parallel(worker, range(10), 4)
+        )
+
+    def test_max_workers(self):
+        lock = threading.Lock()
+        running = []
+        max_running = []
+        def worker(i):
+            with lock:
+                running.append(i)
+                max_running.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(i)
+        tools.map_parallel(worker, range(8), 3)
+        self.assertEqual(3, max(max_running))
+
+    def test_exception_does_not_stop_other_items(self):
+        done = []
+        def worker(i):
+            if i in (3, 1):
+                raise TestException(i)
+            done.append(i)
+        with self.assertRaises(TestException) as cm:
+            tools.map_parallel(worker, range(5), 2)
+        self.assertEqual((1, ), cm.exception.args)
+        self.assertEqual([0, 2, 4], sorted(done))
+
+
 class JoinMultilinesTest(TestCase):
     def test_empty_input(self):
         self.assertEqual(
@@ -7,6 +7,7 @@ from __future__ import (
 from lxml import etree
 import os
 import shutil
+from xml.dom.minidom import parseString
 from pcs.test.tools import pcs_unittest as unittest
 
 from pcs.test.tools.assertions import (
@@ -22,6 +23,9 @@ from pcs.test.tools.misc import (
     outdent,
 )
 from pcs.test.tools.pcs_runner import pcs, PcsRunner
+from pcs.test.tools.pcs_unittest import mock
+
+from pcs import constraint
 
 
 empty_cib = rc("cib-empty.xml")
@@ -3591,3 +3595,95 @@ class BundleTicket(Bundle):
             "Warning: R is a bundle resource, you should use the bundle id: B "
                 "when adding constraints\n"
         )
+
+
+@mock.patch.dict("pcs.utils.pcs_options", {"--full": ""}, clear=True)
+@mock.patch("pcs.utils.get_cib_tree")
+class LocationShowTree(unittest.TestCase):
+    def test_show(self, mock_get_cib_tree):
+        mock_get_cib_tree.return_value = etree.fromstring("""
+            <cib><configuration><constraints>
+                <rsc_location id="L1" rsc="R1" node="n1" score="100"/>
+                <!-- comments are skipped -->
+                <rsc_location id="L2" rsc-pattern="R.*" node="n2"
+                    score="-INFINITY" role="Master"
+                />
+                <rsc_location id="L3" rsc="R1" resource-discovery="never">
+                    <rule id="L3-rule" score="INFINITY">
+                        <expression id="L3-expr" attribute="#uname"
+                            operation="eq" value="n3"
+                        />
+                    </rule>
+                </rsc_location>
+            </constraints></configuration></cib>
+        """)
+        with mock.patch("pcs.constraint.print", create=True) as mock_print:
+            constraint.location_show([])
+        ac(
+            "\n".join([call[0][0] for call in mock_print.call_args_list]),
+            outdent("""\
+                Location Constraints:
+                  Resource pattern: R.*
+                    Disabled on: n2 (score:-INFINITY) (role: Master) (id:L2)
+                  Resource: R1
+                    Enabled on: n1 (score:100) (id:L1)
+                    Constraint: L3 (resource-discovery=never)
+                      Rule: score=INFINITY  (id:L3-rule)
+                        Expression: #uname eq n3  (id:L3-expr)"""
+            )
+        )
+
+
+class FindConstraintsContaining(unittest.TestCase):
+    def setUp(self):
+        self.dom = parseString("""
+            <cib><configuration>
+                <resources>
+                    <primitive id="A"/>
+                    <clone id="B-clone"><primitive id="B"/></clone>
+                </resources>
+                <constraints>
+                    <rsc_location id="L1" rsc="A" node="n1" score="100"/>
+                    <rsc_order id="O1" first="A" then="B-clone"/>
+                    <rsc_colocation id="C1" rsc="B" with-rsc="B"/>
+                    <rsc_ticket id="T1" ticket="T">
+                        <resource_set id="T1-set">
+                            <resource_ref id="A"/>
+                            <resource_ref id="B-clone"/>
+                        </resource_set>
+                    </rsc_ticket>
+                </constraints>
+            </configuration></cib>
+        """)
+
+    def find(self, resource_id):
+        constraint_list, set_list = constraint.find_constraints_containing(
+            resource_id, self.dom
+        )
+        return sorted(constraint_list), sorted(set_list)
+
+    def test_plain_and_set(self):
+        self.assertEqual((["L1", "O1"], ["T1"]), self.find("A"))
+
+    def test_clone_parent(self):
+        self.assertEqual((["C1", "O1"], ["T1"]), self.find("B"))
+
+    def test_not_referenced(self):
+        self.assertEqual(([], []), self.find("X"))
+
+    def test_index_built_once(self):
+        with mock.patch(
+            "pcs.constraint.ResourceReferenceIndex",
+            side_effect=constraint.ResourceReferenceIndex
+        ) as mock_index:
+            self.find("A")
+            self.find("B")
+        self.assertEqual(1, mock_index.call_count)
+
+    def test_changes_after_index_built(self):
+        self.find("A")
+        location = self.dom.getElementsByTagName("rsc_location")[0]
+        location.parentNode.removeChild(location)
+        order = self.dom.getElementsByTagName("rsc_order")[0]
+        order.setAttribute("first", "X")
+        self.assertEqual(([], ["T1"]), self.find("A"))
@@ -7,6 +7,8 @@ from __future__ import (
 from pcs.test.tools.pcs_unittest import TestCase
 import os.path
 import logging
+import threading
+import time
 
 from pcs.test.tools.assertions import (
     assert_raise_library_error,
@@ -24,6 +26,7 @@ from pcs import settings
 from pcs.common import (
     pcs_pycurl as pycurl,
     report_codes,
+    trace,
 )
 from pcs.lib.errors import ReportItemSeverity as severity
 
@@ -41,6 +44,17 @@ class CommandRunnerTest(TestCase):
         self.mock_logger = mock.MagicMock(logging.Logger)
         self.mock_reporter = MockLibraryReportProcessor()
 
+    def assert_logged(self, logger_calls):
+        # messages are objects formatted when logged
+        self.assertEqual(
+            logger_calls,
+            [
+                mock.call(str(message))
+                for (message, ), dummy_kwargs
+                in self.mock_logger.debug.call_args_list
+            ]
+        )
+
     def assert_popen_called_with(self, mock_popen, args, kwargs):
         self.assertEqual(mock_popen.call_count, 1)
         real_args, real_kwargs = mock_popen.call_args
@@ -97,8 +111,7 @@ class CommandRunnerTest(TestCase):
                 )
             )
         ]
-        self.assertEqual(self.mock_logger.debug.call_count, len(logger_calls))
-        self.mock_logger.debug.assert_has_calls(logger_calls)
+        self.assert_logged(logger_calls)
         assert_report_item_list_equal(
             self.mock_reporter.report_item_list,
             [
@@ -190,8 +203,7 @@ class CommandRunnerTest(TestCase):
                 )
             )
         ]
-        self.assertEqual(self.mock_logger.debug.call_count, len(logger_calls))
-        self.mock_logger.debug.assert_has_calls(logger_calls)
+        self.assert_logged(logger_calls)
         assert_report_item_list_equal(
             self.mock_reporter.report_item_list,
             [
@@ -274,8 +286,7 @@ class CommandRunnerTest(TestCase):
                     expected_stderr,
             ))
         ]
-        self.assertEqual(self.mock_logger.debug.call_count, len(logger_calls))
-        self.mock_logger.debug.assert_has_calls(logger_calls)
+        self.assert_logged(logger_calls)
         assert_report_item_list_equal(
             self.mock_reporter.report_item_list,
             [
@@ -301,6 +312,106 @@ class CommandRunnerTest(TestCase):
             ]
         )
 
+    @mock.patch.object(
+        lib.ExternalProcessFinishedLogMessage, "__str__",
+        side_effect=AssertionError("message formatted")
+    )
+    @mock.patch.object(
+        lib.ExternalProcessStartedLogMessage, "__str__",
+        side_effect=AssertionError("message formatted")
+    )
+    def test_debug_disabled(
+        self, mock_started_str, mock_finished_str, mock_popen
+    ):
+        mock_process = mock.MagicMock(spec_set=["communicate", "returncode"])
+        mock_process.communicate.return_value = ("stdout", "stderr")
+        mock_process.returncode = 0
+        mock_popen.return_value = mock_process
+        logger = logging.getLogger("pcs.test.command_runner.debug_disabled")
+        logger.setLevel(logging.INFO)
+        logger.addHandler(logging.NullHandler())
+
+        runner = lib.CommandRunner(logger, self.mock_reporter)
+        runner.run(["a_command"], stdin_string="stdin")
+
+        mock_started_str.assert_not_called()
+        mock_finished_str.assert_not_called()
+        self.assertEqual(
+            [
+                report_codes.RUN_EXTERNAL_PROCESS_STARTED,
+                report_codes.RUN_EXTERNAL_PROCESS_FINISHED,
+            ],
+            [item.code for item in self.mock_reporter.report_item_list]
+        )
+
+    def test_trace(self, mock_popen):
+        mock_process = mock.MagicMock(spec_set=["communicate", "returncode"])
+        mock_process.communicate.return_value = ("stdout", "stderr")
+        mock_process.returncode = 0
+        mock_popen.return_value = mock_process
+
+        runner = lib.CommandRunner(self.mock_logger, self.mock_reporter)
+        trace.enable()
+        try:
+            runner.run(["/usr/sbin/a_command", "arg"], stdin_string="stdin")
+            trace_data = trace.get_chrome_trace()
+        finally:
+            trace.disable()
+
+        self.assertEqual(
+            [("a_command", {"command": "/usr/sbin/a_command arg", "retval": 0})],
+            [
+                (event["name"], event["args"])
+                for event in trace_data["traceEvents"]
+                if event["cat"] == trace.CATEGORY_PROCESS
+            ]
+        )
+        self.assertEqual(
+            1, trace_data["otherData"][trace.COUNTER_PROCESSES]
+        )
+        self.assertEqual(
+            17, trace_data["otherData"][trace.COUNTER_PIPE_BYTES]
+        )
+
+    @mock.patch(
+        "pcs.lib.external.settings.external_process_report_payload_limit", 6
+    )
+    def test_report_payload_limit(self, mock_popen):
+        mock_process = mock.MagicMock(spec_set=["communicate", "returncode"])
+        mock_process.communicate.return_value = ("long stdout", "stderr")
+        mock_process.returncode = 0
+        mock_popen.return_value = mock_process
+
+        runner = lib.CommandRunner(self.mock_logger, self.mock_reporter)
+        self.assertEqual(
+            ("long stdout", "stderr", 0),
+            runner.run(["a_command"], stdin_string="long stdin")
+        )
+        assert_report_item_list_equal(
+            self.mock_reporter.report_item_list,
+            [
+                (
+                    severity.DEBUG,
+                    report_codes.RUN_EXTERNAL_PROCESS_STARTED,
+                    {
+                        "command": "a_command",
+                        "stdin": "long s\n--Truncated, 4 more characters--",
+                        "environment": dict(),
+                    }
+                ),
+                (
+                    severity.DEBUG,
+                    report_codes.RUN_EXTERNAL_PROCESS_FINISHED,
+                    {
+                        "command": "a_command",
+                        "return_value": 0,
+                        "stdout": "long s\n--Truncated, 5 more characters--",
+                        "stderr": "stderr",
+                    }
+                )
+            ]
+        )
+
     def test_popen_error(self, mock_popen):
         expected_error = "expected error"
         command = ["a_command"]
@@ -332,8 +443,7 @@ class CommandRunnerTest(TestCase):
         logger_calls = [
             mock.call("Running: {0}\nEnvironment:".format(command_str)),
         ]
-        self.assertEqual(self.mock_logger.debug.call_count, len(logger_calls))
-        self.mock_logger.debug.assert_has_calls(logger_calls)
+        self.assert_logged(logger_calls)
         assert_report_item_list_equal(
             self.mock_reporter.report_item_list,
             [
@@ -381,8 +491,7 @@ class CommandRunnerTest(TestCase):
         logger_calls = [
             mock.call("Running: {0}\nEnvironment:".format(command_str)),
         ]
-        self.assertEqual(self.mock_logger.debug.call_count, len(logger_calls))
-        self.mock_logger.debug.assert_has_calls(logger_calls)
+        self.assert_logged(logger_calls)
         assert_report_item_list_equal(
             self.mock_reporter.report_item_list,
             [
@@ -398,6 +507,146 @@ class CommandRunnerTest(TestCase):
             ]
         )
 
+
+@mock.patch(
+    "pcs.lib.external.settings.external_process_report_payload_limit", 6
+)
+class LimitedReportPayloadTest(TestCase):
+    def test_not_limited(self):
+        payload = lib.LimitedReportPayload("short")
+        self.assertEqual("short", str(payload))
+        self.assertEqual("short", payload)
+
+    def test_limited_when_formatted(self):
+        data = "long payload"
+        payload = lib.LimitedReportPayload(data)
+        # nothing is copied until the payload is formatted
+        self.assertIs(data, payload._payload)
+        self.assertEqual(
+            "long p\n--Truncated, 6 more characters--",
+            "{0}".format(payload)
+        )
+        self.assertEqual("long p\n--Truncated, 6 more characters--", payload)
+        self.assertNotEqual("long payload", payload)
+
+    def test_bytes(self):
+        payload = lib.LimitedReportPayload(b"long payload")
+        self.assertEqual(b"long p\n--Truncated, 6 more characters--", payload)
+        self.assertEqual(
+            "long p\n--Truncated, 6 more characters--", str(payload)
+        )
+
+    def test_empty(self):
+        self.assertFalse(lib.LimitedReportPayload(""))
+        self.assertTrue(lib.LimitedReportPayload("a"))
+
+    def test_no_limit(self):
+        # patched here, it would be overridden by the patch of the class
+        with mock.patch(
+            "pcs.lib.external.settings.external_process_report_payload_limit",
+            None
+        ):
+            self.assertEqual(
+                "long payload", str(lib.LimitedReportPayload("long payload"))
+            )
+
+
+class CommandRunnerTimeoutTest(TestCase):
+    def setUp(self):
+        self.runner = lib.CommandRunner(
+            mock.MagicMock(logging.Logger), MockLibraryReportProcessor()
+        )
+
+    def test_finished_in_time(self):
+        self.assertEqual(
+            ("out\n", "", 0),
+            self.runner.run(["/bin/sh", "-c", "echo out"], timeout=10)
+        )
+
+    def test_timed_out(self):
+        start = time.time()
+        with self.assertRaises(lib.CommandTimeoutError) as cm:
+            self.runner.run(["/bin/sh", "-c", "sleep 10"], timeout=0.2)
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual("/bin/sh -c 'sleep 10'", cm.exception.command)
+        self.assertEqual(0.2, cm.exception.timeout)
+
+    def test_children_killed(self):
+        # the child would keep stdout open if it was not killed
+        start = time.time()
+        with self.assertRaises(lib.CommandTimeoutError):
+            self.runner.run(
+                ["/bin/sh", "-c", "sleep 10 & sleep 10"], timeout=0.2
+            )
+        self.assertLess(time.time() - start, 5)
+
+    def test_timeouts_in_threads(self):
+        # commands are started and killed while other threads are running
+        result_dict = {}
+        def run(name, args, timeout):
+            try:
+                result_dict[name] = self.runner.run(args, timeout=timeout)
+            except lib.CommandTimeoutError as e:
+                result_dict[name] = e
+        thread_list = [
+            threading.Thread(
+                target=run,
+                args=(i, ["/bin/sh", "-c", "sleep 10 & sleep 10"], 0.2)
+            )
+            for i in range(4)
+        ]
+        thread_list.append(threading.Thread(
+            target=run, args=("echo", ["/bin/sh", "-c", "echo out"], 10)
+        ))
+        start = time.time()
+        for thread in thread_list:
+            thread.start()
+        for thread in thread_list:
+            thread.join()
+        self.assertLess(time.time() - start, 5)
+        for i in range(4):
+            self.assertTrue(
+                isinstance(result_dict[i], lib.CommandTimeoutError)
+            )
+        self.assertEqual(("out\n", "", 0), result_dict["echo"])
+
+
+@mock.patch("subprocess.Popen", autospec=True)
+class CommandRunnerNewSessionTest(TestCase):
+    def setUp(self):
+        self.runner = lib.CommandRunner(
+            mock.MagicMock(logging.Logger), MockLibraryReportProcessor()
+        )
+        self.runner._python2 = False
+
+    def fixture_process(self, mock_popen):
+        mock_process = mock.MagicMock(spec_set=["communicate", "returncode"])
+        mock_process.communicate.return_value = ("", "")
+        mock_process.returncode = 0
+        mock_popen.return_value = mock_process
+
+    def test_timeout(self, mock_popen):
+        self.fixture_process(mock_popen)
+        self.runner.run(["a_command"], timeout=10)
+        dummy_args, kwargs = mock_popen.call_args
+        self.assertTrue(kwargs["start_new_session"])
+        self.assertFalse("preexec_fn" in kwargs)
+
+    def test_no_timeout(self, mock_popen):
+        self.fixture_process(mock_popen)
+        self.runner.run(["a_command"])
+        dummy_args, kwargs = mock_popen.call_args
+        self.assertFalse(kwargs["start_new_session"])
+        self.assertFalse("preexec_fn" in kwargs)
+
+    def test_python2(self, mock_popen):
+        self.fixture_process(mock_popen)
+        self.runner._python2 = True
+        self.runner.run(["a_command"], timeout=10)
+        dummy_args, kwargs = mock_popen.call_args
+        self.assertTrue(callable(kwargs["preexec_fn"]))
+        self.assertFalse("start_new_session" in kwargs)
+
 @mock.patch(
     "pcs.lib.external.pycurl.Curl",
     autospec=True
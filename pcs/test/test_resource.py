@@ -5,9 +5,18 @@ from __future__ import (
 )
 
 from lxml import etree
+import logging
+import os
 import re
 import shutil
 from textwrap import dedent
+from xml.dom.minidom import parseString
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    #python 3
+    from io import StringIO
 
 from pcs.test.tools import pcs_unittest as unittest
 from pcs.test.tools.assertions import (
@@ -15,7 +24,8 @@ from pcs.test.tools.assertions import (
     AssertPcsMixin,
 )
 from pcs.test.tools.cib import get_assert_pcs_effect_mixin
-from pcs.test.tools.pcs_unittest import TestCase
+from pcs.test.tools.custom_mock import MockLibraryReportProcessor
+from pcs.test.tools.pcs_unittest import TestCase, mock, skipUnless
 from pcs.test.tools.misc import (
     get_test_resource as rc,
     outdent,
@@ -26,8 +36,10 @@ from pcs.test.tools.pcs_runner import (
     PcsRunner,
 )
 
+from pcs import settings
 from pcs import utils
 from pcs import resource
+from pcs.lib.external import CommandRunner
 
 empty_cib = rc("cib-empty.xml")
 temp_cib = rc("temp-cib.xml")
@@ -5212,3 +5224,418 @@ class ResourceUpdateSpcialChecks(unittest.TestCase, AssertPcsMixin):
             "Warning: this command is not sufficient for removing a guest node,"
             " use 'pcs cluster node remove-guest'\n"
         )
+
+
+@mock.patch.dict("pcs.utils.pcs_options", clear=True)
+@mock.patch("pcs.utils.err", side_effect=SystemExit(1))
+class ResourceGroupAddTree(TestCase):
+    def setUp(self):
+        self.cib = etree.fromstring("""
+            <cib>
+                <configuration>
+                    <resources>
+                        <primitive id="R1" />
+                        <group id="G1">
+                            <primitive id="R2" />
+                            <primitive id="R3" />
+                        </group>
+                        <clone id="C1">
+                            <group id="G2">
+                                <primitive id="R4" />
+                            </group>
+                        </clone>
+                        <clone id="C2">
+                            <primitive id="R5" />
+                        </clone>
+                    </resources>
+                </configuration>
+            </cib>
+        """)
+
+    def get_group_members(self, group_id):
+        return [
+            el.get("id")
+            for el in self.cib.xpath("//group[@id=$id]/primitive", id=group_id)
+        ]
+
+    def test_new_group(self, mock_err):
+        resource.resource_group_add(self.cib, "G3", ["R1", "R4"])
+        self.assertEqual(["R1", "R4"], self.get_group_members("G3"))
+        # emptied group is removed together with its clone
+        self.assertEqual([], self.cib.xpath("//*[@id='C1' or @id='G2']"))
+        mock_err.assert_not_called()
+
+    def test_after(self, mock_err):
+        utils.pcs_options["--after"] = "R2"
+        resource.resource_group_add(self.cib, "G1", ["R1"])
+        self.assertEqual(["R2", "R1", "R3"], self.get_group_members("G1"))
+
+    def test_before(self, mock_err):
+        utils.pcs_options["--before"] = "R2"
+        resource.resource_group_add(self.cib, "G1", ["R3", "R1"])
+        self.assertEqual(["R3", "R1", "R2"], self.get_group_members("G1"))
+
+    def test_errors(self, mock_err):
+        for group_id, resource_ids, message in (
+            ("G3", ["R5"], "cannot group clone resources"),
+            ("G3", ["RX"], "Unable to find resource: RX"),
+            ("G1", ["R2"], "R2 already exists in G1"),
+            ("C2", ["R1"], "'C2' is already a clone resource"),
+        ):
+            mock_err.reset_mock()
+            self.assertRaises(
+                SystemExit,
+                resource.resource_group_add, self.cib, group_id, resource_ids
+            )
+            mock_err.assert_called_once_with(message)
+
+
+def fixture_removal_cib():
+    return parseString("""
+        <cib>
+            <configuration>
+                <resources>
+                    <primitive id="R1" />
+                    <group id="G1">
+                        <primitive id="R2" />
+                        <primitive id="R3" />
+                    </group>
+                    <clone id="C1">
+                        <group id="G2">
+                            <primitive id="R4" />
+                        </group>
+                    </clone>
+                    <master id="M1">
+                        <primitive id="R5" />
+                    </master>
+                    <bundle id="B1">
+                        <primitive id="R6" />
+                    </bundle>
+                </resources>
+                <constraints>
+                    <rsc_location id="L1" rsc="G1" node="n1" score="1" />
+                    <rsc_location id="L2" rsc="R2" node="n1" score="1" />
+                    <rsc_order id="O1" first="C1" then="R1" />
+                </constraints>
+                <fencing-topology>
+                    <fencing-level id="FL1" target="n1" index="1"
+                        devices="R1,R5"
+                    />
+                </fencing-topology>
+            </configuration>
+        </cib>
+    """)
+
+
+@mock.patch.dict("pcs.utils.pcs_options", clear=True)
+@mock.patch("pcs.utils.usefile", True)
+@mock.patch("pcs.utils.push_cib_diff")
+@mock.patch("pcs.utils.get_cib_dom")
+class ResourceRemoveList(TestCase):
+    def setUp(self):
+        self.cib = fixture_removal_cib()
+        self.cib_original_xml = self.cib.toxml()
+
+    def remove(self, mock_get_cib_dom, resource_id_list):
+        mock_get_cib_dom.return_value = self.cib
+        with mock.patch("sys.stdout", new_callable=StringIO) as mock_stdout:
+            resource.resource_remove_list(resource_id_list)
+        return mock_stdout.getvalue().splitlines()
+
+    def get_ids(self, tag):
+        return [
+            el.getAttribute("id") for el in self.cib.getElementsByTagName(tag)
+        ]
+
+    def test_one_cib_load_and_push(self, mock_get_cib_dom, mock_push):
+        self.assertEqual(
+            [
+                "Removing group: G1 (and all resources within group)",
+                "Stopping all resources in group: G1...",
+                "Removing group: G2 (and all resources within group)",
+                "Stopping all resources in group: G2...",
+                "Removing Constraint - O1",
+                "Deleting Resource - R1",
+                "Removing Constraint - L2",
+                "Deleting Resource - R2",
+                "Removing Constraint - L1",
+                "Deleting Resource (and group) - R3",
+                "Deleting Resource (and group and clone) - R4",
+            ],
+            self.remove(mock_get_cib_dom, ["R1", "G1", "C1", "R3"])
+        )
+        mock_get_cib_dom.assert_called_once_with()
+        mock_push.assert_called_once_with(self.cib_original_xml, self.cib)
+        self.assertEqual(["R5", "R6"], self.get_ids("primitive"))
+        self.assertEqual([], self.get_ids("group"))
+        self.assertEqual([], self.get_ids("clone"))
+        self.assertEqual(["M1"], self.get_ids("master"))
+        self.assertEqual(
+            "R5",
+            self.cib.getElementsByTagName("fencing-level")[0]
+                .getAttribute("devices")
+        )
+
+    def test_master_and_bundle(self, mock_get_cib_dom, mock_push):
+        self.assertEqual(
+            [
+                "Deleting bundle 'B1' and its inner resource 'R6'",
+                "Deleting Resource - R5",
+                "Deleting Resource - R6",
+            ],
+            self.remove(mock_get_cib_dom, ["M1", "B1"])
+        )
+        self.assertEqual([], self.get_ids("master"))
+        self.assertEqual([], self.get_ids("bundle"))
+        self.assertEqual(
+            "R1",
+            self.cib.getElementsByTagName("fencing-level")[0]
+                .getAttribute("devices")
+        )
+
+    @mock.patch("pcs.utils.run", return_value=("", 0))
+    @mock.patch("pcs.utils.get_library_wrapper")
+    @mock.patch("pcs.utils.resource_running_on")
+    @mock.patch("pcs.utils.getClusterStateXml", return_value="<crm_mon/>")
+    def test_stop_running_at_once(
+        self, mock_state, mock_running_on, mock_lib, mock_run,
+        mock_get_cib_dom, mock_push
+    ):
+        running_set = set(["R1", "R2"])
+        mock_running_on.side_effect = lambda resource_id, state: {
+            "is_running": resource_id in running_set,
+        }
+        def disable(resource_id_list, wait):
+            self.assertEqual(["R1", "G1"], resource_id_list)
+            self.assertFalse(wait)
+            running_set.clear()
+        mock_lib.return_value.resource.disable.side_effect = disable
+        with mock.patch("pcs.utils.usefile", False):
+            output = self.remove(mock_get_cib_dom, ["R1", "G1", "R5"])
+        self.assertIn("Attempting to stop: R1, G1... Stopped", output)
+        mock_run.assert_called_once_with(["crm_resource", "--wait"])
+        self.assertEqual(2, mock_state.call_count)
+        self.assertEqual(2, mock_get_cib_dom.call_count)
+        mock_push.assert_called_once_with(self.cib_original_xml, self.cib)
+
+    @mock.patch("pcs.utils.err", side_effect=SystemExit(1))
+    def test_nonexistent(self, mock_err, mock_get_cib_dom, mock_push):
+        self.assertRaises(
+            SystemExit, self.remove, mock_get_cib_dom, ["R1", "RX"]
+        )
+        mock_err.assert_called_once_with("Resource 'RX' does not exist.")
+        mock_push.assert_not_called()
+
+
+def _is_live_cib_diff_available():
+    return all([
+        os.path.exists(os.path.join(settings.pacemaker_binaries, binary))
+        for binary in ("cibadmin", "crm_diff")
+    ])
+
+@skipUnless(
+    _is_live_cib_diff_available(), "cibadmin or crm_diff is not available"
+)
+@mock.patch.dict("pcs.utils.pcs_options", clear=True)
+@mock.patch("pcs.utils.usefile", True)
+@mock.patch("pcs.utils.filename", temp_cib)
+class ResourceRemoveListConcurrentChange(TestCase):
+    def setUp(self):
+        shutil.copy(empty_cib, temp_cib)
+        self.runner = CommandRunner(
+            mock.MagicMock(logging.Logger),
+            MockLibraryReportProcessor(),
+            {"CIB_file": temp_cib}
+        )
+        self.create_primitive("R1")
+
+    def create_primitive(self, resource_id):
+        dummy_stdout, stderr, retval = self.runner.run([
+            os.path.join(settings.pacemaker_binaries, "cibadmin"),
+            "--create", "--scope", "resources", "--xml-text",
+            (
+                '<primitive id="{0}" class="ocf" provider="heartbeat" '
+                'type="Dummy"/>'
+            ).format(resource_id)
+        ])
+        self.assertEqual(0, retval, stderr)
+
+    def test_concurrent_change_survives(self):
+        get_cib_dom = utils.get_cib_dom
+        def get_cib_dom_and_change_it():
+            dom = get_cib_dom()
+            # someone else changes the CIB after pcs has loaded it
+            self.create_primitive("R2")
+            return dom
+        with mock.patch(
+            "pcs.utils.get_cib_dom", side_effect=get_cib_dom_and_change_it
+        ), mock.patch("pcs.utils.cmd_runner", return_value=self.runner):
+            with mock.patch("sys.stdout", new_callable=StringIO):
+                resource.resource_remove_list(["R1"])
+        with open(temp_cib) as cib_file:
+            cib = etree.fromstring(cib_file.read().encode("utf-8"))
+        self.assertEqual(
+            ["R2"],
+            [el.get("id") for el in cib.findall(".//resources/primitive")]
+        )
+
+
+class GetResourceRemovalList(TestCase):
+    def setUp(self):
+        self.cib = fixture_removal_cib()
+
+    def assert_removal_list(self, resource_id_list, removal_list):
+        self.assertEqual(
+            removal_list,
+            resource._get_resource_removal_list(self.cib, resource_id_list)
+        )
+
+    def test_group_in_clone(self):
+        self.assert_removal_list(["C1"], [("group", "G2", ["R4"])])
+        self.assert_removal_list(["G2"], [("group", "G2", ["R4"])])
+
+    def test_master(self):
+        self.assert_removal_list(["M1"], [("primitive", "R5", ["R5"])])
+
+    def test_bundle(self):
+        self.assert_removal_list(["B1"], [("bundle", "B1", ["R6"])])
+
+    def test_bundle_after_its_inner_resource(self):
+        self.assert_removal_list(
+            ["R6", "B1"],
+            [("primitive", "R6", ["R6"]), ("bundle", "B1", [])]
+        )
+
+    def test_specified_twice(self):
+        self.assert_removal_list(
+            ["R1", "B1", "C1", "R1", "B1", "G2", "R4"],
+            [
+                ("primitive", "R1", ["R1"]),
+                ("bundle", "B1", ["R6"]),
+                ("group", "G2", ["R4"]),
+            ]
+        )
+
+    def test_group_after_its_member(self):
+        self.assert_removal_list(
+            ["R2", "G1", "R3"],
+            [("primitive", "R2", ["R2"]), ("group", "G1", ["R3"])]
+        )
+
+    @mock.patch("pcs.utils.err", side_effect=SystemExit(1))
+    def test_nonexistent(self, mock_err):
+        self.assertRaises(
+            SystemExit,
+            resource._get_resource_removal_list, self.cib, ["R1", "RX"]
+        )
+        mock_err.assert_called_once_with("Resource 'RX' does not exist.")
+
+
+class RemovePrimitive(TestCase):
+    def setUp(self):
+        self.cib = fixture_removal_cib()
+
+    def remove(self, resource_id):
+        with mock.patch("sys.stdout", new_callable=StringIO) as mock_stdout:
+            self.assertIsNone(
+                resource._remove_primitive(self.cib, resource_id, True)
+            )
+        return mock_stdout.getvalue().splitlines()
+
+    def get_ids(self, tag):
+        return [
+            el.getAttribute("id") for el in self.cib.getElementsByTagName(tag)
+        ]
+
+    def test_group_in_clone(self):
+        self.assertEqual(
+            [
+                "Removing Constraint - O1",
+                "Deleting Resource (and group and clone) - R4",
+            ],
+            self.remove("R4")
+        )
+        self.assertEqual([], self.get_ids("clone"))
+        self.assertEqual(["G1"], self.get_ids("group"))
+        self.assertEqual([], self.get_ids("rsc_order"))
+
+    def test_bundle_keeps_bundle(self):
+        self.assertEqual(["Deleting Resource - R6"], self.remove("R6"))
+        self.assertEqual(["B1"], self.get_ids("bundle"))
+        self.assertEqual(
+            ["R1", "R2", "R3", "R4", "R5"], self.get_ids("primitive")
+        )
+
+    def test_removed_twice(self):
+        self.assertEqual(
+            ["Removing Constraint - L2", "Deleting Resource - R2"],
+            self.remove("R2")
+        )
+        self.assertEqual([], self.remove("R2"))
+        self.assertEqual(["G1", "G2"], self.get_ids("group"))
+        self.assertEqual(
+            ["R1", "R3", "R4", "R5", "R6"], self.get_ids("primitive")
+        )
+        self.assertEqual(["L1"], self.get_ids("rsc_location"))
+
+
+@mock.patch("pcs.utils.resource_running_on")
+@mock.patch("pcs.resource._is_bundle_running")
+@mock.patch("pcs.resource.get_cluster_state_dom")
+@mock.patch("pcs.utils.getClusterStateXml", return_value="<crm_mon/>")
+class StopResourcesBeforeRemoval(TestCase):
+    removal_list = [
+        ("primitive", "R1", ["R1"]),
+        ("bundle", "B1", ["R6"]),
+        ("bundle", "B2", []),
+    ]
+
+    def test_nothing_running(
+        self, mock_state_xml, mock_state_dom, mock_bundle_running,
+        mock_running_on
+    ):
+        mock_running_on.return_value = {"is_running": False}
+        mock_bundle_running.return_value = False
+        self.assertFalse(
+            resource._stop_resources_before_removal(self.removal_list)
+        )
+        mock_state_xml.assert_called_once_with()
+        mock_state_dom.assert_called_once_with("<crm_mon/>")
+        self.assertEqual(
+            [
+                mock.call(mock_state_dom.return_value, "B1"),
+                mock.call(mock_state_dom.return_value, "B2"),
+            ],
+            mock_bundle_running.call_args_list
+        )
+
+    @mock.patch("pcs.utils.run", return_value=("", 0))
+    @mock.patch("pcs.utils.get_library_wrapper")
+    def test_state_loaded_once_per_check(
+        self, mock_lib, mock_run, mock_state_xml, mock_state_dom,
+        mock_bundle_running, mock_running_on
+    ):
+        running_set = set(["R1", "B2"])
+        mock_running_on.side_effect = lambda resource_id, state: {
+            "is_running": resource_id in running_set,
+        }
+        mock_bundle_running.side_effect = (
+            lambda state, resource_id: resource_id in running_set
+        )
+        def disable(resource_id_list, wait):
+            self.assertEqual(["R1", "B2"], resource_id_list)
+            running_set.clear()
+        mock_lib.return_value.resource.disable.side_effect = disable
+        with mock.patch("sys.stdout", new_callable=StringIO) as mock_stdout:
+            self.assertTrue(
+                resource._stop_resources_before_removal(self.removal_list)
+            )
+        self.assertEqual(
+            "Attempting to stop: R1, B2... Stopped\n", mock_stdout.getvalue()
+        )
+        self.assertEqual(2, mock_state_xml.call_count)
+        self.assertEqual(
+            [mock.call("<crm_mon/>"), mock.call("<crm_mon/>")],
+            mock_state_dom.call_args_list
+        )
+        self.assertEqual(4, mock_bundle_running.call_count)
@@ -4,13 +4,29 @@ from __future__ import (
     print_function,
 )
 
+import json
+import os
 import shutil
+import sys
+import tempfile
+import threading
 from textwrap import dedent
 
+try:
+    from cStringIO import StringIO
+except ImportError:
+    #python 3
+    from io import StringIO
+
+from lxml import etree
+
+from pcs import status, utils
+from pcs.lib import reports
+from pcs.lib.errors import LibraryError
 from pcs.test.tools.assertions import AssertPcsMixin
 from pcs.test.tools.misc import get_test_resource as rc
 from pcs.test.tools.pcs_runner import PcsRunner
-from pcs.test.tools.pcs_unittest import TestCase
+from pcs.test.tools.pcs_unittest import TestCase, mock
 
 
 class StonithWarningTest(TestCase, AssertPcsMixin):
@@ -105,3 +121,490 @@ class StonithWarningTest(TestCase, AssertPcsMixin):
                 Current DC: NONE
             """)
         )
+
+
+CRM_MON_XML = """
+    <crm_mon version="1.1.18">
+        <summary>
+            <current_dc present="true" name="node1" id="1"
+                with_quorum="true"
+            />
+            <nodes_configured number="2" expected_votes="unknown"/>
+            <resources_configured number="3" disabled="0" blocked="0"/>
+        </summary>
+        <nodes>
+            <node name="node1" id="1" online="true" standby="false"
+                type="member" resources_running="2"
+            />
+            <node name="node2" id="2" online="false" standby="false"
+                type="member" resources_running="0"
+            />
+        </nodes>
+        <resources>
+            <resource id="R1" resource_agent="ocf::heartbeat:Dummy"
+                role="Started" active="true" nodes_running_on="1"
+            >
+                <node name="node1" id="1" cached="false"/>
+            </resource>
+            <clone id="C-clone" multi_state="false" unique="false">
+                <resource id="C" resource_agent="ocf::heartbeat:Dummy"
+                    role="Stopped" active="false" nodes_running_on="0"
+                />
+            </clone>
+        </resources>
+        <tickets>
+            <ticket id="T1" status="granted" standby="false"/>
+        </tickets>
+    </crm_mon>
+"""
+
+CIB_STONITH = """
+    <cib><configuration>
+        <crm_config/>
+        <resources>
+            <primitive id="S1" class="stonith" type="fence_xvm">
+                <instance_attributes id="S1-attrs">
+                    <nvpair id="S1-method" name="method" value="cycle"/>
+                </instance_attributes>
+            </primitive>
+        </resources>
+    </configuration></cib>
+"""
+
+
+class RunProbes(TestCase):
+    def test_results_and_errors(self):
+        def fail():
+            raise SystemExit(1)
+        probe_results = status.run_probes({
+            "one": lambda: 1,
+            "fail": fail,
+        })
+        self.assertTrue(probe_results.has("one"))
+        self.assertTrue(probe_results.has("fail"))
+        self.assertFalse(probe_results.has("other"))
+        self.assertEqual(1, probe_results.get("one"))
+        self.assertEqual("x", probe_results.get("other", "x"))
+        self.assertRaises(SystemExit, lambda: probe_results.get("fail"))
+
+    def test_stderr_printed_when_read(self):
+        def fail():
+            sys.stderr.write("Error: fail\n")
+            raise SystemExit(1)
+        stderr = StringIO()
+        with mock.patch("sys.stderr", stderr):
+            probe_results = status.run_probes({
+                "fail": fail,
+                "one": lambda: 1,
+            })
+            self.assertEqual("", stderr.getvalue())
+            self.assertEqual(1, probe_results.get("one"))
+            self.assertRaises(SystemExit, lambda: probe_results.get("fail"))
+            self.assertEqual("Error: fail\n", stderr.getvalue())
+            # printed only once
+            self.assertRaises(SystemExit, lambda: probe_results.get("fail"))
+        self.assertEqual("Error: fail\n", stderr.getvalue())
+
+    def test_run_concurrently(self):
+        barrier = threading.Event()
+        # the first probe waits for the second one, it would time out if the
+        # probes were run one by one
+        probe_results = status.run_probes({
+            "wait": lambda: barrier.wait(5),
+            "set": barrier.set,
+        })
+        self.assertTrue(probe_results.get("wait"))
+
+
+@mock.patch("pcs.status.os.getuid", lambda: 0)
+@mock.patch("pcs.utils.usefile", False)
+@mock.patch("pcs.utils.is_rhel6", lambda: False)
+@mock.patch("pcs.utils.hasCorosyncConf", lambda: False)
+@mock.patch("pcs.utils.getClusterName", lambda: "test99")
+@mock.patch("pcs.utils.get_cib_tree", lambda: etree.fromstring(CIB_STONITH))
+@mock.patch("pcs.utils.getPacemakerNodesID", lambda allow_failure: {"1": "a"})
+@mock.patch("pcs.utils.getCorosyncNodesID", lambda allow_failure: {"1": "b"})
+@mock.patch("pcs.status._is_sbd_running", lambda: False)
+@mock.patch(
+    "pcs.utils.get_service_status",
+    lambda service: (True, True) if service == "corosync" else None
+)
+class FullStatus(TestCase):
+    def run_status(self, options, mock_run):
+        stdout = StringIO()
+        with mock.patch.dict("pcs.utils.pcs_options", options, clear=True):
+            with mock.patch("sys.stdout", stdout):
+                status.full_status()
+        return stdout.getvalue()
+
+    @mock.patch("pcs.utils.run")
+    def test_text(self, mock_run):
+        mock_run.return_value = ("crm_mon output", 0)
+        self.assertEqual(
+            dedent("""\
+                Cluster name: test99
+                WARNING: following stonith devices have the 'method' option set to 'cycle' which is potentially dangerous, please consider using 'onoff': S1
+                WARNING: corosync and pacemaker node names do not match (IPs used in setup?)
+                crm_mon output
+                Daemon Status:
+                  corosync: active/enabled
+            """),
+            self.run_status({}, mock_run)
+        )
+        mock_run.assert_called_once_with(
+            ["crm_mon", "--one-shot", "--inactive"]
+        )
+
+    @mock.patch("pcs.utils.run")
+    def test_text_full(self, mock_run):
+        mock_run.side_effect = lambda args: (
+            ("T1 granted", 0) if args[0] == "crm_ticket"
+            else ("crm_mon output", 0)
+        )
+        output = self.run_status({"--full": ""}, mock_run)
+        self.assertIn("crm_mon output\nTickets:\n  T1 granted\n", output)
+        self.assertEqual(2, mock_run.call_count)
+        mock_run.assert_any_call([
+            "crm_mon", "--one-shot", "--inactive", "--show-detail",
+            "--show-node-attributes", "--failcounts"
+        ])
+
+    @mock.patch("pcs.utils.err", side_effect=SystemExit(1))
+    @mock.patch("pcs.utils.run")
+    def test_cluster_not_running(self, mock_run, mock_err):
+        mock_run.return_value = ("error", 1)
+        self.assertRaises(SystemExit, lambda: self.run_status({}, mock_run))
+        mock_err.assert_called_once_with(
+            "cluster is not currently running on this node"
+        )
+
+    @mock.patch("pcs.utils.run")
+    def test_cluster_down(self, mock_run):
+        def get_cib_tree():
+            utils.err("unable to get cib")
+        mock_run.return_value = ("error", 1)
+        stderr = StringIO()
+        # patched here, it would be overridden by the patch of the class
+        with mock.patch(
+            "pcs.utils.get_cib_tree", side_effect=get_cib_tree
+        ) as mock_get_cib_tree, mock.patch(
+            "pcs.status._is_sbd_running"
+        ) as mock_sbd_running, mock.patch("sys.stderr", stderr):
+            self.assertRaises(SystemExit, lambda: self.run_status({}, mock_run))
+        # the status is not printed beyond the crm_mon error, so the other
+        # probes are not run at all
+        mock_get_cib_tree.assert_not_called()
+        mock_sbd_running.assert_not_called()
+        mock_run.assert_called_once_with(
+            ["crm_mon", "--one-shot", "--inactive"]
+        )
+        self.assertEqual(
+            "Error: cluster is not currently running on this node\n",
+            stderr.getvalue()
+        )
+
+    @mock.patch("pcs.utils.err", side_effect=SystemExit(1))
+    @mock.patch("pcs.utils.run")
+    def test_bad_output_format(self, mock_run, mock_err):
+        self.assertRaises(
+            SystemExit,
+            lambda: self.run_status({"--output-format": "yaml"}, mock_run)
+        )
+        mock_err.assert_called_once_with(
+            "Unknown value 'yaml' of --output-format, supported values are: "
+            "text, json"
+        )
+        mock_run.assert_not_called()
+
+    @mock.patch("pcs.utils.run")
+    def test_json(self, mock_run):
+        mock_run.return_value = (CRM_MON_XML, 0)
+        result = json.loads(
+            self.run_status({"--output-format": "json"}, mock_run)
+        )
+        mock_run.assert_called_once_with(
+            ["crm_mon", "--one-shot", "--inactive", "--as-xml"]
+        )
+        self.assertEqual("test99", result["cluster_name"])
+        self.assertEqual(
+            [
+                "following stonith devices have the 'method' option set to "
+                    "'cycle' which is potentially dangerous, please consider "
+                    "using 'onoff': S1"
+                ,
+                "corosync and pacemaker node names do not match (IPs used in "
+                    "setup?)"
+                ,
+            ],
+            result["warnings"]
+        )
+        self.assertEqual(
+            [{"name": "corosync", "active": True, "enabled": True}],
+            result["daemons"]
+        )
+        self.assertIsNone(result["pcsd"])
+        cluster = result["cluster"]
+        self.assertEqual(
+            {
+                "present": True,
+                "name": "node1",
+                "id": "1",
+                "with_quorum": True,
+            },
+            cluster["summary"]["current_dc"]
+        )
+        self.assertEqual(
+            ["node1", "node2"], [node["name"] for node in cluster["nodes"]]
+        )
+        self.assertFalse(cluster["nodes"][1]["online"])
+        self.assertEqual(
+            [
+                {
+                    "kind": "resource",
+                    "id": "R1",
+                    "resource_agent": "ocf::heartbeat:Dummy",
+                    "role": "Started",
+                    "active": True,
+                    "nodes_running_on": "1",
+                    "nodes": ["node1"],
+                },
+                {
+                    "kind": "clone",
+                    "id": "C-clone",
+                    "multi_state": False,
+                    "unique": False,
+                    "resources": [
+                        {
+                            "kind": "resource",
+                            "id": "C",
+                            "resource_agent": "ocf::heartbeat:Dummy",
+                            "role": "Stopped",
+                            "active": False,
+                            "nodes_running_on": "0",
+                        },
+                    ],
+                },
+            ],
+            cluster["resources"]
+        )
+        self.assertEqual(
+            [{"id": "T1", "status": "granted", "standby": False}],
+            cluster["tickets"]
+        )
+
+
+@mock.patch("pcs.status.settings.status_watch_max_backoff", 10)
+@mock.patch("pcs.status.settings.status_watch_refresh_interval", 60)
+@mock.patch("pcs.status.time.sleep")
+@mock.patch("pcs.status._get_full_status_output")
+@mock.patch("pcs.status._ClusterChangeSubscription")
+class WatchFullStatus(TestCase):
+    def setUp(self):
+        self.stdout = StringIO()
+        self.stderr = StringIO()
+
+    def watch(self, mock_subscription_class):
+        subscription = mock_subscription_class.return_value
+        subscription.start.return_value = ""
+        subscription.is_running.side_effect = [False] + [True] * 10
+        with mock.patch("sys.stdout", self.stdout):
+            with mock.patch("sys.stderr", self.stderr):
+                self.assertRaises(
+                    KeyboardInterrupt,
+                    lambda: status.watch_full_status("text", 2)
+                )
+        subscription.start.assert_called_once_with()
+        subscription.stop.assert_called_once_with()
+        return subscription
+
+    def test_refresh_on_change(
+        self, mock_subscription_class, mock_output, mock_sleep
+    ):
+        mock_output.side_effect = [
+            ("status {0}\n".format(i), "", True) for i in range(3)
+        ]
+        subscription = mock_subscription_class.return_value
+        # stop watching once the third status has been printed
+        subscription.wait.side_effect = [True, False, KeyboardInterrupt()]
+        self.watch(mock_subscription_class)
+        self.assertEqual(
+            "status 0\nstatus 1\nstatus 2\n", self.stdout.getvalue()
+        )
+        mock_output.assert_called_with("text")
+        self.assertEqual(
+            [mock.call(60)] * 3, subscription.wait.call_args_list
+        )
+        self.assertEqual(3, subscription.clear.call_count)
+        # the status is refreshed at most every interval seconds
+        self.assertEqual(2, mock_sleep.call_count)
+        for call in mock_sleep.call_args_list:
+            self.assertTrue(0 <= call[0][0] <= 2)
+
+    def test_backoff_when_unreachable(
+        self, mock_subscription_class, mock_output, mock_sleep
+    ):
+        mock_output.side_effect = (
+            [("", "Error: unreachable\n", False)] * 4
+            +
+            [("status\n", "", True)]
+            +
+            [("", "Error: unreachable\n", False)]
+        )
+        # stop watching at the backoff after the success
+        mock_sleep.side_effect = [None] * 9 + [KeyboardInterrupt()]
+        subscription = self.watch(mock_subscription_class)
+        self.assertEqual("status\n", self.stdout.getvalue())
+        self.assertEqual("Error: unreachable\n" * 5, self.stderr.getvalue())
+        # a backoff is followed by a wait for the rest of the interval
+        sleep_list = [call[0][0] for call in mock_sleep.call_args_list]
+        self.assertEqual(
+            [4, 8, 10, 10, 4],
+            [sleep_list[i] for i in (0, 2, 4, 6, 9)]
+        )
+        subscription.wait.assert_called_once_with(60)
+
+    def test_subscription_error(
+        self, mock_subscription_class, mock_output, mock_sleep
+    ):
+        mock_output.return_value = ("status\n", "", True)
+        subscription = mock_subscription_class.return_value
+        subscription.wait.side_effect = KeyboardInterrupt()
+        subscription.start.return_value = "Error: unable to watch\n"
+        subscription.is_running.side_effect = [False]
+        with mock.patch("sys.stdout", self.stdout):
+            with mock.patch("sys.stderr", self.stderr):
+                self.assertRaises(
+                    KeyboardInterrupt,
+                    lambda: status.watch_full_status("text", 2)
+                )
+        self.assertEqual("status\n", self.stdout.getvalue())
+        self.assertEqual("Error: unable to watch\n", self.stderr.getvalue())
+        subscription.stop.assert_called_once_with()
+
+
+class ClusterChangeSubscription(TestCase):
+    def setUp(self):
+        self.binaries_dir = tempfile.mkdtemp()
+        self.subscription = status._ClusterChangeSubscription()
+
+    def tearDown(self):
+        self.subscription.stop()
+        shutil.rmtree(self.binaries_dir)
+
+    def fixture_crm_mon(self, script):
+        crm_mon = os.path.join(self.binaries_dir, "crm_mon")
+        with open(crm_mon, "w") as crm_mon_file:
+            crm_mon_file.write("#!/bin/sh\n" + script + "\n")
+        os.chmod(crm_mon, 0o755)
+
+    def start(self):
+        with mock.patch(
+            "pcs.status.settings.pacemaker_binaries", self.binaries_dir
+        ):
+            return self.subscription.start()
+
+    def test_change_notified(self):
+        self.fixture_crm_mon("echo changed; exec sleep 60")
+        self.assertEqual("", self.start())
+        self.assertTrue(self.subscription.wait(10))
+        self.assertTrue(self.subscription.is_running())
+        self.subscription.stop()
+        self.assertFalse(self.subscription.is_running())
+
+    def test_no_change(self):
+        self.fixture_crm_mon("exec sleep 60")
+        self.assertEqual("", self.start())
+        self.assertFalse(self.subscription.wait(0.1))
+        self.assertTrue(self.subscription.is_running())
+
+    def test_exit_notified(self):
+        self.fixture_crm_mon("exit 1")
+        self.assertEqual("", self.start())
+        self.assertTrue(self.subscription.wait(10))
+        self.subscription.stop()
+        self.assertFalse(self.subscription.is_running())
+
+    def test_cleared(self):
+        self.fixture_crm_mon("echo changed; exec sleep 60")
+        self.start()
+        self.assertTrue(self.subscription.wait(10))
+        self.subscription.clear()
+        self.assertFalse(self.subscription.wait(0.1))
+
+    def test_start_error(self):
+        os.rmdir(self.binaries_dir)
+        self.assertEqual(
+            "Error: unable to watch cluster changes: "
+                "No such file or directory\n"
+            ,
+            self.start()
+        )
+        self.assertFalse(self.subscription.is_running())
+        os.mkdir(self.binaries_dir)
+
+
+@mock.patch("pcs.utils.drop_cib_tree")
+@mock.patch("pcs.status.collect_full_status")
+@mock.patch("pcs.status.print_full_status")
+class FullStatusOutput(TestCase):
+    def test_success(self, mock_print, mock_collect, mock_drop):
+        mock_print.side_effect = lambda probe_results: print("status")
+        self.assertEqual(
+            ("status\n", "", True), status._get_full_status_output("text")
+        )
+        mock_collect.assert_called_once_with(False)
+
+    def test_error_captured(self, mock_print, mock_collect, mock_drop):
+        def print_status(probe_results):
+            print("Cluster name: test99")
+            utils.err("cluster is not currently running on this node")
+        mock_print.side_effect = print_status
+        self.assertEqual(
+            (
+                "Cluster name: test99\n",
+                "Error: cluster is not currently running on this node\n",
+                False,
+            ),
+            status._get_full_status_output("text")
+        )
+        mock_drop.assert_called_once_with()
+        mock_collect.assert_called_once_with(False)
+
+    def test_library_error_captured(self, mock_print, mock_collect, mock_drop):
+        mock_collect.side_effect = LibraryError(
+            reports.cib_load_error("stderr")
+        )
+        self.assertEqual(
+            ("", "Error: unable to get cib\n", False),
+            status._get_full_status_output("text")
+        )
+        mock_print.assert_not_called()
+
+    def test_environment_error_captured(
+        self, mock_print, mock_collect, mock_drop
+    ):
+        mock_collect.side_effect = EnvironmentError("Too many open files")
+        self.assertEqual(
+            ("", "Error: Too many open files\n", False),
+            status._get_full_status_output("text")
+        )
+        mock_print.assert_not_called()
+
+
+class GetWatchInterval(TestCase):
+    @mock.patch("pcs.status.settings.status_watch_interval", 3)
+    def test_default(self):
+        self.assertEqual(3, status._get_watch_interval(None))
+
+    def test_value(self):
+        self.assertEqual(0.5, status._get_watch_interval("0.5"))
+
+    @mock.patch("pcs.utils.err", side_effect=SystemExit(1))
+    def test_invalid(self, mock_err):
+        for value in ("0", "-1", "abc"):
+            self.assertRaises(
+                SystemExit, lambda: status._get_watch_interval(value)
+            )
+        mock_err.assert_called_with(
+            "'abc' is not a valid --watch value, use a positive number"
+        )
@@ -7,9 +7,10 @@ from __future__ import (
 import sys
 from pcs.test.tools import pcs_unittest as unittest
 import xml.dom.minidom
-import xml.etree.cElementTree as ET
 from time import sleep
 
+from lxml import etree
+
 try:
     from cStringIO import StringIO
 except ImportError:
@@ -22,7 +23,7 @@ from pcs.test.tools.pcs_unittest import mock
 
 from pcs import utils
 from pcs.lib import reports
-from pcs.lib.errors import ReportItemSeverity
+from pcs.lib.errors import LibraryError, ReportItemSeverity
 
 cib_with_nodes = rc("cib-empty-withnodes.xml")
 empty_cib = rc("cib-empty.xml")
@@ -1667,41 +1668,6 @@ class UtilsTest(unittest.TestCase):
         """).documentElement
         self.assertEqual("key=-1 keys=90", utils.get_utilization_str(el))
 
-    def test_get_cluster_property_from_xml_enum(self):
-        el = ET.fromstring("""
-        <parameter name="no-quorum-policy" unique="0">
-            <shortdesc lang="en">What to do when the cluster does not have quorum</shortdesc>
-            <content type="enum" default="stop"/>
-            <longdesc lang="en">What to do when the cluster does not have quorum  Allowed values: stop, freeze, ignore, suicide</longdesc>
-        </parameter>
-        """)
-        expected = {
-            "name": "no-quorum-policy",
-            "shortdesc": "What to do when the cluster does not have quorum",
-            "longdesc": "",
-            "type": "enum",
-            "default": "stop",
-            "enum": ["stop", "freeze", "ignore", "suicide"]
-        }
-        self.assertEqual(expected, utils.get_cluster_property_from_xml(el))
-
-    def test_get_cluster_property_from_xml(self):
-        el = ET.fromstring("""
-        <parameter name="default-resource-stickiness" unique="0">
-            <shortdesc lang="en"></shortdesc>
-            <content type="integer" default="0"/>
-            <longdesc lang="en"></longdesc>
-        </parameter>
-        """)
-        expected = {
-            "name": "default-resource-stickiness",
-            "shortdesc": "",
-            "longdesc": "",
-            "type": "integer",
-            "default": "0"
-        }
-        self.assertEqual(expected, utils.get_cluster_property_from_xml(el))
-
     def test_get_cluster_property_default(self):
         definition = {
             "default-resource-stickiness": {
@@ -1915,6 +1881,30 @@ class RunParallelTest(unittest.TestCase):
         )
 
 
+@mock.patch.dict("pcs.utils.pcs_options", {}, clear=True)
+@mock.patch("pcs.utils.usefile", False)
+@mock.patch("subprocess.Popen")
+class RunPreexecTest(unittest.TestCase):
+    def fixture_popen(self, mock_popen):
+        mock_popen.return_value.communicate.return_value = ("output", None)
+        mock_popen.return_value.returncode = 0
+
+    @mock.patch("pcs.utils.PYTHON2", False)
+    def test_no_preexec_fn(self, mock_popen):
+        # preexec_fn is not safe in threads, e.g. in pcs status probes
+        self.fixture_popen(mock_popen)
+        self.assertEqual(("output", 0), utils.run(["/bin/true"]))
+        dummy_args, kwargs = mock_popen.call_args
+        self.assertIsNone(kwargs["preexec_fn"])
+
+    @mock.patch("pcs.utils.PYTHON2", True)
+    def test_python2(self, mock_popen):
+        self.fixture_popen(mock_popen)
+        utils.run(["/bin/true"])
+        dummy_args, kwargs = mock_popen.call_args
+        self.assertEqual(utils.subprocess_setup, kwargs["preexec_fn"])
+
+
 class PrepareNodeNamesTest(unittest.TestCase):
     def test_return_original_when_is_in_pacemaker_nodes(self):
         node = 'test'
@@ -2769,3 +2759,131 @@ class TouchCibFile(unittest.TestCase):
         err.assert_called_once_with(
             "Unable to write to file: '/fake/filename': 'some message'"
         )
+
+@mock.patch("pcs.utils.get_cib")
+class GetCibTree(unittest.TestCase):
+    def setUp(self):
+        utils.drop_cib_tree()
+
+    def tearDown(self):
+        utils.drop_cib_tree()
+
+    def test_load_once(self, mock_get_cib):
+        with open(empty_cib) as cib_file:
+            mock_get_cib.return_value = cib_file.read()
+        tree = utils.get_cib_tree()
+        self.assertEqual("cib", tree.tag)
+        self.assertIs(tree, utils.get_cib_tree())
+        mock_get_cib.assert_called_once_with()
+
+    def test_load_again_when_dropped(self, mock_get_cib):
+        with open(empty_cib) as cib_file:
+            mock_get_cib.return_value = cib_file.read()
+        tree = utils.get_cib_tree()
+        utils.drop_cib_tree()
+        self.assertIsNot(tree, utils.get_cib_tree())
+        self.assertEqual(2, mock_get_cib.call_count)
+
+    @mock.patch("pcs.utils.err", side_effect=SystemExit(1))
+    def test_invalid_xml(self, mock_err, mock_get_cib):
+        mock_get_cib.return_value = "<cib"
+        self.assertRaises(SystemExit, utils.get_cib_tree)
+        mock_err.assert_called_once_with("unable to get cib")
+
+
+class MayChangeCib(unittest.TestCase):
+    def test_query(self):
+        self.assertFalse(utils._may_change_cib(["cibadmin", "-l", "-Q"]))
+        self.assertFalse(utils._may_change_cib(
+            ["/usr/sbin/cibadmin", "--query", "--xpath", "//constraints"]
+        ))
+        self.assertFalse(utils._may_change_cib(["crm_mon", "--one-shot"]))
+
+    def test_change(self):
+        self.assertTrue(utils._may_change_cib(
+            ["cibadmin", "--replace", "-V", "--xml-pipe", "-o", "configuration"]
+        ))
+        self.assertTrue(utils._may_change_cib(
+            ["crm_resource", "--move", "-r", "R"]
+        ))
+
+
+@mock.patch("pcs.utils.push_cib_diff_xml")
+@mock.patch("pcs.utils.diff_cibs_xml")
+@mock.patch("pcs.utils.cmd_runner")
+class PushCibDiff(unittest.TestCase):
+    def setUp(self):
+        self.cib_original_xml = "<cib><configuration/></cib>"
+        self.dom = xml.dom.minidom.parseString(
+            "<cib><configuration><resources/></configuration></cib>"
+        )
+
+    def test_push_diff(self, mock_runner, mock_diff, mock_push):
+        mock_diff.return_value = "<diff/>"
+        with mock.patch("pcs.utils._cib_tree", "tree"):
+            utils.push_cib_diff(self.cib_original_xml, self.dom)
+            self.assertIsNone(utils._cib_tree)
+        dummy_runner, dummy_reporter, old_xml, new_xml = mock_diff.call_args[0]
+        self.assertEqual(self.cib_original_xml, old_xml)
+        self.assertEqual(self.dom.toxml(), new_xml)
+        mock_push.assert_called_once_with(mock_runner.return_value, "<diff/>")
+
+    def test_push_diff_of_lxml_element(self, mock_runner, mock_diff, mock_push):
+        mock_diff.return_value = "<diff/>"
+        utils.push_cib_diff(
+            self.cib_original_xml,
+            etree.fromstring("<cib><configuration><tags/></configuration></cib>")
+        )
+        self.assertEqual(
+            "<cib><configuration><tags/></configuration></cib>",
+            mock_diff.call_args[0][3]
+        )
+        mock_push.assert_called_once_with(mock_runner.return_value, "<diff/>")
+
+    def test_no_change(self, mock_runner, mock_diff, mock_push):
+        mock_diff.return_value = ""
+        utils.push_cib_diff(self.cib_original_xml, self.dom)
+        mock_push.assert_not_called()
+
+    @mock.patch("pcs.utils.process_library_reports")
+    def test_push_error(
+        self, mock_process_reports, mock_runner, mock_diff, mock_push
+    ):
+        report = reports.cib_push_error("stderr", "stdout")
+        mock_diff.return_value = "<diff/>"
+        mock_push.side_effect = LibraryError(report)
+        utils.push_cib_diff(self.cib_original_xml, self.dom)
+        mock_process_reports.assert_called_once_with((report, ))
+
+class TreeHelpers(unittest.TestCase):
+    def setUp(self):
+        self.tree = etree.fromstring("""
+            <cib>
+                <configuration>
+                    <resources>
+                        <group id="G">
+                            <primitive id="R1" />
+                        </group>
+                        <primitive id="R2" />
+                    </resources>
+                </configuration>
+                <status>
+                    <lrm_resource id="R3" />
+                </status>
+            </cib>
+        """)
+
+    def test_tree_get_element(self):
+        self.assertEqual(
+            "R1", utils.tree_get_element(self.tree, "primitive", "R1").get("id")
+        )
+        self.assertIsNone(utils.tree_get_element(self.tree, "group", "R1"))
+        group = self.tree.find(".//group")
+        self.assertIsNone(utils.tree_get_element(group, "primitive", "R2"))
+
+    def test_does_id_exist(self):
+        self.assertTrue(utils.does_id_exist(self.tree, "G"))
+        self.assertTrue(utils.does_id_exist(self.tree, "R2"))
+        self.assertFalse(utils.does_id_exist(self.tree, "R3"))
+        self.assertEqual("R3", utils.find_unique_id(self.tree, "R3"))
+        self.assertEqual("R2-1", utils.find_unique_id(self.tree, "R2"))
@@ -221,6 +221,8 @@ class EnvAssistant(object):
                 }) if self.__config.spy else None
             ),
             booth=self.__config.env.booth,
+            cib_cache=self.__config.env.cib_cache,
+            cib_diff_engine=self.__config.env.cib_diff_engine,
         )
         self.__unpatch = patch_env(self.__call_queue, self.__config, self._env)
         # If pushing corosync.conf has not been patched in the
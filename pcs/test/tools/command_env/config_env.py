@@ -18,7 +18,8 @@ class EnvConfig(object):
         self.__cib_tempfile = None
         self.__corosync_conf_data = None
         self.__booth = None
-
+        self.__cib_cache = None
+        self.__cib_diff_engine = None
 
     def set_cib_data(self, cib_data, cib_tempfile="/fake/tmp/file"):
         self.__cib_data = cib_data
@@ -33,6 +34,20 @@ class EnvConfig(object):
     def cib_tempfile(self):
         return self.__cib_tempfile
 
+    def set_cib_cache(self, cib_cache):
+        self.__cib_cache = cib_cache
+
+    @property
+    def cib_cache(self):
+        return self.__cib_cache
+
+    def set_cib_diff_engine(self, cib_diff_engine):
+        self.__cib_diff_engine = cib_diff_engine
+
+    @property
+    def cib_diff_engine(self):
+        return self.__cib_diff_engine
+
     def set_booth(self, booth):
         self.__booth = booth
 
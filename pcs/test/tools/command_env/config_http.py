@@ -14,6 +14,7 @@ from pcs.test.tools.command_env.config_http_pcmk import PcmkShortcuts
 from pcs.test.tools.command_env.config_http_sbd import SbdShortcuts
 from pcs.test.tools.command_env.mock_node_communicator import(
     place_communication,
+    place_concurrent_responses,
     place_requests,
     place_responses,
 )
@@ -63,6 +64,16 @@ class HttpConfig(object):
     def start_loop(self, response_list, name):
         place_responses(self.__calls, name, response_list)
 
+    def run_concurrently(self, communication_name_list, name):
+        """
+        Expect already configured communications to be run concurrently
+        list communication_name_list -- keys of the communications
+        string name -- key of the merged responses call
+        """
+        place_concurrent_responses(
+            self.__calls, name, communication_name_list
+        )
+
     def put_file(
         self, communication_list, name="http.common.put_file",
         results=None, files=None, **kwargs
@@ -74,6 +74,35 @@ class CibShortcuts(object):
 
         self.__calls.place(name, call, before=before)
 
+    def load_root(
+        self,
+        epoch=557,
+        num_updates=122,
+        admin_epoch=0,
+        name="runner.cib.load_root",
+        before=None,
+    ):
+        """
+        Create call for loading the root element of CIB with its version
+
+        int epoch -- epoch of the CIB
+        int num_updates -- num_updates of the CIB
+        int admin_epoch -- admin_epoch of the CIB
+        string name -- key of the call
+        string before -- key of call before which this new call is to be placed
+        """
+        self.__calls.place(
+            name,
+            RunnerCall(
+                "cibadmin --local --query --xpath /cib --no-children",
+                stdout=(
+                    '<cib epoch="{0}" num_updates="{1}" admin_epoch="{2}"'
+                    ' validate-with="pacemaker-2.0" crm_feature_set="3.0.9"/>'
+                ).format(epoch, num_updates, admin_epoch),
+            ),
+            before=before,
+        )
+
     def load_content(
         self,
         cib,
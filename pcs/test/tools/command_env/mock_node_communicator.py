@@ -243,6 +243,53 @@ def place_communication(calls, name, communication_list, **kwargs):
         place_requests(calls, "{0}_requests_{1}".format(name, i), req_list)
 
 
+def place_concurrent_responses(calls, name, communication_name_list):
+    """
+    Merge responses of communications run concurrently into one loop
+
+    Communications run at once add all their initial requests before the loop
+    is started and their responses come in one loop. The responses of the
+    communications are removed and put into one start loop call placed instead
+    of the responses of the last communication. Requests which are added while
+    the loop is running (e.g. when a request is retried on another node) are
+    moved after the merged call.
+
+    CallListBuilder calls -- list of expected calls
+    string name -- the key of the merged call
+    list communication_name_list -- keys of communications run concurrently
+    """
+    response_name_list = [
+        "{0}_responses".format(com_name)
+        for com_name in communication_name_list
+    ]
+    response_list = []
+    for response_name in response_name_list:
+        response_list.extend(calls.get(response_name).response_list)
+    for response_name in response_name_list[:-1]:
+        calls.remove(response_name)
+    calls.place(
+        name, StartLoopCall(response_list), instead=response_name_list[-1]
+    )
+
+    # requests of the last communication added in the loop already follow
+    late_request_list = []
+    for com_name in communication_name_list[:-1]:
+        request_name_prefix = "{0}_requests_".format(com_name)
+        for call_name in calls.names:
+            if call_name.startswith(request_name_prefix):
+                late_request_list.append((call_name, calls.get(call_name)))
+    for call_name, _ in late_request_list:
+        calls.remove(call_name)
+    name_list = calls.names
+    next_name_index = name_list.index(name) + 1
+    next_name = (
+        name_list[next_name_index] if next_name_index < len(name_list)
+        else None
+    )
+    for call_name, call in late_request_list:
+        calls.place(call_name, call, before=next_name)
+
+
 class AddRequestCall(object):
     type = CALL_TYPE_HTTP_ADD_REQUESTS
 
@@ -306,6 +353,7 @@ def _compare_request_data(expected, real):
 class NodeCommunicator(object):
     def __init__(self, call_queue=None):
         self.__call_queue = call_queue
+        self.__real_request_dict = {}
 
     def add_requests(self, request_list):
         _, add_request_call = self.__call_queue.take(
@@ -364,7 +412,29 @@ class NodeCommunicator(object):
                 bad_request_list_content(errors)
             )
 
+        for expected_request, real_request in zip(
+            expected_request_list, request_list
+        ):
+            self.__real_request_dict[id(expected_request)] = (
+                expected_request, real_request
+            )
 
     def start_loop(self):
         _, call = self.__call_queue.take(CALL_TYPE_HTTP_START_LOOP)
-        return call.response_list
+        return self.__bind_responses(call.response_list)
+
+    def __bind_responses(self, response_list):
+        # Responses belong to the requests which were really added, like in
+        # the real communicator, so callers are able to pair them. Requests
+        # may be added while the loop is running, so bind them one by one.
+        for response in response_list:
+            if id(response.request) in self.__real_request_dict:
+                _, real_request = self.__real_request_dict[id(response.request)]
+                response.handle.request_obj = real_request
+                consumer = real_request.response_consumer
+                if consumer is not None:
+                    # the body goes to the consumer only, like in curl
+                    consumer.reset()
+                    consumer.write(response.handle.output_buffer.getvalue())
+                    response.handle.output_buffer = None
+            yield response
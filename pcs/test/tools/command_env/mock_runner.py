@@ -113,7 +113,8 @@ class Runner(object):
         return self.__env_vars
 
     def run(
-        self, args, stdin_string=None, env_extend=None, binary_output=False
+        self, args, stdin_string=None, env_extend=None, binary_output=False,
+        timeout=None
     ):
         command = " ".join(args)
         i, call = self.__call_queue.take(CALL_TYPE_RUNNER, command)
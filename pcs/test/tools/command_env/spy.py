@@ -71,7 +71,8 @@ class Runner(object):
         self.__runner = original_runner
 
     def run(
-        self, args, stdin_string=None, env_extend=None, binary_output=False
+        self, args, stdin_string=None, env_extend=None, binary_output=False,
+        timeout=None
     ):
         print_call(self, "run")
         print_line("args: {0}".format(args))
@@ -81,11 +82,14 @@ class Runner(object):
             print_line("env_extend: {0}".format(env_extend))
         if binary_output:
             print_line("binary_output: {0}".format(binary_output))
+        if timeout is not None:
+            print_line("timeout: {0}".format(timeout))
         stdout, stderr, returncode = self.__runner.run(
             args,
             stdin_string,
             env_extend,
             binary_output,
+            timeout,
         )
         print_long_text("stdout", stdout)
         print_long_text("stderr", stderr)
@@ -62,6 +62,7 @@ class MockCurl(object):
         self._error = error
         self._exception = exception
         self.request_obj = request
+        self.closed = False
 
     @property
     def opts(self):
@@ -74,6 +75,9 @@ class MockCurl(object):
     def reset(self):
         self._opts = {}
 
+    def close(self):
+        self.closed = True
+
     def setopt(self, opt, val):
         if val is None:
             self.unsetopt(opt)
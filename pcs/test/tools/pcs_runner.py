@@ -40,7 +40,7 @@ class PcsRunner(object):
         return pcs(self.cib_file, args_with_files)
 
 
-def pcs(testfile, args = ""):
+def pcs(testfile, args = "", string_for_stdin=None):
     """
     Run pcs with -f on specified file
     Return tuple with:
@@ -71,7 +71,8 @@ def pcs(testfile, args = ""):
         cluster_conf = rc("cluster.conf")
         conf_opts.append("--cluster_conf=" + cluster_conf)
     return utils.run(
-        [__pcs_location, "-f", testfile] + conf_opts + arg_split_temp
+        [__pcs_location, "-f", testfile] + conf_opts + arg_split_temp,
+        string_for_stdin=string_for_stdin
     )
 
 
@@ -25,6 +25,7 @@ def full_usage():
     out += strip_extras(config([],False))
     out += strip_extras(pcsd([],False))
     out += strip_extras(alert([], False))
+    out += strip_extras(batch([], False))
     print(out.strip())
     print("Examples:\n" + examples.replace(" \ ",""))
 
@@ -157,6 +158,11 @@ Options:
     -h, --help         Display usage and exit.
     -f file            Perform actions on file instead of active CIB.
     --debug            Print all network traffic and external commands run.
+    --profile          Print time spent in external commands, network
+                       requests and CIB processing when pcs exits. If the
+                       PCS_TRACE environment variable is set, a timeline is
+                       saved to the file it specifies in the Chrome trace
+                       format.
     --version          Print pcs version information. List pcs capabilities if
                        --full is specified.
     --request-timeout  Timeout for each outgoing request to another node in
@@ -180,6 +186,7 @@ Commands:
     pcsd        Manage pcs daemon.
     node        Manage cluster nodes.
     alert       Manage pacemaker alerts.
+    batch       Run several configuration commands as one CIB change.
 """
 # Advanced usage to possibly add later
 #  --corosync_conf=<corosync file> Specify alternative corosync.conf file
@@ -237,9 +244,10 @@ Commands:
                 ip=192.168.0.99 cidr_netmask=32 nic=eth2 \\
                 op monitor interval=30s
 
-    delete <resource id|group id|master id|clone id>
-        Deletes the resource, group, master or clone (and all resources within
-        the group/master/clone).
+    delete <resource id|group id|master id|clone id|bundle id>...
+        Deletes the resources, groups, masters, clones or bundles (and all
+        resources within the groups/masters/clones/bundles). Running resources
+        are stopped first unless --force is specified.
 
     enable <resource id>... [--wait[=n]]
         Allow the cluster to start the resources. Depending on the rest of the
@@ -344,8 +352,10 @@ Commands:
     providers
         List available OCF resource agent providers.
 
-    agents [standard[:provider]]
+    agents [standard[:provider]] [--refresh-cache]
         List available agents optionally filtered by standard and provider.
+        If --refresh-cache is specified, cached metadata of all agents are
+        removed so they are loaded from the agents again.
 
     update <resource id> [resource options] [op [<operation action>
            <operation options>]...] [meta <meta operations>...] [--wait[=n]]
@@ -695,14 +705,15 @@ Commands:
         Sync corosync configuration to all nodes found from current
         corosync.conf file (cluster.conf on systems running Corosync 1.x).
 
-    cib [filename] [scope=<scope> | --config]
+    cib [filename] [scope=<scope> | --config] [--node <node>]
         Get the raw xml from the CIB (Cluster Information Base).  If a filename
         is provided, we save the CIB to that file, otherwise the CIB is
         printed.  Specify scope to get a specific section of the CIB.  Valid
         values of the scope are: configuration, nodes, resources, constraints,
         crm_config, rsc_defaults, op_defaults, status.  --config is the same as
-        scope=configuration.  Do not specify a scope if you want to edit
-        the saved CIB using pcs (pcs -f <command>).
+        scope=configuration.  If --node is specified, the CIB is obtained from
+        pcsd running on the specified node.  Do not specify a scope if you want
+        to edit the saved CIB using pcs (pcs -f <command>).
 
     cib-push <filename> [--wait[=<n>]]
             [diff-against=<filename_original> | scope=<scope> | --config]
@@ -1283,9 +1294,15 @@ def status(args = [], pout = True):
 Usage: pcs status [commands]...
 View current cluster and resource status
 Commands:
-    [status] [--full | --hide-inactive]
+    [status] [--full | --hide-inactive] [--output-format=text|json]
+            [--watch[=<seconds>]]
         View all information about the cluster and resources (--full provides
-        more details, --hide-inactive hides inactive resources).
+        more details, --hide-inactive hides inactive resources). If
+        --output-format=json is specified, the status is printed as a json
+        object for use in scripts and monitoring. If --watch is specified, pcs
+        keeps running and prints the status again each time the cluster
+        changes, at most every <seconds> (default 1) seconds. With --output-format=json each status is printed as a json
+        object on one line.
 
     resources [<resource id> | --full | --groups | --hide-inactive]
         Show all currently configured resources or if a resource is specified
@@ -1728,10 +1745,40 @@ Commands:
         return output
 
 
+def batch(args=[], pout=True):
+    output = """
+Usage: pcs batch [--wait[=n]] < <batch file>
+Run several commands as one change of the CIB.
+
+Commands are read from the standard input, one command per line. Empty lines
+and lines starting with '#' are ignored, commands may be prefixed with 'pcs'.
+The CIB is loaded once, all the commands are applied to it and the result is
+pushed to the cluster in one step. If any of the commands fails, no changes
+are made. If --wait is specified, pcs waits up to 'n' seconds for the changes
+to be applied and then returns 0 if the changes have been applied or 1 if the
+operation has not completed yet. If 'n' is not specified it defaults to 60
+minutes. Options -f, --wait, --debug and --request-timeout can be specified
+only for the whole batch.
+
+These commands can be used in a batch:
+    resource create
+    constraint colocation set
+    constraint order set
+    constraint ticket set|add|remove
+    acl role|user|target|group|permission
+    alert create|update|remove|recipient
+"""
+    if pout:
+        print(sub_usage(args, output))
+    else:
+        return output
+
+
 def show(main_usage_name, rest_usage_names):
     usage_map = {
         "acl": acl,
         "alert": alert,
+        "batch": batch,
         "cluster": cluster,
         "config": config,
         "constraint": constraint,
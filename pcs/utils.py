@@ -22,15 +22,24 @@ import base64
 import threading
 import logging
 
+from lxml import etree
+
 from pcs import settings, usage
 
 from pcs.common import (
     pcs_pycurl as pycurl,
     report_codes,
+    trace,
+)
+from pcs.common.node_communicator import (
+    ConnectionPool,
+    CurlDebugCollector,
+    DEBUG_ALWAYS,
 )
 from pcs.common.tools import (
     join_multilines,
     simple_cache,
+    xml_fromstring,
 )
 
 from pcs.cli.common import (
@@ -47,8 +56,11 @@ from pcs.cli.common.reports import (
 from pcs.cli.booth.command import DEFAULT_BOOTH_NAME
 import pcs.cli.booth.env
 
-from pcs.lib import reports, sbd
-from pcs.lib.env import LibraryEnvironment
+from pcs.lib import (
+    reports,
+    sbd,
+)
+from pcs.lib.cib.tools import does_id_exist as lib_does_id_exist
 from pcs.lib.errors import LibraryError, ReportListAnalyzer
 from pcs.lib.external import (
     CommandRunner,
@@ -71,7 +83,12 @@ from pcs.lib.communication.nodes import (
 from pcs.lib.communication.tools import run as run_com_cmd
 import pcs.lib.corosync.config_parser as corosync_conf_parser
 from pcs.lib.corosync.config_facade import ConfigFacade as corosync_conf_facade
-from pcs.lib.pacemaker.live import has_wait_for_idle_support
+from pcs.lib.pacemaker.cib_cache import CibCache
+from pcs.lib.pacemaker.live import (
+    diff_cibs_xml,
+    has_wait_for_idle_support,
+    push_cib_diff_xml,
+)
 from pcs.lib.pacemaker.state import ClusterState
 from pcs.lib.pacemaker.values import(
     is_boolean,
@@ -94,6 +111,12 @@ PYTHON2 = (sys.version_info.major == 2)
 usefile = False
 filename = ""
 pcs_options = {}
+# LibraryEnvironment shared by library commands run in a batch
+shared_lib_env = None
+# CIB cached for library commands run one after another in one pcs run
+cib_cache = CibCache()
+# CIB parsed by get_cib_tree, shared by all its callers in one pcs run
+_cib_tree = None
 
 
 class UnknownPropertyException(Exception):
@@ -436,22 +459,7 @@ def sendHTTPRequest(
         print("Sending HTTP Request to: " + url)
         print("Data: {0}".format(data))
 
-    def __debug_callback(data_type, debug_data):
-        prefixes = {
-            pycurl.DEBUG_TEXT: b"* ",
-            pycurl.DEBUG_HEADER_IN: b"< ",
-            pycurl.DEBUG_HEADER_OUT: b"> ",
-            pycurl.DEBUG_DATA_IN: b"<< ",
-            pycurl.DEBUG_DATA_OUT: b">> ",
-        }
-        if data_type in prefixes:
-            debug_output.write(prefixes[data_type])
-            debug_output.write(debug_data)
-            if not debug_data.endswith(b"\n"):
-                debug_output.write(b"\n")
-
     output = BytesIO()
-    debug_output = BytesIO()
     cookies = __get_cookie_list(host, token_file["tokens"])
     if not timeout:
         timeout = settings.default_request_timeout
@@ -462,9 +470,13 @@ def sendHTTPRequest(
     handler.setopt(pycurl.PROTOCOLS, pycurl.PROTO_HTTPS)
     handler.setopt(pycurl.URL, url.encode("utf-8"))
     handler.setopt(pycurl.WRITEFUNCTION, output.write)
-    handler.setopt(pycurl.VERBOSE, 1)
     handler.setopt(pycurl.NOSIGNAL, 1) # required for multi-threading
-    handler.setopt(pycurl.DEBUGFUNCTION, __debug_callback)
+    # debug output is only printed with --debug, do not pay for it otherwise
+    debug_output = None
+    if "--debug" in pcs_options:
+        debug_output = CurlDebugCollector()
+        handler.setopt(pycurl.VERBOSE, 1)
+        handler.setopt(pycurl.DEBUGFUNCTION, debug_output)
     handler.setopt(pycurl.TIMEOUT_MS, int(timeout * 1000))
     handler.setopt(pycurl.SSL_VERIFYHOST, 0)
     handler.setopt(pycurl.SSL_VERIFYPEER, 0)
@@ -473,7 +485,18 @@ def sendHTTPRequest(
     if data:
         handler.setopt(pycurl.COPYPOSTFIELDS, data.encode("utf-8"))
     try:
-        handler.perform()
+        with trace.span(request, trace.CATEGORY_HTTP, host=host):
+            handler.perform()
+        if trace.is_enabled():
+            trace.add_count(trace.COUNTER_HTTP_REQUESTS)
+            trace.add_count(
+                trace.COUNTER_HTTP_BYTES,
+                int(
+                    handler.getinfo(pycurl.SIZE_UPLOAD)
+                    +
+                    handler.getinfo(pycurl.SIZE_DOWNLOAD)
+                )
+            )
         response_data = output.getvalue().decode("utf-8")
         response_code = handler.getinfo(pycurl.RESPONSE_CODE)
         if printResult or printSuccess:
@@ -993,6 +1016,8 @@ def run(
         touch_cib_file(filename)
 
     command = args[0]
+    if _may_change_cib(args):
+        drop_cib_tree()
     if command[0:3] == "crm" or command in ["cibadmin", "cman_tool", "iso8601"]:
         args[0] = settings.pacemaker_binaries + command
     elif command[0:8] == "corosync":
@@ -1013,19 +1038,29 @@ def run(
         else:
             stdin_pipe = None
 
-        p = subprocess.Popen(
-            args,
-            stdin=stdin_pipe,
-            stdout=subprocess.PIPE,
-            stderr=(subprocess.PIPE if ignore_stderr else subprocess.STDOUT),
-            preexec_fn=subprocess_setup,
-            close_fds=True,
-            env=env_var,
-            # decodes newlines and in python3 also converts bytes to str
-            universal_newlines=(not PYTHON2 and not binary_output)
-        )
-        output, dummy_stderror = p.communicate(string_for_stdin)
-        returnVal = p.returncode
+        with trace.span(
+            os.path.basename(args[0]), trace.CATEGORY_PROCESS,
+            command=" ".join(args)
+        ) as span_args:
+            p = subprocess.Popen(
+                args,
+                stdin=stdin_pipe,
+                stdout=subprocess.PIPE,
+                stderr=(
+                    subprocess.PIPE if ignore_stderr else subprocess.STDOUT
+                ),
+                # preexec_fn is not safe to use when other threads are
+                # running, python3 restores SIGPIPE in the child by itself
+                preexec_fn=(subprocess_setup if PYTHON2 else None),
+                close_fds=True,
+                env=env_var,
+                # decodes newlines and in python3 also converts bytes to str
+                universal_newlines=(not PYTHON2 and not binary_output)
+            )
+            output, dummy_stderror = p.communicate(string_for_stdin)
+            returnVal = p.returncode
+            span_args["retval"] = returnVal
+        trace.add_process(string_for_stdin, output, dummy_stderror)
         if "--debug" in pcs_options:
             print("Return Value: {0}".format(returnVal))
             print("--Debug Output Start--\n{0}".format(output), end="")
@@ -1383,6 +1418,17 @@ def dom_get_group_masterslave(dom, group_id):
             return group
     return None
 
+def tree_get_element(tree, tag, element_id):
+    """
+    Return the first descendant of an lxml element with the tag and id or None
+
+    etree tree -- element to search in
+    string tag -- tag of the searched element, e.g. primitive
+    string element_id -- id of the searched element
+    """
+    element_list = tree.xpath(".//{0}[@id=$id]".format(tag), id=element_id)
+    return element_list[0] if element_list else None
+
 def dom_get_resource(dom, resource_id):
     for primitive in dom.getElementsByTagName("primitive"):
         if primitive.getAttribute("id") == resource_id:
@@ -1675,7 +1721,8 @@ def get_cib(scope=None):
     command = ["cibadmin", "-l", "-Q"]
     if scope:
         command.append("--scope=%s" % scope)
-    output, retval = run(command)
+    with trace.span("load cib", trace.CATEGORY_CIB, scope=scope):
+        output, retval = run(command)
     if retval != 0:
         if retval == 6 and scope:
             err("unable to get cib, scope '%s' not present in cib" % scope)
@@ -1685,18 +1732,53 @@ def get_cib(scope=None):
 
 def get_cib_dom():
     try:
-        dom = parseString(get_cib())
+        cib_xml = get_cib()
+        with trace.span("parse cib (minidom)", trace.CATEGORY_CIB):
+            dom = parseString(cib_xml)
         return dom
     except:
         err("unable to get cib")
 
 def get_cib_etree():
     try:
-        root = ET.fromstring(get_cib())
+        cib_xml = get_cib()
+        with trace.span("parse cib (etree)", trace.CATEGORY_CIB):
+            root = ET.fromstring(cib_xml)
         return root
     except:
         err("unable to get cib")
 
+def get_cib_tree():
+    """
+    Return the CIB as an lxml tree, it is loaded and parsed once per pcs run
+
+    The tree is shared by all callers, so changes done to it by one caller are
+    visible to the others. It is dropped once a command which may change the
+    CIB is run, the next call then loads the CIB again.
+    """
+    global _cib_tree
+    # the global may be dropped by a command run in another thread meanwhile
+    cib_tree = _cib_tree
+    if cib_tree is None:
+        cib_xml = get_cib()
+        try:
+            with trace.span("parse cib (lxml)", trace.CATEGORY_CIB):
+                cib_tree = xml_fromstring(cib_xml)
+        except (etree.XMLSyntaxError, ValueError):
+            err("unable to get cib")
+        _cib_tree = cib_tree
+    return cib_tree
+
+def drop_cib_tree():
+    global _cib_tree
+    _cib_tree = None
+
+def _may_change_cib(args):
+    command = os.path.basename(args[0])
+    if command == "cibadmin":
+        return "-Q" not in args and "--query" not in args
+    return command != "crm_mon"
+
 def is_etree(var):
     return (
         var.__class__ == xml.etree.ElementTree.Element
@@ -1717,15 +1799,44 @@ def replace_cib_configuration(dom):
         #run(...) calls subprocess.Popen.communicate which calls encode...
         #so there is bytes to str conversion
         new_dom = ET.tostring(dom).decode()
+    elif isinstance(dom, etree._Element):
+        new_dom = etree.tostring(dom).decode()
     elif hasattr(dom, "toxml"):
         new_dom = dom.toxml()
     else:
         new_dom = dom
     cmd = ["cibadmin", "--replace", "-V", "--xml-pipe", "-o", "configuration"]
-    output, retval = run(cmd, False, new_dom)
+    with trace.span("push cib", trace.CATEGORY_CIB):
+        output, retval = run(cmd, False, new_dom)
     if retval != 0:
         err("Unable to update cib\n"+output)
 
+def push_cib_diff(cib_original_xml, dom):
+    """
+    Push changes done to a loaded CIB as a diff against the CIB as it was loaded
+
+    Changes done to the live CIB by someone else since it was loaded are kept,
+    unlike when the whole configuration is replaced.
+
+    string cib_original_xml -- the CIB as it was loaded
+    dom -- the changed CIB, minidom document or lxml element
+    """
+    if isinstance(dom, etree._Element):
+        cib_new_xml = etree.tostring(dom).decode()
+    else:
+        cib_new_xml = dom.toxml()
+    runner = cmd_runner()
+    try:
+        cib_diff_xml = diff_cibs_xml(
+            runner, get_report_processor(), cib_original_xml, cib_new_xml
+        )
+        if cib_diff_xml:
+            with trace.span("push cib", trace.CATEGORY_CIB):
+                push_cib_diff_xml(runner, cib_diff_xml)
+    except LibraryError as e:
+        process_library_reports(e.args)
+    drop_cib_tree()
+
 def is_valid_cib_scope(scope):
     return scope in [
         "configuration", "nodes", "resources", "constraints", "crm_config",
@@ -1737,6 +1848,8 @@ def is_valid_cib_scope(scope):
 def does_id_exist(dom, check_id):
     # do not search in /cib/status, it may contain references to previously
     # existing and deleted resources and thus preventing creating them again
+    if isinstance(dom, etree._Element):
+        return lib_does_id_exist(dom, check_id)
     if is_etree(dom):
         for elem in dom.findall(str(
             '(/cib/*[name()!="status"]|/*[name()!="cib"])/*'
@@ -2030,12 +2143,15 @@ def getPacemakerNodesID(allow_failure=False):
 
     return pm_nodes
 
-def corosyncPacemakerNodeCheck():
+def corosyncPacemakerNodeCheck(pm_nodes=None, cs_nodes=None):
     # does not work on CMAN clusters and pacemaker-remote nodes
     # we do not want a failure to exit pcs as this is only a minor information
     # function
-    pm_nodes = getPacemakerNodesID(allow_failure=True)
-    cs_nodes = getCorosyncNodesID(allow_failure=True)
+    # pm_nodes and cs_nodes can be passed when they have been already loaded
+    if pm_nodes is None:
+        pm_nodes = getPacemakerNodesID(allow_failure=True)
+    if cs_nodes is None:
+        cs_nodes = getCorosyncNodesID(allow_failure=True)
 
     for node_id in pm_nodes:
         if pm_nodes[node_id] == "(null)":
@@ -2170,13 +2286,12 @@ def err(errorText, exit_after_error=True):
         sys.exit(1)
 
 
-def serviceStatus(prefix):
-    print("Daemon Status:")
-    service_def = [
-        # (
-        #     service name,
-        #     display even if not enabled nor running
-        # )
+def get_status_service_list():
+    """
+    Return daemons shown in status as tuples (service name, display even if
+    not enabled nor running)
+    """
+    return [
         ("cman", False),
         ("corosync", True),
         ("pacemaker", True),
@@ -2184,19 +2299,45 @@ def serviceStatus(prefix):
         ("pcsd", True),
         (sbd.get_sbd_service_name(), False),
     ]
-    for service, display_always in service_def:
-        try:
-            running = is_service_running(cmd_runner(), service)
-            enabled = is_service_enabled(cmd_runner(), service)
-            if display_always or enabled or running:
-                print("{prefix}{service}: {active}/{enabled}".format(
-                    prefix=prefix,
-                    service=service,
-                    active=("active" if running else "inactive"),
-                    enabled=("enabled" if enabled else "disabled")
-                ))
-        except LibraryError:
-            pass
+
+def get_service_status(service):
+    """
+    Return a tuple (running, enabled) of a service, None if unknown
+
+    string service -- name of the service
+    """
+    try:
+        return (
+            is_service_running(cmd_runner(), service),
+            is_service_enabled(cmd_runner(), service),
+        )
+    except LibraryError:
+        return None
+
+def serviceStatus(prefix, service_status_dict=None):
+    """
+    Print status of daemons
+
+    string prefix -- printed at the beginning of each line
+    dict service_status_dict -- already loaded results of get_service_status
+        by service names, services missing in it are not printed
+    """
+    print("Daemon Status:")
+    for service, display_always in get_status_service_list():
+        if service_status_dict is None:
+            status = get_service_status(service)
+        else:
+            status = service_status_dict.get(service)
+        if status is None:
+            continue
+        running, enabled = status
+        if display_always or enabled or running:
+            print("{prefix}{service}: {active}/{enabled}".format(
+                prefix=prefix,
+                service=service,
+                active=("active" if running else "inactive"),
+                enabled=("enabled" if enabled else "disabled")
+            ))
 
 def enableServices():
     # do NOT handle SBD in here, it is started by pacemaker not systemd or init
@@ -2654,105 +2795,20 @@ def get_cluster_property_default(prop_def_dict, prop):
 
 
 def get_cluster_properties_definition():
-    # we don't want to change these properties
-    banned_props = ["dc-version", "cluster-infrastructure"]
-    basic_props = [
-        "batch-limit", "no-quorum-policy", "symmetric-cluster", "enable-acl",
-        "stonith-enabled", "stonith-action", "pe-input-series-max",
-        "stop-orphan-resources", "stop-orphan-actions", "cluster-delay",
-        "start-failure-is-fatal", "pe-error-series-max", "pe-warn-series-max"
-        ]
-    readable_names = {
-        "batch-limit": "Batch Limit",
-        "no-quorum-policy": "No Quorum Policy",
-        "symmetric-cluster": "Symmetric",
-        "stonith-enabled": "Stonith Enabled",
-        "stonith-action": "Stonith Action",
-        "cluster-delay": "Cluster Delay",
-        "stop-orphan-resources": "Stop Orphan Resources",
-        "stop-orphan-actions": "Stop Orphan Actions",
-        "start-failure-is-fatal": "Start Failure is Fatal",
-        "pe-error-series-max": "PE Error Storage",
-        "pe-warn-series-max": "PE Warning Storage",
-        "pe-input-series-max": "PE Input Storage",
-        "enable-acl": "Enable ACLs"
-    }
-    sources = [
-        {
-            "name": "pengine",
-            "path": settings.pengine_binary
-        },
-        {
-            "name": "crmd",
-            "path": settings.crmd_binary
-        },
-        {
-            "name": "cib",
-            "path": settings.cib_binary
-        }
-    ]
-    definition = {}
-    for source in sources:
-        stdout, stderr, retval = cmd_runner().run([source["path"], "metadata"])
-        if retval != 0:
-            err("unable to run {0}\n{1}".format(source["name"], stderr))
-        try:
-            etree = ET.fromstring(stdout)
-            for e in etree.findall("./parameters/parameter"):
-                prop = get_cluster_property_from_xml(e)
-                if prop["name"] not in banned_props:
-                    prop["source"] = source["name"]
-                    prop["advanced"] = prop["name"] not in basic_props
-                    if prop["name"] in readable_names:
-                        prop["readable_name"] = readable_names[prop["name"]]
-                    else:
-                        prop["readable_name"] = prop["name"]
-                    definition[prop["name"]] = prop
-        except xml.parsers.expat.ExpatError as e:
-            err("unable to parse {0} metadata definition: {1}".format(
-                source["name"],
-                e
-            ))
-        except ET.ParseError as e:
-            err("unable to parse {0} metadata definition: {1}".format(
-                source["name"],
-                e
-            ))
-    return definition
-
+    # imported here as it is only needed by a few commands
+    from pcs.lib import cluster_property as lib_cluster_property
+    try:
+        return lib_cluster_property.get_cluster_properties_definition(
+            cmd_runner()
+        )
+    except LibraryError as e:
+        process_library_reports(e.args)
 
-def get_cluster_property_from_xml(etree_el):
-    property = {
-        "name": etree_el.get("name", ""),
-        "shortdesc": "",
-        "longdesc": "",
-    }
-    for item in ["shortdesc", "longdesc"]:
-        item_el = etree_el.find(item)
-        if item_el is not None and item_el.text is not None:
-            property[item] = item_el.text
-
-    content = etree_el.find("content")
-    if content is None:
-        property["type"] = ""
-        property["default"] = ""
-    else:
-        property["type"] = content.get("type", "")
-        property["default"] = content.get("default", "")
-
-    if property["type"] == "enum":
-        property["enum"] = []
-        if property["longdesc"]:
-            values = property["longdesc"].split("  Allowed values: ")
-            if len(values) == 2:
-                property["enum"] = values[1].split(", ")
-                property["longdesc"] = values[0]
-        if property["default"] not in property["enum"]:
-            property["enum"].append(property["default"])
-
-    if property["longdesc"] == property["shortdesc"]:
-        property["longdesc"] = ""
-    return property
+@simple_cache
+def get_connection_pool():
+    # All lib commands run in one pcs process talk to the same nodes, so they
+    # share the pool and reuse connections established by previous commands.
+    return ConnectionPool(share_tls_sessions=True)
 
 def get_lib_env():
     user = None
@@ -2778,6 +2834,7 @@ def get_lib_env():
         except IOError as e:
             err("Unable to read %s: %s" % (conf, e.strerror))
 
+    from pcs.lib.env import LibraryEnvironment
     return LibraryEnvironment(
         logging.getLogger("pcs"),
         get_report_processor(),
@@ -2787,6 +2844,11 @@ def get_lib_env():
         corosync_conf_data,
         token_file_data_getter=read_token_file,
         request_timeout=pcs_options.get("--request-timeout"),
+        connection_pool=get_connection_pool(),
+        communication_debug_policy=(
+            DEBUG_ALWAYS if "--debug" in pcs_options else None
+        ),
+        cib_cache=cib_cache,
     )
 
 def get_cli_env():
@@ -2807,6 +2869,9 @@ def get_cli_env():
     env.token_file_data_getter = read_token_file
     env.debug = "--debug" in pcs_options
     env.request_timeout = pcs_options.get("--request-timeout")
+    env.connection_pool = get_connection_pool()
+    env.lib_env = shared_lib_env
+    env.cib_cache = cib_cache
     return env
 
 def get_middleware_factory():
@@ -2855,6 +2920,7 @@ def get_modifiers():
         "monitor": "--monitor" in pcs_options,
         "name": pcs_options.get("--name", None),
         "no-default-ops": "--no-default-ops" in pcs_options,
+        "refresh_cache": "--refresh-cache" in pcs_options,
         "skip_offline_nodes": "--skip-offline" in pcs_options,
         "start": "--start" in pcs_options,
         "wait": pcs_options.get("--wait", False),
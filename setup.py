@@ -3,6 +3,7 @@
 import os
 
 from setuptools import setup, Command, find_packages
+from setuptools.command.build_py import build_py
 
 class CleanCommand(Command):
     user_options = []
@@ -15,6 +16,22 @@ class CleanCommand(Command):
         assert os.getcwd() == self.cwd, 'Must be in package root: %s' % self.cwd
         os.system('rm -rf ./build ./dist ./*.pyc ./*.egg-info')
 
+class BuildPyCommand(build_py):
+    # Precompute the bash completion tree, so it is not generated from usage
+    # on each completion.
+    def run(self):
+        build_py.run(self)
+        if self.dry_run:
+            return
+        from pcs import usage
+        from pcs.cli.common import completion
+        package_dir = os.path.join(self.build_lib, "pcs")
+        completion.save_suggestion_tree(
+            os.path.join(package_dir, "completion_tree.json"),
+            os.path.join(package_dir, "usage.py"),
+            usage.generate_completion_tree_from_usage()
+        )
+
 setup(
     name='pcs',
     version='0.9.162',
@@ -39,6 +56,7 @@ setup(
         ],
     },
     cmdclass={
+        'build_py': BuildPyCommand,
         'clean': CleanCommand,
     }
 )